@@ -9,9 +9,11 @@ class Config:
     BINANCE_SECRET_KEY = os.getenv('BINANCE_SECRET_KEY')
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
     METAAPI_TOKEN = os.getenv('METAAPI_TOKEN')
+    METAAPI_ACCOUNT_ID = os.getenv('METAAPI_ACCOUNT_ID')
     
     # App Settings
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_NIVEIS = os.getenv('LOG_NIVEIS', '')   # nível por subsistema: "binance_client=WARNING,estrategia=DEBUG"
     DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
     TZ = os.getenv('TZ', 'UTC')
     
@@ -19,14 +21,19 @@ class Config:
     DEFAULT_SYMBOL = os.getenv('DEFAULT_SYMBOL', 'BTC/USDT')
     DEFAULT_TIMEFRAME = os.getenv('DEFAULT_TIMEFRAME', '1h')
     
+    # Metrics (Prometheus text format)
+    METRICAS_PORTA = int(os.getenv('METRICAS_PORTA', '0')) or None
+    METRICAS_ARQUIVO = os.getenv('METRICAS_ARQUIVO')
+    
     # Paths
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     LOGS_DIR = os.path.join(BASE_DIR, 'logs')
+    DATA_DIR = os.path.join(BASE_DIR, 'data')
     
     @staticmethod
     def ensure_directories():
         """Ensure necessary directories exist"""
-        directories = [Config.LOGS_DIR]
+        directories = [Config.LOGS_DIR, Config.DATA_DIR]
         for directory in directories:
             if not os.path.exists(directory):
                 os.makedirs(directory)
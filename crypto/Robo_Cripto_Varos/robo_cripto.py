@@ -1,23 +1,17 @@
-import pandas as pd
 import os 
+import sys
 import time 
-from binance.client import Client
-from binance.enums import *
-from dotenv import load_dotenv
+import logging
 
-# Carrega variáveis de ambiente do arquivo .env (onde chaves API devem estar armazenadas)
-load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from shared.utils.data_fetcher import obter_cache
+from shared.indicators import CruzamentoMedias
+from shared.utils.logger import configurar_logs
 
-# Obtém as chaves API das variáveis de ambiente
-api_key = os.getenv("KEY_BINANCE")
-secret_key = os.getenv("SECRET_BINANCE")
+logger = logging.getLogger("robo_cripto")
 
-# Inicializa o cliente da Binance com as chaves
-cliente_binance = Client(api_key, secret_key)
-
-# Configurações para correção de problemas de tempo/sincronização
-cliente_binance.REQUEST_TIMEOUT = 10  # correção de erro
-cliente_binance.timestamp_offset = cliente_binance.get_server_time()['serverTime'] - int(time.time() * 1000) # correção de erro
+# Cliente criado em iniciar(): importar este módulo não lê .env nem acessa a rede
+cliente_binance = None
 
 # symbol_info = cliente_binance.get_symbol_info('BTCUSDT')
 # lot_size_filter = next(f for f in symbol_info['filters'] if f['filterType'] == 'LOT_SIZE')
@@ -30,21 +24,39 @@ cliente_binance.timestamp_offset = cliente_binance.get_server_time()['serverTime
 # Parâmetros para operação
 codigo_operado = "SOLBRL"   # Par de negociação
 ativo_operado = "SOL"       # Moeda base
-periodo_candle = Client.KLINE_INTERVAL_1HOUR # Intervalo dos candles (1 hora)
+periodo_candle = "1h" # Intervalo dos candles (1 hora)
 quantidade = 0.055 # Quantidade fixa para compra
 
+# Médias de 7 e 40 períodos mantidas incrementalmente entre os ciclos
+cruzamento = CruzamentoMedias(7, 40)
+
+def iniciar():
+    """Carrega as chaves do .env e cria o cliente compartilhado da Binance"""
+    global cliente_binance
+    from dotenv import load_dotenv
+    from crypto.src.binance_client import obter_cliente
+
+    # Carrega variáveis de ambiente do arquivo .env (onde chaves API devem estar armazenadas)
+    load_dotenv()
+    api_key = os.getenv("KEY_BINANCE")
+    secret_key = os.getenv("SECRET_BINANCE")
+
+    # Timeout de 10s; o deslocamento do relógio é medido e renovado pelo próprio cliente
+    cliente_binance = obter_cliente(api_key, secret_key, requests_params={'timeout': 10})
+    return cliente_binance
+
 def pegando_dados(codigo, intervalo):
-   """Obtém dados históricos de candles da Binance"""
-    
-    # Busca últimos 1000 candles
-    candles = cliente_binance.get_klines(symbol = codigo, interval = intervalo, limit = 1000)
-    # Converte para DataFrame e nomeia coluna
-    precos = pd.DataFrame(candles)
-    precos.columns = ["tempo_abertura", "abertura", "maxima", "minima", "fechamento", "volume", "tempo_fechamento", "moedas_negociadas", "numero_trades",
-                    "volume_ativo_base_compra", "volume_ativo_cotação", "-"]
+    """Obtém dados históricos de candles da Binance"""
+    import pandas as pd
+
+    # Últimos 1000 candles via cache incremental (só os candles novos são baixados)
+    cache = obter_cache(cliente_binance.get_klines, codigo, intervalo, mercado="spot")
+    cache.atualizar()
+    cruzamento.sincronizar(cache.fechadas)  # médias incrementais: só os candles novos
+    candles = cache.janela(1000)
 
     # Mantém apenas colunas relevantes
-    precos = precos[["fechamento", "tempo_fechamento"]]
+    precos = pd.DataFrame({"fechamento": candles["close"], "tempo_fechamento": candles["t_close"]})
 
     # Converte timestamp para datetime com fuso horário
     precos["tempo_fechamento"] = pd.to_datetime(precos["tempo_fechamento"], unit = "ms").dt.tz_localize("UTC")
@@ -55,14 +67,9 @@ def pegando_dados(codigo, intervalo):
 
 def estrategia_trade(dados, codigo_ativo, ativo_operado, quantidade, posicao):
     """Executa estratégia de trading baseada em médias móveis"""
-    # Calcula médias móveis
-    dados["media_rapida"] = dados["fechamento"].rolling(window = 7).mean()   # MMA de 7 períodos
-    dados["media_devagar"] = dados["fechamento"].rolling(window = 40).mean() # MMA de 40 períodos
-
-    # Obtém últimos valores das médias
-    ultima_media_rapida = dados["media_rapida"].iloc[-1]
-    ultima_media_devagar = dados["media_devagar"].iloc[-1]
-    print(f"Última Média Rápida: {ultima_media_rapida} | Última Média Devagar: {ultima_media_devagar}")
+    # Últimos valores das médias (MMA 7 e 40), incluindo o candle em formação
+    ultima_media_rapida, ultima_media_devagar = cruzamento.espiar(dados["fechamento"].iloc[-1])
+    logger.info("Última Média Rápida: %s | Última Média Devagar: %s", ultima_media_rapida, ultima_media_devagar)
 
     # Verifica saldo disponível do ativo
     conta = cliente_binance.get_account()
@@ -77,12 +84,12 @@ def estrategia_trade(dados, codigo_ativo, ativo_operado, quantidade, posicao):
         if posicao == False: # Se não está posicionado
             # Executa ordem de compra
             order = cliente_binance.create_order(symbol = codigo_ativo,
-                side = SIDE_BUY,
-                type = ORDER_TYPE_MARKET,
+                side = 'BUY',
+                type = 'MARKET',
                 quantity = quantidade
                 )
             
-            print("COMPROU O ATIVO")
+            logger.info("COMPROU O ATIVO")
             posicao = True # Atualiza estado para posicionado
 
     elif ultima_media_rapida < ultima_media_devagar:  # Tendência de baixa
@@ -90,28 +97,42 @@ def estrategia_trade(dados, codigo_ativo, ativo_operado, quantidade, posicao):
         if posicao == True:  # Se está posicionado
             # Executa ordem de venda com quantidade disponível (ajustada para 3 casas decimais)
             order = cliente_binance.create_order(symbol = codigo_ativo,
-                side = SIDE_SELL,
-                type = ORDER_TYPE_MARKET,
+                side = 'SELL',
+                type = 'MARKET',
                 quantity = int(quantidade_atual * 1000)/1000)
             
-            print("VENDER O ATIVO")
+            logger.info("VENDER O ATIVO")
             posicao = False # Atualiza estado para não posicionado
 
     return posicao
 
-# Loop principal de operação
-posicao_atual = False # Controla se está com posição aberta
-while True:
-    # Atualiza dados e executa estratégia
-    dados_atualizados = pegando_dados(codigo=codigo_operado, intervalo=periodo_candle)
-    posicao_atual = estrategia_trade(
-        dados_atualizados, 
-        codigo_ativo=codigo_operado, 
-        ativo_operado=ativo_operado, 
-        quantidade=quantidade, posicao=posicao_atual)
-        
-    # Espera 1 hora até próxima verificação
-    time.sleep(60 * 60)
-
+def posicao_na_corretora(ativo, quantidade):
+    """Posição real na partida: posicionado se o saldo do ativo cobre ao menos metade do lote
+    (a taxa de compra é descontada no próprio ativo; poeira de vendas anteriores não conta)"""
+    saldo = cliente_binance.get_asset_balance(asset=ativo)
+    total = float(saldo["free"]) + float(saldo["locked"]) if saldo else 0.0
+    posicionado = total >= quantidade / 2
+    logger.info("Saldo de %s na partida: %s -> %s", ativo, total, "posicionado" if posicionado else "sem posição")
+    return posicionado
+
+def main():
+    configurar_logs("robo_cripto")
+    iniciar()
+
+    # Loop principal de operação
+    posicao_atual = posicao_na_corretora(ativo_operado, quantidade) # Controla se está com posição aberta
+    while True:
+        # Atualiza dados e executa estratégia
+        dados_atualizados = pegando_dados(codigo=codigo_operado, intervalo=periodo_candle)
+        posicao_atual = estrategia_trade(
+            dados_atualizados, 
+            codigo_ativo=codigo_operado, 
+            ativo_operado=ativo_operado, 
+            quantidade=quantidade, posicao=posicao_atual)
+            
+        # Espera 1 hora até próxima verificação
+        time.sleep(60 * 60)
 
 
+if __name__ == "__main__":
+    main()
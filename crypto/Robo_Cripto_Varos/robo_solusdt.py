@@ -1,58 +1,68 @@
-import pandas as pd
 import os 
+import sys
 import time 
-from binance.client import Client
-from binance.enums import *
+import logging
 
-from dotenv import load_dotenv
-load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from shared.utils.data_fetcher import obter_cache
+from shared.indicators import CruzamentoMedias
+from shared.utils.logger import configurar_logs
 
-# Configuração das chaves API
-api_key = os.getenv("KEY_BINANCE")
-secret_key = os.getenv("SECRET_BINANCE")
+logger = logging.getLogger("robo_solusdt")
 
-# Inicialização do cliente Binance
-cliente_binance = Client(api_key, secret_key)
-cliente_binance.REQUEST_TIMEOUT = 10
-cliente_binance.timestamp_offset = 
-    cliente_binance.get_server_time()['serverTime'] - int(time.time() * 1000)
+# Cliente criado em iniciar(): importar este módulo não lê .env nem acessa a rede
+cliente_binance = None
 
 # Configuração para mercado futuro
 codigo_operado = "SOLUSDT"  # Par para futuros
 ativo_referencia = "USDT"   # Moeda de referência para futuros
-periodo_candle = Client.KLINE_INTERVAL_1HOUR
+periodo_candle = "1h"
 quantidade_contratos = 1  # Quantidade de contratos (ajuste conforme sua estratégia)
 alavancagem = 2  # Alavancagem de 2x
 
-# Configurar alavancagem para futuros
-try:
-    cliente_binance.futures_change_leverage(symbol=codigo_operado, leverage=alavancagem)
-    print(f"Alavancagem configurada para {alavancagem}x em {codigo_operado}")
-except Exception as e:
-    print(f"Erro ao configurar alavancagem: {e}")
+# Médias de 7 e 40 períodos mantidas incrementalmente entre os ciclos
+cruzamento = CruzamentoMedias(7, 40)
+
+def iniciar():
+    """Carrega as chaves, cria o cliente e configura a alavancagem"""
+    global cliente_binance
+    from dotenv import load_dotenv
+    from crypto.src.binance_client import obter_cliente
+
+    # Configuração das chaves API
+    load_dotenv()
+    api_key = os.getenv("KEY_BINANCE")
+    secret_key = os.getenv("SECRET_BINANCE")
+
+    # Inicialização do cliente Binance
+    # (o deslocamento do relógio é medido e renovado pelo próprio cliente)
+    cliente_binance = obter_cliente(api_key, secret_key, requests_params={'timeout': 10})
+
+    # Configurar alavancagem para futuros
+    try:
+        cliente_binance.futures_change_leverage(symbol=codigo_operado, leverage=alavancagem)
+        logger.info("Alavancagem configurada para %sx em %s", alavancagem, codigo_operado)
+    except Exception as e:
+        logger.error("Erro ao configurar alavancagem: %s", e)
+    return cliente_binance
 
 def pegando_dados_futuros(codigo, intervalo):
-    """Obtém dados de candles do mercado futuro"""
-    candles = cliente_binance.futures_klines(symbol=codigo, interval=intervalo, limit=1000)
-    precos = pd.DataFrame(candles)
-    precos.columns = ["tempo_abertura", "abertura", "maxima", "minima", "fechamento", "volume", 
-                     "tempo_fechamento", "volume_em_ativos", "numero_trades",
-                     "taker_buy_base_asset_volume", "taker_buy_quote_asset_volume", "ignore"]
-    precos = precos[["fechamento", "tempo_fechamento"]]
-    precos["fechamento"] = precos["fechamento"].astype(float)
+    """Obtém dados de candles do mercado futuro (cache incremental: só baixa candles novos)"""
+    import pandas as pd
+    cache = obter_cache(cliente_binance.futures_klines, codigo, intervalo)
+    cache.atualizar()
+    cruzamento.sincronizar(cache.fechadas)  # médias incrementais: só os candles novos
+    candles = cache.janela(1000)
+    precos = pd.DataFrame({"fechamento": candles["close"], "tempo_fechamento": candles["t_close"]})
     precos["tempo_fechamento"] = pd.to_datetime(precos["tempo_fechamento"], unit="ms").dt.tz_localize("UTC")
     precos["tempo_fechamento"] = precos["tempo_fechamento"].dt.tz_convert("America/Sao_Paulo")
     return precos
 
 def estrategia_futuros(dados, codigo_ativo, quantidade, posicao_aberta):
     """Executa estratégia de trading para futuros"""
-    dados["media_rapida"] = dados["fechamento"].rolling(window=7).mean()
-    dados["media_devagar"] = dados["fechamento"].rolling(window=40).mean()
-
-    ultima_media_rapida = dados["media_rapida"].iloc[-1]
-    ultima_media_devagar = dados["media_devagar"].iloc[-1]
+    ultima_media_rapida, ultima_media_devagar = cruzamento.espiar(dados["fechamento"].iloc[-1])
 
-    print(f"Última Média Rápida: {ultima_media_rapida:.4f} | Última Média Devagar: {ultima_media_devagar:.4f}")
+    logger.info("Última Média Rápida: %.4f | Última Média Devagar: %.4f", ultima_media_rapida, ultima_media_devagar)
 
     # Verificar posições abertas em futuros
     try:
@@ -61,11 +71,11 @@ def estrategia_futuros(dados, codigo_ativo, quantidade, posicao_aberta):
         
         if posicao_atual and float(posicao_atual['positionAmt']) != 0:
             posicao_aberta = True
-            print(f"Posição aberta encontrada: {posicao_atual['positionAmt']} contratos")
+            logger.info("Posição aberta encontrada: %s contratos", posicao_atual['positionAmt'])
         else:
             posicao_aberta = False
     except Exception as e:
-        print(f"Erro ao verificar posições: {e}")
+        logger.error("Erro ao verificar posições: %s", e)
         return posicao_aberta
 
     # Lógica de trading para futuros
@@ -79,10 +89,10 @@ def estrategia_futuros(dados, codigo_ativo, quantidade, posicao_aberta):
                     type='MARKET',
                     quantity=quantidade
                 )
-                print("POSIÇÃO LONG ABERTA - COMPROU FUTUROS")
+                logger.info("POSIÇÃO LONG ABERTA - COMPROU FUTUROS")
                 posicao_aberta = True
             except Exception as e:
-                print(f"Erro ao abrir posição long: {e}")
+                logger.error("Erro ao abrir posição long: %s", e)
 
     elif ultima_media_rapida < ultima_media_devagar:
         if posicao_aberta:
@@ -95,21 +105,37 @@ def estrategia_futuros(dados, codigo_ativo, quantidade, posicao_aberta):
                     quantity=quantidade,
                     reduceOnly='true'  # Garante que é apenas para reduzir posição
                 )
-                print("POSIÇÃO LONG FECHADA - VENDEU FUTUROS")
+                logger.info("POSIÇÃO LONG FECHADA - VENDEU FUTUROS")
                 posicao_aberta = False
             except Exception as e:
-                print(f"Erro ao fechar posição: {e}")
+                logger.error("Erro ao fechar posição: %s", e)
 
     return posicao_aberta
 
-# Loop principal de operação
-posicao_aberta = False
-while True:
-    try:
-        dados_atualizados = pegando_dados_futuros(codigo=codigo_operado, intervalo=periodo_candle)
-        posicao_aberta = estrategia_futuros(dados_atualizados, codigo_ativo=codigo_operado, 
-                                           quantidade=quantidade_contratos, posicao_aberta=posicao_aberta)
-        time.sleep(60 * 60)  # Espera 1 hora
-    except Exception as e:
-        print(f"Erro no loop principal: {e}")
-        time.sleep(60 * 5)  # Espera 5 minutos em caso de erro
\ No newline at end of file
+def posicao_na_corretora(codigo_ativo):
+    """Posição real na partida (evita reabrir uma posição que já existe após um reinício)"""
+    posicoes = cliente_binance.futures_position_information(symbol=codigo_ativo)
+    posicao = next((p for p in posicoes if p['symbol'] == codigo_ativo), None)
+    quantidade = float(posicao['positionAmt']) if posicao else 0.0
+    logger.info("Posição em %s na partida: %s contratos", codigo_ativo, quantidade)
+    return quantidade != 0
+
+def main():
+    configurar_logs("robo_solusdt")
+    iniciar()
+
+    # Loop principal de operação
+    posicao_aberta = posicao_na_corretora(codigo_operado)
+    while True:
+        try:
+            dados_atualizados = pegando_dados_futuros(codigo=codigo_operado, intervalo=periodo_candle)
+            posicao_aberta = estrategia_futuros(dados_atualizados, codigo_ativo=codigo_operado, 
+                                               quantidade=quantidade_contratos, posicao_aberta=posicao_aberta)
+            time.sleep(60 * 60)  # Espera 1 hora
+        except Exception as e:
+            logger.error("Erro no loop principal: %s", e)
+            time.sleep(60 * 5)  # Espera 5 minutos em caso de erro
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+"""Robô de Futuros USDT-M SOLUSDT H1 (cruzamento de médias 7 x 40, só LONG).
+
+Importar este módulo não lê credenciais, não cria cliente e não acessa a
+rede: isso acontece em ``iniciar()``, chamada por ``main()``. Imports
+pesados (``binance``, ``pandas``) também ficam para a partida ou para as
+funções que os usam.
+
+Ao fim de cada ciclo o estado das médias, a posição e as ordens pendentes
+vão para ``data/estado_futuros_<PAR>_<PERIODO>.json``; na partida esse
+checkpoint é retomado e conferido com a exchange (``restaurar_estado``).
+Execução::
+
+    python -m crypto.sol_futures.futures_bot [--stream]
+    python crypto/sol_futures/futures_bot-SOLUSDT.py [--stream]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from config.settings import Config
+from config.constants import INTERVALO_MS
+from shared.utils.data_fetcher import obter_cache
+from shared.utils.startup import MedidorPartida
+from shared.utils.logger import Ciclo, obter_metricas, iniciar_exportacao, configurar_logs
+from shared.utils.trade_journal import obter_diario
+from shared.utils.checkpoint import Checkpoint
+from shared.utils.scheduler import Backoff, proximo_fechamento
+from shared.indicators import CruzamentoMedias, desvio_retornos
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# =========================
+# Configurações do Robô
+# =========================
+PAR                   = "SOLUSDT"                         # Par USDT-M de Futuros
+PERIODO               = "1h"                              # H1
+MEDIA_RAPIDA          = 7                                 # MM curta
+MEDIA_LENTA           = 40                                # MM longa (original)
+TIPO_MEDIA            = "SMA"                             # 'SMA' ou 'EMA'
+ALAVANCAGEM           = 2                                 # Alavancagem
+TIPO_MARGEM           = 'ISOLATED'                        # 'ISOLATED' ou 'CROSSED'
+PCT_SALDO             = 0.90                              # 90% do saldo em USDT por operação
+RECV_WINDOW_MS        = 60000                             # 60s para robustez de rede
+ESPERA_ERRO_SEG       = 60                                # Teto do backoff (com jitter) em erro transitório
+MARGEM_FECHAMENTO_SEG = 0.5                               # acorda N s depois da virada da vela (servidor)
+LIMITE_CANDLES        = 1000                              # histórico para análise/testes
+ANTECEDENCIA_SEG      = 3                                 # ordem montada N s antes do fechamento (stream)
+IDADE_MAX_ORDEM_SEG   = 30                                # ordem antecipada mais velha que isso é refeita
+MAX_PERDAS_SEGUIDAS   = 3                                 # circuit breaker: perdas seguidas (None desliga)
+PAUSA_PERDAS_VELAS    = 24                                # entradas suspensas por N velas após a última perda
+ORCAMENTO_PARTIDA_MS  = 3000                              # aviso se a partida passar disso
+
+logger = logging.getLogger("robo_futuros")
+metricas = obter_metricas()
+
+# Telemetria das decisões no diário (últimas em diario.operacoes_recentes)
+def registrar_operacao(acao: str, quantidade: float, preco: float, forca_sinal: float, saldo_usdt: float):
+    diario.operacao(PAR, acao, quantidade, preco, forca_sinal, saldo_usdt)
+
+# =========================
+# Estado de execução (preenchido por iniciar())
+# =========================
+cliente  = None     # ClienteBinance compartilhado: pool keep-alive, orçamento de peso e relógio do servidor
+conta    = None     # EstadoConta: saldo/posição/preço de um instantâneo por ciclo
+simbolos = None     # InfoSimbolos: exchange info em disco (data/exchange_info_futures.json)
+executor = None     # ExecutorOrdens: filtros em cache e client order id por vela
+estrategia = None   # EstrategiaCruzamento: modos da conta, ordem de cada sinal e circuit breaker
+diario   = None     # DiarioOperacoes: execuções, P&L realizado e perdas seguidas (data/diario_operacoes.sqlite)
+checkpoint = None   # Checkpoint do estado entre reinícios (None sem DATA_DIR)
+FILTROS      = {}
+PASSO_QTD    = None
+NOTIONAL_MIN = None
+
+# =========================
+# Utilidades de Tempo
+# =========================
+def tempo_servidor_ms() -> int:
+    """Tempo do servidor de Futuros em ms: relógio local + deslocamento mantido pelo cliente, sem ida à API."""
+    relogio = getattr(cliente, "relogio_servidor", None)
+    if relogio is not None:
+        return int(relogio() * 1000)
+    return cliente.futures_time()['serverTime']
+
+def aguardar_fechamento(periodo: str = None):
+    """Dorme até ``MARGEM_FECHAMENTO_SEG`` depois do fechamento da próxima vela de ``periodo`` (padrão ``PERIODO``)."""
+    periodo = periodo or PERIODO
+    try:
+        agora_ms = tempo_servidor_ms()
+    except Exception:
+        agora_ms = int(time.time() * 1000)  # fallback local
+    agora_s = agora_ms / 1000
+    restante = proximo_fechamento(periodo, agora_s) + MARGEM_FECHAMENTO_SEG - agora_s
+    agora_s = int(agora_s)
+    # Auditoria de horários
+    hora_server = datetime.utcfromtimestamp(agora_s).strftime("%Y-%m-%d %H:%M:%S UTC")
+    try:
+        # Exibição no fuso de São Paulo para leitura
+        from zoneinfo import ZoneInfo
+        hora_sp = datetime.fromtimestamp(agora_s, ZoneInfo("America/Sao_Paulo")).strftime("%Y-%m-%d %H:%M:%S %Z")
+    except Exception:
+        hora_sp = "indisp."
+    logger.info("[Timing] server=%s | SP=%s | aguardando %.1fs até próxima %s", hora_server, hora_sp, restante, periodo)
+    time.sleep(restante)
+
+# =========================
+# Exchange Info / Filtros
+# =========================
+def cachear_filtros(par: str):
+    filtros = simbolos.filtros(par)
+    return {
+        "MARKET_LOT_SIZE": filtros["MARKET_LOT_SIZE"],
+        "MIN_NOTIONAL":   filtros["MIN_NOTIONAL"],
+        "PRICE_FILTER":   filtros["PRICE_FILTER"],
+    }
+
+# =========================
+# Partida
+# =========================
+def iniciar(cliente_externo=None, diario_externo=None) -> MedidorPartida:
+    """Credenciais, cliente, conta, filtros, diário e executor. Sem isso nenhuma função de conta/ordem funciona."""
+    global cliente, conta, simbolos, executor, estrategia, diario, checkpoint, FILTROS, PASSO_QTD, NOTIONAL_MIN
+    partida = MedidorPartida(f"futuros-{PAR}", ORCAMENTO_PARTIDA_MS)
+
+    with partida.fase("imports"):
+        from crypto.src.binance_client import obter_cliente
+        from crypto.src.account_state import EstadoConta
+        from crypto.src.order_executor import VELAS_RETIDAS, ExecutorOrdens
+        from crypto.src.exchange_info import obter_info
+        from crypto.strategies.sma_crossover import EstrategiaCruzamento
+
+    with partida.fase("cliente"):
+        if cliente_externo is not None:
+            cliente = cliente_externo
+        else:
+            from dotenv import load_dotenv
+            load_dotenv()
+            api_key    = os.getenv("KEY_BINANCE")
+            secret_key = os.getenv("SECRET_BINANCE")
+            if not api_key or not secret_key:
+                raise RuntimeError("Chaves de API não encontradas. Defina KEY_BINANCE e SECRET_BINANCE no .env")
+            cliente = obter_cliente(api_key, secret_key, requests_params={'timeout': 30})
+        conta = EstadoConta(cliente, recv_window=RECV_WINDOW_MS)
+
+    with partida.fase("diario"):
+        diario = diario_externo if diario_externo is not None else obter_diario()
+
+    with partida.fase("filtros"):
+        simbolos = obter_info(cliente, "futures")
+        FILTROS = cachear_filtros(PAR)
+        PASSO_QTD    = float(FILTROS["MARKET_LOT_SIZE"]["stepSize"])
+        NOTIONAL_MIN = float(FILTROS["MIN_NOTIONAL"]["notional"])
+        executor = ExecutorOrdens(cliente, conta, {PAR: FILTROS}, prefixo="sma", recv_window=RECV_WINDOW_MS,
+                                  simbolos=simbolos, diario=diario,
+                                  retencao_s=VELAS_RETIDAS * INTERVALO_MS[PERIODO] / 1000)
+        estrategia = EstrategiaCruzamento(
+            cliente, PAR, PERIODO, MEDIA_RAPIDA, MEDIA_LENTA, TIPO_MEDIA, ALAVANCAGEM, PCT_SALDO, TIPO_MARGEM,
+            conta=conta, executor=executor, simbolos=simbolos, diario=diario, prefixo="sma", cruzamento=cruzamento,
+            max_perdas_seguidas=MAX_PERDAS_SEGUIDAS, pausa_perdas_velas=PAUSA_PERDAS_VELAS,
+        )
+
+    with partida.fase("estado"):
+        checkpoint = None
+        if Config.DATA_DIR:
+            checkpoint = Checkpoint(
+                os.path.join(Config.DATA_DIR, f"estado_futuros_{PAR}_{PERIODO}.json"),
+                {"par": PAR, "periodo": PERIODO, "rapida": MEDIA_RAPIDA, "lenta": MEDIA_LENTA, "tipo": TIPO_MEDIA},
+            )
+            restaurar_estado()
+    return partida
+
+# =========================
+# Checkpoint / Retomada
+# =========================
+def salvar_estado(posicao: float):
+    if checkpoint is None:
+        return
+    try:
+        checkpoint.salvar({
+            "cruzamento": cruzamento.estado(),
+            "posicao": posicao,
+            "ordens_pendentes": executor.pendentes(),
+        })
+    except OSError as e:
+        logger.warning(f"[Checkpoint] Falha ao salvar: {e}")
+
+def restaurar_estado() -> bool:
+    """Retoma médias e ordens pendentes do checkpoint e confere a posição com um instantâneo da conta.
+
+    As velas fechadas depois do checkpoint entram em ``sincronizar`` no
+    primeiro ciclo, sem reaquecer as médias do histórico inteiro.
+    """
+    estado = checkpoint.carregar()
+    if estado is None:
+        return False
+    try:
+        cruzamento.restaurar(estado["cruzamento"])
+    except (KeyError, ValueError, TypeError) as e:
+        logger.warning(f"[Retomada] Estado das médias inválido ({e}); reaquecendo do histórico")
+        cruzamento.reiniciar()
+    for ordem in executor.retomar(estado.get("ordens_pendentes", [])):
+        logger.info(f"[Retomada] Ordem {ordem.id_cliente} {ordem.lado} {ordem.quantidade}: {ordem.estado}")
+    conta.instantaneo(forcar=True)
+    posicao = posicao_aberta(PAR)
+    if abs(posicao - estado.get("posicao", 0.0)) > 1e-12:
+        logger.warning(f"[Retomada] Posição mudou com o robô parado: {estado.get('posicao')} -> {posicao}")
+    ultima = cruzamento.ultimo_t_open
+    logger.info(f"[Retomada] Médias até a vela {ultima} | posição={posicao}")
+    return True
+
+# =========================
+# Consulta de Conta/Posição
+# =========================
+def saldo_usdt() -> float:
+    return conta.saldo("USDT")
+
+def preco_atual(par: str) -> float:
+    return conta.preco(par)
+
+def posicao_aberta(par: str) -> float:
+    """Tamanho (contracts) da posição (positivo=LONG, negativo=SHORT). One-way mode."""
+    return conta.posicao(par)
+
+def fechar_posicao_se_existir(par: str):
+    amt = posicao_aberta(par)
+    if amt == 0:
+        return
+    lado = 'SELL' if amt > 0 else 'BUY'
+    logger.info(f"[Fechamento] Fechando {par}: qty={abs(amt)} side={lado}")
+    ordem = executor.preparar(par, lado, abs(amt), int(time.time() * 1000), reduce_only=True)
+    executor.enviar(ordem)
+
+# =========================
+# Cálculo de Quantidade
+# =========================
+def calcular_quantidade(par: str, pct_saldo: float, alavancagem: int) -> float:
+    """90% do saldo * leverage, no passo do MARKET_LOT_SIZE e acima do MIN_NOTIONAL."""
+    return executor.quantidade(par, pct_saldo, alavancagem)
+
+# =========================
+# Dados de Mercado
+# =========================
+# Stream WebSocket (modo --stream); None no modo REST
+stream = None
+
+def cache_klines(par: str, periodo: str):
+    return obter_cache(cliente.futures_klines, par, periodo,
+                       limite=LIMITE_CANDLES, diretorio=Config.DATA_DIR)
+
+def buscar_klines_fechados(par: str, periodo: str, limite: int = LIMITE_CANDLES) -> "pd.DataFrame":
+    """Últimas ``limite`` velas via cache incremental (só as velas novas são baixadas)."""
+    cache = cache_klines(par, periodo)
+    cache.atualizar()
+    return cache.dataframe(limite)
+
+# =========================
+# Estratégia (7 x 40)
+# =========================
+def sinal_media_movel(df: "pd.DataFrame") -> str:
+    """Retorna 'COMPRA', 'VENDA' ou 'MANTER' com base no estado da **penúltima vela**."""
+    import pandas as pd
+    if len(df) < max(MEDIA_RAPIDA, MEDIA_LENTA) + 2:
+        return "MANTER"
+    fechamento = df["close"].astype(float)
+    mm_r = fechamento.rolling(window=MEDIA_RAPIDA).mean()
+    mm_l = fechamento.rolling(window=MEDIA_LENTA).mean()
+
+    # penúltima vela fechada
+    r_prev = mm_r.iloc[-2]
+    l_prev = mm_l.iloc[-2]
+
+    logger.info("[MM] Rápida(%d)=%.6f | Lenta(%d)=%.6f (base: vela fechada)", MEDIA_RAPIDA, r_prev, MEDIA_LENTA, l_prev)
+    if pd.isna(r_prev) or pd.isna(l_prev):
+        return "MANTER"
+    if r_prev > l_prev:
+        return "COMPRA"
+    if r_prev < l_prev:
+        return "VENDA"
+    return "MANTER"
+
+# Estado incremental das médias (atualizado só com velas recém-fechadas)
+cruzamento = CruzamentoMedias(MEDIA_RAPIDA, MEDIA_LENTA, TIPO_MEDIA)
+
+def sinal_incremental(velas_fechadas) -> str:
+    """Mesma decisão de ``sinal_media_movel`` sem recalcular as médias sobre o histórico."""
+    sinal = cruzamento.sincronizar(velas_fechadas)
+    r_prev, l_prev = cruzamento.valores()
+    logger.info("[MM] Rápida(%d)=%.6f | Lenta(%d)=%.6f (base: vela fechada)", MEDIA_RAPIDA, r_prev, MEDIA_LENTA, l_prev)
+    return sinal
+
+# =========================
+# Utilidades opcionais (não alteram a lógica)
+# =========================
+def mercado_volatil(par: str, desvio_limite: float = 0.05) -> bool:
+    """Usa as 20 últimas velas de 15min e calcula desvio-padrão dos retornos. Apenas informativo."""
+    try:
+        cache = cache_klines(par, "15m")
+        if stream is None or not len(cache.fechadas):
+            cache.atualizar()
+        fechamentos = cache.janela(20)["close"]
+        vol = float(desvio_retornos(fechamentos, len(fechamentos) - 1)[-1])
+        logger.info("[Vol] σ(returns 15m)=%.4f | limite=%s", vol, desvio_limite)
+        return vol > desvio_limite
+    except Exception as e:
+        logger.warning(f"[Vol] Falha ao medir volatilidade: {e}")
+        return False
+
+# =========================
+# Loop Principal
+# =========================
+def executar_ciclo(cache, ciclo: Ciclo = None):
+    """Decide e executa com base na última vela fechada do cache.
+
+    Saldo e posição vêm de um único instantâneo da conta por ciclo; o saldo
+    registrado na operação é o do instantâneo anterior à ordem. Cada fase é
+    medida em ``ciclo`` (um novo, registrado no log, se não for passado).
+    Roda sob ``estrategia.trava``: uma antecipação atrasada não se sobrepõe
+    ao ciclo do fechamento.
+    """
+    if ciclo is None:
+        with Ciclo(par=PAR) as ciclo:
+            executar_ciclo(cache, ciclo)
+        logger.info("[Ciclo] %s", ciclo.linha())
+        return
+    with estrategia.trava:
+        _executar_ciclo(cache, ciclo)
+
+def _executar_ciclo(cache, ciclo: Ciclo):
+    with ciclo.fase("sinal"):
+        sinal = sinal_incremental(cache.fechadas)
+    t_vela = int(cache.fechadas["t_open"][-1])
+    with ciclo.fase("posicao"):
+        # Com a ordem antecipada para esta vela o instantâneo recente basta; sem ela, um novo
+        lado = "BUY" if sinal == "COMPRA" else "SELL"
+        if executor.preparada(PAR, lado, t_vela, IDADE_MAX_ORDEM_SEG) is None:
+            conta.instantaneo(forcar=not conta.stream_ativo)
+        tamanho_pos = posicao_aberta(PAR)
+    with ciclo.fase("dimensionamento"):
+        ordem = estrategia.ordem_para_sinal(sinal, tamanho_pos, t_vela)
+
+    if ordem is not None:
+        px, usdt = preco_atual(PAR), saldo_usdt()
+        if ordem.lado == "BUY":
+            logger.info("[Entrada] LONG qty=%s @ ~%s", ordem.quantidade, px)
+        else:
+            logger.info("[Saída] Fechando LONG qty=%s @ ~%s", ordem.quantidade, px)
+        with ciclo.fase("envio"):
+            resposta = executor.enviar(ordem)
+        if resposta.get("status") == "FILLED":
+            executado = float(resposta.get("executedQty", ordem.quantidade))
+            tamanho_pos += executado if ordem.lado == "BUY" else -executado
+        # Do fechamento da vela (t_close + 1 ms) até a resposta da ordem
+        fechamento_s = (int(cache.fechadas["t_close"][-1]) + 1) / 1000
+        metricas.observar("robo_vela_ate_ordem_segundos", time.time() - fechamento_s, par=PAR)
+        if ordem.lado == "BUY":
+            registrar_operacao("COMPRA", ordem.quantidade, px, forca_sinal=1.0, saldo_usdt=usdt)
+        else:
+            registrar_operacao("VENDA", ordem.quantidade, px, forca_sinal=-1.0, saldo_usdt=usdt)
+    else:
+        logger.info("[Manter] sinal=%s | pos=%s", sinal, tamanho_pos)
+
+    with ciclo.fase("checkpoint"):
+        salvar_estado(tamanho_pos)
+
+    # Informativo (não bloqueia): volatilidade
+    with ciclo.fase("volatilidade"):
+        mercado_volatil(PAR)
+
+def loop_principal():
+    from binance.exceptions import BinanceAPIException, BinanceRequestException
+
+    logger.info(f"Iniciando Futuros USDT-M | {PAR} | MM {MEDIA_RAPIDA}x{MEDIA_LENTA} | Lvg {ALAVANCAGEM} | {TIPO_MARGEM}")
+    estrategia.garantir_modos_conta()
+    backoff = Backoff(base_s=1.0, maximo_s=ESPERA_ERRO_SEG)
+
+    while True:
+        try:
+            cache = cache_klines(PAR, PERIODO)
+            with Ciclo(par=PAR) as ciclo:
+                with ciclo.fase("velas"):
+                    cache.atualizar()
+                if cache.aberta is not None:
+                    executar_ciclo(cache, ciclo)
+            if cache.aberta is None:
+                espera = backoff.proxima()
+                logger.warning(f"[Dados] Sem dados. Aguardando {espera:.1f}s...")
+                time.sleep(espera)
+                continue
+            logger.info("[Ciclo] %s", ciclo.linha())
+            backoff.zerar()
+
+            # Espera até a próxima vela do período fechar
+            aguardar_fechamento()
+
+        except (BinanceAPIException, BinanceRequestException) as e:
+            espera = backoff.proxima()
+            logger.error(f"[Erro API] {e}. Repetindo em {espera:.1f}s...")
+            time.sleep(espera)
+        except Exception as e:
+            espera = backoff.proxima()
+            logger.error(f"[Erro Geral] {e}. Repetindo em {espera:.1f}s...")
+            time.sleep(espera)
+
+# =========================
+# Modo Stream (WebSocket)
+# =========================
+def antecipar_ordem(cache):
+    """Monta a ordem que a vela em formação produziria, para enviá-la sem consultas no fechamento."""
+    if cache.aberta is None:
+        return
+    with estrategia.trava:
+        conta.instantaneo(forcar=not conta.stream_ativo)
+        estrategia.antecipar(cache)
+
+async def loop_antecipacao(cache):
+    passo_s = INTERVALO_MS[PERIODO] / 1000
+    while True:
+        restante = passo_s - (time.time() % passo_s) - ANTECEDENCIA_SEG
+        await asyncio.sleep(restante if restante > 0 else restante + passo_s)
+        try:
+            await asyncio.to_thread(antecipar_ordem, cache)
+        except Exception as e:
+            logger.warning(f"[Antecipação] {e}")
+
+async def loop_stream(url: str = None):
+    """Decide no instante em que a vela fecha no stream, sem polling nem margem de segurança."""
+    global stream
+    from binance.exceptions import BinanceAPIException, BinanceRequestException
+    from crypto.src.market_stream import StreamMercado, URL_FUTUROS_WS
+
+    logger.info(f"Iniciando Futuros USDT-M (stream) | {PAR} | MM {MEDIA_RAPIDA}x{MEDIA_LENTA} | Lvg {ALAVANCAGEM} | {TIPO_MARGEM}")
+    await asyncio.to_thread(estrategia.garantir_modos_conta)
+
+    stream = StreamMercado(url or URL_FUTUROS_WS)
+    conta.fonte_preco = stream.preco_marca
+    cache = cache_klines(PAR, PERIODO)
+    cache_15m = cache_klines(PAR, "15m")
+    await asyncio.to_thread(cache.atualizar)
+    await asyncio.to_thread(cache_15m.atualizar)
+
+    async def ao_fechar(cache_evento, novas):
+        if cache_evento is not cache:
+            return
+        try:
+            await asyncio.to_thread(executar_ciclo, cache)
+        except (BinanceAPIException, BinanceRequestException) as e:
+            logger.error(f"[Erro API] {e}. Aguardando próxima vela.")
+        except Exception as e:
+            logger.error(f"[Erro Geral] {e}. Aguardando próxima vela.")
+
+    stream.ao_fechar_vela(ao_fechar)
+    stream.assinar_klines(cache)
+    stream.assinar_klines(cache_15m)
+    stream.assinar_preco_marca(PAR)
+    await asyncio.gather(stream.executar(), conta.acompanhar(), loop_antecipacao(cache))
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    configurar_logs("robo_futuros")
+    partida = iniciar()
+    partida.registrar(logger)
+    iniciar_exportacao()
+    if "--stream" in argv:
+        asyncio.run(loop_stream())
+    else:
+        loop_principal()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""Estado da conta de Futuros em cache: saldo, posições e preço por instantâneo.
+
+Um ciclo de decisão consultava posição, saldo e preço várias vezes, cada
+uma com uma chamada REST assinada. ``EstadoConta`` serve tudo de um único
+instantâneo (``futures_account``: saldos e posições de todos os pares numa
+só chamada), válido por ``ttl_s`` segundos ou até ser invalidado por uma
+ordem nossa. Com o stream de usuário ligado (``acompanhar``), os eventos
+``ACCOUNT_UPDATE`` mantêm o instantâneo em dia sem REST, e uma ordem não o
+invalida.
+
+Toda leitura expõe a idade/origem do dado (``idade_s``, ``origem``) para
+quem precisar decidir se ele é fresco o bastante.
+"""
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger("account_state")
+
+URL_USUARIO_WS = "wss://fstream.binance.com/ws"
+RECV_WINDOW_MS = 60000
+TTL_PADRAO_S = 5.0
+TTL_PRECO_S = 2.0
+KEEPALIVE_S = 30 * 60
+
+
+class Instantaneo:
+    """Saldos e posições num instante; ``origem`` é 'rest' ou 'stream'."""
+
+    __slots__ = ("saldos", "posicoes", "obtido_em", "origem", "valido")
+
+    def __init__(self, saldos: dict, posicoes: dict, origem: str = "rest"):
+        self.saldos = saldos            # ativo -> saldo da carteira
+        self.posicoes = posicoes        # par -> positionAmt (positivo=LONG)
+        self.obtido_em = time.monotonic()
+        self.origem = origem
+        self.valido = True
+
+    @property
+    def idade_s(self) -> float:
+        return time.monotonic() - self.obtido_em
+
+
+class EstadoConta:
+    def __init__(self, cliente, ttl_s: float = TTL_PADRAO_S, ttl_preco_s: float = TTL_PRECO_S,
+                 recv_window: int = RECV_WINDOW_MS):
+        self.cliente = cliente
+        self.ttl_s = ttl_s
+        self.ttl_preco_s = ttl_preco_s
+        self.recv_window = recv_window
+        self.atual = None
+        self.consultas = 0
+        self.stream_ativo = False
+        self.fonte_preco = None         # função par -> preço ou None (ex.: StreamMercado.preco_marca)
+        self._precos = {}               # par -> (preço, monotonic)
+        self._ouvintes = []
+        self._lock = threading.Lock()
+
+    # ---------- Instantâneo ----------
+    def _consultar(self) -> Instantaneo:
+        conta = self.cliente.futures_account(recvWindow=self.recv_window)
+        self.consultas += 1
+        saldos = {a["asset"]: float(a["walletBalance"]) for a in conta.get("assets", [])}
+        posicoes = {}
+        for p in conta.get("positions", []):
+            qtd = float(p["positionAmt"])
+            if qtd:
+                posicoes[p["symbol"]] = posicoes.get(p["symbol"], 0.0) + qtd
+        return Instantaneo(saldos, posicoes)
+
+    def _fresco(self, inst) -> bool:
+        if inst is None or not inst.valido:
+            return False
+        return self.stream_ativo or inst.idade_s <= self.ttl_s
+
+    def instantaneo(self, forcar: bool = False) -> Instantaneo:
+        """Instantâneo vigente; consulta a API só se vencido, invalidado ou ``forcar``."""
+        inst = self.atual
+        if not forcar and self._fresco(inst):
+            return inst
+        with self._lock:
+            inst = self.atual
+            if forcar or not self._fresco(inst):
+                inst = self.atual = self._consultar()
+            return inst
+
+    def invalidar(self):
+        """Chamado após enviar uma ordem: a próxima leitura busca estado novo.
+
+        Com o stream de usuário ativo não faz nada: o ``ACCOUNT_UPDATE`` da
+        execução atualiza o instantâneo, sem REST.
+        """
+        inst = self.atual
+        if inst is not None and not self.stream_ativo:
+            inst.valido = False
+
+    # ---------- Leituras ----------
+    def saldo(self, ativo: str = "USDT") -> float:
+        return self.instantaneo().saldos.get(ativo, 0.0)
+
+    def posicao(self, par: str) -> float:
+        return self.instantaneo().posicoes.get(par, 0.0)
+
+    def preco(self, par: str) -> float:
+        if self.fonte_preco is not None:
+            px = self.fonte_preco(par)
+            if px is not None:
+                return px
+        valor = self._precos.get(par)
+        if valor is not None and time.monotonic() - valor[1] <= self.ttl_preco_s:
+            return valor[0]
+        px = float(self.cliente.futures_symbol_ticker(symbol=par)["price"])
+        self._precos[par] = (px, time.monotonic())
+        return px
+
+    def preco_em_cache(self, par: str):
+        """Último preço conhecido (stream ou cache do ticker) sem consultar a API; None se não houver."""
+        if self.fonte_preco is not None:
+            px = self.fonte_preco(par)
+            if px is not None:
+                return px
+        valor = self._precos.get(par)
+        return valor[0] if valor is not None else None
+
+    # ---------- Stream de usuário ----------
+    def ao_evento(self, callback):
+        """Registra ``callback(evento)`` para todos os eventos do stream de usuário."""
+        self._ouvintes.append(callback)
+
+    def aplicar_evento(self, evento: dict):
+        """Aplica ``ACCOUNT_UPDATE`` (saldos/posições alterados) sobre o instantâneo vigente."""
+        for callback in self._ouvintes:
+            callback(evento)
+        tipo = evento.get("e")
+        if tipo == "ACCOUNT_UPDATE":
+            dados = evento["a"]
+            with self._lock:
+                base = self.atual
+                if base is None:
+                    return
+                saldos = dict(base.saldos)
+                posicoes = dict(base.posicoes)
+                for b in dados.get("B", []):
+                    saldos[b["a"]] = float(b["wb"])
+                for p in dados.get("P", []):
+                    qtd = float(p["pa"])
+                    if qtd:
+                        posicoes[p["s"]] = qtd
+                    else:
+                        posicoes.pop(p["s"], None)
+                self.atual = Instantaneo(saldos, posicoes, origem="stream")
+        elif tipo == "listenKeyExpired":
+            self.stream_ativo = False
+            self.invalidar()
+
+    async def acompanhar(self, url: str = URL_USUARIO_WS, backoff_max: float = 60.0):
+        """Mantém o stream de usuário; enquanto conectado, o instantâneo não vence por TTL."""
+        import websockets
+
+        espera = 1.0
+        while True:
+            try:
+                chave = await asyncio.to_thread(self.cliente.futures_stream_get_listen_key)
+                async with websockets.connect(f"{url}/{chave}") as ws:
+                    # Instantâneo base depois de conectar: nenhum evento se perde entre os dois
+                    await asyncio.to_thread(self.instantaneo, True)
+                    self.stream_ativo = True
+                    espera = 1.0
+                    logger.info("[Conta] Stream de usuário conectado")
+                    renovar = asyncio.create_task(self._manter_chave(chave))
+                    try:
+                        async for bruto in ws:
+                            self.aplicar_evento(json.loads(bruto))
+                            if not self.stream_ativo:
+                                break
+                    finally:
+                        renovar.cancel()
+            except asyncio.CancelledError:
+                self.stream_ativo = False
+                raise
+            except Exception as e:
+                logger.warning(f"[Conta] Stream de usuário caiu: {e}")
+            self.stream_ativo = False
+            self.invalidar()
+            atraso = espera * (0.5 + random.random() / 2)
+            await asyncio.sleep(atraso)
+            espera = min(espera * 2, backoff_max)
+
+    async def _manter_chave(self, chave: str):
+        while True:
+            await asyncio.sleep(KEEPALIVE_S)
+            try:
+                await asyncio.to_thread(self.cliente.futures_stream_keepalive, chave)
+            except Exception as e:
+                logger.warning(f"[Conta] Falha ao renovar listenKey: {e}")
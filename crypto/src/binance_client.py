@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""Cliente Binance compartilhado: sessão com pool keep-alive, orçamento de peso e relógio do servidor.
+
+``ClienteBinance`` é um ``binance.client.Client`` com três acréscimos:
+
+- **Pool de conexões**: uma ``requests.Session`` com ``HTTPAdapter`` dimensionado
+  para várias threads; todas as instâncias/robôs do processo reutilizam as
+  mesmas conexões TLS (``obter_cliente``).
+- **Orçamento de peso**: antes de cada requisição o peso estimado é reservado
+  no minuto corrente do host (api/fapi); depois da resposta o uso real vem do
+  cabeçalho ``X-MBX-USED-WEIGHT-1M`` (que inclui o consumo de outros processos
+  no mesmo IP). Se a reserva estouraria o limite, a thread espera a virada do
+  minuto em vez de arriscar um 429/418. ``Retry-After`` bloqueia o host.
+- **Coalescência de GETs**: GETs idênticos em andamento (mesmo endpoint e
+  parâmetros) viram uma única requisição; as demais threads recebem o mesmo
+  resultado. O objeto devolvido é compartilhado: não o altere.
+
+Cada requisição é contada por endpoint (chamadas, peso, erros e duração) nas
+métricas ``robo_rest_*`` de ``shared/utils/logger.py``.
+
+O deslocamento de relógio (``timestamp_offset``) é medido na primeira chamada
+assinada, renovado periodicamente e reajustado automaticamente quando a
+Binance responde ``-1021`` (timestamp fora do ``recvWindow``).
+"""
+import os
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+
+from shared.utils.logger import obter_metricas
+
+logger = logging.getLogger("binance_client")
+
+# Limite de peso por minuto e por IP de cada host (REQUEST_WEIGHT do exchangeInfo)
+LIMITE_PESO_MINUTO = {
+    "api": 6000,
+    "fapi": 2400,
+    "dapi": 2400,
+}
+LIMITE_PESO_PADRAO = 1200
+
+# Pesos dos endpoints usados pelos robôs; o resto conta 1 e é corrigido pelo cabeçalho
+PESOS_ENDPOINT = {
+    "/fapi/v1/exchangeInfo": 1,
+    "/fapi/v2/balance": 5,
+    "/fapi/v3/balance": 5,
+    "/fapi/v2/positionRisk": 5,
+    "/fapi/v3/positionRisk": 5,
+    "/fapi/v2/account": 5,
+    "/fapi/v3/account": 5,
+    "/api/v3/exchangeInfo": 20,
+    "/api/v3/account": 20,
+    "/api/v3/ticker/price": 2,
+}
+
+# Tickers: (peso com ``symbol``, peso sem ``symbol`` = todos os pares de uma vez)
+PESOS_TICKER = {
+    "/fapi/v1/ticker/24hr": (1, 40),
+    "/fapi/v1/ticker/bookTicker": (2, 5),
+    "/fapi/v1/ticker/price": (1, 2),
+    "/fapi/v2/ticker/price": (1, 2),
+}
+
+CODIGO_TIMESTAMP = -1021
+TEMPO_SYNC_S = 600
+
+
+def peso_estimado(uri: str, params: dict = None) -> int:
+    """Peso de uma requisição conforme a documentação da Binance (aproximado)."""
+    caminho = urlparse(uri).path
+    if caminho.endswith("/klines"):
+        limite = int((params or {}).get("limit", 500))
+        if caminho.startswith("/api/"):
+            return 2
+        if limite < 100:
+            return 1
+        if limite < 500:
+            return 2
+        return 5 if limite <= 1000 else 10
+    if caminho in PESOS_TICKER:
+        return PESOS_TICKER[caminho][0 if (params or {}).get("symbol") else 1]
+    return PESOS_ENDPOINT.get(caminho, 1)
+
+
+class OrcamentoPeso:
+    """Peso consumido no minuto corrente de um host, no estilo token bucket por janela fixa.
+
+    A Binance zera o contador a cada minuto do relógio do servidor, então o
+    "balde" é recarregado por inteiro na virada do minuto. ``registrar`` alinha
+    o consumo local com o valor autoritativo do cabeçalho.
+    """
+
+    def __init__(self, limite: int, margem: float = 0.9, relogio=time.time):
+        self.limite = max(int(limite * margem), 1)
+        self.relogio = relogio
+        self.usado = 0
+        self.esperas = 0
+        self._minuto = None
+        self._bloqueado_ate = 0.0
+        self._cond = threading.Condition()
+
+    def _virar_minuto(self, agora: float):
+        minuto = int(agora // 60)
+        if minuto != self._minuto:
+            self._minuto = minuto
+            self.usado = 0
+            self._cond.notify_all()
+
+    def reservar(self, peso: int):
+        """Bloqueia até haver ``peso`` disponível no minuto corrente e o reserva."""
+        with self._cond:
+            while True:
+                agora = self.relogio()
+                self._virar_minuto(agora)
+                espera = self._bloqueado_ate - agora
+                if espera <= 0:
+                    if self.usado == 0 or self.usado + peso <= self.limite:
+                        self.usado += peso
+                        return
+                    espera = (self._minuto + 1) * 60 - agora
+                self.esperas += 1
+                logger.warning(f"[Peso] Orçamento esgotado ({self.usado}/{self.limite}); aguardando {espera:.1f}s")
+                self._cond.wait(espera + 0.05)
+
+    def registrar(self, usado: int):
+        """Uso informado pelo servidor (``X-MBX-USED-WEIGHT-1M``) para o minuto corrente."""
+        with self._cond:
+            self._virar_minuto(self.relogio())
+            self.usado = max(self.usado, usado)
+
+    def bloquear(self, segundos: float):
+        with self._cond:
+            self._bloqueado_ate = max(self._bloqueado_ate, self.relogio() + segundos)
+
+
+class _Pendente:
+    __slots__ = ("evento", "resultado", "erro")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class ClienteBinance(Client):
+    """``Client`` do python-binance com pool de conexões, orçamento de peso e coalescência de GETs."""
+
+    def __init__(self, api_key: str = None, api_secret: str = None, requests_params: dict = None,
+                 pool: int = 16, margem_peso: float = 0.9, sync_a_cada_s: float = TEMPO_SYNC_S, **kwargs):
+        self.pool = pool
+        self.margem_peso = margem_peso
+        self.sync_a_cada_s = sync_a_cada_s
+        self.orcamentos = {}
+        self.coalescidas = 0
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+        self._ultimo_sync = 0.0
+        self.metricas = obter_metricas()
+        kwargs.setdefault("ping", False)   # sem rede no construtor
+        super().__init__(api_key, api_secret, requests_params, **kwargs)
+
+    # ---------- Sessão ----------
+    def _init_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers.update(self._get_headers())
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=getattr(self, "pool", 16))
+        session.mount("https://", adaptador)
+        session.mount("http://", adaptador)
+        session.hooks["response"].append(self._ao_responder)
+        return session
+
+    # ---------- Orçamento de peso ----------
+    def relogio_servidor(self) -> float:
+        """Segundos no relógio do servidor (relógio local + deslocamento medido)."""
+        return time.time() + self.timestamp_offset / 1000
+
+    def orcamento(self, uri: str) -> OrcamentoPeso:
+        host = urlparse(uri).netloc
+        with self._lock:
+            orc = self.orcamentos.get(host)
+            if orc is None:
+                limite = LIMITE_PESO_MINUTO.get(host.split(".")[0], LIMITE_PESO_PADRAO)
+                orc = self.orcamentos[host] = OrcamentoPeso(limite, self.margem_peso, self.relogio_servidor)
+            return orc
+
+    def _ao_responder(self, resposta, *args, **kwargs):
+        orc = self.orcamento(resposta.url)
+        usado = resposta.headers.get("X-MBX-USED-WEIGHT-1M")
+        if usado is not None:
+            orc.registrar(int(usado))
+            self.metricas.definir("robo_rest_peso_minuto", int(usado), host=urlparse(resposta.url).netloc)
+        if resposta.status_code in (418, 429):
+            segundos = float(resposta.headers.get("Retry-After", 60))
+            logger.error(f"[Peso] HTTP {resposta.status_code} em {urlparse(resposta.url).path}; host bloqueado por {segundos:.0f}s")
+            orc.bloquear(segundos)
+        return resposta
+
+    # ---------- Relógio ----------
+    def sincronizar_tempo(self) -> int:
+        """Mede ``timestamp_offset`` (ms) contra o tempo dos Futuros, descontando meia latência."""
+        inicio = time.time()
+        servidor = self.futures_time()["serverTime"]
+        fim = time.time()
+        self.timestamp_offset = int(servidor - (inicio + fim) * 500)
+        self._ultimo_sync = fim
+        logger.info(f"[Relógio] Deslocamento do servidor: {self.timestamp_offset} ms (RTT {1000 * (fim - inicio):.0f} ms)")
+        return self.timestamp_offset
+
+    def _sync_vencido(self) -> bool:
+        with self._lock:
+            agora = time.time()
+            if agora - self._ultimo_sync <= self.sync_a_cada_s:
+                return False
+            self._ultimo_sync = agora   # só uma thread ressincroniza
+            return True
+
+    # ---------- Requisições ----------
+    def _request(self, method, uri: str, signed: bool, force_params: bool = False, **kwargs):
+        if signed and self._sync_vencido():
+            self.sincronizar_tempo()
+        if method != "get":
+            return self._enviar(method, uri, signed, force_params, **kwargs)
+
+        dados = kwargs.get("data")
+        chave = (uri, signed, tuple(sorted((k, str(v)) for k, v in (dados or {}).items())))
+        with self._lock:
+            pendente = self._em_andamento.get(chave)
+            lider = pendente is None
+            if lider:
+                pendente = self._em_andamento[chave] = _Pendente()
+            else:
+                self.coalescidas += 1
+                self.metricas.incrementar("robo_rest_coalescidas_total", endpoint=urlparse(uri).path)
+        if not lider:
+            pendente.evento.wait()
+            if pendente.erro is not None:
+                raise pendente.erro
+            return pendente.resultado
+        try:
+            pendente.resultado = self._enviar(method, uri, signed, force_params, **kwargs)
+            return pendente.resultado
+        except Exception as e:
+            pendente.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            pendente.evento.set()
+
+    def _chamar(self, method, uri: str, signed: bool, force_params: bool, peso: int, **kwargs):
+        """Reserva o peso e faz a requisição, contando chamada, peso, erro e duração por endpoint."""
+        endpoint = urlparse(uri).path
+        self.orcamento(uri).reservar(peso)
+        m = self.metricas
+        m.incrementar("robo_rest_chamadas_total", endpoint=endpoint)
+        m.incrementar("robo_rest_peso_total", peso, endpoint=endpoint)
+        try:
+            with m.medir("robo_rest_segundos", endpoint=endpoint):
+                return super()._request(method, uri, signed, force_params, **kwargs)
+        except BinanceAPIException as e:
+            m.incrementar("robo_rest_erros_total", endpoint=endpoint, codigo=e.code)
+            raise
+
+    def _enviar(self, method, uri: str, signed: bool, force_params: bool = False, **kwargs):
+        dados = kwargs.get("data")
+        originais = dict(dados) if isinstance(dados, dict) else None
+        peso = peso_estimado(uri, originais)
+        try:
+            return self._chamar(method, uri, signed, force_params, peso, **kwargs)
+        except BinanceAPIException as e:
+            if not signed or e.code != CODIGO_TIMESTAMP:
+                raise
+            logger.warning(f"[Relógio] {e.message}; ressincronizando e repetindo")
+            self.sincronizar_tempo()
+            if originais is not None:
+                kwargs["data"] = dict(originais)
+            return self._chamar(method, uri, signed, force_params, peso, **kwargs)
+
+
+_clientes = {}
+_clientes_lock = threading.Lock()
+
+
+def obter_cliente(api_key: str = None, api_secret: str = None, **kwargs) -> ClienteBinance:
+    """Cliente único por chave de API no processo (padrão: ``KEY_BINANCE``/``SECRET_BINANCE``)."""
+    api_key = api_key or os.getenv("KEY_BINANCE")
+    api_secret = api_secret or os.getenv("SECRET_BINANCE")
+    with _clientes_lock:
+        cliente = _clientes.get(api_key)
+        if cliente is None:
+            cliente = _clientes[api_key] = ClienteBinance(api_key, api_secret, **kwargs)
+        return cliente
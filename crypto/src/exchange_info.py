@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""Filtros e metadados de símbolos (exchange info) em cache local, com atualização em segundo plano.
+
+``futures_exchange_info`` devolve todos os símbolos da corretora, e cada robô
+o baixava na importação só para achar os filtros de um par. ``InfoSimbolos``
+guarda um índice ``símbolo -> {filterType: filtro}`` em
+``<DATA_DIR>/exchange_info_<mercado>.json``. Na partida ele é lido do
+disco (sem rede) e só é rebaixado quando passa de ``validade_s``, quando um
+símbolo pedido não está no índice (no máximo uma vez a cada
+``intervalo_falta_s``: um par deslistado ou digitado errado não baixa o
+exchange info inteiro a cada consulta) ou quando uma ordem é recusada por passo
+ou precisão (``order_executor.CODIGOS_PASSO``). Todos os robôs do processo usam o mesmo índice
+(``obter_info``).
+"""
+import os
+import json
+import time
+import logging
+import threading
+
+from config.settings import Config
+
+logger = logging.getLogger("exchange_info")
+
+VALIDADE_PADRAO_S = 6 * 3600
+# Idade mínima do índice para um símbolo ausente provocar novo download (~40 de peso, ~1 MB)
+INTERVALO_FALTA_S = 60.0
+
+
+class InfoSimbolos:
+    def __init__(self, cliente=None, mercado: str = "futures", diretorio: str = None,
+                 validade_s: float = VALIDADE_PADRAO_S, intervalo_falta_s: float = INTERVALO_FALTA_S):
+        self.cliente = cliente
+        self.mercado = mercado
+        self.validade_s = validade_s
+        self.intervalo_falta_s = intervalo_falta_s
+        diretorio = diretorio or Config.DATA_DIR
+        self.caminho = os.path.join(diretorio, f"exchange_info_{mercado}.json")
+        self.simbolos = {}              # símbolo -> {"status", "filtros": {filterType: filtro}, ...}
+        self.obtido_em = 0.0
+        self.ouvintes = []
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self._carregar_disco()
+
+    # ---------- Persistência ----------
+    def _carregar_disco(self):
+        try:
+            with open(self.caminho, encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.simbolos = dados.get("simbolos", {})
+        self.obtido_em = float(dados.get("obtido_em", 0))
+        logger.info(f"[ExchangeInfo] {len(self.simbolos)} símbolos do disco ({self.idade_s / 3600:.1f}h)")
+
+    def _salvar_disco(self):
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"obtido_em": self.obtido_em, "simbolos": self.simbolos}, f)
+        os.replace(temporario, self.caminho)
+
+    @property
+    def idade_s(self) -> float:
+        return time.time() - self.obtido_em
+
+    @property
+    def vencido(self) -> bool:
+        return not self.simbolos or self.idade_s > self.validade_s
+
+    # ---------- Atualização ----------
+    def _baixar(self) -> dict:
+        if self.mercado == "spot":
+            return self.cliente.get_exchange_info()
+        return self.cliente.futures_exchange_info()
+
+    def atualizar(self) -> int:
+        """Baixa o exchange info, reindexa, grava no disco e avisa os ouvintes."""
+        with self._lock:
+            info = self._baixar()
+            self.simbolos = {
+                s["symbol"]: {
+                    "status": s.get("status"),
+                    "base": s.get("baseAsset"),
+                    "cotacao": s.get("quoteAsset"),
+                    "contrato": s.get("contractType"),
+                    "filtros": {f["filterType"]: f for f in s["filters"]},
+                }
+                for s in info["symbols"]
+            }
+            self.obtido_em = time.time()
+            self._salvar_disco()
+        logger.info(f"[ExchangeInfo] {self.mercado}: {len(self.simbolos)} símbolos atualizados")
+        for callback in self.ouvintes:
+            callback(self)
+        return len(self.simbolos)
+
+    def garantir(self):
+        if self.vencido:
+            self.atualizar()
+
+    def ao_atualizar(self, callback):
+        """Registra ``callback(info)`` chamado após cada atualização."""
+        self.ouvintes.append(callback)
+
+    def iniciar_fundo(self, intervalo_s: float = None):
+        """Atualiza em uma thread daemon a cada ``intervalo_s`` (padrão: ``validade_s``)."""
+        if self._thread is not None:
+            return
+        intervalo_s = intervalo_s or self.validade_s
+
+        def _laco():
+            while not self._parar.wait(intervalo_s):
+                try:
+                    self.atualizar()
+                except Exception as e:
+                    logger.warning(f"[ExchangeInfo] Falha na atualização periódica: {e}")
+
+        self._thread = threading.Thread(target=_laco, name=f"exchange-info-{self.mercado}", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    # ---------- Consultas (O(1)) ----------
+    def simbolo(self, par: str) -> dict:
+        dados = self.simbolos.get(par)
+        if dados is None and self.idade_s >= self.intervalo_falta_s:
+            # Par listado depois do último download; índice recente não é baixado de novo
+            self.atualizar()
+            dados = self.simbolos.get(par)
+        if dados is None:
+            raise KeyError(f"{par} não existe em {self.mercado}")
+        return dados
+
+    def filtros(self, par: str) -> dict:
+        return self.simbolo(par)["filtros"]
+
+    def filtro(self, par: str, tipo: str) -> dict:
+        return self.filtros(par)[tipo]
+
+    def negociaveis(self, cotacao: str = "USDT", contrato: str = "PERPETUAL") -> list:
+        """Símbolos em TRADING com a cotação e o tipo de contrato pedidos (índice sem o tipo: todos)."""
+        return sorted(
+            par for par, d in self.simbolos.items()
+            if d.get("status") == "TRADING" and d.get("cotacao") == cotacao
+            and d.get("contrato", contrato) in (contrato, None)
+        )
+
+
+_infos = {}
+_infos_lock = threading.Lock()
+
+
+def obter_info(cliente, mercado: str = "futures", **kwargs) -> InfoSimbolos:
+    """Índice compartilhado por mercado; baixa da API só se o disco estiver vazio ou vencido."""
+    with _infos_lock:
+        info = _infos.get(mercado)
+        if info is None:
+            info = _infos[mercado] = InfoSimbolos(cliente, mercado, **kwargs)
+        elif info.cliente is None:
+            info.cliente = cliente
+    info.garantir()
+    return info
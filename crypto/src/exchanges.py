@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""Interface assíncrona única sobre várias corretoras: python-binance e ``ccxt.async_support``.
+
+Cada corretora expõe as mesmas corrotinas, com pares no formato da Binance
+(``SOLUSDT``; ``SOL/USDT`` e ``SOL/USDT:USDT`` do ccxt também são aceitos) e
+números sempre em ``float``:
+
+- ``klines(par, periodo, limite, inicio_ms)``: ``DTYPE_KLINE``, a última
+  linha é a vela em formação (como ``futures_klines``);
+- ``ticker(par)``: ``{"par", "preco", "bid", "ask"}``; ``tickers(pares)``:
+  ``{par: preço}`` numa chamada só;
+- ``saldos()``: ``{ativo: saldo}``; ``posicoes()``: ``{par: quantidade}``
+  (positivo=LONG, só as abertas);
+- ``filtros(par)``: ``{"passo_qtd", "qtd_min", "passo_preco", "nocional_min"}``;
+- ``criar_ordem(par, lado, quantidade, reduzir, id_cliente)``: ordem a
+  mercado, resposta ``{"id", "id_cliente", "par", "lado", "estado",
+  "quantidade", "executada", "preco_medio", "corretora"}``.
+
+``CorretoraBinance`` usa o ``ClienteBinance`` do processo (pool de conexões
+e orçamento de peso) em threads; ``CorretoraCcxt`` usa uma ``ClientSession``
+do aiohttp própria por corretora, com limite de conexões, e o ccxt só é
+importado ao abrir. Em ambas, um semáforo limita as chamadas simultâneas à
+mesma corretora, e cada chamada entra em ``robo_corretora_segundos``.
+
+``Corretoras`` chama várias corretoras em paralelo (``em_todas``), para
+dividir a carga ou comparar preços e execuções num mesmo runtime.
+"""
+import asyncio
+import logging
+from decimal import Decimal
+
+import numpy as np
+
+from config.constants import INTERVALO_MS
+from shared.utils.data_fetcher import DTYPE_KLINE, klines_para_array
+from shared.utils.helpers import arredondar_passo
+from shared.utils.logger import obter_metricas
+
+logger = logging.getLogger("exchanges")
+
+CONCORRENCIA_PADRAO = 8
+POOL_PADRAO = 16
+
+# Métodos do python-binance por mercado
+METODOS_BINANCE = {
+    "futures": {"klines": "futures_klines", "preco": "futures_symbol_ticker", "livro": "futures_orderbook_ticker",
+                "ordem": "futures_create_order"},
+    "spot": {"klines": "get_klines", "preco": "get_symbol_ticker", "livro": "get_orderbook_ticker",
+             "ordem": "create_order"},
+}
+# Tipo de mercado do ccxt para cada mercado do robô
+TIPOS_CCXT = {"futures": "swap", "spot": "spot"}
+TICK_SIZE_CCXT = 4                  # ccxt.TICK_SIZE: ``precision`` já é o passo, não o número de casas
+ESTADOS_CCXT = {"open": "NEW", "closed": "FILLED", "canceled": "CANCELED", "expired": "EXPIRED",
+                "rejected": "REJECTED"}
+
+
+def _num(valor, padrao: float = 0.0) -> float:
+    """Número da API (string, Decimal, int, None ou '') em ``float``."""
+    if valor is None or valor == "":
+        return padrao
+    return float(valor)
+
+
+def par_unificado(simbolo: str) -> str:
+    """``SOL/USDT:USDT`` ou ``SOL/USDT`` -> ``SOLUSDT``; pares já no formato da Binance ficam iguais."""
+    return simbolo.split(":")[0].replace("/", "").replace("-", "").upper()
+
+
+def _casas(passo: float) -> int:
+    return max(-Decimal(str(passo)).normalize().as_tuple().exponent, 0)
+
+
+class Corretora:
+    """Base: nome, limite de chamadas simultâneas e métricas por chamada."""
+
+    def __init__(self, nome: str, mercado: str = "futures", concorrencia: int = CONCORRENCIA_PADRAO):
+        if mercado not in METODOS_BINANCE:
+            raise ValueError(f"Mercado desconhecido: {mercado}")
+        self.nome = nome
+        self.mercado = mercado
+        self.concorrencia = concorrencia
+        self.metricas = obter_metricas()
+        self._semaforo = None
+
+    async def _medir(self, metodo: str, corrotina):
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.concorrencia)
+        async with self._semaforo:
+            with self.metricas.medir("robo_corretora_segundos", corretora=self.nome, metodo=metodo):
+                try:
+                    return await corrotina
+                except Exception:
+                    self.metricas.incrementar("robo_corretora_erros_total", corretora=self.nome, metodo=metodo)
+                    raise
+
+    async def fechar(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.fechar()
+
+
+# ---------- python-binance ----------
+class CorretoraBinance(Corretora):
+    def __init__(self, cliente, mercado: str = "futures", simbolos=None, concorrencia: int = CONCORRENCIA_PADRAO,
+                 nome: str = "binance"):
+        """``cliente``: ``ClienteBinance`` (``obter_cliente``) ou ``CorretoraSimulada``; ``simbolos``: ``InfoSimbolos``."""
+        super().__init__(nome, mercado, concorrencia)
+        self.cliente = cliente
+        self.simbolos = simbolos
+        self.metodos = METODOS_BINANCE[mercado]
+
+    async def _chamar(self, metodo: str, **params):
+        funcao = getattr(self.cliente, self.metodos.get(metodo, metodo))
+        return await self._medir(metodo, asyncio.to_thread(funcao, **params))
+
+    async def klines(self, par: str, periodo: str, limite: int = 500, inicio_ms: int = None) -> np.ndarray:
+        params = dict(symbol=par_unificado(par), interval=periodo, limit=limite)
+        if inicio_ms is not None:
+            params["startTime"] = int(inicio_ms)
+        return klines_para_array(await self._chamar("klines", **params))
+
+    async def ticker(self, par: str) -> dict:
+        par = par_unificado(par)
+        preco, livro = await asyncio.gather(self._chamar("preco", symbol=par), self._chamar("livro", symbol=par))
+        return {"par": par, "preco": _num(preco["price"]), "bid": _num(livro["bidPrice"]),
+                "ask": _num(livro["askPrice"])}
+
+    async def tickers(self, pares=None) -> dict:
+        precos = {t["symbol"]: _num(t["price"]) for t in await self._chamar("preco")}
+        if pares is None:
+            return precos
+        return {p: precos[p] for p in map(par_unificado, pares) if p in precos}
+
+    async def saldos(self) -> dict:
+        if self.mercado == "spot":
+            conta = await self._chamar("get_account")
+            return {b["asset"]: _num(b["free"]) + _num(b["locked"]) for b in conta["balances"]
+                    if _num(b["free"]) or _num(b["locked"])}
+        conta = await self._chamar("futures_account")
+        return {a["asset"]: _num(a["walletBalance"]) for a in conta["assets"] if _num(a["walletBalance"])}
+
+    async def posicoes(self) -> dict:
+        if self.mercado == "spot":
+            return {}
+        conta = await self._chamar("futures_account")
+        return {p["symbol"]: _num(p["positionAmt"]) for p in conta["positions"] if _num(p["positionAmt"])}
+
+    async def filtros(self, par: str) -> dict:
+        if self.simbolos is None:
+            from crypto.src.exchange_info import obter_info
+            self.simbolos = await asyncio.to_thread(obter_info, self.cliente, self.mercado)
+        f = await asyncio.to_thread(self.simbolos.filtros, par_unificado(par))
+        lote = f.get("MARKET_LOT_SIZE") or f.get("LOT_SIZE") or {}
+        nocional = f.get("MIN_NOTIONAL") or f.get("NOTIONAL") or {}
+        return {
+            "passo_qtd": _num(lote.get("stepSize"), 1e-8),
+            "qtd_min": _num(lote.get("minQty")),
+            "passo_preco": _num(f.get("PRICE_FILTER", {}).get("tickSize"), 1e-8),
+            "nocional_min": _num(nocional.get("notional", nocional.get("minNotional"))),
+        }
+
+    async def criar_ordem(self, par: str, lado: str, quantidade: float, reduzir: bool = False,
+                          id_cliente: str = None) -> dict:
+        par = par_unificado(par)
+        passo = (await self.filtros(par))["passo_qtd"]
+        payload = {"symbol": par, "side": lado.upper(), "type": "MARKET",
+                   "quantity": f"{arredondar_passo(quantidade, passo):.{_casas(passo)}f}", "newOrderRespType": "RESULT"}
+        if id_cliente:
+            payload["newClientOrderId"] = id_cliente
+        if reduzir and self.mercado == "futures":
+            payload["reduceOnly"] = "true"
+        r = await self._chamar("ordem", **payload)
+        executada = _num(r.get("executedQty"))
+        preco_medio = _num(r.get("avgPrice"))
+        if not preco_medio and executada:
+            preco_medio = _num(r.get("cummulativeQuoteQty")) / executada     # spot não traz avgPrice
+        return {"id": str(r.get("orderId")), "id_cliente": r.get("clientOrderId", id_cliente), "par": par,
+                "lado": lado.upper(), "estado": r.get("status"), "quantidade": _num(r.get("origQty"), quantidade),
+                "executada": executada, "preco_medio": preco_medio, "corretora": self.nome}
+
+
+# ---------- ccxt ----------
+class CorretoraCcxt(Corretora):
+    def __init__(self, nome: str, api_key: str = None, api_secret: str = None, mercado: str = "futures",
+                 opcoes: dict = None, pool: int = POOL_PADRAO, concorrencia: int = CONCORRENCIA_PADRAO,
+                 exchange=None):
+        """``nome``: id do ccxt (``bybit``, ``okx``...; ``ccxt:binance`` para não colidir com ``CorretoraBinance``).
+
+        ``exchange``: instância do ccxt já criada (testes); sem ela, é criada no primeiro uso.
+        """
+        super().__init__(nome, mercado, concorrencia)
+        self.id_ccxt = nome.split(":", 1)[-1]
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.opcoes = opcoes or {}
+        self.pool = pool
+        self.exchange = exchange
+        self.sessao = None
+        self.simbolos = {}              # par (SOLUSDT), id nativo ou símbolo do ccxt -> símbolo do ccxt
+        self._abrindo = None
+
+    # ---------- Sessão e mercados ----------
+    def _criar_exchange(self):
+        import aiohttp
+        import ccxt.async_support as ccxt
+
+        self.sessao = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool, ttl_dns_cache=300))
+        config = {"enableRateLimit": True, "session": self.sessao,
+                  "options": {"defaultType": TIPOS_CCXT[self.mercado], "adjustForTimeDifference": True,
+                              **self.opcoes}}
+        if self.api_key:
+            config.update(apiKey=self.api_key, secret=self.api_secret)
+        return getattr(ccxt, self.id_ccxt)(config)
+
+    async def _carregar_mercados(self):
+        if self.exchange is None:
+            self.exchange = self._criar_exchange()
+        mercados = await self.exchange.load_markets()
+        tipo = TIPOS_CCXT[self.mercado]
+        for simbolo, m in mercados.items():
+            if m.get("type") != tipo or (tipo == "swap" and not m.get("linear")):
+                continue
+            self.simbolos[simbolo] = simbolo
+            self.simbolos.setdefault(par_unificado(f"{m['base']}{m['quote']}"), simbolo)
+            self.simbolos.setdefault(par_unificado(m["id"]), simbolo)
+        logger.info(f"[Corretoras] {self.nome}: {len(self.simbolos)} par(es) {self.mercado}")
+
+    async def abrir(self):
+        """Cria a sessão e carrega os mercados uma vez (chamadas concorrentes esperam a mesma carga)."""
+        if self._abrindo is None:
+            self._abrindo = asyncio.ensure_future(self._carregar_mercados())
+        try:
+            await asyncio.shield(self._abrindo)
+        except Exception:
+            self._abrindo = None
+            raise
+
+    async def simbolo(self, par: str) -> str:
+        await self.abrir()
+        try:
+            return self.simbolos.get(par) or self.simbolos[par_unificado(par)]
+        except KeyError:
+            raise KeyError(f"{par} não existe em {self.nome} ({self.mercado})") from None
+
+    async def _chamar(self, metodo: str, *args, **kwargs):
+        await self.abrir()
+        return await self._medir(metodo, getattr(self.exchange, metodo)(*args, **kwargs))
+
+    async def fechar(self):
+        if self.exchange is not None and hasattr(self.exchange, "close"):
+            await self.exchange.close()
+        if self.sessao is not None:
+            await self.sessao.close()
+            self.sessao = None
+
+    # ---------- Interface ----------
+    async def klines(self, par: str, periodo: str, limite: int = 500, inicio_ms: int = None) -> np.ndarray:
+        linhas = await self._chamar("fetch_ohlcv", await self.simbolo(par), periodo, inicio_ms, limite)
+        arr = np.zeros(len(linhas), dtype=DTYPE_KLINE)
+        if not linhas:
+            return arr
+        ohlcv = np.array([[_num(x) for x in linha[:6]] for linha in linhas])
+        arr["t_open"] = ohlcv[:, 0]
+        arr["t_close"] = arr["t_open"] + INTERVALO_MS[periodo] - 1
+        for i, campo in enumerate(("open", "high", "low", "close", "volume"), start=1):
+            arr[campo] = ohlcv[:, i]
+        arr["quote_vol"] = arr["volume"] * arr["close"]            # o OHLCV do ccxt não traz o volume em cotação
+        return arr
+
+    def _ticker(self, t: dict) -> dict:
+        preco = _num(t.get("last"), None)
+        if preco is None:
+            preco = _num(t.get("close"))
+        return {"par": par_unificado(t["symbol"]), "preco": preco, "bid": _num(t.get("bid"), preco),
+                "ask": _num(t.get("ask"), preco)}
+
+    async def ticker(self, par: str) -> dict:
+        return self._ticker(await self._chamar("fetch_ticker", await self.simbolo(par)))
+
+    async def tickers(self, pares=None) -> dict:
+        simbolos = None if pares is None else [await self.simbolo(p) for p in pares]
+        brutos = await self._chamar("fetch_tickers", simbolos)
+        return {t["par"]: t["preco"] for t in map(self._ticker, brutos.values())}
+
+    async def saldos(self) -> dict:
+        saldo = await self._chamar("fetch_balance")
+        return {ativo: _num(total) for ativo, total in (saldo.get("total") or {}).items() if _num(total)}
+
+    async def posicoes(self) -> dict:
+        if self.mercado == "spot":
+            return {}
+        abertas = {}
+        for p in await self._chamar("fetch_positions"):
+            qtd = _num(p.get("contracts")) * _num(p.get("contractSize"), 1.0)
+            if qtd:
+                abertas[par_unificado(p["symbol"])] = -qtd if p.get("side") == "short" else qtd
+        return abertas
+
+    async def filtros(self, par: str) -> dict:
+        m = self.exchange.markets[await self.simbolo(par)]
+        precisao, limites = m.get("precision") or {}, m.get("limits") or {}
+
+        def passo(valor):
+            if valor is None:
+                return 1e-8
+            if getattr(self.exchange, "precisionMode", None) == TICK_SIZE_CCXT:
+                return _num(valor)
+            return 10.0 ** -int(valor)
+
+        return {
+            "passo_qtd": passo(precisao.get("amount")),
+            "qtd_min": _num((limites.get("amount") or {}).get("min")),
+            "passo_preco": passo(precisao.get("price")),
+            "nocional_min": _num((limites.get("cost") or {}).get("min")),
+        }
+
+    async def criar_ordem(self, par: str, lado: str, quantidade: float, reduzir: bool = False,
+                          id_cliente: str = None) -> dict:
+        simbolo = await self.simbolo(par)
+        params = {}
+        if id_cliente:
+            params["clientOrderId"] = id_cliente
+        if reduzir and self.mercado == "futures":
+            params["reduceOnly"] = True
+        r = await self._chamar("create_order", simbolo, "market", lado.lower(), quantidade, None, params)
+        return {"id": str(r.get("id")), "id_cliente": r.get("clientOrderId", id_cliente),
+                "par": par_unificado(simbolo), "lado": lado.upper(),
+                "estado": ESTADOS_CCXT.get(r.get("status"), r.get("status")),
+                "quantidade": _num(r.get("amount"), quantidade), "executada": _num(r.get("filled")),
+                "preco_medio": _num(r.get("average")), "corretora": self.nome}
+
+
+# ---------- Várias corretoras ----------
+class Corretoras:
+    """Grupo de corretoras chamadas em paralelo; uma falha não cancela as outras."""
+
+    def __init__(self, corretoras):
+        self.corretoras = {c.nome: c for c in corretoras}
+
+    def __getitem__(self, nome: str) -> Corretora:
+        return self.corretoras[nome]
+
+    def __iter__(self):
+        return iter(self.corretoras.values())
+
+    async def em_todas(self, metodo: str, *args, **kwargs) -> dict:
+        """``{nome: resultado}`` de ``metodo`` em todas as corretoras; as que falharem trazem a exceção."""
+        nomes = list(self.corretoras)
+        resultados = await asyncio.gather(
+            *(getattr(self.corretoras[n], metodo)(*args, **kwargs) for n in nomes), return_exceptions=True)
+        for nome, r in zip(nomes, resultados):
+            if isinstance(r, Exception):
+                logger.warning(f"[Corretoras] {nome}.{metodo}: {r}")
+        return dict(zip(nomes, resultados))
+
+    async def melhor_preco(self, par: str, lado: str) -> tuple:
+        """(corretora, preço) mais barato para comprar (ask) ou mais caro para vender (bid)."""
+        compra = lado.upper() == "BUY"
+        cotacoes = {n: t[("ask" if compra else "bid")] for n, t in (await self.em_todas("ticker", par)).items()
+                    if not isinstance(t, Exception)}
+        if not cotacoes:
+            raise RuntimeError(f"Nenhuma corretora cotou {par}")
+        nome = (min if compra else max)(cotacoes, key=cotacoes.get)
+        return nome, cotacoes[nome]
+
+    async def fechar(self):
+        await asyncio.gather(*(c.fechar() for c in self), return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.fechar()
+
+
+def criar_corretora(nome: str, mercado: str = "futures", api_key: str = None, api_secret: str = None,
+                    **kwargs) -> Corretora:
+    """``binance`` usa o ``ClienteBinance`` do processo; ``ccxt:<id>`` ou qualquer outro nome, o ccxt."""
+    if nome == "binance":
+        from crypto.src.binance_client import obter_cliente
+        return CorretoraBinance(obter_cliente(api_key, api_secret), mercado, **kwargs)
+    return CorretoraCcxt(nome, api_key, api_secret, mercado, **kwargs)
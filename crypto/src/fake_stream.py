@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Servidor WebSocket local que imita o stream combinado dos Futuros da Binance.
+
+Serve para testar o ``StreamMercado`` sem rede::
+
+    servidor = ServidorStreamFalso()
+    await servidor.iniciar()
+    stream = StreamMercado(url=servidor.url)
+    ...
+    await servidor.enviar_kline("SOLUSDT", "1h", vela, fechada=True)
+    await servidor.derrubar_conexoes()   # força reconexão + backfill
+"""
+import json
+import asyncio
+
+
+class ServidorStreamFalso:
+    def __init__(self, host: str = "127.0.0.1", porta: int = 0):
+        self.host = host
+        self.porta = porta
+        self.clientes = {}          # conexão -> set de streams assinados
+        self.conexoes = 0
+        self._servidor = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.porta}/stream"
+
+    async def iniciar(self):
+        import websockets
+
+        self._servidor = await websockets.serve(self._atender, self.host, self.porta)
+        self.porta = next(iter(self._servidor.sockets)).getsockname()[1]
+        return self
+
+    async def parar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+
+    async def _atender(self, ws, path=None):
+        self.clientes[ws] = set()
+        self.conexoes += 1
+        try:
+            async for bruto in ws:
+                msg = json.loads(bruto)
+                if msg.get("method") == "SUBSCRIBE":
+                    self.clientes[ws].update(msg["params"])
+                    await ws.send(json.dumps({"result": None, "id": msg.get("id")}))
+        except Exception:
+            pass
+        finally:
+            self.clientes.pop(ws, None)
+
+    async def aguardar_assinatura(self, stream: str, timeout: float = 5.0):
+        async def _esperar():
+            while not any(stream in s for s in self.clientes.values()):
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(_esperar(), timeout)
+
+    async def _publicar(self, stream: str, dados: dict):
+        texto = json.dumps({"stream": stream, "data": dados})
+        for ws, assinados in list(self.clientes.items()):
+            if stream in assinados:
+                await ws.send(texto)
+
+    async def enviar_kline(self, par: str, intervalo: str, vela, fechada: bool = True):
+        """``vela`` é uma linha de ``DTYPE_KLINE`` (ou array de 1 linha)."""
+        v = vela[0] if getattr(vela, "shape", ()) else vela
+        k = {
+            "t": int(v["t_open"]), "T": int(v["t_close"]), "s": par, "i": intervalo,
+            "o": str(v["open"]), "h": str(v["high"]), "l": str(v["low"]), "c": str(v["close"]),
+            "v": str(v["volume"]), "n": int(v["trades"]), "x": fechada, "q": str(v["quote_vol"]),
+            "V": str(v["taker_base"]), "Q": str(v["taker_quote"]),
+        }
+        stream = f"{par.lower()}@kline_{intervalo}"
+        await self._publicar(stream, {"e": "kline", "E": int(v["t_close"]), "s": par, "k": k})
+
+    async def enviar_preco_marca(self, par: str, preco: float):
+        stream = f"{par.lower()}@markPrice@1s"
+        await self._publicar(stream, {"e": "markPriceUpdate", "s": par, "p": str(preco)})
+
+    async def derrubar_conexoes(self):
+        for ws in list(self.clientes):
+            await ws.close()
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""Runtime assíncrono: várias instâncias símbolo/estratégia em um único processo.
+
+Uso::
+
+    python -m crypto.src.main crypto/config/instancias.json
+
+Todas as instâncias compartilham um único cliente REST (``ClienteBinance``),
+o mesmo índice de filtros (``InfoSimbolos``, lido do disco), o mesmo
+``ExecutorOrdens``, um cache de velas por par/intervalo e uma única conexão
+WebSocket. Cada instância é avaliada no
+fechamento da vela do seu intervalo, em uma thread do pool padrão, e seus
+erros ficam isolados: uma instância que falha não derruba as demais.
+
+No máximo uma instância por par: em Futuros one-way a posição é uma só por
+símbolo, a alavancagem também (a última ``garantir_modos_conta`` venceria) e
+a VENDA de uma instância (``reduceOnly`` com a posição inteira) fecharia o que
+as outras abriram. ``iniciar`` recusa configurações com par repetido, e a
+varredura só acrescenta pares sem instância em nenhum intervalo.
+
+Os disparos por tempo (virada das velas no modo REST e antecipação das
+ordens) ficam em um único ``Agendador``, no relógio do servidor, para
+qualquer mistura de intervalos.
+
+Com a chave ``varredura`` a partida roda ``crypto/strategies/scanner.py`` e
+acrescenta uma instância de cruzamento para cada um dos ``top`` melhores
+pares que ainda não tenham instância no mesmo intervalo::
+
+    "varredura": {"periodo": "1h", "rapida": 7, "lenta": 40, "top": 3,
+                  "instancia": {"alavancagem": 2, "pct_saldo": 0.10}}
+
+Com a chave ``telegram`` (token em ``TELEGRAM_BOT_TOKEN``) o serviço de
+``telegram/src/bot.py`` roda no mesmo event loop: execuções e erros viram
+notificações em lote, e ``/status``, ``/pnl`` e ``/positions`` são
+respondidos com o estado deste runtime::
+
+    "telegram": {"chats": [123456789], "agrupar_s": 2}
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+import argparse
+
+from config.settings import Config
+from config.constants import INTERVALO_MS
+from shared.utils.data_fetcher import obter_cache
+from shared.utils.logger import configurar_logs, iniciar_exportacao
+from shared.utils.trade_journal import obter_diario
+from shared.utils.scheduler import Agendador
+from crypto.src.account_state import EstadoConta
+from crypto.src.exchange_info import obter_info
+from crypto.src.order_executor import VELAS_RETIDAS, ExecutorOrdens
+from crypto.strategies.sma_crossover import EstrategiaCruzamento
+
+logger = logging.getLogger("runtime")
+
+ESTRATEGIAS = {
+    "cruzamento": EstrategiaCruzamento,
+}
+
+# Margem após a virada da vela no modo REST (a Binance leva alguns ms para fechar a vela)
+MARGEM_REST_S = 2.0
+MAX_AVALIACOES_SIMULTANEAS = 8
+# Antecedência com que a ordem da vela em formação é montada antes do fechamento
+ANTECEDENCIA_S = 3.0
+# Estados de ordem que contam como erro da instância no envio em lote
+ESTADOS_FALHA = frozenset({"REJEITADA", "REJECTED", "DESCONHECIDA", "ENVIANDO"})
+
+
+def carregar_config(caminho: str) -> dict:
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def validar_instancias(definicoes: list):
+    """Uma instância por par: a posição e a alavancagem de Futuros one-way são por símbolo."""
+    vistos, repetidos = set(), []
+    for d in definicoes:
+        if d["par"] in vistos and d["par"] not in repetidos:
+            repetidos.append(d["par"])
+        vistos.add(d["par"])
+    if repetidos:
+        raise ValueError(f"Mais de uma instância para {', '.join(repetidos)}: cada par admite uma só "
+                         f"(posição e alavancagem são compartilhadas no modo one-way)")
+
+
+class Runtime:
+    def __init__(self, config: dict, cliente=None, url_stream: str = None):
+        self.config = config
+        self.modo = config.get("modo", "stream")
+        self.cliente = cliente
+        self.url_stream = url_stream
+        self.instancias = []
+        self.caches = {}            # (par, periodo) -> CacheKlines
+        self.por_cache = {}         # id(cache) -> [instâncias]
+        self.erros = {}             # nome da instância -> erros consecutivos
+        self.stream = None
+        self.conta = None           # EstadoConta compartilhado por todas as instâncias
+        self.simbolos = None        # InfoSimbolos (exchange info em cache)
+        self.diario = None          # DiarioOperacoes compartilhado (execuções e P&L de todas as instâncias)
+        self.executor = None        # ExecutorOrdens compartilhado: as ordens de uma virada saem em um só lote
+        self.agendador = None       # Agendador: viradas de vela e antecipação, no relógio do servidor
+        self.telegram = None        # ServicoTelegram: notificações e comandos (chave ``telegram``)
+        self._falhas_rest = {}      # periodo -> (vela, caches que falharam ao atualizar)
+        self._tarefas = set()
+        self._semaforo = asyncio.Semaphore(config.get("max_avaliacoes_simultaneas", MAX_AVALIACOES_SIMULTANEAS))
+
+    # ---------- Partida ----------
+    def _criar_cliente(self):
+        from crypto.src.binance_client import obter_cliente
+        api_key = Config.BINANCE_API_KEY or os.getenv("KEY_BINANCE")
+        secret_key = Config.BINANCE_SECRET_KEY or os.getenv("SECRET_BINANCE")
+        if not api_key or not secret_key:
+            raise RuntimeError("Chaves de API não encontradas (BINANCE_API_KEY/BINANCE_SECRET_KEY ou KEY_BINANCE/SECRET_BINANCE)")
+        return obter_cliente(api_key, secret_key, requests_params={'timeout': 30})
+
+    def _filtros_por_simbolo(self, pares) -> dict:
+        """Filtros de todas as instâncias a partir do índice local (no máximo um download)."""
+        self.simbolos = obter_info(self.cliente, "futures")
+        if not set(pares) <= set(self.simbolos.simbolos):
+            self.simbolos.atualizar()
+        return {p: self.simbolos.simbolos[p]["filtros"] for p in pares if p in self.simbolos.simbolos}
+
+    def _cache(self, par: str, periodo: str):
+        chave = (par, periodo)
+        if chave not in self.caches:
+            self.caches[chave] = obter_cache(
+                self.cliente.futures_klines, par, periodo,
+                limite=self.config.get("limite_candles", 1000), diretorio=Config.DATA_DIR,
+            )
+        return self.caches[chave]
+
+    def _varrer(self, definicoes: list) -> list:
+        """Definições de instância para os melhores pares da varredura (``config["varredura"]``)."""
+        from crypto.strategies.scanner import Varredura, ranking
+
+        parametros = dict(self.config["varredura"])
+        top = parametros.pop("top", 3)
+        extras = parametros.pop("instancia", {})
+        parametros.setdefault("velas", self.config.get("limite_candles", 1000))
+        varredura = Varredura(self.cliente, simbolos=obter_info(self.cliente, "futures"), **parametros)
+        existentes = {d["par"] for d in definicoes}
+        novas = [
+            {"par": par, "periodo": varredura.periodo, "estrategia": "cruzamento", "rapida": varredura.rapida,
+             "lenta": varredura.lenta, "tipo": varredura.tipo, **extras}
+            for par in ranking(varredura.executar())
+            if par not in existentes
+        ][:top]
+        logger.info(f"[Runtime] Varredura: {', '.join(d['par'] for d in novas) or 'nenhum par elegível'}")
+        return novas
+
+    async def iniciar(self):
+        if self.cliente is None:
+            self.cliente = await asyncio.to_thread(self._criar_cliente)
+        definicoes = list(self.config.get("instancias", []))
+        validar_instancias(definicoes)
+        if self.config.get("varredura"):
+            definicoes += await asyncio.to_thread(self._varrer, definicoes)
+        pares = {d["par"] for d in definicoes}
+        filtros = await asyncio.to_thread(self._filtros_por_simbolo, pares)
+        self.conta = EstadoConta(self.cliente)
+        self.diario = obter_diario()
+        maior_ms = max((INTERVALO_MS[d["periodo"]] for d in definicoes), default=3600_000)
+        self.executor = ExecutorOrdens(self.cliente, self.conta, simbolos=self.simbolos, diario=self.diario,
+                                       retencao_s=VELAS_RETIDAS * maior_ms / 1000)
+
+        for d in definicoes:
+            d = dict(d)
+            classe = ESTRATEGIAS[d.pop("estrategia", "cruzamento")]
+            par, periodo = d.pop("par"), d.pop("periodo")
+            if par not in filtros:
+                logger.error(f"[Runtime] {par} não existe em Futuros USDT-M; instância ignorada")
+                continue
+            inst = classe(self.cliente, par, periodo, filtros=filtros[par], conta=self.conta,
+                          executor=self.executor, simbolos=self.simbolos, diario=self.diario, **d)
+            cache = self._cache(par, periodo)
+            self.instancias.append(inst)
+            self.por_cache.setdefault(id(cache), []).append(inst)
+
+        # Modos de conta e bootstrap das velas em paralelo (limitados pelo pool de threads)
+        await asyncio.gather(*(self._isolado(i, i.garantir_modos_conta) for i in self.instancias))
+        await asyncio.gather(*(asyncio.to_thread(c.atualizar) for c in self.caches.values()))
+        self.simbolos.iniciar_fundo()
+        logger.info(f"[Runtime] {len(self.instancias)} instância(s), {len(self.caches)} par(es)/intervalo(s), modo={self.modo}")
+
+    # ---------- Avaliação ----------
+    async def _isolado(self, inst, funcao, *args):
+        """Executa ``funcao`` da instância em thread; exceções são registradas e não propagam."""
+        async with self._semaforo:
+            try:
+                resultado = await asyncio.to_thread(funcao, *args)
+                self.erros[inst.nome] = 0
+                return resultado
+            except Exception as e:
+                self.erros[inst.nome] = self.erros.get(inst.nome, 0) + 1
+                logger.error(f"[Runtime] {inst.nome}: {e} (erros seguidos={self.erros[inst.nome]})")
+                return None
+
+    async def avaliar_cache(self, cache, novas=None):
+        """Modo stream: cada instância envia a própria ordem assim que a vela fecha."""
+        instancias = self.por_cache.get(id(cache), [])
+        await asyncio.gather(*(self._isolado(i, i.avaliar, cache) for i in instancias))
+
+    async def avaliar_lote(self, caches):
+        """Modo REST: decide todas as instâncias das velas que fecharam juntas e envia as ordens em lote.
+
+        Um lote por executor (as instâncias da partida compartilham um só); cada
+        ordem que não sair conta como erro da instância que a decidiu.
+        """
+        pares = [(i, c) for c in caches for i in self.por_cache.get(id(c), [])]
+        decisoes = await asyncio.gather(*(self._isolado(i, i.decidir, c) for i, c in pares))
+        por_executor = {}
+        for (inst, _), d in zip(pares, decisoes):
+            if d is not None and d[1] is not None:
+                por_executor.setdefault(id(inst.executor), []).append((inst, d[1]))
+        await asyncio.gather(*(self._enviar_lote(grupo) for grupo in por_executor.values()))
+
+    async def _enviar_lote(self, grupo: list):
+        """Envia as ordens ``[(instância, ordem)]`` de um mesmo executor e atribui as falhas a cada instância."""
+        executor = grupo[0][0].executor
+        falha = None
+        async with self._semaforo:
+            try:
+                if len(grupo) == 1:
+                    await asyncio.to_thread(executor.enviar, grupo[0][1])
+                else:
+                    await asyncio.to_thread(executor.enviar_lote, [o for _, o in grupo])
+            except Exception as e:
+                falha = e
+        for inst, ordem in grupo:
+            if ordem.resposta is not None and ordem.estado not in ESTADOS_FALHA:
+                self.erros[inst.nome] = 0
+                continue
+            self.erros[inst.nome] = self.erros.get(inst.nome, 0) + 1
+            motivo = falha or (ordem.resposta or {}).get("msg") or ordem.estado
+            logger.error(f"[Runtime] {inst.nome}: ordem {ordem.id_cliente} não enviada: {motivo} "
+                         f"(erros seguidos={self.erros[inst.nome]})")
+
+    async def _antecipar(self, periodo: str):
+        """Alguns segundos antes do fechamento, monta as ordens que as velas em formação produziriam."""
+        caches = [c for (_, p), c in self.caches.items() if p == periodo]
+        if self.modo != "stream":
+            await asyncio.gather(*(asyncio.to_thread(c.atualizar) for c in caches), return_exceptions=True)
+        await asyncio.gather(*(self._isolado(i, i.antecipar, c)
+                               for c in caches for i in self.por_cache.get(id(c), [])))
+
+    def _telegram(self):
+        """Serviço do Telegram (``config["telegram"]``), ou None se não puder ser criado."""
+        from telegram.src.bot import ServicoTelegram
+
+        opcoes = dict(self.config["telegram"])
+        try:
+            servico = ServicoTelegram(opcoes.pop("token", None), contexto=self, **opcoes)
+        except Exception as e:
+            logger.error(f"[Runtime] Telegram desligado: {e}")
+            return None
+        servico.acompanhar(self.diario)
+        return servico
+
+    # ---------- Agendamento ----------
+    async def _executar_stream(self):
+        from crypto.src.market_stream import StreamMercado, URL_FUTUROS_WS
+
+        self.stream = StreamMercado(self.url_stream or URL_FUTUROS_WS)
+        self.stream.ao_fechar_vela(self.avaliar_cache)
+        for cache in self.caches.values():
+            self.stream.assinar_klines(cache)
+        for par in {i.par for i in self.instancias}:
+            self.stream.assinar_preco_marca(par)
+        self.conta.fonte_preco = self.stream.preco_marca
+        tarefas = [self.stream.executar()]
+        if self.config.get("stream_usuario", True):
+            tarefas.append(self.conta.acompanhar())
+        await asyncio.gather(*tarefas)
+
+    async def _fechamento_rest(self, periodo: str):
+        """Virada da vela do intervalo: atualiza os caches e avalia todos os pares desse intervalo.
+
+        Caches que falharem são os únicos refeitos na nova tentativa (backoff do
+        agendador); os que já atualizaram não são avaliados de novo.
+        """
+        vela = int(self.agendador.relogio() * 1000 // INTERVALO_MS[periodo])
+        anterior = self._falhas_rest.pop(periodo, None)
+        if anterior is not None and anterior[0] == vela:
+            caches = anterior[1]
+        else:
+            caches = [c for (_, p), c in self.caches.items() if p == periodo]
+        resultados = await asyncio.gather(*(asyncio.to_thread(c.atualizar) for c in caches),
+                                          return_exceptions=True)
+        prontos, falhas = [], []
+        for cache, res in zip(caches, resultados):
+            if isinstance(res, Exception):
+                logger.error(f"[Runtime] Falha ao atualizar {cache.par} {cache.periodo}: {res}")
+                falhas.append(cache)
+            else:
+                prontos.append(cache)
+        if prontos:
+            tarefa = asyncio.create_task(self.avaliar_lote(prontos))
+            self._tarefas.add(tarefa)
+            tarefa.add_done_callback(self._tarefas.discard)
+        if falhas:
+            self._falhas_rest[periodo] = (vela, falhas)
+            raise RuntimeError(f"{len(falhas)} cache(s) de {periodo} sem atualizar")
+
+    async def executar(self):
+        await self.iniciar()
+        self.agendador = Agendador(getattr(self.cliente, "relogio_servidor", None))
+        periodos = sorted({p for (_, p) in self.caches})
+        for p in periodos:
+            if self.config.get("antecipar_ordens", True):
+                self.agendador.a_cada_vela(p, self._antecipar, p, margem_s=-ANTECEDENCIA_S,
+                                           nome=f"antecipar[{p}]")
+            if self.modo != "stream":
+                self.agendador.a_cada_vela(p, self._fechamento_rest, p, margem_s=MARGEM_REST_S,
+                                           nome=f"fechamento[{p}]")
+        tarefas = [self.agendador.executar_async()]
+        if self.modo == "stream":
+            tarefas.append(self._executar_stream())
+        if self.config.get("telegram"):
+            self.telegram = self._telegram()
+            if self.telegram is not None:
+                tarefas.append(self.telegram.executar())
+        await asyncio.gather(*tarefas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runtime multi-símbolo dos robôs de futuros")
+    parser.add_argument("config", nargs="?", default=os.path.join(Config.BASE_DIR, "crypto", "config", "instancias.json"))
+    args = parser.parse_args(argv)
+
+    configurar_logs("runtime")
+    iniciar_exportacao()
+    runtime = Runtime(carregar_config(args.config))
+    try:
+        asyncio.run(runtime.executar())
+    except KeyboardInterrupt:
+        logger.info("[Runtime] Encerrado pelo usuário")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Dados de mercado por WebSocket (klines e mark price dos Futuros USDT-M).
+
+Em vez de dormir até a virada da hora e consultar a API REST, o stream
+recebe cada atualização de vela e dispara os callbacks registrados no
+instante em que a Binance marca a vela como fechada (``k.x = true``). As
+velas são gravadas no ``CacheKlines`` do par/intervalo; se houver lacuna
+(reconexão, mensagem perdida) o cache é completado via REST antes de
+emitir o evento.
+"""
+import json
+import time
+import random
+import asyncio
+import logging
+
+import numpy as np
+
+from shared.utils.data_fetcher import DTYPE_KLINE
+
+logger = logging.getLogger("market_stream")
+
+URL_FUTUROS_WS = "wss://fstream.binance.com/stream"
+
+
+def kline_ws_para_array(k: dict) -> np.ndarray:
+    """Converte o objeto ``k`` do evento de kline em array de 1 linha (``DTYPE_KLINE``)."""
+    vela = np.empty(1, dtype=DTYPE_KLINE)
+    vela[0] = (
+        k["t"], float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"]),
+        k["T"], float(k["q"]), k["n"], float(k["V"]), float(k["Q"]),
+    )
+    return vela
+
+
+class StreamMercado:
+    """Uma conexão WebSocket combinada para todos os pares/intervalos assinados."""
+
+    def __init__(self, url: str = URL_FUTUROS_WS, backoff_inicial: float = 1.0, backoff_max: float = 60.0):
+        self.url = url
+        self.backoff_inicial = backoff_inicial
+        self.backoff_max = backoff_max
+        self.caches = {}            # "solusdt@kline_1h" -> CacheKlines
+        self.precos_marca = {}      # "SOLUSDT" -> (preço, recebido_em_s)
+        self.assinaturas = set()
+        self.conectado = asyncio.Event()
+        self.reconexoes = 0
+        self._callbacks = []
+        self._ws = None
+        self._tarefas = set()
+        self._parar = False
+
+    # ---------- Assinaturas ----------
+    def assinar_klines(self, cache):
+        """Assina o kline do par/intervalo do cache; velas fechadas são gravadas nele."""
+        nome = f"{cache.par.lower()}@kline_{cache.periodo}"
+        self.caches[nome] = cache
+        self._assinar(nome)
+
+    def assinar_preco_marca(self, par: str):
+        self._assinar(f"{par.lower()}@markPrice@1s")
+
+    def _assinar(self, nome: str):
+        novo = nome not in self.assinaturas
+        self.assinaturas.add(nome)
+        if novo and self._ws is not None:
+            self._criar_tarefa(self._enviar_assinatura([nome]))
+
+    def ao_fechar_vela(self, callback):
+        """Registra ``callback(cache, novas)`` (função ou corrotina) chamado a cada vela fechada."""
+        self._callbacks.append(callback)
+
+    def preco_marca(self, par: str, idade_max_s: float = 5.0):
+        """Último mark price recebido, ou None se mais velho que ``idade_max_s``."""
+        valor = self.precos_marca.get(par.upper())
+        if valor is None or time.monotonic() - valor[1] > idade_max_s:
+            return None
+        return valor[0]
+
+    # ---------- Conexão ----------
+    async def _enviar_assinatura(self, nomes):
+        await self._ws.send(json.dumps({"method": "SUBSCRIBE", "params": sorted(nomes), "id": int(time.time() * 1000)}))
+
+    async def executar(self):
+        """Mantém a conexão aberta até ``parar()``, reconectando com backoff exponencial."""
+        import websockets
+
+        espera = self.backoff_inicial
+        primeira = True
+        while not self._parar:
+            try:
+                async with websockets.connect(self.url, max_queue=None) as ws:
+                    self._ws = ws
+                    if self.assinaturas:
+                        await self._enviar_assinatura(self.assinaturas)
+                    self.conectado.set()
+                    logger.info(f"[Stream] Conectado: {len(self.assinaturas)} assinatura(s)")
+                    if not primeira:
+                        await self._completar_lacunas()
+                    primeira = False
+                    espera = self.backoff_inicial
+                    async for bruto in ws:
+                        await self._tratar(json.loads(bruto))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[Stream] Conexão perdida: {e}")
+            finally:
+                self._ws = None
+                self.conectado.clear()
+            if self._parar:
+                break
+            self.reconexoes += 1
+            atraso = espera * (0.5 + random.random() / 2)
+            logger.info(f"[Stream] Reconectando em {atraso:.1f}s...")
+            await asyncio.sleep(atraso)
+            espera = min(espera * 2, self.backoff_max)
+
+    async def parar(self):
+        self._parar = True
+        if self._ws is not None:
+            await self._ws.close()
+
+    # ---------- Mensagens ----------
+    async def _tratar(self, msg: dict):
+        dados = msg.get("data", msg)
+        evento = dados.get("e") if isinstance(dados, dict) else None
+        if evento == "kline":
+            await self._tratar_kline(msg.get("stream") or f"{dados['s'].lower()}@kline_{dados['k']['i']}", dados["k"])
+        elif evento == "markPriceUpdate":
+            self.precos_marca[dados["s"]] = (float(dados["p"]), time.monotonic())
+
+    async def _tratar_kline(self, nome: str, k: dict):
+        cache = self.caches.get(nome)
+        if cache is None:
+            return
+        vela = kline_ws_para_array(k)
+        if not k["x"]:
+            cache.atualizar_aberta(vela)
+            return
+        if len(cache.fechadas) and int(vela["t_open"][0]) <= int(cache.fechadas["t_open"][-1]):
+            return          # repetida (ou já trazida pelo backfill): não emite de novo
+        if cache.inserir_fechada(vela):
+            self._emitir(cache, vela)
+        else:
+            # Lacuna (ou cache ainda vazio): completa via REST sem bloquear o loop
+            await self._backfill(cache)
+
+    async def _backfill(self, cache):
+        try:
+            novas = await asyncio.to_thread(cache.atualizar)
+        except Exception as e:
+            logger.warning(f"[Stream] Backfill REST falhou para {cache.par} {cache.periodo}: {e}")
+            return
+        if len(novas):
+            logger.info(f"[Stream] Backfill {cache.par} {cache.periodo}: +{len(novas)} vela(s)")
+            self._emitir(cache, novas)
+
+    async def _completar_lacunas(self):
+        await asyncio.gather(*(self._backfill(c) for c in self.caches.values()))
+
+    def _emitir(self, cache, novas):
+        for callback in self._callbacks:
+            resultado = callback(cache, novas)
+            if asyncio.iscoroutine(resultado):
+                self._criar_tarefa(resultado)
+
+    def _criar_tarefa(self, coro):
+        tarefa = asyncio.create_task(coro)
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._finalizar_tarefa)
+
+    def _finalizar_tarefa(self, tarefa):
+        self._tarefas.discard(tarefa)
+        if not tarefa.cancelled() and tarefa.exception() is not None:
+            logger.error(f"[Stream] Erro em callback: {tarefa.exception()}")
@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+"""Execução de ordens de Futuros: payload pronto antes do sinal, envio idempotente e em lote.
+
+``ExecutorOrdens`` separa o trabalho em duas fases:
+
+- ``preparar``: quantidade arredondada com os filtros em cache
+  (``MARKET_LOT_SIZE``/``MIN_NOTIONAL``, casas decimais calculadas uma vez),
+  lado, ``reduceOnly`` e um ``newClientOrderId`` determinístico
+  (prefixo + par + abertura da vela + lado). Pode rodar antes do fechamento
+  da vela, com saldo e preço do ``EstadoConta``.
+- ``enviar``/``enviar_lote``: só a requisição assinada. A assinatura inclui o
+  ``timestamp``, então é gerada no envio (não dá para pré-assinar). Em
+  timeout ou erro de rede a ordem é consultada pelo mesmo client order id
+  antes de reenviar, e um reenvio duplicado é recusado pela Binance: nunca
+  há duas ordens para o mesmo sinal. O payload pede
+  ``newOrderRespType=RESULT`` (a resposta já traz quantidade executada e
+  preço médio); se ainda assim a Binance devolver só o ACK ``NEW``, ``enviar``
+  volta na hora e a execução é acompanhada fora do caminho da decisão: pelo
+  ``ORDER_TRADE_UPDATE`` com o stream de usuário ativo, senão por uma thread
+  que consulta a ordem até um estado final (``ordem.concluida`` sinaliza).
+
+Com ``simbolos`` (``InfoSimbolos``), uma recusa por passo ou precisão
+(``CODIGOS_PASSO``) atualiza o exchange info e, se a quantidade arredondada
+mudar, a ordem é remontada e reenviada uma vez. Recusas por notional mínimo
+não são repetidas: arredondar para baixo não as corrige.
+
+Confirmações chegam pelo stream de usuário (``ORDER_TRADE_UPDATE``) via
+``EstadoConta.ao_evento`` e ficam em ``ordens[id].estado``. O tempo de envio
+(``robo_ordem_envio_segundos``) e do envio até a execução
+(``robo_ordem_ack_segundos``) vão para as métricas do processo. Ordens em
+estado final preparadas há mais de ``retencao_s`` (algumas velas) saem de
+``ordens`` na próxima preparação: o executor compartilhado não cresce sem
+limite e a vela corrente continua protegida contra reenvio.
+
+Com ``diario`` (``DiarioOperacoes``), cada ordem executada é registrada uma
+vez com quantidade, preço médio e taxa: pelo stream (campo ``n``) quando ele
+está ativo, senão pela resposta REST mais a taxa dos trades da ordem
+(``futures_account_trades``).
+"""
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from decimal import Decimal
+
+from shared.utils.helpers import arredondar_passo
+from shared.utils.logger import obter_metricas
+
+logger = logging.getLogger("order_executor")
+
+RECV_WINDOW_MS = 60000
+TAMANHO_ID = 36                    # limite do newClientOrderId
+MAX_LOTE = 5                       # limite do /fapi/v1/batchOrders
+CODIGO_DUPLICADA = -4116           # ClientOrderId is duplicated
+CODIGO_INEXISTENTE = -2013         # Order does not exist
+# Recusas por filtro que o novo arredondamento da quantidade pode corrigir
+CODIGOS_PASSO = frozenset({-1013, -1111})
+ESTADOS_FINAIS = frozenset({"FILLED", "CANCELED", "EXPIRED", "REJECTED", "REJEITADA"})
+VELAS_RETIDAS = 3                  # ordens finais guardadas por ~3 velas
+RETENCAO_S = VELAS_RETIDAS * 3600.0
+
+
+def _excecoes():
+    """Exceções da API e de rede, importadas só no envio (``binance`` leva ~1 s para importar)."""
+    import requests
+    from binance.exceptions import BinanceAPIException, BinanceRequestException
+    return BinanceAPIException, BinanceRequestException, (BinanceRequestException, requests.exceptions.RequestException)
+
+
+def id_cliente(prefixo: str, par: str, t_vela: int, lado: str) -> str:
+    """Client order id estável por sinal (``^[.A-Z:/a-z0-9_-]{1,36}$``).
+
+    A cauda ``-{abertura da vela}-{lado}`` nunca é cortada: se prefixo e par
+    não cabem, viram um trecho do início mais um resumo SHA-1 de 8 dígitos
+    (estável entre processos), e ids de velas ou lados diferentes não colidem.
+    """
+    cabeca, cauda = f"{prefixo}-{par}", f"-{int(t_vela) // 1000}-{lado[0]}"
+    espaco = TAMANHO_ID - len(cauda)
+    if len(cabeca) > espaco:
+        resumo = hashlib.sha1(cabeca.encode()).hexdigest()[:8]
+        cabeca = f"{cabeca[:espaco - len(resumo) - 1]}_{resumo}"
+    return cabeca + cauda
+
+
+class OrdemPreparada:
+    __slots__ = ("par", "lado", "quantidade", "payload", "id_cliente", "preparada_em", "estado", "resposta",
+                 "enviada_em", "executada_em", "concluida")
+
+    def __init__(self, par: str, lado: str, quantidade: float, payload: dict, id_cliente: str):
+        self.par = par
+        self.lado = lado
+        self.quantidade = quantidade
+        self.payload = payload
+        self.id_cliente = id_cliente
+        self.preparada_em = time.monotonic()
+        self.estado = "PREPARADA"
+        self.resposta = None
+        self.enviada_em = None
+        self.executada_em = None
+        self.concluida = threading.Event()          # estado final alcançado
+
+    @property
+    def idade_s(self) -> float:
+        return time.monotonic() - self.preparada_em
+
+
+class ExecutorOrdens:
+    def __init__(self, cliente, conta=None, filtros: dict = None, prefixo: str = "bot",
+                 tentativas: int = 3, espera_s: float = 0.5, recv_window: int = RECV_WINDOW_MS,
+                 simbolos=None, diario=None, retencao_s: float = RETENCAO_S):
+        self.cliente = cliente
+        self.conta = conta
+        self.simbolos = simbolos
+        self.diario = diario
+        self.prefixo = prefixo
+        self.tentativas = tentativas
+        self.espera_s = espera_s
+        self.recv_window = recv_window
+        self.retencao_s = retencao_s
+        self.regras = {}                # par -> (passo, casas, notional_min)
+        self.ordens = {}                # id_cliente -> OrdemPreparada
+        self.metricas = obter_metricas()
+        self._lock = threading.Lock()
+        for par, f in (filtros or {}).items():
+            self.definir_filtros(par, f)
+        if conta is not None:
+            conta.ao_evento(self.aplicar_evento)
+        if simbolos is not None:
+            simbolos.ao_atualizar(self._recarregar_filtros)
+
+    # ---------- Filtros ----------
+    def definir_filtros(self, par: str, filtros: dict):
+        passo = filtros["MARKET_LOT_SIZE"]["stepSize"]
+        casas = max(-Decimal(passo).normalize().as_tuple().exponent, 0)
+        self.regras[par] = (float(passo), casas, float(filtros["MIN_NOTIONAL"]["notional"]))
+
+    def _regras(self, par: str):
+        if par not in self.regras and self.simbolos is not None:
+            self.definir_filtros(par, self.simbolos.filtros(par))
+        return self.regras[par]
+
+    def _recarregar_filtros(self, info):
+        for par in list(self.regras):
+            if par in info.simbolos:
+                self.definir_filtros(par, info.simbolos[par]["filtros"])
+
+    def _refazer_por_filtro(self, ordem: OrdemPreparada) -> bool:
+        """Atualiza o exchange info e rearredonda a quantidade da ordem; False se ela não mudou."""
+        if self.simbolos is None:
+            return False
+        antes = self.regras.get(ordem.par)
+        self.simbolos.atualizar()
+        passo, casas, _ = self._regras(ordem.par)
+        if self.regras.get(ordem.par) == antes:
+            return False
+        quantidade = arredondar_passo(ordem.quantidade, passo)
+        texto = f"{quantidade:.{casas}f}"
+        if texto == ordem.payload["quantity"]:
+            return False
+        ordem.quantidade = quantidade
+        ordem.payload["quantity"] = texto
+        return True
+
+    def quantidade(self, par: str, pct_saldo: float, alavancagem: int) -> float:
+        """Quantidade de entrada: ``pct_saldo`` do saldo x alavancagem, no passo e acima do notional mínimo."""
+        passo, _, notional_min = self._regras(par)
+        usdt = self.conta.saldo("USDT")
+        if usdt <= 0:
+            logger.warning("[Qtd] Saldo USDT insuficiente.")
+            return 0.0
+        px = self.conta.preco(par)
+        qtd = arredondar_passo(usdt * pct_saldo * alavancagem / px, passo)
+        if qtd * px < notional_min:
+            qtd = arredondar_passo(notional_min / px, passo)
+        return max(qtd, 0.0)
+
+    # ---------- Preparação ----------
+    def preparar(self, par: str, lado: str, quantidade: float, t_vela: int,
+                 reduce_only: bool = False, prefixo: str = None) -> OrdemPreparada:
+        """Monta (ou reaproveita) a ordem a mercado do sinal da vela ``t_vela``.
+
+        ``prefixo`` substitui o do executor no client order id, para várias
+        estratégias compartilharem o mesmo executor (e o mesmo lote).
+        """
+        ident = id_cliente(prefixo or self.prefixo, par, t_vela, lado)
+        with self._lock:
+            self._podar()
+            existente = self.ordens.get(ident)
+            if existente is not None and existente.estado != "PREPARADA":
+                return existente        # já enviada: nunca recriar com o mesmo id
+            passo, casas, _ = self._regras(par)
+            quantidade = arredondar_passo(quantidade, passo)
+            payload = {
+                "symbol": par, "side": lado, "type": "MARKET",
+                "quantity": f"{quantidade:.{casas}f}", "newClientOrderId": ident,
+                "newOrderRespType": "RESULT",
+            }
+            if reduce_only:
+                payload["reduceOnly"] = "true"
+            ordem = self.ordens[ident] = OrdemPreparada(par, lado, quantidade, payload, ident)
+            return ordem
+
+    def _podar(self):
+        """Descarta as ordens em estado final preparadas há mais de ``retencao_s``."""
+        limite = time.monotonic() - self.retencao_s
+        for ident in [i for i, o in self.ordens.items() if o.estado in ESTADOS_FINAIS and o.preparada_em < limite]:
+            del self.ordens[ident]
+
+    def preparada(self, par: str, lado: str, t_vela: int, idade_max_s: float = None, prefixo: str = None):
+        ordem = self.ordens.get(id_cliente(prefixo or self.prefixo, par, t_vela, lado))
+        if ordem is None or (idade_max_s is not None and ordem.estado == "PREPARADA" and ordem.idade_s > idade_max_s):
+            return None
+        return ordem
+
+    # ---------- Envio ----------
+    def _consultar(self, ordem: OrdemPreparada):
+        BinanceAPIException, _, _ = _excecoes()
+        try:
+            return self.cliente.futures_get_order(symbol=ordem.par, origClientOrderId=ordem.id_cliente,
+                                                  recvWindow=self.recv_window)
+        except BinanceAPIException as e:
+            if e.code == CODIGO_INEXISTENTE:
+                return None
+            raise
+
+    def _atualizar_estado(self, ordem: OrdemPreparada, estado: str, execucao: tuple = None):
+        """``execucao``: (quantidade, preço médio, taxa, t_ms) quando a ordem foi executada."""
+        if ordem.estado in ESTADOS_FINAIS and estado not in ESTADOS_FINAIS:
+            return                      # resposta REST atrasada depois do stream: não regride
+        ordem.estado = estado
+        self.metricas.incrementar("robo_ordens_estado_total", par=ordem.par, lado=ordem.lado, estado=estado)
+        if estado in ESTADOS_FINAIS:
+            ordem.concluida.set()
+        if estado != "FILLED":
+            return
+        if ordem.executada_em is None:
+            ordem.executada_em = time.monotonic()
+            if ordem.enviada_em is not None:
+                self.metricas.observar("robo_ordem_ack_segundos", ordem.executada_em - ordem.enviada_em,
+                                       par=ordem.par)
+        if self.diario is not None and execucao is not None and execucao[0] > 0:
+            qtd, preco, taxa, t_ms = execucao
+            self.diario.execucao(ordem.par, ordem.lado, qtd, preco, taxa, t_ms, ordem.id_cliente)
+
+    def _taxa(self, ordem: OrdemPreparada, resposta: dict) -> float:
+        """Comissão da ordem pelos trades (a resposta da ordem não traz taxa); 0.0 se a consulta falhar."""
+        try:
+            trades = self.cliente.futures_account_trades(symbol=ordem.par, orderId=resposta.get("orderId"),
+                                                         recvWindow=self.recv_window)
+        except Exception as e:
+            logger.warning(f"[Ordem] {ordem.id_cliente}: taxa indisponível ({e}); registrada como 0")
+            return 0.0
+        return sum(float(t.get("commission", 0)) for t in trades)
+
+    def _confirmar(self, ordem: OrdemPreparada, resposta: dict):
+        """Guarda a resposta REST e atualiza o estado da ordem.
+
+        Sem stream de usuário, a ordem executada vai ao diário com a taxa dos
+        trades; com o stream ativo quem registra é o ``ORDER_TRADE_UPDATE``.
+        """
+        ordem.resposta = resposta
+        execucao = None
+        qtd = float(resposta.get("executedQty", 0))
+        if (self.diario is not None and resposta.get("status") == "FILLED" and qtd > 0
+                and ordem.executada_em is None and not getattr(self.conta, "stream_ativo", False)):
+            execucao = (qtd, float(resposta.get("avgPrice", 0)), self._taxa(ordem, resposta),
+                        resposta.get("updateTime"))
+        self._atualizar_estado(ordem, resposta.get("status", "NEW"), execucao)
+        logger.info(f"[Ordem] {ordem.id_cliente} {ordem.lado} {ordem.payload['quantity']} {ordem.par}: {ordem.estado}")
+        return resposta
+
+    def _acompanhar(self, ordem: OrdemPreparada):
+        """Consulta a ordem aceita sem estado final (ACK ``NEW``) até ela ser executada ou recusada.
+
+        Roda na thread de ``_acompanhar_em_fundo``; esgotadas as
+        ``tentativas``, a ordem fica em ``pendentes`` (checkpoint/retomada).
+        """
+        for tentativa in range(1, self.tentativas + 1):
+            if ordem.estado in ESTADOS_FINAIS:
+                return
+            time.sleep(self.espera_s * tentativa)
+            try:
+                resposta = self._consultar(ordem)
+            except Exception as e:
+                logger.warning(f"[Ordem] {ordem.id_cliente}: consulta falhou ({e})")
+                continue
+            if resposta is not None:
+                self._confirmar(ordem, resposta)
+        if ordem.estado not in ESTADOS_FINAIS:
+            logger.warning(f"[Ordem] {ordem.id_cliente} ainda {ordem.estado} após {self.tentativas} consultas")
+
+    def _acompanhar_em_fundo(self, ordem: OrdemPreparada):
+        """ACK sem estado final: o stream de usuário confirma; sem ele, uma thread consulta a ordem."""
+        if ordem.estado in ESTADOS_FINAIS or getattr(self.conta, "stream_ativo", False):
+            return
+        threading.Thread(target=self._acompanhar, args=(ordem,), name=f"ack-{ordem.id_cliente}",
+                         daemon=True).start()
+
+    def enviar(self, ordem: OrdemPreparada) -> dict:
+        """Envia a ordem; repete com o mesmo client order id em falha de rede.
+
+        Sem espera no caminho da decisão: um ACK ``NEW`` volta como está e a
+        execução é acompanhada em segundo plano (``ordem.concluida``).
+        """
+        if ordem.resposta is not None:
+            return ordem.resposta
+        BinanceAPIException, BinanceRequestException, erros_rede = _excecoes()
+        ordem.estado = "ENVIANDO"
+        ordem.enviada_em = ordem.enviada_em or time.monotonic()
+        refeita = False
+        try:
+            for tentativa in range(1, self.tentativas + 1):
+                try:
+                    with self.metricas.medir("robo_ordem_envio_segundos", par=ordem.par):
+                        resposta = self.cliente.futures_create_order(**ordem.payload, recvWindow=self.recv_window)
+                    self._confirmar(ordem, resposta)
+                    self._acompanhar_em_fundo(ordem)
+                    return resposta
+                except BinanceAPIException as e:
+                    if e.code in CODIGOS_PASSO and not refeita and self._refazer_por_filtro(ordem):
+                        logger.warning(f"[Ordem] {ordem.id_cliente} recusada por filtro ({e.message}); "
+                                       f"reenviando com qty={ordem.payload['quantity']}")
+                        refeita = True
+                        continue
+                    if e.code != CODIGO_DUPLICADA:
+                        self._atualizar_estado(ordem, "REJEITADA")
+                        raise
+                    logger.warning(f"[Ordem] {ordem.id_cliente} já existe na corretora; consultando")
+                except erros_rede as e:
+                    logger.warning(f"[Ordem] {ordem.id_cliente} sem resposta ({e}); tentativa {tentativa}/{self.tentativas}")
+                # A consulta pelo id já é a pausa: sem ordem na corretora, o reenvio com o mesmo id é seguro
+                existente = self._consultar(ordem)
+                if existente is not None:
+                    self._confirmar(ordem, existente)
+                    self._acompanhar_em_fundo(ordem)
+                    return existente
+            self._atualizar_estado(ordem, "DESCONHECIDA")
+            raise BinanceRequestException(f"Ordem {ordem.id_cliente} sem confirmação após {self.tentativas} tentativas")
+        finally:
+            if self.conta is not None:
+                self.conta.invalidar()
+
+    def enviar_lote(self, ordens) -> list:
+        """Envia até 5 ordens por requisição (``batchOrders``); respostas na ordem de entrada."""
+        _, _, erros_rede = _excecoes()
+        respostas = []
+        for i in range(0, len(ordens), MAX_LOTE):
+            bloco = [o for o in ordens[i:i + MAX_LOTE] if o.resposta is None]
+            if not bloco:
+                respostas.extend(o.resposta for o in ordens[i:i + MAX_LOTE])
+                continue
+            agora = time.monotonic()
+            for o in bloco:
+                o.estado = "ENVIANDO"
+                o.enviada_em = o.enviada_em or agora
+            try:
+                with self.metricas.medir("robo_ordem_envio_segundos", par="lote"):
+                    resultado = self.cliente.futures_place_batch_order(
+                        batchOrders=[dict(o.payload) for o in bloco], recvWindow=self.recv_window)
+            except erros_rede as e:
+                logger.warning(f"[Lote] Sem resposta ({e}); confirmando individualmente")
+                resultado = [None] * len(bloco)
+            for o, r in zip(bloco, resultado):
+                if r is not None and "orderId" in r:
+                    self._confirmar(o, r)
+                elif r is not None and r.get("code") != CODIGO_DUPLICADA:
+                    o.resposta = r
+                    self._atualizar_estado(o, "REJEITADA")
+                    logger.error(f"[Lote] {o.id_cliente} rejeitada: {r.get('msg')}")
+                else:
+                    o.estado = "PREPARADA"
+                    try:
+                        self.enviar(o)          # duplicada é recusada: consulta pelo mesmo id
+                    except Exception as e:
+                        logger.error(f"[Lote] {o.id_cliente}: {e}")
+            for o in bloco:
+                if o.resposta is not None and "orderId" in o.resposta:
+                    self._acompanhar_em_fundo(o)
+            respostas.extend(o.resposta for o in ordens[i:i + MAX_LOTE])
+        if self.conta is not None:
+            self.conta.invalidar()
+        return respostas
+
+    async def enviar_async(self, ordem: OrdemPreparada) -> dict:
+        return await asyncio.to_thread(self.enviar, ordem)
+
+    async def enviar_lote_async(self, ordens) -> list:
+        return await asyncio.to_thread(self.enviar_lote, list(ordens))
+
+    # ---------- Retomada após reinício ----------
+    def pendentes(self) -> list:
+        """``[par, client order id]`` das ordens enviadas sem estado final (para o checkpoint)."""
+        return [[o.par, i] for i, o in self.ordens.items()
+                if o.estado != "PREPARADA" and o.estado not in ESTADOS_FINAIS]
+
+    def retomar(self, pendentes) -> list:
+        """Consulta na exchange as ordens pendentes de uma execução anterior e volta a acompanhá-las.
+
+        Uma ordem retomada conta como enviada: ``preparada`` a devolve e
+        ``enviar`` não a repete, mesmo que o robô decida de novo na mesma vela.
+        """
+        retomadas = []
+        for par, ident in pendentes:
+            if ident in self.ordens:
+                continue
+            ordem = OrdemPreparada(par, "", 0.0, {"symbol": par, "newClientOrderId": ident}, ident)
+            resposta = self._consultar(ordem)
+            if resposta is None:
+                logger.warning(f"[Retomada] {ident} não existe na exchange; descartada")
+                continue
+            ordem.lado = resposta["side"]
+            ordem.quantidade = float(resposta["origQty"])
+            ordem.payload.update(side=ordem.lado, type=resposta.get("type", "MARKET"),
+                                 quantity=resposta["origQty"])
+            self.ordens[ident] = ordem
+            self._confirmar(ordem, resposta)
+            retomadas.append(ordem)
+        return retomadas
+
+    # ---------- Confirmações (stream de usuário) ----------
+    def aplicar_evento(self, evento: dict):
+        if evento.get("e") != "ORDER_TRADE_UPDATE":
+            return
+        o = evento["o"]
+        ordem = self.ordens.get(o.get("c"))
+        if ordem is not None:
+            self._atualizar_estado(ordem, o["X"], (float(o.get("z", 0)), float(o.get("ap", 0)),
+                                                   float(o.get("n", 0)), o.get("T")))
+            logger.info(f"[Ordem] {ordem.id_cliente}: {o['X']} (executado {o.get('z')} @ {o.get('ap')})")
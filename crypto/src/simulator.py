@@ -0,0 +1,634 @@
+# -*- coding: utf-8 -*-
+"""Corretora de Futuros simulada em processo, com relógio virtual, para replay sem rede.
+
+``CorretoraSimulada`` implementa o subconjunto do ``Client`` que os robôs usam
+(klines, ticker, conta, posições, ordens a mercado, modos da conta, exchange
+info) sobre velas gravadas. O ``RelogioVirtual`` substitui o módulo ``time``
+dos módulos do robô: ``time.sleep`` apenas avança o relógio, então o
+``aguardar_fechamento`` do loop REST não espera de verdade e um ano de H1
+roda em segundos::
+
+    python -m crypto.src.simulator SOLUSDT --periodo 1h --dias 365
+
+Ordens são executadas ao último preço conhecido (fechamento da última vela
+fechada), com taxa e validação dos filtros como na Binance. Como lá, a
+resposta do envio é só o ACK (``NEW``, nada executado) a menos que a ordem
+peça ``newOrderRespType=RESULT``; a execução aparece em ``futures_get_order``.
+Erros saem como
+``BinanceAPIException`` com os mesmos códigos. Cada chamada pode custar
+``latencia_ms`` de relógio virtual e é contada nas mesmas métricas
+``robo_rest_*`` do ``ClienteBinance``, e cada execução guarda o atraso desde o
+fechamento da vela (``atraso_ms``), para medir quantas idas à API o ciclo faz
+antes da ordem. Só o modo REST (``loop_principal``) é suportado; o stream
+WebSocket tem o seu próprio servidor falso (``fake_stream.py``).
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+from decimal import Decimal
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+from config.constants import INTERVALO_MS
+from shared.utils.data_fetcher import DTYPE_KLINE
+from shared.utils.logger import configurar_logs, obter_metricas
+
+logger = logging.getLogger("simulator")
+
+TAXA_TAKER = 0.0004
+ALAVANCAGEM_PADRAO = 20
+LIMITE_KLINES = 1500
+FILTROS_PADRAO = {
+    "PRICE_FILTER":    {"filterType": "PRICE_FILTER", "tickSize": "0.0001"},
+    "LOT_SIZE":        {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001"},
+    "MARKET_LOT_SIZE": {"filterType": "MARKET_LOT_SIZE", "stepSize": "0.001", "minQty": "0.001"},
+    "MIN_NOTIONAL":    {"filterType": "MIN_NOTIONAL", "notional": "5"},
+}
+
+
+# Endpoint REST de cada método, para as mesmas métricas ``robo_rest_*`` do ClienteBinance
+ENDPOINTS = {
+    "futures_time": "/fapi/v1/time",
+    "futures_ping": "/fapi/v1/ping",
+    "futures_exchange_info": "/fapi/v1/exchangeInfo",
+    "futures_klines": "/fapi/v1/klines",
+    "futures_symbol_ticker": "/fapi/v1/ticker/price",
+    "futures_ticker": "/fapi/v1/ticker/24hr",
+    "futures_orderbook_ticker": "/fapi/v1/ticker/bookTicker",
+    "futures_mark_price": "/fapi/v1/premiumIndex",
+    "futures_account": "/fapi/v2/account",
+    "futures_account_balance": "/fapi/v2/balance",
+    "futures_position_information": "/fapi/v2/positionRisk",
+    "futures_change_position_mode": "/fapi/v1/positionSide/dual",
+    "futures_change_margin_type": "/fapi/v1/marginType",
+    "futures_change_leverage": "/fapi/v1/leverage",
+    "futures_create_order": "/fapi/v1/order",
+    "futures_place_batch_order": "/fapi/v1/batchOrders",
+    "futures_get_order": "/fapi/v1/order",
+    "futures_account_trades": "/fapi/v1/userTrades",
+    "futures_cancel_all_open_orders": "/fapi/v1/allOpenOrders",
+}
+
+
+class FimDosDados(BaseException):
+    """O relógio passou da última vela. ``BaseException`` para atravessar o ``except Exception`` do loop."""
+
+
+def _erro(codigo: int, mensagem: str, status: int = 400):
+    from binance.exceptions import BinanceAPIException
+    return BinanceAPIException(None, status, json.dumps({"code": codigo, "msg": mensagem}))
+
+
+# ---------- Relógio ----------
+class _TempoVirtual:
+    """Substituto do módulo ``time``: relógio de parede, monotônico e ``sleep`` virtuais."""
+
+    def __init__(self, relogio):
+        self._relogio = relogio
+
+    def time(self) -> float:
+        return self._relogio.agora_ms / 1000
+
+    def time_ns(self) -> int:
+        return self._relogio.agora_ms * 1_000_000
+
+    monotonic = time
+
+    def sleep(self, segundos: float):
+        self._relogio.avancar_ms(segundos * 1000)
+
+    def __getattr__(self, nome):
+        return getattr(time, nome)          # perf_counter, strftime... continuam reais
+
+
+class RelogioVirtual:
+    def __init__(self, inicio_ms: int, fim_ms: int = None):
+        self.agora_ms = int(inicio_ms)
+        self.fim_ms = fim_ms
+        self.dormido_ms = 0
+
+    def avancar_ms(self, ms: float):
+        self.agora_ms += int(ms)
+        self.dormido_ms += int(ms)
+        if self.fim_ms is not None and self.agora_ms > self.fim_ms:
+            raise FimDosDados(self.agora_ms)
+
+    @contextmanager
+    def instalado(self, *modulos):
+        """Troca o ``time`` dos ``modulos`` pelo relógio virtual enquanto durar o bloco."""
+        tempo = _TempoVirtual(self)
+        originais = [(m, m.time) for m in modulos]
+        for m in modulos:
+            m.time = tempo
+        try:
+            yield self
+        finally:
+            for m, original in originais:
+                m.time = original
+
+
+# ---------- Séries ----------
+def _reamostrar(velas: np.ndarray, passo_base: int, passo: int) -> np.ndarray:
+    """Agrega (intervalo maior) ou subdivide por interpolação linear (menor, só informativo)."""
+    if passo == passo_base or not len(velas):
+        return velas
+    if passo % passo_base == 0:
+        grupo = velas["t_open"] // passo
+        _, inicio = np.unique(grupo, return_index=True)
+        fim = np.append(inicio[1:], len(velas)) - 1
+        out = np.empty(len(inicio), dtype=DTYPE_KLINE)
+        out["t_open"] = grupo[inicio] * passo
+        out["t_close"] = out["t_open"] + passo - 1
+        out["open"], out["close"] = velas["open"][inicio], velas["close"][fim]
+        out["high"] = np.maximum.reduceat(velas["high"], inicio)
+        out["low"] = np.minimum.reduceat(velas["low"], inicio)
+        for campo in ("volume", "quote_vol", "trades", "taker_base", "taker_quote"):
+            out[campo] = np.add.reduceat(velas[campo], inicio)
+        return out
+    if passo_base % passo == 0:
+        k = passo_base // passo
+        frac = np.arange(k + 1) / k
+        caminho = velas["open"][:, None] + (velas["close"] - velas["open"])[:, None] * frac
+        out = np.empty(len(velas) * k, dtype=DTYPE_KLINE)
+        out["t_open"] = (velas["t_open"][:, None] + np.arange(k) * passo).ravel()
+        out["t_close"] = out["t_open"] + passo - 1
+        out["open"], out["close"] = caminho[:, :-1].ravel(), caminho[:, 1:].ravel()
+        out["high"] = np.maximum(out["open"], out["close"])
+        out["low"] = np.minimum(out["open"], out["close"])
+        for campo in ("volume", "quote_vol", "trades", "taker_base", "taker_quote"):
+            out[campo] = np.repeat(velas[campo] / k, k).astype(DTYPE_KLINE[campo])
+        return out
+    raise _erro(-1120, "Invalid interval.")
+
+
+class _Serie:
+    """Velas de um par/intervalo com as linhas cruas (strings) prontas para ``futures_klines``."""
+
+    def __init__(self, velas: np.ndarray):
+        self.velas = velas
+        self.t_open = velas["t_open"]
+        self.t_close = velas["t_close"]
+        self.linhas = [
+            [int(v["t_open"]), f"{v['open']:.8g}", f"{v['high']:.8g}", f"{v['low']:.8g}", f"{v['close']:.8g}",
+             f"{v['volume']:.8g}", int(v["t_close"]), f"{v['quote_vol']:.8g}", int(v["trades"]),
+             f"{v['taker_base']:.8g}", f"{v['taker_quote']:.8g}", "0"]
+            for v in velas
+        ]
+
+    def fechadas_ate(self, agora_ms: int) -> int:
+        """Quantas velas já fecharam em ``agora_ms``."""
+        return int(np.searchsorted(self.t_close, agora_ms, side="left"))
+
+
+# ---------- Corretora ----------
+class CorretoraSimulada:
+    """Subconjunto síncrono do ``binance.Client`` de Futuros USDT-M, one-way, sobre velas gravadas."""
+
+    def __init__(self, velas: dict, periodo: str = "1h", relogio: RelogioVirtual = None,
+                 saldo: float = 1000.0, taxa: float = TAXA_TAKER, filtros: dict = None,
+                 latencia_ms: float = 0.0):
+        self.periodo = periodo
+        self.passo_ms = INTERVALO_MS[periodo]
+        self.velas = {par: np.asarray(v, dtype=DTYPE_KLINE) for par, v in velas.items()}
+        inicio = min(int(v["t_open"][0]) for v in self.velas.values())
+        self.relogio = relogio or RelogioVirtual(inicio)
+        self.saldo = float(saldo)
+        self.taxa = taxa
+        self.filtros = {par: dict((filtros or {}).get(par, FILTROS_PADRAO)) for par in self.velas}
+        self.latencia_ms = latencia_ms
+        self.alavancagem = {par: ALAVANCAGEM_PADRAO for par in self.velas}
+        self.tipo_margem = {par: "CROSSED" for par in self.velas}
+        self.posicoes = {}                      # par -> [quantidade (com sinal), preço de entrada]
+        self.ordens = {}                        # clientOrderId -> resposta
+        self.execucoes = []                     # ordens executadas, em ordem
+        self.chamadas = Counter()
+        self.taxas_pagas = 0.0
+        self.metricas = obter_metricas()
+        self._series = {}
+        self._proximo_id = 1
+
+    # ---------- Infra ----------
+    def _chamada(self, nome: str, params: dict = None):
+        from crypto.src.binance_client import peso_estimado
+
+        self.chamadas[nome] += 1
+        endpoint = ENDPOINTS[nome]
+        self.metricas.incrementar("robo_rest_chamadas_total", endpoint=endpoint)
+        self.metricas.incrementar("robo_rest_peso_total", peso_estimado(endpoint, params), endpoint=endpoint)
+        if self.latencia_ms:
+            self.relogio.avancar_ms(self.latencia_ms)
+
+    @property
+    def agora_ms(self) -> int:
+        return self.relogio.agora_ms
+
+    def _serie(self, par: str, intervalo: str) -> _Serie:
+        serie = self._series.get((par, intervalo))
+        if serie is None:
+            if par not in self.velas:
+                raise _erro(-1121, "Invalid symbol.")
+            if intervalo not in INTERVALO_MS:
+                raise _erro(-1120, "Invalid interval.")
+            velas = _reamostrar(self.velas[par], self.passo_ms, INTERVALO_MS[intervalo])
+            serie = self._series[(par, intervalo)] = _Serie(velas)
+        return serie
+
+    def preco(self, par: str) -> float:
+        """Último preço negociado: fechamento da última vela fechada (abertura, antes da primeira)."""
+        serie = self._serie(par, self.periodo)
+        i = serie.fechadas_ate(self.agora_ms)
+        return float(serie.velas["close"][i - 1] if i else serie.velas["open"][0])
+
+    def _fim_da_vela_anterior(self, par: str) -> int:
+        serie = self._serie(par, self.periodo)
+        i = serie.fechadas_ate(self.agora_ms)
+        return int(serie.t_close[i - 1]) + 1 if i else int(serie.t_open[0])
+
+    def relogio_servidor(self) -> float:
+        """Mesmo contrato do ``ClienteBinance``: segundos no relógio do servidor (aqui, o virtual)."""
+        return self.agora_ms / 1000
+
+    # ---------- Mercado ----------
+    def futures_time(self, **params) -> dict:
+        self._chamada("futures_time")
+        return {"serverTime": self.agora_ms}
+
+    def futures_ping(self, **params) -> dict:
+        self._chamada("futures_ping")
+        return {}
+
+    def futures_exchange_info(self, **params) -> dict:
+        self._chamada("futures_exchange_info")
+        return {
+            "serverTime": self.agora_ms,
+            "symbols": [
+                {"symbol": par, "status": "TRADING", "baseAsset": par[:-4], "quoteAsset": par[-4:],
+                 "contractType": "PERPETUAL", "filters": list(self.filtros[par].values())}
+                for par in self.velas
+            ],
+        }
+
+    def futures_klines(self, symbol: str, interval: str, limit: int = 500, startTime: int = None,
+                       endTime: int = None, **params) -> list:
+        self._chamada("futures_klines", {"limit": limit})
+        serie = self._serie(symbol, interval)
+        agora = self.agora_ms
+        limit = min(int(limit), LIMITE_KLINES)
+        fim = serie.fechadas_ate(agora)
+        aberta = fim < len(serie.linhas) and serie.t_open[fim] <= agora
+        if endTime is not None and int(np.searchsorted(serie.t_close, endTime, side="right")) < fim + aberta:
+            fim, aberta = int(np.searchsorted(serie.t_close, endTime, side="right")), False
+        if startTime is not None:
+            ini = int(np.searchsorted(serie.t_open, startTime, side="left"))
+        else:
+            ini = max(fim + aberta - limit, 0)
+        linhas = serie.linhas[ini:min(fim, ini + limit)]
+        if aberta and len(linhas) < limit and ini <= fim:
+            # Vela em formação: só a abertura é conhecida
+            v = serie.velas[fim]
+            o = f"{v['open']:.8g}"
+            linhas = linhas + [[int(v["t_open"]), o, o, o, o, "0", int(v["t_close"]), "0", 0, "0", "0", "0"]]
+        return linhas
+
+    def futures_symbol_ticker(self, symbol: str = None, **params):
+        self._chamada("futures_symbol_ticker", {"symbol": symbol})
+        if symbol is None:
+            return [{"symbol": p, "price": str(self.preco(p)), "time": self.agora_ms} for p in self.velas]
+        return {"symbol": symbol, "price": str(self.preco(symbol)), "time": self.agora_ms}
+
+    def _estatisticas_24h(self, par: str) -> dict:
+        """Estatísticas das velas fechadas nas últimas 24h (o ticker real inclui a vela em formação)."""
+        serie = self._serie(par, self.periodo)
+        fim = serie.fechadas_ate(self.agora_ms)
+        ini = int(np.searchsorted(serie.t_open, self.agora_ms - 86_400_000, side="left"))
+        velas = serie.velas[ini:fim]
+        ultimo = self.preco(par)
+        abertura = float(velas["open"][0]) if len(velas) else ultimo
+        return {
+            "symbol": par, "lastPrice": str(ultimo), "openPrice": str(abertura),
+            "priceChangePercent": f"{100 * (ultimo / abertura - 1):.3f}",
+            "highPrice": str(float(velas["high"].max()) if len(velas) else ultimo),
+            "lowPrice": str(float(velas["low"].min()) if len(velas) else ultimo),
+            "volume": str(float(velas["volume"].sum())), "quoteVolume": str(float(velas["quote_vol"].sum())),
+            "count": int(velas["trades"].sum()), "closeTime": self.agora_ms,
+        }
+
+    def futures_ticker(self, symbol: str = None, **params):
+        """Estatísticas de 24h de um par ou, sem ``symbol``, de todos."""
+        self._chamada("futures_ticker", {"symbol": symbol})
+        if symbol is None:
+            return [self._estatisticas_24h(p) for p in self.velas]
+        return self._estatisticas_24h(symbol)
+
+    def futures_orderbook_ticker(self, symbol: str = None, **params):
+        """Melhor compra/venda: último preço -/+ um tick."""
+        self._chamada("futures_orderbook_ticker", {"symbol": symbol})
+
+        def livro(par):
+            preco = Decimal(str(self.preco(par)))
+            tick = Decimal(self.filtros[par].get("PRICE_FILTER", FILTROS_PADRAO["PRICE_FILTER"])["tickSize"])
+            return {"symbol": par, "bidPrice": str(preco - tick), "bidQty": "1", "askPrice": str(preco + tick),
+                    "askQty": "1", "time": self.agora_ms}
+
+        if symbol is None:
+            return [livro(p) for p in self.velas]
+        return livro(symbol)
+
+    def futures_mark_price(self, symbol: str = None, **params):
+        self._chamada("futures_mark_price")
+        return {"symbol": symbol, "markPrice": str(self.preco(symbol)), "time": self.agora_ms}
+
+    # ---------- Conta ----------
+    def _pnl_aberto(self) -> float:
+        return sum(q * (self.preco(par) - entrada) for par, (q, entrada) in self.posicoes.items())
+
+    def _margem_usada(self) -> float:
+        return sum(abs(q) * entrada / self.alavancagem[par] for par, (q, entrada) in self.posicoes.items())
+
+    def _disponivel(self) -> float:
+        return self.saldo + min(self._pnl_aberto(), 0.0) - self._margem_usada()
+
+    def _posicao(self, par: str) -> dict:
+        q, entrada = self.posicoes.get(par, (0.0, 0.0))
+        return {
+            "symbol": par, "positionAmt": f"{q:.8g}", "entryPrice": f"{entrada:.8g}",
+            "markPrice": str(self.preco(par)), "unRealizedProfit": f"{q * (self.preco(par) - entrada):.8f}",
+            "leverage": str(self.alavancagem[par]), "marginType": self.tipo_margem[par].lower(),
+            "positionSide": "BOTH",
+        }
+
+    def futures_account(self, **params) -> dict:
+        self._chamada("futures_account")
+        pnl = self._pnl_aberto()
+        return {
+            "totalWalletBalance": f"{self.saldo:.8f}",
+            "totalUnrealizedProfit": f"{pnl:.8f}",
+            "availableBalance": f"{self._disponivel():.8f}",
+            "assets": [{"asset": "USDT", "walletBalance": f"{self.saldo:.8f}",
+                        "unrealizedProfit": f"{pnl:.8f}", "availableBalance": f"{self._disponivel():.8f}"}],
+            "positions": [self._posicao(par) for par in self.velas],
+        }
+
+    def futures_account_balance(self, **params) -> list:
+        self._chamada("futures_account_balance")
+        return [{"asset": "USDT", "balance": f"{self.saldo:.8f}",
+                 "availableBalance": f"{self._disponivel():.8f}"}]
+
+    def futures_position_information(self, symbol: str = None, **params) -> list:
+        self._chamada("futures_position_information")
+        return [self._posicao(par) for par in self.velas if symbol in (None, par)]
+
+    def futures_change_position_mode(self, dualSidePosition="false", **params) -> dict:
+        self._chamada("futures_change_position_mode")
+        if str(dualSidePosition).lower() == "true":
+            raise _erro(-4059, "Hedge mode is not supported by the simulator.")
+        raise _erro(-4059, "No need to change position side.")
+
+    def futures_change_margin_type(self, symbol: str, marginType: str, **params) -> dict:
+        self._chamada("futures_change_margin_type")
+        if self.tipo_margem[symbol] == marginType.upper():
+            raise _erro(-4046, "No need to change margin type.")
+        self.tipo_margem[symbol] = marginType.upper()
+        return {"code": 200, "msg": "success"}
+
+    def futures_change_leverage(self, symbol: str, leverage: int, **params) -> dict:
+        self._chamada("futures_change_leverage")
+        self.alavancagem[symbol] = int(leverage)
+        return {"symbol": symbol, "leverage": int(leverage), "maxNotionalValue": "1000000"}
+
+    # ---------- Ordens ----------
+    def _validar(self, par: str, qtd: Decimal, px: float, reduzir: bool):
+        filtros = self.filtros[par]
+        passo = Decimal(filtros["MARKET_LOT_SIZE"]["stepSize"])
+        if qtd <= 0 or qtd < Decimal(filtros["MARKET_LOT_SIZE"].get("minQty", passo)):
+            raise _erro(-4003, "Quantity less than or equal to zero.")
+        if qtd % passo:
+            raise _erro(-1111, "Precision is over the maximum defined for this asset.")
+        if not reduzir and float(qtd) * px < float(filtros["MIN_NOTIONAL"]["notional"]):
+            raise _erro(-4164, "Order's notional must be no smaller than the minimum notional.")
+
+    def _executar(self, ordem: dict) -> dict:
+        par = ordem["symbol"]
+        lado = ordem["side"]
+        ident = ordem.get("newClientOrderId") or f"sim-{self._proximo_id}"
+        if ident in self.ordens:
+            raise _erro(-4116, "ClientOrderId is duplicated.")
+        if str(ordem.get("type", "MARKET")).upper() != "MARKET":
+            raise _erro(-1116, "Only MARKET orders are supported by the simulator.")
+        reduzir = str(ordem.get("reduceOnly", "false")).lower() == "true"
+        qtd = Decimal(str(ordem["quantity"]))
+        px = self.preco(par)
+        self._validar(par, qtd, px, reduzir)
+
+        atual, entrada = self.posicoes.get(par, (0.0, 0.0))
+        delta = float(qtd) if lado == "BUY" else -float(qtd)
+        if reduzir and (atual == 0 or (atual > 0) == (delta > 0) or abs(delta) > abs(atual) + 1e-12):
+            raise _erro(-2022, "ReduceOnly Order is rejected.")
+        fecha = min(abs(delta), abs(atual)) if atual and (atual > 0) != (delta > 0) else 0.0
+        abre = abs(delta) - fecha
+        if abre and abre * px / self.alavancagem[par] > self._disponivel() + fecha * entrada / self.alavancagem[par]:
+            raise _erro(-2019, "Margin is insufficient.")
+
+        taxa = self.taxa * float(qtd) * px
+        realizado = fecha * (px - entrada) * (1 if atual > 0 else -1)
+        self.saldo += realizado - taxa
+        self.taxas_pagas += taxa
+        nova = atual + delta
+        if abs(nova) < 1e-12:
+            self.posicoes.pop(par, None)
+        elif abre:
+            base = abs(atual) - fecha
+            self.posicoes[par] = [nova, (base * entrada + abre * px) / (base + abre) if fecha == 0 else px]
+        else:
+            self.posicoes[par] = [nova, entrada]
+
+        resposta = {
+            "orderId": self._proximo_id, "symbol": par, "status": "FILLED", "clientOrderId": ident,
+            "side": lado, "type": "MARKET", "origQty": str(qtd), "executedQty": str(qtd),
+            "avgPrice": f"{px:.8g}", "cumQuote": f"{float(qtd) * px:.8f}", "reduceOnly": reduzir,
+            "positionSide": "BOTH", "updateTime": self.agora_ms,
+        }
+        self._proximo_id += 1
+        self.ordens[ident] = resposta
+        self.execucoes.append({
+            "id_ordem": resposta["orderId"], "t": self.agora_ms, "par": par, "lado": lado, "quantidade": float(qtd), "preco": px,
+            "taxa": taxa, "realizado": realizado, "saldo": self.saldo,
+            "atraso_ms": self.agora_ms - self._fim_da_vela_anterior(par),
+        })
+        if str(ordem.get("newOrderRespType", "ACK")).upper() == "RESULT":
+            return dict(resposta)
+        # Padrão da Binance: só o ACK, sem a execução (que aparece em ``futures_get_order``)
+        return dict(resposta, status="NEW", executedQty="0", avgPrice="0.00", cumQuote="0")
+
+    def futures_create_order(self, **params) -> dict:
+        self._chamada("futures_create_order")
+        return self._executar(params)
+
+    def futures_place_batch_order(self, batchOrders, **params) -> list:
+        self._chamada("futures_place_batch_order")
+        respostas = []
+        for ordem in batchOrders:
+            try:
+                respostas.append(self._executar(ordem))
+            except Exception as e:
+                respostas.append({"code": getattr(e, "code", -1000), "msg": getattr(e, "message", str(e))})
+        return respostas
+
+    def futures_get_order(self, symbol: str, origClientOrderId: str = None, orderId: int = None, **params) -> dict:
+        self._chamada("futures_get_order")
+        if origClientOrderId in self.ordens:
+            return self.ordens[origClientOrderId]
+        for r in self.ordens.values():
+            if r["orderId"] == orderId:
+                return r
+        raise _erro(-2013, "Order does not exist.")
+
+    def futures_account_trades(self, symbol: str, orderId: int = None, **params) -> list:
+        self._chamada("futures_account_trades")
+        return [{"symbol": e["par"], "id": i, "orderId": e["id_ordem"], "side": e["lado"],
+                 "price": f"{e['preco']:.8g}", "qty": str(e["quantidade"]), "realizedPnl": f"{e['realizado']:.8f}",
+                 "commission": f"{e['taxa']:.8f}", "commissionAsset": "USDT", "time": e["t"]}
+                for i, e in enumerate(self.execucoes, 1)
+                if e["par"] == symbol and (orderId is None or e["id_ordem"] == orderId)]
+
+    def futures_cancel_all_open_orders(self, symbol: str, **params) -> dict:
+        self._chamada("futures_cancel_all_open_orders")
+        return {"code": 200, "msg": "The operation of cancel all open order is done."}
+
+    # ---------- Resumo ----------
+    def resumo(self) -> dict:
+        atrasos = [e["atraso_ms"] for e in self.execucoes]
+        return {
+            "saldo": self.saldo,
+            "pnl_aberto": self._pnl_aberto(),
+            "posicoes": {par: q for par, (q, _) in self.posicoes.items()},
+            "ordens": len(self.execucoes),
+            "taxas": self.taxas_pagas,
+            "atraso_medio_ms": float(np.mean(atrasos)) if atrasos else 0.0,
+            "atraso_max_ms": max(atrasos, default=0),
+            "chamadas": dict(self.chamadas),
+        }
+
+
+# ---------- Replay do robô de Futuros ----------
+@contextmanager
+def _estado_isolado(corretora: CorretoraSimulada, diretorio: str, persistir_velas: bool):
+    """Caches de velas e exchange info novos durante o replay, gravando só em ``diretorio``.
+
+    Sem ``persistir_velas`` o cache de velas fica só em memória (``DATA_DIR``
+    None): anexar cada vela ao arquivo colunar domina o tempo de um replay longo.
+    """
+    from config.settings import Config
+    from shared.utils import data_fetcher
+    from crypto.src import exchange_info
+
+    anteriores = (Config.DATA_DIR, data_fetcher._caches, exchange_info._infos)
+    Config.DATA_DIR = diretorio if persistir_velas else None
+    data_fetcher._caches = {}
+    exchange_info._infos = {"futures": exchange_info.InfoSimbolos(corretora, "futures", diretorio)}
+    try:
+        yield
+    finally:
+        Config.DATA_DIR, data_fetcher._caches, exchange_info._infos = anteriores
+
+
+def reproduzir(velas: np.ndarray, par: str = "SOLUSDT", periodo: str = "1h", aquecimento: int = None,
+               saldo: float = 1000.0, taxa: float = TAXA_TAKER, filtros: dict = None,
+               latencia_ms: float = 0.0, persistir_velas: bool = False, reinicios=()) -> dict:
+    """Roda o ``loop_principal`` do robô de Futuros sobre ``velas`` até acabarem os dados.
+
+    As primeiras ``aquecimento`` velas (padrão: ``LIMITE_CANDLES`` do robô) já
+    estão fechadas na partida; o robô decide a partir da seguinte.
+
+    ``reinicios``: velas (contadas após o aquecimento) depois de cujo ciclo o
+    processo do robô "cai" e é reiniciado na vela seguinte: médias, caches e
+    executor são perdidos e o robô volta pelo checkpoint, pelo arquivo de
+    velas e pelo diário em disco, como em um deploy.
+    """
+    from crypto.sol_futures import futures_bot as robo
+    from crypto.src import account_state, order_executor, exchange_info
+    from shared.utils import data_fetcher, trade_journal, checkpoint
+
+    velas = np.asarray(velas, dtype=DTYPE_KLINE)
+    aquecimento = robo.LIMITE_CANDLES if aquecimento is None else aquecimento
+    if len(velas) <= aquecimento:
+        raise ValueError(f"São necessárias mais de {aquecimento} velas (há {len(velas)})")
+    relogio = RelogioVirtual(int(velas["t_close"][aquecimento - 1]) + 1, int(velas["t_close"][-1]) + 1)
+    corretora = CorretoraSimulada({par: velas}, periodo, relogio, saldo, taxa,
+                                  {par: filtros} if filtros else None, latencia_ms)
+    configuracao = (robo.PAR, robo.PERIODO)
+    robo.PAR, robo.PERIODO = par, periodo
+    # Queda no meio da espera pela vela seguinte (o ciclo da vela ``i`` já terminou)
+    meia_vela = INTERVALO_MS[periodo] // 2
+    paradas = [int(velas["t_close"][aquecimento + i]) + meia_vela for i in sorted(reinicios)] + [relogio.fim_ms]
+
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory() as diretorio, \
+            _estado_isolado(corretora, diretorio, persistir_velas or bool(reinicios)), \
+            relogio.instalado(robo, data_fetcher, account_state, order_executor, exchange_info, trade_journal,
+                              checkpoint):
+        arquivo_diario = os.path.join(diretorio, "diario_operacoes.sqlite")
+        try:
+            for parada in paradas:
+                # Partida de um processo novo: nada do anterior além do que está em disco
+                robo.cruzamento.reiniciar()
+                data_fetcher._caches = {}
+                diario = trade_journal.DiarioOperacoes(arquivo_diario)
+                relogio.fim_ms = parada
+                try:
+                    robo.iniciar(cliente_externo=corretora, diario_externo=diario)
+                    robo.loop_principal()
+                except FimDosDados:
+                    pass
+                finally:
+                    diario.fechar()
+        finally:
+            robo.PAR, robo.PERIODO = configuracao
+        operacoes = diario.operacoes(par)
+    resultado = corretora.resumo()
+    resultado.update(velas=len(velas) - aquecimento, duracao_s=time.perf_counter() - t0,
+                     operacoes=operacoes, execucoes=corretora.execucoes,
+                     diario=diario.estatisticas(par).como_dict())
+    return resultado
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay do robô de Futuros sobre velas do arquivo local")
+    parser.add_argument("par", nargs="?", default="SOLUSDT")
+    parser.add_argument("--periodo", default="1h")
+    parser.add_argument("--dias", type=float, default=365)
+    parser.add_argument("--aquecimento", type=int, default=None)
+    parser.add_argument("--saldo", type=float, default=1000.0)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    from config.settings import Config
+    from shared.utils.candle_archive import ArquivoVelas
+
+    configurar_logs("simulador", nivel="WARNING")
+    arquivo = ArquivoVelas(Config.DATA_DIR, args.par, args.periodo)
+    aquecimento = args.aquecimento
+    if aquecimento is None:
+        from crypto.sol_futures.futures_bot import LIMITE_CANDLES as aquecimento
+    n = int(args.dias * 86_400_000 / INTERVALO_MS[args.periodo]) + aquecimento
+    velas = arquivo.ultimas(n)
+    if len(velas) <= aquecimento:
+        print(f"{args.par} {args.periodo}: só {len(velas)} velas em {arquivo.diretorio} "
+              f"(importe com python -m shared.utils.candle_archive)")
+        return 1
+    r = reproduzir(velas, args.par, args.periodo, aquecimento, args.saldo, latencia_ms=args.latencia_ms)
+    print(f"{args.par} {args.periodo}: {r['velas']} velas em {r['duracao_s']:.1f}s | ordens={r['ordens']} "
+          f"| saldo={r['saldo']:.2f} USDT | taxas={r['taxas']:.2f} | atraso médio={r['atraso_medio_ms']:.0f} ms")
+    for nome, qtd in sorted(r["chamadas"].items(), key=lambda x: -x[1]):
+        print(f"  {nome:<32} {qtd:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
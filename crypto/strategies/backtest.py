@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""Backtest vetorizado do cruzamento de médias (7 x 40) do robô de futuros.
+
+Reproduz a semântica de ``sinal_media_movel`` + ``loop_principal``:
+
+* a decisão é tomada no fechamento da vela ``t`` (a "penúltima vela" do
+  robô) e executada a mercado ao preço de fechamento dessa vela;
+* só LONG: entra quando rápida > lenta e está zerado, sai quando
+  rápida < lenta e está comprado; igualdade ou médias indefinidas mantêm;
+* tamanho = ``PCT_SALDO`` do capital x ``ALAVANCAGEM`` / preço,
+  arredondado para baixo no ``stepSize`` e elevado ao notional mínimo,
+  como em ``calcular_quantidade``; taxa cobrada sobre o notional de
+  entrada e de saída.
+
+As médias de todas as janelas vêm de uma única soma acumulada, e a grade
+de pares (rápida, lenta) é avaliada em lotes de matrizes pares x velas; o
+único laço em Python percorre o índice do trade, nunca as velas.
+"""
+import numpy as np
+
+TAXA_TAKER = 0.0004   # 0,04% por lado (taker, USDT-M nível padrão)
+
+DTYPE_RESULTADO = np.dtype([
+    ("rapida",        "i4"),
+    ("lenta",         "i4"),
+    ("retorno",       "f8"),
+    ("max_drawdown",  "f8"),
+    ("trades",        "i4"),
+    ("acertos",       "f8"),
+    ("exposicao",     "f8"),
+    ("capital_final", "f8"),
+])
+
+
+def _fechamentos(dados) -> np.ndarray:
+    """Aceita o array estruturado do cache/arquivo de velas ou um vetor de fechamentos."""
+    dados = np.asarray(dados)
+    if dados.dtype.names:
+        dados = dados["close"]
+    return np.ascontiguousarray(dados, dtype=np.float64)
+
+
+def medias_cumsum(fechamentos: np.ndarray, janelas) -> np.ndarray:
+    """SMA de cada janela (linhas) via soma acumulada; NaN antes de a janela encher."""
+    fechamentos = _fechamentos(fechamentos)
+    janelas = np.asarray(janelas, dtype=np.int64)
+    n = len(fechamentos)
+    acumulado = np.concatenate([[0.0], np.cumsum(fechamentos)])
+    medias = np.full((len(janelas), n), np.nan)
+    for i, w in enumerate(janelas):
+        if w <= n:
+            medias[i, w - 1:] = (acumulado[w:] - acumulado[:-w]) / w
+    return medias
+
+
+def posicoes(rapida: np.ndarray, lenta: np.ndarray, minimo) -> np.ndarray:
+    """Estado da posição (True = LONG) após a decisão no fechamento de cada vela.
+
+    ``minimo`` (escalar ou um por linha) é o número de velas fechadas que
+    ``sinal_media_movel`` exige antes de decidir: ``max(rapida, lenta) + 1``.
+    """
+    dif = np.atleast_2d(rapida - lenta)
+    n = dif.shape[-1]
+    minimo = np.broadcast_to(np.asarray(minimo, dtype=np.int64), dif.shape[:1])
+    # Antes do mínimo o robô devolve MANTER; as médias já são NaN exceto na última vela anterior
+    for m in np.unique(minimo):
+        dif[minimo == m, :min(m - 1, n)] = np.nan
+    with np.errstate(invalid="ignore"):
+        decide = dif != 0
+    decide &= ~np.isnan(dif)
+    # Propaga a última decisão (COMPRA/VENDA) por cima das velas "MANTER"
+    idx = np.where(decide, np.arange(n), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    with np.errstate(invalid="ignore"):
+        return np.take_along_axis(dif, idx, axis=-1) > 0
+
+
+def _simular(fechamentos, pos, alavancagem, pct_saldo, taxa, capital, passo_qtd, notional_min):
+    """Capital vela a vela para cada linha de ``pos`` (pares x velas)."""
+    p, n = pos.shape
+    entrada = pos.copy()
+    entrada[:, 1:] &= ~pos[:, :-1]
+    saida = np.zeros_like(pos)
+    saida[:, 1:] = pos[:, :-1] & ~pos[:, 1:]
+
+    n_trades = entrada.sum(axis=1)
+    k_max = int(n_trades.max()) if p else 0
+    linhas_e, velas_e = np.nonzero(entrada)
+    linhas_s, velas_s = np.nonzero(saida)
+    inicio = np.concatenate([[0], np.cumsum(n_trades)[:-1]])
+    ordem_e = np.arange(len(linhas_e)) - inicio[linhas_e]
+    inicio_s = np.concatenate([[0], np.cumsum(saida.sum(axis=1))[:-1]])
+    ordem_s = np.arange(len(linhas_s)) - inicio_s[linhas_s]
+
+    px_e = np.full((p, k_max), np.nan)
+    px_s = np.full((p, k_max), np.nan)
+    px_e[linhas_e, ordem_e] = fechamentos[velas_e]
+    px_s[linhas_s, ordem_s] = fechamentos[velas_s]
+    aberto_no_fim = np.isnan(px_s) & ~np.isnan(px_e)
+
+    cap_antes = np.zeros((p, k_max))
+    cap_depois = np.zeros((p, k_max))
+    qtds = np.zeros((p, k_max))
+    cap = np.full(p, float(capital))
+    with np.errstate(invalid="ignore"):
+        for k in range(k_max):
+            pe, ps = px_e[:, k], px_s[:, k]
+            valido = ~np.isnan(pe) & (cap > 0)
+            qtd = cap * pct_saldo * alavancagem / pe
+            if passo_qtd:
+                qtd = np.floor(qtd / passo_qtd + 1e-9) * passo_qtd
+                if notional_min:
+                    minima = np.floor(notional_min / pe / passo_qtd + 1e-9) * passo_qtd
+                    qtd = np.where(qtd * pe < notional_min, minima, qtd)
+            qtd = np.where(valido, qtd, 0.0)
+            cap_antes[:, k] = cap
+            qtds[:, k] = qtd
+            fechado = valido & ~np.isnan(ps)
+            resultado = qtd * (ps - pe) - taxa * qtd * (pe + ps)
+            cap = np.maximum(np.where(fechado, cap + resultado, cap), 0.0)
+            cap_depois[:, k] = cap
+
+    # Curva marcada a mercado. Cada linha é uma sequência de segmentos constantes
+    # (antes do 1º trade e de cada entrada até a próxima), expandidos com np.repeat.
+    # Dentro do trade: capital = base + qtd * fechamento, base = cap_antes - qtd * px_entrada * (1 + taxa)
+    vel_e = np.full((p, k_max), n, dtype=np.int64)
+    vel_e[linhas_e, ordem_e] = velas_e
+    limites = np.concatenate([np.zeros((p, 1), np.int64), vel_e, np.full((p, 1), n)], axis=1)
+    tamanhos = np.diff(limites, axis=1).ravel()
+
+    def expandir(antes, por_trade):
+        valores = np.concatenate([np.full((p, 1), antes), por_trade], axis=1)
+        return np.repeat(valores.ravel(), tamanhos).reshape(p, n)
+
+    with np.errstate(invalid="ignore"):
+        base = np.where(np.isnan(px_e), 0.0, cap_antes - qtds * px_e * (1.0 + taxa))
+    curva = np.where(pos,
+                     expandir(0.0, base) + expandir(0.0, qtds) * fechamentos,
+                     expandir(float(capital), cap_depois))
+    np.maximum(curva, 0.0, out=curva)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ganhos = np.where(np.isnan(px_s), np.nan, px_s - px_e - taxa * (px_e + px_s)) > 0
+        fechados = (~np.isnan(px_s)).sum(axis=1)
+        acertos = np.where(fechados > 0, ganhos.sum(axis=1) / np.maximum(fechados, 1), np.nan)
+    trades = dict(px_entrada=px_e, px_saida=px_s, qtd=qtds, cap_antes=cap_antes,
+                  cap_depois=cap_depois, aberto_no_fim=aberto_no_fim)
+    return curva, n_trades, acertos, trades
+
+
+def _metricas(curva, capital):
+    pico = np.maximum.accumulate(curva, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dd = np.where(pico > 0, 1.0 - curva / pico, 0.0).max(axis=1)
+    return curva[:, -1] / capital - 1.0, dd
+
+
+def varrer_grade(dados, rapidas, lentas, alavancagem: float = 2, pct_saldo: float = 0.90,
+                 taxa: float = TAXA_TAKER, capital: float = 1000.0, passo_qtd: float = None,
+                 notional_min: float = None, lote: int = 128, inicio: int = 0) -> np.ndarray:
+    """Avalia todos os pares (rápida < lenta) da grade; retorna ``DTYPE_RESULTADO`` ordenado por retorno.
+
+    ``inicio`` desliga as decisões antes dessa vela (as anteriores só aquecem as médias).
+    """
+    fechamentos = _fechamentos(dados)
+    rapidas = np.asarray(sorted(set(int(x) for x in rapidas)))
+    lentas = np.asarray(sorted(set(int(x) for x in lentas)))
+    pares = np.array([(r, l) for r in rapidas for l in lentas if r < l], dtype=np.int64).reshape(-1, 2)
+    resultado = np.zeros(len(pares), dtype=DTYPE_RESULTADO)
+    if not len(pares):
+        return resultado
+
+    janelas = np.union1d(rapidas, lentas)
+    medias = medias_cumsum(fechamentos, janelas)
+    linha = {int(w): i for i, w in enumerate(janelas)}
+    i_rapida = np.array([linha[r] for r in pares[:, 0]])
+    i_lenta = np.array([linha[l] for l in pares[:, 1]])
+
+    for ini in range(0, len(pares), lote):
+        fim = min(ini + lote, len(pares))
+        bloco = pares[ini:fim]
+        minimo = np.maximum(bloco.max(axis=1) + 1, inicio + 1)
+        pos = posicoes(medias[i_rapida[ini:fim]], medias[i_lenta[ini:fim]], minimo)
+        curva, n_trades, acertos, _ = _simular(fechamentos, pos, alavancagem, pct_saldo, taxa,
+                                               capital, passo_qtd, notional_min)
+        ret, dd = _metricas(curva, capital)
+        r = resultado[ini:fim]
+        r["rapida"], r["lenta"] = bloco[:, 0], bloco[:, 1]
+        r["retorno"], r["max_drawdown"] = ret, dd
+        r["trades"], r["acertos"] = n_trades, acertos
+        r["exposicao"] = pos.mean(axis=1)
+        r["capital_final"] = curva[:, -1]
+
+    return np.sort(resultado, order="retorno")[::-1]
+
+
+def backtestar(dados, rapida: int = 7, lenta: int = 40, alavancagem: float = 2,
+               pct_saldo: float = 0.90, taxa: float = TAXA_TAKER, capital: float = 1000.0,
+               passo_qtd: float = None, notional_min: float = None, inicio: int = 0) -> dict:
+    """Backtest de um único par com curva de capital e lista de trades."""
+    fechamentos = _fechamentos(dados)
+    medias = medias_cumsum(fechamentos, [rapida, lenta])
+    pos = posicoes(medias[:1], medias[1:], max(rapida, lenta, inicio) + 1)
+    curva, n_trades, acertos, t = _simular(fechamentos, pos, alavancagem, pct_saldo, taxa,
+                                           capital, passo_qtd, notional_min)
+    ret, dd = _metricas(curva, capital)
+    trades = [
+        {"preco_entrada": float(pe), "preco_saida": None if np.isnan(ps) else float(ps),
+         "quantidade": float(q), "capital_antes": float(ca), "capital_depois": float(cd)}
+        for pe, ps, q, ca, cd in zip(t["px_entrada"][0], t["px_saida"][0], t["qtd"][0],
+                                     t["cap_antes"][0], t["cap_depois"][0])
+    ]
+    return {
+        "retorno": float(ret[0]), "max_drawdown": float(dd[0]), "trades": trades,
+        "acertos": float(acertos[0]), "exposicao": float(pos.mean()),
+        "posicao": pos[0], "curva": curva[0],
+    }
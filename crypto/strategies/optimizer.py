@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Otimizador paralelo do cruzamento de médias por símbolo/intervalo com walk-forward.
+
+Uso::
+
+    python -m crypto.strategies.optimizer --simbolos SOLUSDT BTCUSDT --intervalos 1h 4h \\
+        --rapidas 2:50 --lentas 10:200:2 --dobras 4 --saida otimizacao.csv
+
+As velas são lidas do arquivo colunar (``shared/utils/candle_archive.py``)
+em ``Config.DATA_DIR``: os processos recebem só símbolo/intervalo, mapeiam
+a coluna de fechamentos em memória e compartilham as páginas do arquivo via
+page cache, sem copiar nem serializar DataFrames.
+
+Cada dobra treina em ``--treino`` segmentos consecutivos e testa no
+segmento seguinte (janela deslizante). A fase de treino é dividida em
+tarefas (símbolo, intervalo, dobra, fatia de médias rápidas) para manter
+todos os núcleos ocupados mesmo com poucos símbolos.
+"""
+import os
+import csv
+import time
+import logging
+import argparse
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config.settings import Config
+from shared.utils.candle_archive import ArquivoVelas
+from shared.utils.logger import configurar_logs
+from crypto.strategies.backtest import TAXA_TAKER, backtestar, varrer_grade
+
+logger = logging.getLogger("otimizador")
+
+COLUNAS_SAIDA = [
+    "simbolo", "intervalo", "dobra", "rapida", "lenta",
+    "retorno_treino", "drawdown_treino", "trades_treino",
+    "retorno_teste", "drawdown_teste", "trades_teste",
+]
+
+
+@lru_cache(maxsize=None)
+def _fechamentos(fonte: tuple) -> np.ndarray:
+    """Coluna de fechamentos mapeada em memória; ``fonte`` = (raiz, símbolo, intervalo)."""
+    return ArquivoVelas(*fonte).coluna("close")
+
+
+def dividir_dobras(n: int, dobras: int, treino: int) -> list:
+    """Fatias ``(ini_treino, ini_teste, fim_teste)`` do walk-forward; ``dobras=0`` usa a amostra toda."""
+    if dobras <= 0:
+        return [(0, n, n)]
+    seg = n // (dobras + treino)
+    if seg < 1:
+        raise ValueError(f"{n} velas não bastam para {dobras} dobra(s) com treino de {treino} segmento(s): "
+                         f"são necessárias pelo menos {dobras + treino}")
+    return [(i * seg, (i + treino) * seg, (i + treino + 1) * seg) for i in range(dobras)]
+
+
+def intervalo_inteiros(texto: str) -> range:
+    """'2:50' -> range(2, 51); '10:200:2' -> range(10, 201, 2); '7' -> range(7, 8)."""
+    partes = [int(x) for x in texto.split(":")]
+    if len(partes) == 1:
+        return range(partes[0], partes[0] + 1)
+    passo = partes[2] if len(partes) > 2 else 1
+    return range(partes[0], partes[1] + 1, passo)
+
+
+# =========================
+# Tarefas executadas nos processos
+# =========================
+def _treinar(fonte, fatia, rapidas, lentas, top, custos):
+    fechamentos = _fechamentos(fonte)
+    ini, fim = fatia
+    res = varrer_grade(fechamentos[ini:fim], rapidas, lentas, **custos)
+    return res[:top]
+
+
+def _testar(fonte, fatia, pares, custos):
+    fechamentos = _fechamentos(fonte)
+    ini, ini_teste, fim = fatia
+    saida = []
+    for rapida, lenta in pares:
+        r = backtestar(fechamentos[ini:fim], rapida, lenta, inicio=ini_teste - ini, **custos)
+        saida.append((r["retorno"], r["max_drawdown"], len(r["trades"])))
+    return saida
+
+
+# =========================
+# Orquestração
+# =========================
+def otimizar(simbolos, intervalos, rapidas, lentas, dobras: int = 4, treino: int = 3, top: int = 5,
+             processos: int = None, diretorio: str = Config.DATA_DIR, fatias_rapidas: int = None,
+             **custos) -> list:
+    """Executa o walk-forward em paralelo e retorna as linhas ordenadas por retorno no teste."""
+    processos = processos or os.cpu_count() or 1
+    fatias_rapidas = fatias_rapidas or processos
+    rapidas = list(rapidas)
+    pedacos = [p for p in np.array_split(np.asarray(rapidas), min(fatias_rapidas, len(rapidas))) if len(p)]
+
+    conjuntos = []
+    for simbolo in simbolos:
+        for intervalo in intervalos:
+            fonte = (diretorio, simbolo, intervalo)
+            n = len(ArquivoVelas(*fonte))
+            if not n:
+                logger.warning(f"[Otimizador] Sem velas para {simbolo} {intervalo} em {diretorio}")
+                continue
+            for d, fatia in enumerate(dividir_dobras(n, dobras, treino)):
+                conjuntos.append((simbolo, intervalo, fonte, d, fatia))
+
+    linhas = []
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        # Fase 1: varredura da grade no período de treino
+        fut_treino = {
+            (i, j): pool.submit(_treinar, fonte, fatia[:2], pedaco, lentas, top, custos)
+            for i, (_, _, fonte, _, fatia) in enumerate(conjuntos)
+            for j, pedaco in enumerate(pedacos)
+        }
+        melhores = []
+        for i in range(len(conjuntos)):
+            res = np.concatenate([fut_treino[(i, j)].result() for j in range(len(pedacos))])
+            melhores.append(np.sort(res, order="retorno")[::-1][:top])
+
+        # Fase 2: avaliação fora da amostra dos melhores pares de cada dobra
+        fut_teste = [
+            pool.submit(_testar, fonte, fatia, [(int(r["rapida"]), int(r["lenta"])) for r in best], custos)
+            if fatia[2] > fatia[1] else None
+            for (_, _, fonte, _, fatia), best in zip(conjuntos, melhores)
+        ]
+        for (simbolo, intervalo, _, d, _), best, fut in zip(conjuntos, melhores, fut_teste):
+            testes = fut.result() if fut else [(np.nan, np.nan, 0)] * len(best)
+            for r, (ret_t, dd_t, tr_t) in zip(best, testes):
+                linhas.append({
+                    "simbolo": simbolo, "intervalo": intervalo, "dobra": d,
+                    "rapida": int(r["rapida"]), "lenta": int(r["lenta"]),
+                    "retorno_treino": float(r["retorno"]), "drawdown_treino": float(r["max_drawdown"]),
+                    "trades_treino": int(r["trades"]),
+                    "retorno_teste": ret_t, "drawdown_teste": dd_t, "trades_teste": tr_t,
+                })
+
+    chave = "retorno_teste" if dobras > 0 else "retorno_treino"
+    linhas.sort(key=lambda x: -np.inf if np.isnan(x[chave]) else x[chave], reverse=True)
+    return linhas
+
+
+def salvar_tabela(linhas: list, caminho: str):
+    with open(caminho, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=COLUNAS_SAIDA)
+        w.writeheader()
+        w.writerows(linhas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Otimização walk-forward do cruzamento de médias")
+    parser.add_argument("--simbolos", nargs="+", default=["SOLUSDT"])
+    parser.add_argument("--intervalos", nargs="+", default=["1h"])
+    parser.add_argument("--rapidas", type=intervalo_inteiros, default=intervalo_inteiros("2:50"))
+    parser.add_argument("--lentas", type=intervalo_inteiros, default=intervalo_inteiros("10:200:2"))
+    parser.add_argument("--dobras", type=int, default=4, help="dobras do walk-forward (0 = sem teste)")
+    parser.add_argument("--treino", type=int, default=3, help="segmentos de treino por segmento de teste")
+    parser.add_argument("--top", type=int, default=5, help="pares levados do treino para o teste")
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--dados", default=Config.DATA_DIR)
+    parser.add_argument("--alavancagem", type=float, default=2)
+    parser.add_argument("--pct-saldo", type=float, default=0.90)
+    parser.add_argument("--taxa", type=float, default=TAXA_TAKER)
+    parser.add_argument("--passo", type=float, default=None, help="stepSize do MARKET_LOT_SIZE")
+    parser.add_argument("--notional-min", type=float, default=None)
+    parser.add_argument("--saida", default="otimizacao.csv")
+    args = parser.parse_args(argv)
+
+    configurar_logs("otimizador")
+    inicio = time.perf_counter()
+    linhas = otimizar(
+        args.simbolos, args.intervalos, args.rapidas, args.lentas,
+        dobras=args.dobras, treino=args.treino, top=args.top, processos=args.processos,
+        diretorio=args.dados, alavancagem=args.alavancagem, pct_saldo=args.pct_saldo,
+        taxa=args.taxa, passo_qtd=args.passo, notional_min=args.notional_min,
+    )
+    salvar_tabela(linhas, args.saida)
+    logger.info(f"[Otimizador] {len(linhas)} linhas em {args.saida} ({time.perf_counter() - inicio:.1f}s)")
+    for linha in linhas[:10]:
+        logger.info(f"[Top] {linha['simbolo']} {linha['intervalo']} dobra={linha['dobra']} "
+                    f"MM {linha['rapida']}x{linha['lenta']} | teste={linha['retorno_teste']:.2%} "
+                    f"| treino={linha['retorno_treino']:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""Varredura dos perpétuos USDT-M: cruzamento de médias + filtro de volatilidade, com ranking.
+
+Uso::
+
+    python -m crypto.strategies.scanner --periodo 1h --rapida 7 --lenta 40 --top 10 --saida ranking.json
+
+Uma varredura faz, em ordem:
+
+1. universo: símbolos em TRADING, cotação USDT, contrato perpétuo
+   (``InfoSimbolos.negociaveis``, lido do disco);
+2. duas chamadas em lote para todos os pares: estatísticas de 24h (liquidez)
+   e melhor compra/venda (spread). Pares abaixo de ``volume_min`` saem antes
+   de qualquer kline;
+3. velas: o cache de cada par (``obter_cache``) parte do arquivo local e
+   busca só as velas que faltam, em até ``paralelo`` threads; o orçamento de
+   peso do ``ClienteBinance`` segura as threads antes de estourar o limite;
+4. avaliação vetorizada: os fechamentos viram uma matriz pares x velas
+   alinhada pelo ``t_open``, e médias, desvio dos retornos e idade do
+   cruzamento saem de operações por eixo (``shared/indicators/technical.py``).
+
+O sinal é o mesmo de ``CruzamentoMedias`` na última vela fechada. O filtro
+de volatilidade é o de ``mercado_volatil`` do robô: desvio-padrão dos
+retornos das últimas 20 velas de 15m fechadas (``desvio_15m``, uma chamada
+leve de klines por par avaliado) acima do limite, qualquer que seja o
+``periodo`` da varredura. O resultado é um array estruturado
+(``DTYPE_VARREDURA``) com os elegíveis (COMPRA e não volátil) primeiro,
+ordenados por ``forca``: a distância entre as médias medida em desvios dos
+retornos do próprio ``periodo`` (``desvio``). ``ranking`` dá os melhores pares
+para o runtime (``crypto/src/main.py``, chave ``varredura`` da configuração).
+"""
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config.settings import Config
+from config.constants import INTERVALO_MS
+from shared.indicators import desvio_retornos, ema, sma
+from shared.utils.data_fetcher import klines_para_array, obter_cache
+from shared.utils.logger import configurar_logs
+
+logger = logging.getLogger("scanner")
+
+PARALELO_PADRAO = 8
+VOLUME_MIN_PADRAO = 10_000_000      # USDT negociados nas últimas 24h
+DESVIO_LIMITE_PADRAO = 0.05         # mesmo limite de ``mercado_volatil``
+JANELA_VOLATILIDADE = 20            # retornos do ``periodo`` no desvio que normaliza a ``forca``
+# Filtro de volatilidade de ``mercado_volatil``: velas de 15m fechadas
+PERIODO_VOLATILIDADE = "15m"
+VELAS_VOLATILIDADE = 20
+
+DTYPE_VARREDURA = np.dtype([
+    ("par",              "U32"),
+    ("sinal",            "U7"),     # COMPRA / VENDA / MANTER, como ``decidir``
+    ("idade_cruzamento", "i4"),     # velas desde a última troca de lado das médias (-1: nenhuma na janela)
+    ("rapida",           "f8"),
+    ("lenta",            "f8"),
+    ("forca",            "f8"),     # (rápida / lenta - 1) / desvio
+    ("desvio",           "f8"),     # retornos do ``periodo`` (janela ``janela_vol``)
+    ("desvio_15m",       "f8"),     # o de ``mercado_volatil``; NaN se a consulta falhar
+    ("volatil",          "?"),      # desvio_15m > desvio_limite
+    ("volume_24h",       "f8"),
+    ("variacao_24h",     "f8"),     # %
+    ("spread_bps",       "f8"),
+    ("elegivel",         "?"),
+])
+
+
+def matriz_fechamentos(velas_por_par: dict, n: int, passo_ms: int) -> tuple:
+    """(pares, t_open da última coluna, matriz pares x ``n``) com as últimas ``n`` velas fechadas.
+
+    As colunas terminam na vela fechada mais recente entre todos os pares;
+    pares sem ``n`` velas consecutivas terminando nela (listagem recente,
+    cache atrasado, lacuna na janela) ficam de fora.
+    """
+    ultimos = {par: int(v["t_open"][-1]) for par, v in velas_por_par.items() if len(v)}
+    if not ultimos:
+        return [], None, np.empty((0, n))
+    fim = max(ultimos.values())
+    inicio = fim - (n - 1) * passo_ms
+    pares, linhas = [], []
+    for par, velas in velas_por_par.items():
+        if ultimos.get(par) != fim or len(velas) < n or int(velas["t_open"][-n]) != inicio:
+            continue
+        pares.append(par)
+        linhas.append(velas["close"][-n:])
+    return pares, fim, np.array(linhas, dtype=np.float64).reshape(len(linhas), n)
+
+
+def avaliar(fechamentos: np.ndarray, rapida: int = 7, lenta: int = 40, tipo: str = "SMA",
+            janela_vol: int = JANELA_VOLATILIDADE) -> dict:
+    """Médias, sinal, idade do cruzamento e desvio dos retornos na última vela de cada linha."""
+    media = sma if tipo.upper() == "SMA" else ema
+    medias_r = media(fechamentos, rapida)
+    medias_l = media(fechamentos, lenta)
+    lado = np.sign(medias_r - medias_l)
+    # troca[:, j]: o lado mudou da vela j para j+1; a idade é a distância da última troca ao fim
+    troca = (lado[:, 1:] != lado[:, :-1]) & ~np.isnan(lado[:, 1:]) & ~np.isnan(lado[:, :-1])
+    idade = np.where(troca.any(axis=1), np.argmax(troca[:, ::-1], axis=1), -1)
+    r, l = medias_r[:, -1], medias_l[:, -1]
+    desvio = desvio_retornos(fechamentos[:, -(janela_vol + 1):], janela_vol)[:, -1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        forca = (r / l - 1.0) / desvio
+    return {
+        "rapida": r,
+        "lenta": l,
+        "sinal": np.where(r > l, "COMPRA", np.where(r < l, "VENDA", "MANTER")),
+        "idade_cruzamento": idade,
+        "desvio": desvio,
+        "forca": forca,
+    }
+
+
+def ranking(resultado: np.ndarray, top: int = None) -> list:
+    """Pares elegíveis na ordem da varredura (os ``top`` primeiros)."""
+    return [str(p) for p in resultado["par"][resultado["elegivel"]][:top]]
+
+
+class Varredura:
+    def __init__(self, cliente, periodo: str = "1h", rapida: int = 7, lenta: int = 40, tipo: str = "SMA",
+                 velas: int = 1000, janela_vol: int = JANELA_VOLATILIDADE,
+                 desvio_limite: float = DESVIO_LIMITE_PADRAO, volume_min: float = VOLUME_MIN_PADRAO,
+                 paralelo: int = PARALELO_PADRAO, simbolos=None, diretorio: str = None):
+        """``velas``: ``limit`` da carga inicial de cada par; a matriz usa as ``velas - 1`` fechadas."""
+        if velas - 1 <= max(rapida, lenta, janela_vol):
+            raise ValueError("velas deve ser maior que as janelas das médias e da volatilidade")
+        self.cliente = cliente
+        self.periodo = periodo
+        self.passo_ms = INTERVALO_MS[periodo]
+        self.rapida = rapida
+        self.lenta = lenta
+        self.tipo = tipo.upper()
+        self.velas = velas
+        self.janela_vol = janela_vol
+        self.desvio_limite = desvio_limite
+        self.volume_min = volume_min
+        self.paralelo = paralelo
+        self.simbolos = simbolos
+        self.diretorio = diretorio if diretorio is not None else Config.DATA_DIR
+
+    # ---------- Coleta ----------
+    def universo(self) -> list:
+        if self.simbolos is None:
+            from crypto.src.exchange_info import obter_info
+            self.simbolos = obter_info(self.cliente, "futures")
+        return self.simbolos.negociaveis()
+
+    def mercado(self) -> dict:
+        """par -> (volume 24h em USDT, variação 24h %, spread em bps), em duas chamadas para todos os pares."""
+        livro = {t["symbol"]: t for t in self.cliente.futures_orderbook_ticker()}
+        saida = {}
+        for t in self.cliente.futures_ticker():
+            par = t["symbol"]
+            b = livro.get(par, {})
+            compra, venda = float(b.get("bidPrice") or 0), float(b.get("askPrice") or 0)
+            spread = 2e4 * (venda - compra) / (venda + compra) if compra > 0 and venda > 0 else np.nan
+            saida[par] = (float(t["quoteVolume"]), float(t["priceChangePercent"]), spread)
+        return saida
+
+    def _fechadas(self, par: str) -> np.ndarray:
+        cache = obter_cache(self.cliente.futures_klines, par, self.periodo, limite=self.velas,
+                            max_velas=self.velas, diretorio=self.diretorio)
+        cache.atualizar()
+        return cache.fechadas
+
+    def carregar(self, pares) -> dict:
+        """Velas fechadas de cada par (arquivo local + só as que faltam), em até ``paralelo`` threads."""
+        velas = {}
+        with ThreadPoolExecutor(max_workers=self.paralelo, thread_name_prefix="varredura") as pool:
+            futuros = [(par, pool.submit(self._fechadas, par)) for par in pares]
+            for par, futuro in futuros:
+                try:
+                    velas[par] = futuro.result()
+                except Exception as e:
+                    logger.warning(f"[Varredura] {par}: falha ao atualizar velas ({e})")
+        return velas
+
+    def _desvio_15m(self, par: str) -> float:
+        """σ dos retornos das últimas ``VELAS_VOLATILIDADE`` velas de 15m fechadas, como ``mercado_volatil``."""
+        brutas = self.cliente.futures_klines(symbol=par, interval=PERIODO_VOLATILIDADE,
+                                             limit=VELAS_VOLATILIDADE + 1)
+        fechamentos = klines_para_array(brutas)["close"][:-1]     # a última ainda está em formação
+        return float(desvio_retornos(fechamentos, len(fechamentos) - 1)[-1])
+
+    def desvios_15m(self, pares) -> np.ndarray:
+        """``_desvio_15m`` de cada par, em até ``paralelo`` threads (NaN onde a consulta falhar)."""
+        desvios = np.full(len(pares), np.nan)
+        with ThreadPoolExecutor(max_workers=self.paralelo, thread_name_prefix="varredura") as pool:
+            futuros = [pool.submit(self._desvio_15m, par) for par in pares]
+            for i, (par, futuro) in enumerate(zip(pares, futuros)):
+                try:
+                    desvios[i] = futuro.result()
+                except Exception as e:
+                    logger.warning(f"[Varredura] {par}: falha ao medir a volatilidade de 15m ({e})")
+        return desvios
+
+    # ---------- Varredura ----------
+    def executar(self) -> np.ndarray:
+        t0 = time.perf_counter()
+        universo = self.universo()
+        mercado = self.mercado()
+        liquidos = [p for p in universo if p in mercado and mercado[p][0] >= self.volume_min]
+        n = self.velas - 1
+        pares, fim, matriz = matriz_fechamentos(self.carregar(liquidos), n, self.passo_ms)
+        if len(pares) < len(liquidos):
+            logger.info(f"[Varredura] {len(liquidos) - len(pares)} par(es) sem {n} velas contínuas; ignorados")
+
+        av = avaliar(matriz, self.rapida, self.lenta, self.tipo, self.janela_vol)
+        resultado = np.zeros(len(pares), dtype=DTYPE_VARREDURA)
+        resultado["par"] = pares
+        for campo, valores in av.items():
+            resultado[campo] = valores
+        resultado["volume_24h"], resultado["variacao_24h"], resultado["spread_bps"] = (
+            np.array([mercado[p] for p in pares]).reshape(len(pares), 3).T)
+        resultado["desvio_15m"] = self.desvios_15m(pares)
+        resultado["volatil"] = resultado["desvio_15m"] > self.desvio_limite
+        resultado["elegivel"] = (resultado["sinal"] == "COMPRA") & ~resultado["volatil"]
+        forca = np.nan_to_num(resultado["forca"], nan=-np.inf)
+        resultado = resultado[np.lexsort((-forca, ~resultado["elegivel"]))]
+
+        logger.info(f"[Varredura] {self.periodo} {self.tipo}{self.rapida}x{self.lenta}: {len(universo)} símbolos, "
+                    f"{len(liquidos)} líquidos, {len(pares)} avaliados, {int(resultado['elegivel'].sum())} elegíveis "
+                    f"em {time.perf_counter() - t0:.1f}s")
+        return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Varredura do cruzamento de médias em todos os perpétuos USDT-M")
+    parser.add_argument("--periodo", default="1h")
+    parser.add_argument("--rapida", type=int, default=7)
+    parser.add_argument("--lenta", type=int, default=40)
+    parser.add_argument("--tipo", default="SMA", choices=["SMA", "EMA"])
+    parser.add_argument("--velas", type=int, default=1000)
+    parser.add_argument("--volume-min", type=float, default=VOLUME_MIN_PADRAO)
+    parser.add_argument("--desvio-limite", type=float, default=DESVIO_LIMITE_PADRAO)
+    parser.add_argument("--paralelo", type=int, default=PARALELO_PADRAO)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--saida", help="grava o resultado completo em JSON")
+    args = parser.parse_args(argv)
+
+    configurar_logs("varredura")
+    from crypto.src.binance_client import obter_cliente
+
+    varredura = Varredura(obter_cliente(), args.periodo, args.rapida, args.lenta, args.tipo, args.velas,
+                          desvio_limite=args.desvio_limite, volume_min=args.volume_min, paralelo=args.paralelo)
+    resultado = varredura.executar()
+    for r in resultado[:args.top]:
+        logger.info(f"{r['par']:<14} {r['sinal']:<7} idade={r['idade_cruzamento']:>4} força={r['forca']:>7.2f} "
+                    f"σ={r['desvio']:.4f}{' (volátil)' if r['volatil'] else ''} "
+                    f"vol24h={r['volume_24h'] / 1e6:,.1f}M spread={r['spread_bps']:.1f}bps")
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump([{c: r[c].item() for c in DTYPE_VARREDURA.names} for r in resultado], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Estratégia 7 x 40 (cruzamento de médias, só LONG) como instância por par/intervalo.
+
+Cliente, filtros e parâmetros são injetados, para que um único processo
+rode várias instâncias compartilhando a mesma sessão com a exchange e o mesmo
+``EstadoConta`` (um instantâneo de saldo/posições serve todas as instâncias
+que fecham vela no mesmo instante). O robô de futuros
+(``crypto/sol_futures/futures_bot.py``) usa esta mesma classe e só
+acrescenta o ciclo medido e o checkpoint.
+
+As ordens passam pelo ``ExecutorOrdens``: ``antecipar`` monta a ordem que a
+vela em formação produziria alguns segundos antes do fechamento, e
+``decidir`` só a confirma (ou monta na hora) quando a vela fecha. Um
+``executor`` injetado pode ser compartilhado por várias instâncias (o
+runtime envia as ordens de um executor em um só lote); o client order id
+leva o ``prefixo`` da instância (intervalo, tipo e períodos das médias).
+
+``antecipar`` e ``decidir`` rodam em threads diferentes (a antecipação pode
+atrasar até o fechamento) e mexem no mesmo ``cruzamento`` e nas ordens
+preparadas: ``trava`` as serializa, e quem monta o próprio ciclo sobre a
+instância (``futures_bot.executar_ciclo``) usa a mesma trava.
+
+Com ``max_perdas_seguidas`` e ``diario``, perdas seguidas suspendem as
+entradas por ``pausa_perdas_velas`` velas (``entradas_suspensas``).
+"""
+import logging
+import threading
+
+from config.constants import INTERVALO_MS
+from crypto.src.account_state import EstadoConta
+from crypto.src.order_executor import VELAS_RETIDAS, ExecutorOrdens
+from shared.indicators import CruzamentoMedias
+from shared.indicators.moving_average import decidir
+from shared.utils.logger import obter_metricas
+
+RECV_WINDOW_MS = 60000
+IDADE_MAX_PREPARADA_S = 30
+
+
+class EstrategiaCruzamento:
+    def __init__(self, cliente, par: str, periodo: str, rapida: int = 7, lenta: int = 40,
+                 tipo: str = "SMA", alavancagem: int = 2, pct_saldo: float = 0.90,
+                 tipo_margem: str = "ISOLATED", filtros: dict = None, conta: EstadoConta = None,
+                 executor: ExecutorOrdens = None, simbolos=None, diario=None, prefixo: str = None,
+                 cruzamento: CruzamentoMedias = None, max_perdas_seguidas: int = None,
+                 pausa_perdas_velas: int = 24):
+        self.cliente = cliente
+        self.conta = conta or EstadoConta(cliente, recv_window=RECV_WINDOW_MS)
+        # Um id por estratégia: duas instâncias no mesmo par/intervalo não colidem
+        self.prefixo = prefixo or f"cz{periodo}{tipo[0].upper()}{rapida}x{lenta}"
+        self.executor = executor or ExecutorOrdens(cliente, self.conta, prefixo=self.prefixo, simbolos=simbolos,
+                                                   diario=diario,
+                                                   retencao_s=VELAS_RETIDAS * INTERVALO_MS[periodo] / 1000)
+        self.par = par
+        self.periodo = periodo
+        self.alavancagem = alavancagem
+        self.pct_saldo = pct_saldo
+        self.tipo_margem = tipo_margem
+        self.diario = diario
+        self.max_perdas_seguidas = max_perdas_seguidas
+        self.pausa_perdas_velas = pausa_perdas_velas
+        self.cruzamento = cruzamento or CruzamentoMedias(rapida, lenta, tipo)
+        self.nome = f"{par}:{periodo}:{tipo.upper()}{rapida}x{lenta}"
+        self.logger = logging.getLogger(f"estrategia.{self.nome}")
+        self.metricas = obter_metricas()
+        self.trava = threading.RLock()
+        if filtros:
+            self.definir_filtros(filtros)
+
+    def definir_filtros(self, filtros: dict):
+        self.executor.definir_filtros(self.par, filtros)
+
+    # ---------- Preparação ----------
+    def garantir_modos_conta(self):
+        from binance.exceptions import BinanceAPIException
+
+        c = self.cliente
+        try:
+            c.futures_change_position_mode(dualSidePosition='false', recvWindow=RECV_WINDOW_MS)
+        except BinanceAPIException as e:
+            if "No need to change position side" not in str(e):
+                self.logger.warning(f"[Modo Posição] {e}")
+        try:
+            c.futures_change_margin_type(symbol=self.par, marginType=self.tipo_margem, recvWindow=RECV_WINDOW_MS)
+        except BinanceAPIException as e:
+            if "No need to change margin type" not in str(e):
+                self.logger.warning(f"[Tipo Margem] {e}")
+        try:
+            c.futures_change_leverage(symbol=self.par, leverage=self.alavancagem, recvWindow=RECV_WINDOW_MS)
+        except BinanceAPIException as e:
+            self.logger.warning(f"[Alavancagem] {e}")
+
+    # ---------- Consultas ----------
+    def saldo_usdt(self) -> float:
+        return self.conta.saldo("USDT")
+
+    def preco_atual(self) -> float:
+        return self.conta.preco(self.par)
+
+    def posicao_aberta(self) -> float:
+        return self.conta.posicao(self.par)
+
+    def calcular_quantidade(self) -> float:
+        return self.executor.quantidade(self.par, self.pct_saldo, self.alavancagem)
+
+    # ---------- Ordens ----------
+    def entradas_suspensas(self, t_vela: int) -> bool:
+        """Circuit breaker: ``max_perdas_seguidas`` operações perdedoras seguidas (do diário) suspendem
+        novas entradas por ``pausa_perdas_velas`` velas contadas da última perda. Saídas nunca são bloqueadas."""
+        if self.max_perdas_seguidas is None or self.diario is None:
+            return False
+        est = self.diario.estatisticas(self.par)
+        if est.perdas_seguidas < self.max_perdas_seguidas:
+            return False
+        return t_vela < est.ultimo_resultado_ms + self.pausa_perdas_velas * INTERVALO_MS[self.periodo]
+
+    def ordem_para_sinal(self, sinal: str, tamanho_pos: float, t_vela: int):
+        """Ordem que ``sinal`` pede com a posição atual (reaproveita a preparada), ou None."""
+        if sinal == "COMPRA" and tamanho_pos == 0:
+            if self.entradas_suspensas(t_vela):
+                self.logger.warning("[Disjuntor] %d perdas seguidas; entrada suspensa",
+                                    self.diario.perdas_seguidas(self.par))
+                return None
+            ordem = self.executor.preparada(self.par, "BUY", t_vela, IDADE_MAX_PREPARADA_S, self.prefixo)
+            if ordem is None:
+                qtd = self.calcular_quantidade()
+                if qtd <= 0:
+                    return None
+                ordem = self.executor.preparar(self.par, "BUY", qtd, t_vela, prefixo=self.prefixo)
+            return ordem
+        if sinal == "VENDA" and tamanho_pos > 0:
+            ordem = self.executor.preparada(self.par, "SELL", t_vela, IDADE_MAX_PREPARADA_S, self.prefixo)
+            if ordem is None or (ordem.estado == "PREPARADA" and ordem.quantidade != abs(tamanho_pos)):
+                ordem = self.executor.preparar(self.par, "SELL", abs(tamanho_pos), t_vela, reduce_only=True,
+                                               prefixo=self.prefixo)
+            return ordem
+        return None
+
+    def antecipar(self, cache):
+        """Pouco antes do fechamento: monta a ordem que a vela em formação produziria."""
+        if cache.aberta is None:
+            return None
+        with self.trava:
+            self.cruzamento.sincronizar(cache.fechadas)
+            t_vela = int(cache.aberta["t_open"][0])
+            sinal = decidir(*self.cruzamento.espiar(float(cache.aberta["close"][0])))
+            ordem = self.ordem_para_sinal(sinal, self.posicao_aberta(), t_vela)
+        if ordem is not None:
+            self.logger.info("[Antecipação] %s %s pronta para o fechamento", ordem.lado, ordem.payload["quantity"])
+        return ordem
+
+    # ---------- Ciclo ----------
+    def decidir(self, cache):
+        """Sinal da última vela fechada e a ordem correspondente (sem enviar)."""
+        m = self.metricas
+        with self.trava:
+            with m.span("sinal", par=self.par, periodo=self.periodo):
+                sinal = self.cruzamento.sincronizar(cache.fechadas)
+            r_prev, l_prev = self.cruzamento.valores()
+            self.logger.info("[MM] Rápida=%.6f | Lenta=%.6f (base: vela fechada)", r_prev, l_prev)
+            with m.span("posicao", par=self.par, periodo=self.periodo):
+                tamanho_pos = self.posicao_aberta()
+            with m.span("dimensionamento", par=self.par, periodo=self.periodo):
+                ordem = self.ordem_para_sinal(sinal, tamanho_pos, int(cache.fechadas["t_open"][-1]))
+        if ordem is None:
+            self.logger.info("[Manter] sinal=%s | pos=%s", sinal, tamanho_pos)
+        elif ordem.lado == "BUY":
+            self.logger.info("[Entrada] LONG qty=%s", ordem.payload["quantity"])
+        else:
+            self.logger.info("[Saída] Fechando LONG qty=%s", ordem.payload["quantity"])
+        return sinal, ordem
+
+    def avaliar(self, cache) -> str:
+        """Decide com base na última vela fechada do cache e envia a ordem, se houver."""
+        with self.trava:
+            sinal, ordem = self.decidir(cache)
+            if ordem is not None:
+                with self.metricas.span("envio", par=self.par, periodo=self.periodo):
+                    self.executor.enviar(ordem)
+        return sinal
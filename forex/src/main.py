@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Runtime de forex: instâncias do cruzamento 7 x 40 em pares de FX pelo MetaApi.
+
+Uso::
+
+    python -m forex.src.main forex/config/instancias.json
+
+Configuração (token em ``METAAPI_TOKEN``; conta em ``conta`` ou ``METAAPI_ACCOUNT_ID``)::
+
+    {"conta": "<id da conta MetaApi>", "limite_candles": 1000,
+     "instancias": [{"par": "EURUSD", "periodo": "1h", "rapida": 7, "lenta": 40,
+                     "alavancagem": 10, "pct_saldo": 0.10}]}
+
+As peças são as dos robôs de cripto: ``CacheKlines`` (e o arquivo local de
+velas, mercado ``forex``) carregado pelo histórico do MetaApi,
+``CruzamentoMedias`` incremental e o ``Agendador``, que fecha cada vela no
+fim do intervalo. A vela fechada dispara a avaliação no próprio event loop,
+como o modo stream de ``crypto/src/main.py``: decisão sobre o estado
+sincronizado e envio da ordem, sem nenhuma consulta no caminho.
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+import argparse
+
+from config.settings import Config
+from shared.utils.data_fetcher import obter_cache
+from shared.utils.logger import configurar_logs, iniciar_exportacao
+from shared.utils.scheduler import Agendador
+from forex.src.metaapi_client import ClienteMetaApi, conectar_conta
+from forex.strategies.sma_crossover import EstrategiaCruzamentoForex
+
+logger = logging.getLogger("runtime_forex")
+
+MERCADO = "forex"
+
+
+def carregar_config(caminho: str) -> dict:
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RuntimeForex:
+    def __init__(self, config: dict, conta=None, agendador: Agendador = None, diretorio: str = None):
+        """``conta``: ``MetatraderAccount`` já conectada (padrão: ``conectar_conta`` com o token da configuração)."""
+        self.config = config
+        self.conta = conta
+        self.agendador = agendador or Agendador()
+        self.diretorio = diretorio if diretorio is not None else Config.DATA_DIR
+        self.cliente = None
+        self.instancias = []
+        self.caches = {}            # (par, periodo) -> CacheKlines
+        self.por_cache = {}         # id(cache) -> [instâncias]
+        self.erros = {}             # nome da instância -> erros consecutivos
+
+    # ---------- Partida ----------
+    async def _conectar_conta(self):
+        token = self.config.get("token") or Config.METAAPI_TOKEN
+        conta = self.config.get("conta") or Config.METAAPI_ACCOUNT_ID
+        if not token or not conta:
+            raise RuntimeError("Token/conta do MetaApi não encontrados (METAAPI_TOKEN/METAAPI_ACCOUNT_ID)")
+        return await conectar_conta(token, conta)
+
+    def _cache(self, par: str, periodo: str):
+        chave = (par, periodo)
+        if chave not in self.caches:
+            self.caches[chave] = obter_cache(self.cliente.klines, par, periodo, mercado=MERCADO,
+                                             limite=self.config.get("limite_candles", 1000),
+                                             diretorio=self.diretorio)
+        return self.caches[chave]
+
+    async def iniciar(self):
+        if self.conta is None:
+            self.conta = await self._conectar_conta()
+        self.cliente = ClienteMetaApi(self.conta, self.agendador)
+        await self.cliente.conectar()
+        for d in self.config.get("instancias", []):
+            d = dict(d)
+            par, periodo = d.pop("par"), d.pop("periodo")
+            d.pop("estrategia", None)
+            inst = EstrategiaCruzamentoForex(self.cliente, par, periodo, **d)
+            cache = self._cache(par, periodo)
+            self.instancias.append(inst)
+            self.por_cache.setdefault(id(cache), []).append(inst)
+
+        # Histórico em threads (``klines`` espera o loop) e só depois as assinaturas do stream
+        await asyncio.gather(*(asyncio.to_thread(c.atualizar) for c in self.caches.values()))
+        for cache in self.caches.values():
+            await self.cliente.assinar(cache)
+        self.cliente.ao_fechar_vela(self.avaliar_cache)
+        logger.info(f"[Forex] {len(self.instancias)} instância(s), {len(self.caches)} par(es)/intervalo(s)")
+
+    # ---------- Avaliação ----------
+    async def _isolado(self, inst, cache):
+        """Avalia a instância; exceções são registradas e não propagam."""
+        try:
+            resultado = await inst.avaliar(cache)
+            self.erros[inst.nome] = 0
+            return resultado
+        except Exception as e:
+            self.erros[inst.nome] = self.erros.get(inst.nome, 0) + 1
+            logger.error(f"[Forex] {inst.nome}: {e} (erros seguidos={self.erros[inst.nome]})")
+            return None
+
+    async def avaliar_cache(self, cache, novas=None):
+        instancias = self.por_cache.get(id(cache), [])
+        await asyncio.gather(*(self._isolado(i, cache) for i in instancias))
+
+    async def executar(self):
+        await self.iniciar()
+        try:
+            await self.agendador.executar_async()
+        finally:
+            await self.cliente.fechar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runtime dos robôs de forex (MetaApi)")
+    parser.add_argument("config", nargs="?", default=os.path.join(Config.BASE_DIR, "forex", "config", "instancias.json"))
+    args = parser.parse_args(argv)
+
+    configurar_logs("runtime_forex")
+    iniciar_exportacao()
+    runtime = RuntimeForex(carregar_config(args.config))
+    try:
+        asyncio.run(runtime.executar())
+    except KeyboardInterrupt:
+        logger.info("[Forex] Encerrado pelo usuário")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""Cliente de forex sobre a conexão de streaming do MetaApi (``metaapi-cloud-sdk``).
+
+Uma ``StreamingConnection`` mantém no processo uma cópia sincronizada do
+terminal (``terminal_state``: conta, posições, cotações e especificação dos
+símbolos), atualizada por eventos. ``ClienteMetaApi`` lê posições, saldo e
+preços dessa cópia, sem consultas periódicas, e liga o MetaApi às mesmas
+peças dos robôs de cripto:
+
+- ``klines``: histórico no formato de ``futures_klines`` (a última linha é a
+  vela em formação), para ``CacheKlines``/``obter_cache`` e o arquivo local
+  de velas. É síncrono e roda fora do event loop (``asyncio.to_thread``),
+  como as chamadas REST da Binance;
+- ``on_candles_updated``: cada atualização da vela em formação vai para
+  ``CacheKlines.atualizar_aberta``. O MetaApi não marca a vela como fechada,
+  então o fechamento é disparado pelo ``Agendador`` no fim da vela (abertura
+  + intervalo, o que também cobre velas alinhadas ao fuso da corretora) ou
+  pela primeira cotação da vela seguinte, o que vier antes;
+- ``ao_fechar_vela(callback)``: mesmo contrato de ``StreamMercado``
+  (``callback(cache, novas)``, função ou corrotina). Uma lacuna (fim de
+  semana, reconexão) é completada pelo histórico antes do evento.
+
+O SDK só é importado em ``conectar_conta``; os testes usam uma conexão falsa.
+"""
+import time
+import asyncio
+import inspect
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+
+from config.constants import INTERVALO_MS
+from shared.utils.data_fetcher import DTYPE_KLINE
+
+logger = logging.getLogger("metaapi_client")
+
+LIMITE_HISTORICO = 1000             # máximo de velas por get_historical_candles
+TIMEOUT_HISTORICO_S = 60.0
+MARGEM_FECHAMENTO_S = 0.25          # a última cotação da vela pode chegar alguns ms depois da virada
+
+
+def _ms(t) -> int:
+    if isinstance(t, datetime):
+        if t.tzinfo is None:
+            t = t.replace(tzinfo=timezone.utc)
+        return int(t.timestamp() * 1000)
+    if isinstance(t, str):
+        return int(datetime.fromisoformat(t.replace("Z", "+00:00")).timestamp() * 1000)
+    return int(t)
+
+
+def velas_para_array(velas: list, passo_ms: int) -> np.ndarray:
+    """Velas do MetaApi (``time``, ``open``... ``tickVolume``) em ``DTYPE_KLINE``.
+
+    Forex não tem volume negociado central: ``volume`` e ``trades`` recebem o
+    número de ticks; os campos de volume em moeda de cotação ficam zerados.
+    """
+    arr = np.zeros(len(velas), dtype=DTYPE_KLINE)
+    if not velas:
+        return arr
+    arr["t_open"] = [_ms(v["time"]) for v in velas]
+    arr["t_close"] = arr["t_open"] + passo_ms - 1
+    for campo in ("open", "high", "low", "close"):
+        arr[campo] = [v[campo] for v in velas]
+    ticks = [v.get("tickVolume") or 0 for v in velas]
+    arr["volume"] = ticks
+    arr["trades"] = ticks
+    return arr
+
+
+def _linhas_api(velas: np.ndarray) -> list:
+    """Array em linhas no formato cru de ``futures_klines`` (12 colunas, a última ignorada)."""
+    return [list(v) + ["0"] for v in velas.tolist()]
+
+
+class _Ouvinte:
+    """``SynchronizationListener`` do SDK: repassa cotações e velas; os demais eventos são ignorados."""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    async def on_symbol_price_updated(self, instance_index, price):
+        self.cliente._preco(price)
+
+    async def on_symbol_prices_updated(self, instance_index, prices, *args, **kwargs):
+        for price in prices or []:
+            self.cliente._preco(price)
+
+    async def on_candles_updated(self, instance_index, candles, *args, **kwargs):
+        for vela in candles or []:
+            await self.cliente._vela(vela)
+
+    def __getattr__(self, nome):
+        if not nome.startswith("on_"):
+            raise AttributeError(nome)
+
+        async def ignorar(*args, **kwargs):
+            return None
+        return ignorar
+
+
+class ClienteMetaApi:
+    def __init__(self, conta, agendador=None, margem_fechamento_s: float = MARGEM_FECHAMENTO_S):
+        """``conta``: ``MetatraderAccount`` já implantada (``conectar_conta``) ou uma falsa nos testes.
+
+        ``agendador``: ``Agendador`` que dispara o fechamento das velas no fim
+        do intervalo; sem ele, a vela fecha com a primeira cotação da seguinte.
+        """
+        self.conta = conta
+        self.agendador = agendador
+        self.margem_fechamento_s = margem_fechamento_s
+        self.conexao = None
+        self.loop = None
+        self.caches = {}                # (par, periodo) -> CacheKlines
+        self.precos = {}                # par -> (bid, ask, monotonic)
+        self.fechamentos = 0
+        self._callbacks = []
+        self._em_formacao = {}          # (par, periodo) -> t_open da última vela recebida pelo stream
+        self._tarefas = set()
+
+    # ---------- Conexão ----------
+    async def conectar(self, timeout_s: float = 300):
+        """Abre a conexão de streaming e espera a cópia local do terminal sincronizar."""
+        self.loop = asyncio.get_running_loop()
+        self.conexao = self.conta.get_streaming_connection()
+        self.conexao.add_synchronization_listener(_Ouvinte(self))
+        await self.conexao.connect()
+        await self.conexao.wait_synchronized({"timeoutInSeconds": timeout_s})
+        logger.info(f"[MetaApi] Conectado e sincronizado ({len(self.posicoes())} posição(ões) abertas)")
+
+    async def assinar(self, cache):
+        """Cotações e velas do par/intervalo do cache; as velas fechadas são gravadas nele."""
+        self.caches[(cache.par, cache.periodo)] = cache
+        await self.conexao.subscribe_to_market_data(cache.par, [
+            {"type": "quotes"}, {"type": "candles", "timeframe": cache.periodo},
+        ])
+
+    def ao_fechar_vela(self, callback):
+        """Registra ``callback(cache, novas)`` (função ou corrotina) chamado a cada vela fechada."""
+        self._callbacks.append(callback)
+
+    async def fechar(self):
+        if self.conexao is not None:
+            await self.conexao.close()
+
+    # ---------- Histórico ----------
+    async def _historico(self, par: str, periodo: str, limite: int, fim_ms: int = None) -> np.ndarray:
+        inicio = None if fim_ms is None else datetime.fromtimestamp(fim_ms / 1000, tz=timezone.utc)
+        velas = await self.conta.get_historical_candles(par, periodo, inicio, min(limite, LIMITE_HISTORICO))
+        return velas_para_array(sorted(velas or [], key=lambda v: _ms(v["time"])), INTERVALO_MS[periodo])
+
+    def klines(self, symbol: str, interval: str, limit: int = 500, startTime: int = None, endTime: int = None,
+               **params) -> list:
+        """Histórico no formato de ``futures_klines``; chamar de uma thread, não do event loop.
+
+        O MetaApi carrega as velas de trás para frente a partir de ``endTime``
+        (ou de agora): as ``limit`` mais recentes cobrem ``startTime`` sempre
+        que ``limit`` cobrir o tempo até agora, que é como o ``CacheKlines``
+        pede. Com o mercado parado, uma vela vazia no intervalo atual faz o
+        papel da vela em formação (nunca é promovida a fechada).
+        """
+        if self.loop is None or self.loop.is_closed():
+            raise RuntimeError("ClienteMetaApi não conectado")
+        if _loop_corrente() is self.loop:
+            raise RuntimeError("klines é bloqueante: chame por asyncio.to_thread")
+        futuro = asyncio.run_coroutine_threadsafe(self._historico(symbol, interval, limit, endTime), self.loop)
+        velas = futuro.result(TIMEOUT_HISTORICO_S)
+        if startTime is not None:
+            velas = velas[velas["t_open"] >= startTime]
+        passo = INTERVALO_MS[interval]
+        agora_ms = int(time.time() * 1000)
+        if endTime is None and (not len(velas) or int(velas["t_open"][-1]) + passo <= agora_ms):
+            ultima = self.caches.get((symbol, interval))
+            referencia = velas[-1:] if len(velas) else (ultima.fechadas[-1:] if ultima is not None else velas)
+            if len(referencia):
+                vazia = np.zeros(1, dtype=DTYPE_KLINE)
+                vazia["t_open"] = (agora_ms // passo) * passo
+                vazia["t_close"] = vazia["t_open"] + passo - 1
+                for campo in ("open", "high", "low", "close"):
+                    vazia[campo] = referencia["close"][-1]
+                velas = np.concatenate([velas, vazia])
+        return _linhas_api(velas)
+
+    # ---------- Eventos do stream ----------
+    def _preco(self, price: dict):
+        self.precos[price["symbol"]] = (float(price["bid"]), float(price["ask"]), time.monotonic())
+
+    async def _vela(self, bruta: dict):
+        chave = (bruta["symbol"], bruta["timeframe"])
+        cache = self.caches.get(chave)
+        if cache is None:
+            return
+        vela = velas_para_array([bruta], cache.passo_ms)
+        t_open = int(vela["t_open"][0])
+        aberta = cache.aberta
+        if aberta is not None and int(aberta["t_open"][0]) < t_open:
+            await self._fechar(cache, int(aberta["t_open"][0]))        # 1ª cotação da vela seguinte
+        if len(cache.fechadas) and t_open <= int(cache.fechadas["t_open"][-1]):
+            return
+        cache.atualizar_aberta(vela)
+        if self._em_formacao.get(chave) != t_open:
+            self._em_formacao[chave] = t_open
+            if self.agendador is None:
+                return
+            espera = (t_open + cache.passo_ms) / 1000 - self.agendador.relogio() + self.margem_fechamento_s
+            self.agendador.em(max(espera, 0.0), self._fechar, cache, t_open,
+                              nome=f"fechar[{cache.par} {cache.periodo}]")
+
+    async def _fechar(self, cache, t_open: int):
+        """Promove a vela em formação ``t_open`` a fechada (uma vez) e emite o evento."""
+        aberta = cache.aberta
+        if (aberta is None or int(aberta["t_open"][0]) != t_open
+                or self._em_formacao.get((cache.par, cache.periodo)) != t_open):
+            return                      # já fechada, ou só a vela vazia do histórico
+        if cache.inserir_fechada(aberta.copy()):
+            self.fechamentos += 1
+            self._emitir(cache, aberta)
+            return
+        # Lacuna (fim de semana, reconexão) ou cache vazio: completa pelo histórico
+        try:
+            novas = await asyncio.to_thread(cache.atualizar)
+        except Exception as e:
+            logger.warning(f"[MetaApi] Histórico falhou para {cache.par} {cache.periodo}: {e}")
+            return
+        if len(novas):
+            logger.info(f"[MetaApi] Histórico {cache.par} {cache.periodo}: +{len(novas)} vela(s)")
+            self.fechamentos += 1
+            self._emitir(cache, novas)
+
+    def _emitir(self, cache, novas):
+        for callback in self._callbacks:
+            resultado = callback(cache, novas)
+            if inspect.iscoroutine(resultado):
+                tarefa = asyncio.create_task(resultado)
+                self._tarefas.add(tarefa)
+                tarefa.add_done_callback(self._finalizar_tarefa)
+
+    def _finalizar_tarefa(self, tarefa):
+        self._tarefas.discard(tarefa)
+        if not tarefa.cancelled() and tarefa.exception() is not None:
+            logger.error(f"[MetaApi] Erro em callback: {tarefa.exception()}")
+
+    # ---------- Estado sincronizado (sem chamadas) ----------
+    @property
+    def terminal(self):
+        return self.conexao.terminal_state
+
+    def saldo(self) -> float:
+        return float((self.terminal.account_information or {}).get("balance", 0.0))
+
+    def posicoes(self, par: str = None) -> list:
+        return [p for p in self.terminal.positions or [] if par is None or p["symbol"] == par]
+
+    def posicao(self, par: str) -> float:
+        """Volume líquido em lotes (positivo=comprado)."""
+        return sum(p["volume"] if p["type"] == "POSITION_TYPE_BUY" else -p["volume"] for p in self.posicoes(par))
+
+    def preco(self, par: str, lado: str = "BUY") -> float:
+        """Preço de execução a mercado: ask para comprar, bid para vender."""
+        valor = self.precos.get(par)
+        if valor is None:
+            cotacao = self.terminal.price(par)
+            if cotacao is None:
+                raise RuntimeError(f"Sem cotação para {par}")
+            valor = (float(cotacao["bid"]), float(cotacao["ask"]), None)
+        return valor[1] if lado == "BUY" else valor[0]
+
+    def especificacao(self, par: str) -> dict:
+        espec = self.terminal.specification(par)
+        if espec is None:
+            raise RuntimeError(f"Símbolo {par} sem especificação no terminal")
+        return espec
+
+    # ---------- Ordens ----------
+    async def comprar(self, par: str, volume: float, id_cliente: str = None) -> dict:
+        return await self.conexao.create_market_buy_order(par, volume, None, None, _opcoes(id_cliente))
+
+    async def vender(self, par: str, volume: float, id_cliente: str = None) -> dict:
+        return await self.conexao.create_market_sell_order(par, volume, None, None, _opcoes(id_cliente))
+
+    async def fechar_posicao(self, id_posicao: str, id_cliente: str = None) -> dict:
+        return await self.conexao.close_position(id_posicao, _opcoes(id_cliente))
+
+
+def _loop_corrente():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _opcoes(id_cliente: str = None) -> dict:
+    return {"clientId": id_cliente} if id_cliente else {}
+
+
+async def conectar_conta(token: str, id_conta: str):
+    """``MetatraderAccount`` implantada e conectada à corretora (importa o SDK)."""
+    from metaapi_cloud_sdk import MetaApi
+
+    api = MetaApi(token)
+    conta = await api.metatrader_account_api.get_account(id_conta)
+    if conta.state not in ("DEPLOYING", "DEPLOYED"):
+        await conta.deploy()
+    await conta.wait_connected()
+    return conta
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Estratégia 7 x 40 (cruzamento de médias, só LONG) em pares de forex pelo MetaApi.
+
+A mesma regra de ``crypto/strategies/sma_crossover.py``: ``CruzamentoMedias``
+alimentado só com velas fechadas do ``CacheKlines``, COMPRA sem posição abre
+um LONG com ``pct_saldo`` do saldo x ``alavancagem``, VENDA com LONG aberto
+fecha a posição. Saldo, posições, cotação e especificação do símbolo vêm da
+cópia sincronizada do terminal (``ClienteMetaApi``), então a decisão não faz
+nenhuma chamada; só o envio da ordem vai à rede, direto do event loop.
+
+O ``clientId`` da ordem é determinístico por sinal (par + abertura da vela +
+lado): uma posição já aberta com esse id (reinício, reenvio) não é repetida.
+"""
+import math
+import logging
+
+from shared.indicators import CruzamentoMedias
+from shared.utils.logger import obter_metricas
+
+# MT5 limita clientId + comentário a 26 caracteres
+TAMANHO_ID_CLIENTE = 26
+
+
+def id_cliente(par: str, t_vela: int, lado: str) -> str:
+    return f"{par}{int(t_vela) // 1000}{lado[0]}"[-TAMANHO_ID_CLIENTE:]
+
+
+def arredondar_volume(volume: float, espec: dict) -> float:
+    """Lotes no passo do símbolo (para baixo), limitados a ``maxVolume``; 0 abaixo de ``minVolume``."""
+    passo = float(espec.get("volumeStep") or 0.01)
+    volume = math.floor(volume / passo + 1e-9) * passo
+    volume = min(volume, float(espec.get("maxVolume") or volume))
+    casas = max(-int(math.floor(math.log10(passo))), 0)
+    volume = round(volume, casas)
+    return volume if volume >= float(espec.get("minVolume") or passo) else 0.0
+
+
+class EstrategiaCruzamentoForex:
+    def __init__(self, cliente, par: str, periodo: str, rapida: int = 7, lenta: int = 40, tipo: str = "SMA",
+                 alavancagem: float = 10, pct_saldo: float = 0.10):
+        self.cliente = cliente
+        self.par = par
+        self.periodo = periodo
+        self.alavancagem = alavancagem
+        self.pct_saldo = pct_saldo
+        self.cruzamento = CruzamentoMedias(rapida, lenta, tipo)
+        self.nome = f"{par}:{periodo}:{tipo.upper()}{rapida}x{lenta}"
+        self.logger = logging.getLogger(f"estrategia.{self.nome}")
+        self.metricas = obter_metricas()
+        self.enviadas = set()           # clientIds já enviados neste processo
+
+    # ---------- Consultas (estado sincronizado) ----------
+    def calcular_volume(self) -> float:
+        espec = self.cliente.especificacao(self.par)
+        saldo = self.cliente.saldo()
+        if saldo <= 0:
+            self.logger.warning("[Volume] Saldo insuficiente.")
+            return 0.0
+        nocional_lote = self.cliente.preco(self.par, "BUY") * float(espec.get("contractSize") or 100_000)
+        return arredondar_volume(saldo * self.pct_saldo * self.alavancagem / nocional_lote, espec)
+
+    def _ja_enviada(self, ident: str) -> bool:
+        return ident in self.enviadas or any(p.get("clientId") == ident for p in self.cliente.posicoes(self.par))
+
+    # ---------- Ciclo ----------
+    def decidir(self, cache):
+        """Sinal da última vela fechada e a ação correspondente: ('BUY', volume), ('CLOSE', posições) ou None."""
+        m = self.metricas
+        with m.span("sinal", par=self.par, periodo=self.periodo):
+            sinal = self.cruzamento.sincronizar(cache.fechadas)
+        r_prev, l_prev = self.cruzamento.valores()
+        self.logger.info("[MM] Rápida=%.6f | Lenta=%.6f (base: vela fechada)", r_prev, l_prev)
+        with m.span("posicao", par=self.par, periodo=self.periodo):
+            tamanho_pos = self.cliente.posicao(self.par)
+        acao = None
+        t_vela = int(cache.fechadas["t_open"][-1])
+        with m.span("dimensionamento", par=self.par, periodo=self.periodo):
+            if sinal == "COMPRA" and tamanho_pos == 0:
+                volume = self.calcular_volume()
+                if volume > 0:
+                    acao = ("BUY", volume, id_cliente(self.par, t_vela, "BUY"))
+            elif sinal == "VENDA" and tamanho_pos > 0:
+                acao = ("CLOSE", [p for p in self.cliente.posicoes(self.par) if p["type"] == "POSITION_TYPE_BUY"],
+                        id_cliente(self.par, t_vela, "SELL"))
+        if acao is None:
+            self.logger.info("[Manter] sinal=%s | pos=%s", sinal, tamanho_pos)
+        elif acao[0] == "BUY":
+            self.logger.info("[Entrada] LONG volume=%s", acao[1])
+        else:
+            self.logger.info("[Saída] Fechando LONG volume=%s", tamanho_pos)
+        return sinal, acao
+
+    async def executar(self, acao):
+        tipo, alvo, ident = acao
+        if self._ja_enviada(ident):
+            self.logger.warning(f"[Ordem] {ident} já enviada; ignorada")
+            return None
+        self.enviadas.add(ident)
+        with self.metricas.medir("robo_ordem_envio_segundos", par=self.par):
+            if tipo == "BUY":
+                resposta = await self.cliente.comprar(self.par, alvo, ident)
+            else:
+                resposta = None
+                for posicao in alvo:
+                    resposta = await self.cliente.fechar_posicao(posicao["id"], ident)
+        self.logger.info(f"[Ordem] {ident} {tipo} {self.par}: {resposta}")
+        return resposta
+
+    async def avaliar(self, cache) -> str:
+        """Decide com base na última vela fechada do cache e envia a ordem, se houver."""
+        sinal, acao = self.decidir(cache)
+        if acao is not None:
+            with self.metricas.span("envio", par=self.par, periodo=self.periodo):
+                await self.executar(acao)
+        return sinal
@@ -0,0 +1,5 @@
+from .moving_average import CruzamentoMedias, MediaMovelExponencial, MediaMovelSimples, MediaWilder
+from .technical import (
+    ATR, RSI, VWAP, Bollinger, DesvioRetornos, Media, Painel,
+    atr, bollinger, desvio_retornos, ema, rsi, sma, vwap,
+)
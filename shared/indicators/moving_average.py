@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""Médias móveis incrementais (O(1) por vela) e o sinal de cruzamento rápida x lenta.
+
+Substitui o ``rolling(...).mean()`` refeito sobre a série inteira a cada
+ciclo: o estado é aquecido uma única vez a partir do histórico (vetorizado)
+e depois atualizado apenas com cada vela recém-fechada. ``estado()`` e
+``restaurar()`` serializam esse estado (tipos JSON) para o checkpoint do robô.
+"""
+import math
+
+import numpy as np
+
+# Recalcula a soma a partir do buffer de tempos em tempos para não acumular erro de ponto flutuante
+RESSINCRONIZAR_A_CADA = 10_000
+
+
+class MediaMovelSimples:
+    """SMA com buffer circular e soma corrente."""
+
+    def __init__(self, periodo: int):
+        if periodo < 1:
+            raise ValueError("periodo deve ser >= 1")
+        self.periodo = periodo
+        self.buffer = np.zeros(periodo, dtype=np.float64)
+        self.pos = 0
+        self.n = 0
+        self.soma = 0.0
+        self._desde_ressinc = 0
+
+    @property
+    def pronta(self) -> bool:
+        return self.n >= self.periodo
+
+    @property
+    def valor(self) -> float:
+        return self.soma / self.periodo if self.pronta else math.nan
+
+    def aquecer(self, serie: np.ndarray) -> float:
+        """Reinicia o estado a partir do histórico em uma passada vetorizada."""
+        serie = np.asarray(serie, dtype=np.float64)
+        self.n = len(serie)
+        cauda = serie[-self.periodo:]
+        self.buffer[:] = 0.0
+        self.buffer[:len(cauda)] = cauda
+        self.pos = len(cauda) % self.periodo
+        self.soma = float(cauda.sum())
+        self._desde_ressinc = 0
+        return self.valor
+
+    def atualizar(self, x: float) -> float:
+        x = float(x)
+        self.soma += x - self.buffer[self.pos]
+        self.buffer[self.pos] = x
+        self.pos = (self.pos + 1) % self.periodo
+        self.n += 1
+        self._desde_ressinc += 1
+        if self._desde_ressinc >= RESSINCRONIZAR_A_CADA:
+            self.soma = float(self.buffer.sum())
+            self._desde_ressinc = 0
+        return self.valor
+
+    def espiar(self, x: float) -> float:
+        """Valor que a média teria com ``x`` como próxima vela, sem alterar o estado."""
+        if self.n + 1 < self.periodo:
+            return math.nan
+        return (self.soma + float(x) - self.buffer[self.pos]) / self.periodo
+
+    def estado(self) -> dict:
+        return {"periodo": self.periodo, "buffer": self.buffer.tolist(), "pos": self.pos, "n": self.n}
+
+    def restaurar(self, estado: dict):
+        if estado["periodo"] != self.periodo:
+            raise ValueError(f"estado de SMA {estado['periodo']} para SMA {self.periodo}")
+        self.buffer[:] = estado["buffer"]
+        self.pos = estado["pos"]
+        self.n = estado["n"]
+        self.soma = float(self.buffer.sum())
+        self._desde_ressinc = 0
+
+
+class MediaMovelExponencial:
+    """EMA com alfa = 2 / (periodo + 1), semeada pela SMA dos primeiros ``periodo`` valores."""
+
+    def __init__(self, periodo: int):
+        if periodo < 1:
+            raise ValueError("periodo deve ser >= 1")
+        self.periodo = periodo
+        self.alfa = 2.0 / (periodo + 1)
+        self.n = 0
+        self.soma_semente = 0.0
+        self.ema = math.nan
+
+    @property
+    def pronta(self) -> bool:
+        return self.n >= self.periodo
+
+    @property
+    def valor(self) -> float:
+        return self.ema if self.pronta else math.nan
+
+    def aquecer(self, serie: np.ndarray) -> float:
+        """Reinicia o estado a partir do histórico: a recursão é resolvida como um produto escalar."""
+        serie = np.asarray(serie, dtype=np.float64)
+        self.n = len(serie)
+        self.ema = math.nan
+        if self.n < self.periodo:
+            self.soma_semente = float(serie.sum())
+            return self.valor
+        semente = serie[:self.periodo].mean()
+        resto = serie[self.periodo:]
+        k = len(resto)
+        # ema_k = (1-a)^k * semente + sum_i a * (1-a)^(k-1-i) * x_i
+        pesos = self.alfa * (1.0 - self.alfa) ** np.arange(k - 1, -1, -1, dtype=np.float64)
+        self.ema = float((1.0 - self.alfa) ** k * semente + pesos @ resto)
+        return self.valor
+
+    def atualizar(self, x: float) -> float:
+        x = float(x)
+        self.n += 1
+        if self.n < self.periodo:
+            self.soma_semente += x
+        elif self.n == self.periodo:
+            self.ema = (self.soma_semente + x) / self.periodo
+        else:
+            self.ema += self.alfa * (x - self.ema)
+        return self.valor
+
+    def espiar(self, x: float) -> float:
+        """Valor que a média teria com ``x`` como próxima vela, sem alterar o estado."""
+        if self.n + 1 < self.periodo:
+            return math.nan
+        if self.n + 1 == self.periodo:
+            return (self.soma_semente + float(x)) / self.periodo
+        return self.ema + self.alfa * (float(x) - self.ema)
+
+    def estado(self) -> dict:
+        return {"periodo": self.periodo, "n": self.n, "soma_semente": self.soma_semente,
+                "ema": None if math.isnan(self.ema) else self.ema}
+
+    def restaurar(self, estado: dict):
+        if estado["periodo"] != self.periodo:
+            raise ValueError(f"estado de EMA {estado['periodo']} para EMA {self.periodo}")
+        self.n = estado["n"]
+        self.soma_semente = estado["soma_semente"]
+        self.ema = math.nan if estado["ema"] is None else estado["ema"]
+
+
+class MediaWilder(MediaMovelExponencial):
+    """Suavização de Wilder (RMA): EMA com alfa = 1 / periodo, base do ATR e do RSI."""
+
+    def __init__(self, periodo: int):
+        super().__init__(periodo)
+        self.alfa = 1.0 / periodo
+
+
+MEDIAS = {"SMA": MediaMovelSimples, "EMA": MediaMovelExponencial}
+
+
+def decidir(rapida: float, lenta: float) -> str:
+    """Mesma regra de ``sinal_media_movel``: 'COMPRA', 'VENDA' ou 'MANTER'."""
+    if math.isnan(rapida) or math.isnan(lenta):
+        return "MANTER"
+    if rapida > lenta:
+        return "COMPRA"
+    if rapida < lenta:
+        return "VENDA"
+    return "MANTER"
+
+
+class CruzamentoMedias:
+    """Estado do cruzamento rápida x lenta alimentado apenas com velas fechadas.
+
+    O sinal corresponde ao da vela fechada mais recente, ou seja, à
+    "penúltima vela" do DataFrame que ``sinal_media_movel`` recebe.
+    """
+
+    def __init__(self, rapida: int = 7, lenta: int = 40, tipo: str = "SMA"):
+        self.tipo = tipo.upper()
+        self.rapida = MEDIAS[self.tipo](rapida)
+        self.lenta = MEDIAS[self.tipo](lenta)
+        # sinal_media_movel exige max(rapida, lenta) + 2 linhas, a última sendo a vela em formação
+        self.minimo = max(rapida, lenta) + 1
+        self.n = 0
+        self.ultimo_t_open = None
+
+    def reiniciar(self):
+        """Descarta o estado (mesmos períodos e tipo); o próximo ``sincronizar`` reaquece do histórico."""
+        self.rapida = MEDIAS[self.tipo](self.rapida.periodo)
+        self.lenta = MEDIAS[self.tipo](self.lenta.periodo)
+        self.n = 0
+        self.ultimo_t_open = None
+
+    @property
+    def aquecido(self) -> bool:
+        return self.n >= self.minimo
+
+    def aquecer(self, fechamentos: np.ndarray, ultimo_t_open: int = None) -> str:
+        self.rapida.aquecer(fechamentos)
+        self.lenta.aquecer(fechamentos)
+        self.n = len(fechamentos)
+        self.ultimo_t_open = ultimo_t_open
+        return self.sinal()
+
+    def atualizar(self, fechamento: float, t_open: int = None) -> str:
+        self.rapida.atualizar(fechamento)
+        self.lenta.atualizar(fechamento)
+        self.n += 1
+        self.ultimo_t_open = t_open
+        return self.sinal()
+
+    def sincronizar(self, velas: np.ndarray) -> str:
+        """Alimenta com as velas fechadas (array com ``t_open``/``close``) ainda não vistas.
+
+        Se a última vela processada não estiver mais em ``velas`` (cache
+        recarregado após parada longa), o estado é reaquecido do zero.
+        """
+        if not len(velas):
+            return self.sinal()
+        tempos = velas["t_open"]
+        idx = int(np.searchsorted(tempos, self.ultimo_t_open)) if self.ultimo_t_open is not None else -1
+        if idx < 0 or idx >= len(tempos) or tempos[idx] != self.ultimo_t_open:
+            return self.aquecer(velas["close"], int(tempos[-1]))
+        for vela in velas[idx + 1:]:
+            self.atualizar(vela["close"], int(vela["t_open"]))
+        return self.sinal()
+
+    def valores(self) -> tuple:
+        return self.rapida.valor, self.lenta.valor
+
+    def sinal(self) -> str:
+        if not self.aquecido:
+            return "MANTER"
+        return decidir(*self.valores())
+
+    def espiar(self, fechamento: float) -> tuple:
+        """Médias (rápida, lenta) incluindo uma vela ainda em formação, sem alterar o estado."""
+        return self.rapida.espiar(fechamento), self.lenta.espiar(fechamento)
+
+    def estado(self) -> dict:
+        return {"tipo": self.tipo, "rapida": self.rapida.estado(), "lenta": self.lenta.estado(),
+                "n": self.n, "ultimo_t_open": self.ultimo_t_open}
+
+    def restaurar(self, estado: dict):
+        """Retoma de ``estado()``; ``sincronizar`` continua da vela ``ultimo_t_open`` sem reaquecer."""
+        if estado["tipo"] != self.tipo:
+            raise ValueError(f"estado de {estado['tipo']} para {self.tipo}")
+        self.rapida.restaurar(estado["rapida"])
+        self.lenta.restaurar(estado["lenta"])
+        self.n = estado["n"]
+        self.ultimo_t_open = estado["ultimo_t_open"]
@@ -0,0 +1,481 @@
+# -*- coding: utf-8 -*-
+"""Indicadores técnicos sobre vetores float64 contíguos do cache de velas.
+
+Cada indicador tem dois modos com o mesmo resultado:
+
+* lote (backtest): ``sma``, ``ema``, ``atr``, ``desvio_retornos``, ``rsi``,
+  ``bollinger`` e ``vwap`` recebem vetores e devolvem um vetor do mesmo
+  tamanho (NaN enquanto a janela não enche), sem DataFrame intermediário;
+* incremental (ao vivo): ``Media``, ``ATR``, ``DesvioRetornos``, ``RSI``,
+  ``Bollinger`` e ``VWAP`` são aquecidos uma vez com o histórico e depois
+  atualizados vela a vela em O(periodo) ou O(1).
+
+``Painel`` agrupa vários indicadores sobre o mesmo bloco de velas
+(``DTYPE_KLINE``): as colunas e os derivados comuns (retornos, variação,
+true range) são extraídos uma única vez e compartilhados::
+
+    painel = Painel(sma7=Media(7), atr14=ATR(14), vol20=DesvioRetornos(20), bb20=Bollinger(20))
+    series = painel.calcular(velas)             # backtest: {nome: vetor}
+    painel.aquecer(cache.fechadas)              # ao vivo
+    valores = painel.atualizar(vela)            # {nome: último valor}
+
+Convenções: médias exponenciais (EMA e Wilder) são semeadas pela média
+simples dos primeiros ``periodo`` valores; ``desvio_retornos`` usa ddof=1
+(``pct_change().rolling(n).std()``) e ``Bollinger`` o desvio populacional.
+"""
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .moving_average import MEDIAS, MediaMovelSimples, MediaWilder
+
+# Tamanho do bloco da recursão exponencial vetorizada: (1 - alfa)^-BLOCO cabe em float64 para alfa <= 2/3
+BLOCO_EXPONENCIAL = 64
+
+
+def _vetor(x) -> np.ndarray:
+    return np.ascontiguousarray(x, dtype=np.float64)
+
+
+def _vazio(forma) -> np.ndarray:
+    return np.full(forma, np.nan)
+
+
+def _com_nan_inicial(x: np.ndarray) -> np.ndarray:
+    """Prefixa um NaN no eixo do tempo (séries derivadas de diferenças têm um valor a menos)."""
+    return np.concatenate([_vazio(x.shape[:-1] + (1,)), x], axis=-1)
+
+
+# ---------- Núcleos vetorizados ----------
+# O tempo é sempre o último eixo: um vetor (uma série) ou uma matriz símbolos x velas.
+def _suavizar(x: np.ndarray, alfa: float, inicial) -> np.ndarray:
+    """y_k = (1 - alfa) * y_{k-1} + alfa * x_k a partir de ``inicial``, sem laço por elemento.
+
+    A série é dobrada em blocos de ``BLOCO_EXPONENCIAL``; dentro de cada um,
+    y_k = b^(k+1) * y_-1 + alfa * b^k * sum_{i<=k} x_i * b^-i (b = 1 - alfa),
+    e só o valor herdado de um bloco para o seguinte é propagado em Python.
+    """
+    beta = 1.0 - alfa
+    n = x.shape[-1]
+    if beta == 0.0 or not n:
+        return x.copy()
+    lote = x.shape[:-1]
+    blocos = -(-n // BLOCO_EXPONENCIAL)
+    matriz = np.zeros(lote + (blocos * BLOCO_EXPONENCIAL,))
+    matriz[..., :n] = x
+    matriz = matriz.reshape(lote + (blocos, BLOCO_EXPONENCIAL))
+    k = np.arange(BLOCO_EXPONENCIAL, dtype=np.float64)
+    parcial = alfa * beta ** k * np.cumsum(matriz * beta ** -k, axis=-1)    # cada bloco partindo de zero
+    finais = parcial[..., -1]
+    herdado = np.empty(lote + (blocos,))
+    fator = beta ** BLOCO_EXPONENCIAL
+    if lote:
+        anterior = inicial
+        for j in range(blocos):
+            herdado[..., j] = anterior
+            anterior = fator * anterior + finais[..., j]
+    else:
+        anterior = float(inicial)
+        for j, fim in enumerate(finais.tolist()):
+            herdado[j] = anterior
+            anterior = fator * anterior + fim
+    saida = parcial + herdado[..., None] * beta ** (k + 1)
+    return saida.reshape(lote + (-1,))[..., :n]
+
+
+def _exponencial(x: np.ndarray, periodo: int, alfa: float) -> np.ndarray:
+    """Média exponencial semeada pela SMA dos primeiros ``periodo`` valores (definida a partir de periodo-1)."""
+    saida = _vazio(x.shape)
+    if periodo <= x.shape[-1]:
+        semente = x[..., :periodo].mean(axis=-1)
+        saida[..., periodo - 1] = semente
+        saida[..., periodo:] = _suavizar(x[..., periodo:], alfa, semente)
+    return saida
+
+
+def _soma_movel(x: np.ndarray, periodo: int) -> np.ndarray:
+    saida = _vazio(x.shape)
+    if periodo <= x.shape[-1]:
+        acumulado = np.cumsum(x, axis=-1)
+        saida[..., periodo - 1] = acumulado[..., periodo - 1]
+        saida[..., periodo:] = acumulado[..., periodo:] - acumulado[..., :-periodo]
+    return saida
+
+
+def _rsi(media_ganhos, media_perdas):
+    """RSI a partir das médias de Wilder; sem perdas vale 100 (ou 50 se também não houve ganhos)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 - 100.0 / (1.0 + np.divide(media_ganhos, media_perdas))
+    return np.where(media_perdas == 0, np.where(media_ganhos > 0, 100.0, 50.0), rsi)
+
+
+def _true_range(maxima: np.ndarray, minima: np.ndarray, fechamento: np.ndarray) -> np.ndarray:
+    """Primeira vela: máxima - mínima (não há fechamento anterior)."""
+    tr = maxima - minima
+    if tr.shape[-1] > 1:
+        anterior = fechamento[..., :-1]
+        tr[..., 1:] = np.maximum(tr[..., 1:], np.maximum(np.abs(maxima[..., 1:] - anterior),
+                                                         np.abs(minima[..., 1:] - anterior)))
+    return tr
+
+
+def _media_desvio_movel(x: np.ndarray, periodo: int, ddof: int) -> tuple:
+    """Média (soma acumulada) e desvio em duas passadas sobre a janela deslizante, sem cópia das janelas."""
+    media = _soma_movel(x, periodo) / periodo
+    desvio = _vazio(x.shape)
+    if periodo <= x.shape[-1]:
+        desvios = sliding_window_view(x, periodo, axis=-1) - media[..., periodo - 1:, None]
+        desvio[..., periodo - 1:] = np.sqrt(np.einsum("...ij,...ij->...i", desvios, desvios) / (periodo - ddof))
+    return media, desvio
+
+
+def _retornos(fechamento: np.ndarray) -> np.ndarray:
+    return fechamento[..., 1:] / fechamento[..., :-1] - 1.0
+
+
+# ---------- Modo lote ----------
+# Aceitam um vetor ou uma matriz (uma série por linha) e devolvem a mesma forma.
+def sma(x, periodo: int) -> np.ndarray:
+    return _soma_movel(_vetor(x), periodo) / periodo
+
+
+def ema(x, periodo: int) -> np.ndarray:
+    return _exponencial(_vetor(x), periodo, 2.0 / (periodo + 1))
+
+
+def atr(maxima, minima, fechamento, periodo: int = 14) -> np.ndarray:
+    tr = _true_range(_vetor(maxima), _vetor(minima), _vetor(fechamento))
+    return _exponencial(tr, periodo, 1.0 / periodo)
+
+
+def _desvio_de_retornos(retornos: np.ndarray, periodo: int) -> np.ndarray:
+    return _com_nan_inicial(_media_desvio_movel(retornos, periodo, ddof=1)[1])
+
+
+def desvio_retornos(fechamento, periodo: int = 20) -> np.ndarray:
+    """Desvio-padrão (ddof=1) dos últimos ``periodo`` retornos simples; definido a partir do índice ``periodo``."""
+    fechamento = _vetor(fechamento)
+    if not fechamento.shape[-1]:
+        return _vazio(fechamento.shape)
+    return _desvio_de_retornos(_retornos(fechamento), periodo)
+
+
+def _rsi_de_variacao(variacao: np.ndarray, periodo: int) -> np.ndarray:
+    ganhos = _exponencial(np.maximum(variacao, 0.0), periodo, 1.0 / periodo)
+    perdas = _exponencial(np.maximum(-variacao, 0.0), periodo, 1.0 / periodo)
+    return _com_nan_inicial(_rsi(ganhos, perdas))
+
+
+def rsi(fechamento, periodo: int = 14) -> np.ndarray:
+    """RSI de Wilder; definido a partir do índice ``periodo``."""
+    fechamento = _vetor(fechamento)
+    if not fechamento.shape[-1]:
+        return _vazio(fechamento.shape)
+    return _rsi_de_variacao(np.diff(fechamento, axis=-1), periodo)
+
+
+def bollinger(fechamento, periodo: int = 20, desvios: float = 2.0) -> tuple:
+    """(inferior, meio, superior) com a SMA e o desvio populacional da janela."""
+    meio, desvio = _media_desvio_movel(_vetor(fechamento), periodo, ddof=0)
+    return meio - desvios * desvio, meio, meio + desvios * desvio
+
+
+def vwap(volume_cotado, volume, periodo: int = 20) -> np.ndarray:
+    """VWAP móvel exato: soma de ``quote_vol`` / soma de ``volume`` na janela (NaN sem volume)."""
+    cotado = _soma_movel(_vetor(volume_cotado), periodo)
+    base = _soma_movel(_vetor(volume), periodo)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(base > 0, cotado / base, np.nan)
+
+
+class Colunas:
+    """Colunas float64 de um bloco de velas e derivados comuns, cada um extraído uma única vez."""
+
+    DERIVADOS = ("retornos", "variacao", "tr")
+
+    def __init__(self, velas: np.ndarray):
+        self.velas = velas
+        self._memo = {}
+
+    def __len__(self) -> int:
+        return len(self.velas)
+
+    def __getitem__(self, nome: str) -> np.ndarray:
+        coluna = self._memo.get(nome)
+        if coluna is None:
+            if nome in self.DERIVADOS:
+                coluna = getattr(self, "_" + nome)()
+            else:
+                coluna = _vetor(self.velas[nome])
+            self._memo[nome] = coluna
+        return coluna
+
+    def _retornos(self) -> np.ndarray:
+        return _retornos(self["close"])
+
+    def _variacao(self) -> np.ndarray:
+        return np.diff(self["close"])
+
+    def _tr(self) -> np.ndarray:
+        return _true_range(self["high"], self["low"], self["close"])
+
+
+def _colunas(velas) -> Colunas:
+    return velas if isinstance(velas, Colunas) else Colunas(velas)
+
+
+# ---------- Modo incremental ----------
+class Indicador:
+    """Contrato: ``lote(velas)`` dá a série inteira; ``aquecer(velas)`` + ``atualizar(vela)`` dão o último valor.
+
+    Depois de ``aquecer(velas[:k])`` e ``atualizar`` com ``velas[k:]``, ``valor``
+    coincide com ``lote(velas)[-1]`` (a menos de arredondamento).
+    """
+
+    def lote(self, velas):
+        raise NotImplementedError
+
+    def aquecer(self, velas):
+        raise NotImplementedError
+
+    def atualizar(self, vela):
+        raise NotImplementedError
+
+    @property
+    def valor(self):
+        raise NotImplementedError
+
+
+class Media(Indicador):
+    """SMA ou EMA de uma coluna (padrão: ``close``) sobre as médias incrementais do cruzamento."""
+
+    def __init__(self, periodo: int, tipo: str = "SMA", campo: str = "close"):
+        self.tipo = tipo.upper()
+        self.campo = campo
+        self.media = MEDIAS[self.tipo](periodo)
+
+    def lote(self, velas) -> np.ndarray:
+        serie = _colunas(velas)[self.campo]
+        return sma(serie, self.media.periodo) if self.tipo == "SMA" else ema(serie, self.media.periodo)
+
+    def aquecer(self, velas) -> float:
+        return self.media.aquecer(_colunas(velas)[self.campo])
+
+    def atualizar(self, vela) -> float:
+        return self.media.atualizar(vela[self.campo])
+
+    @property
+    def valor(self) -> float:
+        return self.media.valor
+
+
+class _JanelaCircular:
+    """Últimos ``periodo`` valores em ordem cronológica via buffer circular."""
+
+    def __init__(self, periodo: int):
+        self.periodo = periodo
+        self.buffer = np.zeros(periodo, dtype=np.float64)
+        self.pos = 0
+        self.n = 0
+
+    @property
+    def cheia(self) -> bool:
+        return self.n >= self.periodo
+
+    def aquecer(self, serie: np.ndarray):
+        cauda = serie[-self.periodo:]
+        self.buffer[:] = 0.0
+        self.buffer[:len(cauda)] = cauda
+        self.pos = len(cauda) % self.periodo
+        self.n = len(serie)
+
+    def adicionar(self, x: float):
+        self.buffer[self.pos] = x
+        self.pos = (self.pos + 1) % self.periodo
+        self.n += 1
+
+    def valores(self) -> np.ndarray:
+        return np.concatenate([self.buffer[self.pos:], self.buffer[:self.pos]])
+
+
+class DesvioRetornos(Indicador):
+    """Desvio-padrão (ddof=1) dos últimos ``periodo`` retornos de fechamento."""
+
+    def __init__(self, periodo: int = 20):
+        if periodo < 2:
+            raise ValueError("periodo deve ser >= 2")
+        self.periodo = periodo
+        self.retornos = _JanelaCircular(periodo)
+        self.ultimo = math.nan
+
+    def lote(self, velas) -> np.ndarray:
+        colunas = _colunas(velas)
+        if not len(colunas):
+            return _vazio(0)
+        return _desvio_de_retornos(colunas["retornos"], self.periodo)
+
+    def aquecer(self, velas) -> float:
+        colunas = _colunas(velas)
+        self.retornos.aquecer(colunas["retornos"])
+        self.ultimo = float(colunas["close"][-1]) if len(colunas) else math.nan
+        return self.valor
+
+    def atualizar(self, vela) -> float:
+        fechamento = float(vela["close"])
+        if not math.isnan(self.ultimo):
+            self.retornos.adicionar(fechamento / self.ultimo - 1.0)
+        self.ultimo = fechamento
+        return self.valor
+
+    @property
+    def valor(self) -> float:
+        return float(np.std(self.retornos.valores(), ddof=1)) if self.retornos.cheia else math.nan
+
+
+class Bollinger(Indicador):
+    """Bandas de Bollinger: (inferior, meio, superior)."""
+
+    def __init__(self, periodo: int = 20, desvios: float = 2.0):
+        self.periodo = periodo
+        self.desvios = desvios
+        self.fechamentos = _JanelaCircular(periodo)
+
+    def lote(self, velas) -> tuple:
+        return bollinger(_colunas(velas)["close"], self.periodo, self.desvios)
+
+    def aquecer(self, velas) -> tuple:
+        self.fechamentos.aquecer(_colunas(velas)["close"])
+        return self.valor
+
+    def atualizar(self, vela) -> tuple:
+        self.fechamentos.adicionar(float(vela["close"]))
+        return self.valor
+
+    @property
+    def valor(self) -> tuple:
+        if not self.fechamentos.cheia:
+            return math.nan, math.nan, math.nan
+        janela = self.fechamentos.valores()
+        meio = float(janela.mean())
+        faixa = self.desvios * float(janela.std())
+        return meio - faixa, meio, meio + faixa
+
+
+class ATR(Indicador):
+    """Average True Range com suavização de Wilder."""
+
+    def __init__(self, periodo: int = 14):
+        self.periodo = periodo
+        self.media = MediaWilder(periodo)
+        self.ultimo = math.nan
+
+    def lote(self, velas) -> np.ndarray:
+        return _exponencial(_colunas(velas)["tr"], self.periodo, 1.0 / self.periodo)
+
+    def aquecer(self, velas) -> float:
+        colunas = _colunas(velas)
+        self.media.aquecer(colunas["tr"])
+        self.ultimo = float(colunas["close"][-1]) if len(colunas) else math.nan
+        return self.valor
+
+    def atualizar(self, vela) -> float:
+        maxima, minima, fechamento = float(vela["high"]), float(vela["low"]), float(vela["close"])
+        tr = maxima - minima
+        if not math.isnan(self.ultimo):
+            tr = max(tr, abs(maxima - self.ultimo), abs(minima - self.ultimo))
+        self.ultimo = fechamento
+        return self.media.atualizar(tr)
+
+    @property
+    def valor(self) -> float:
+        return self.media.valor
+
+
+class RSI(Indicador):
+    """Índice de força relativa de Wilder."""
+
+    def __init__(self, periodo: int = 14):
+        self.periodo = periodo
+        self.ganhos = MediaWilder(periodo)
+        self.perdas = MediaWilder(periodo)
+        self.ultimo = math.nan
+
+    def lote(self, velas) -> np.ndarray:
+        colunas = _colunas(velas)
+        if not len(colunas):
+            return _vazio(0)
+        return _rsi_de_variacao(colunas["variacao"], self.periodo)
+
+    def aquecer(self, velas) -> float:
+        colunas = _colunas(velas)
+        variacao = colunas["variacao"]
+        self.ganhos.aquecer(np.maximum(variacao, 0.0))
+        self.perdas.aquecer(np.maximum(-variacao, 0.0))
+        self.ultimo = float(colunas["close"][-1]) if len(colunas) else math.nan
+        return self.valor
+
+    def atualizar(self, vela) -> float:
+        fechamento = float(vela["close"])
+        if not math.isnan(self.ultimo):
+            variacao = fechamento - self.ultimo
+            self.ganhos.atualizar(max(variacao, 0.0))
+            self.perdas.atualizar(max(-variacao, 0.0))
+        self.ultimo = fechamento
+        return self.valor
+
+    @property
+    def valor(self) -> float:
+        return float(_rsi(self.ganhos.valor, self.perdas.valor))
+
+
+class VWAP(Indicador):
+    """VWAP móvel das últimas ``periodo`` velas a partir de ``quote_vol`` e ``volume``."""
+
+    def __init__(self, periodo: int = 20):
+        self.periodo = periodo
+        self.cotado = MediaMovelSimples(periodo)
+        self.volume = MediaMovelSimples(periodo)
+
+    def lote(self, velas) -> np.ndarray:
+        colunas = _colunas(velas)
+        return vwap(colunas["quote_vol"], colunas["volume"], self.periodo)
+
+    def aquecer(self, velas) -> float:
+        colunas = _colunas(velas)
+        self.cotado.aquecer(colunas["quote_vol"])
+        self.volume.aquecer(colunas["volume"])
+        return self.valor
+
+    def atualizar(self, vela) -> float:
+        self.cotado.atualizar(vela["quote_vol"])
+        self.volume.atualizar(vela["volume"])
+        return self.valor
+
+    @property
+    def valor(self) -> float:
+        volume = self.volume.valor
+        return self.cotado.valor / volume if volume > 0 else math.nan
+
+
+class Painel:
+    """Vários indicadores nomeados sobre as mesmas velas, com colunas e derivados compartilhados."""
+
+    def __init__(self, **indicadores: Indicador):
+        self.indicadores = indicadores
+
+    def calcular(self, velas: np.ndarray) -> dict:
+        """Modo lote: ``{nome: série}`` (Bollinger: tupla de três séries)."""
+        colunas = Colunas(velas)
+        return {nome: ind.lote(colunas) for nome, ind in self.indicadores.items()}
+
+    def aquecer(self, velas: np.ndarray) -> dict:
+        colunas = Colunas(velas)
+        return {nome: ind.aquecer(colunas) for nome, ind in self.indicadores.items()}
+
+    def atualizar(self, vela) -> dict:
+        """Uma vela recém-fechada (registro de ``DTYPE_KLINE``) para todos os indicadores."""
+        return {nome: ind.atualizar(vela) for nome, ind in self.indicadores.items()}
+
+    def valores(self) -> dict:
+        return {nome: ind.valor for nome, ind in self.indicadores.items()}
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Arquivo local de velas em formato colunar, somente-anexação, lido via memmap.
+
+Layout: ``<raiz>/<mercado>/<SIMBOLO>/<intervalo>/<coluna>.bin``, um arquivo
+binário de largura fixa por campo de ``DTYPE_KLINE`` (int64/float64
+little-endian, sem cabeçalho). Cada coluna é mapeada direto em um array
+NumPy sem cópia, então backtests e reinícios do robô carregam anos de
+histórico sem rede e sem parse.
+
+Importação em lote dos dumps mensais da Binance
+(``data.binance.vision``, ``<SIMBOLO>-<intervalo>-AAAA-MM.zip``)::
+
+    python -m shared.utils.candle_archive --simbolo SOLUSDT --intervalo 1h dumps/*.zip
+"""
+import io
+import os
+import glob
+import zipfile
+import logging
+import argparse
+import threading
+
+import numpy as np
+
+from config.settings import Config
+from shared.utils.data_fetcher import DTYPE_KLINE
+from shared.utils.logger import configurar_logs
+
+logger = logging.getLogger("candle_archive")
+
+CAMPOS = DTYPE_KLINE.names
+
+
+class ArquivoVelas:
+    """Colunas de velas de um mercado/símbolo/intervalo, ordenadas por ``t_open``."""
+
+    def __init__(self, raiz: str, simbolo: str, intervalo: str, mercado: str = "futures"):
+        self.simbolo = simbolo
+        self.intervalo = intervalo
+        self.diretorio = os.path.join(raiz, mercado, simbolo, intervalo)
+        self._lock = threading.Lock()
+        self._mapas = {}
+        self._n = self._reparar()
+
+    def _caminho(self, campo: str) -> str:
+        return os.path.join(self.diretorio, f"{campo}.bin")
+
+    def _reparar(self) -> int:
+        """Trunca todas as colunas no menor comprimento (anexação interrompida no meio).
+
+        Um valor gravado pela metade no fim de uma coluna também é cortado: a
+        próxima anexação sempre começa alinhada.
+        """
+        bytes_ = {}
+        for campo in CAMPOS:
+            caminho = self._caminho(campo)
+            bytes_[campo] = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+        n = min(b // DTYPE_KLINE[c].itemsize for c, b in bytes_.items())
+        if any(b != n * DTYPE_KLINE[c].itemsize for c, b in bytes_.items()):
+            logger.warning(f"[Arquivo] {self.simbolo} {self.intervalo}: colunas desalinhadas, truncando em {n} velas")
+            for campo in CAMPOS:
+                caminho = self._caminho(campo)
+                if os.path.exists(caminho):
+                    with open(caminho, "r+b") as f:
+                        f.truncate(n * DTYPE_KLINE[campo].itemsize)
+        return n
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def ultimo_t_open(self):
+        return int(self.coluna("t_open")[-1]) if self._n else None
+
+    # ---------- Leitura (zero-copy) ----------
+    def coluna(self, campo: str) -> np.ndarray:
+        """Coluna inteira mapeada em memória (somente leitura)."""
+        with self._lock:
+            mapa = self._mapas.get(campo)
+            if mapa is None or len(mapa) != self._n:
+                if not self._n:
+                    return np.empty(0, dtype=DTYPE_KLINE[campo])
+                mapa = np.memmap(self._caminho(campo), dtype=DTYPE_KLINE[campo], mode="r", shape=(self._n,))
+                self._mapas[campo] = mapa
+            return mapa
+
+    def colunas(self, *campos) -> dict:
+        return {c: self.coluna(c) for c in (campos or CAMPOS)}
+
+    def ultimas(self, n: int = None) -> np.ndarray:
+        """Cópia estruturada (``DTYPE_KLINE``) das últimas ``n`` velas, ou de todas."""
+        inicio = 0 if n is None else max(self._n - n, 0)
+        arr = np.empty(self._n - inicio, dtype=DTYPE_KLINE)
+        for campo in CAMPOS:
+            arr[campo] = self.coluna(campo)[inicio:]
+        return arr
+
+    # ---------- Escrita ----------
+    def anexar(self, velas: np.ndarray) -> int:
+        """Anexa as velas (ordenadas) mais novas que a última gravada; retorna quantas entraram."""
+        if not len(velas):
+            return 0
+        ultimo = self.ultimo_t_open
+        if ultimo is not None:
+            velas = velas[velas["t_open"] > ultimo]
+        if not len(velas):
+            return 0
+        with self._lock:
+            os.makedirs(self.diretorio, exist_ok=True)
+            for campo in CAMPOS:
+                with open(self._caminho(campo), "ab") as f:
+                    f.write(np.ascontiguousarray(velas[campo], dtype=DTYPE_KLINE[campo]).tobytes())
+            self._n += len(velas)
+        return len(velas)
+
+    # ---------- Importação dos dumps mensais ----------
+    def importar_csv(self, conteudo: bytes) -> int:
+        """Importa um CSV de klines da Binance (com ou sem cabeçalho)."""
+        return self.anexar(ler_csv(conteudo))
+
+    def importar_zip(self, caminho: str) -> int:
+        with open(caminho, "rb") as f:
+            return self.anexar(ler_zip(f.read()))
+
+
+def ler_csv(conteudo: bytes) -> np.ndarray:
+    """Velas (``DTYPE_KLINE``, ordenadas) de um CSV de klines da Binance, com ou sem cabeçalho."""
+    linhas = conteudo.splitlines()
+    if linhas and not linhas[0][:1].isdigit():
+        linhas = linhas[1:]
+    if not linhas:
+        return np.empty(0, dtype=DTYPE_KLINE)
+    bruto = np.loadtxt(io.BytesIO(b"\n".join(linhas)), delimiter=",", usecols=range(len(CAMPOS)),
+                       dtype=np.float64, ndmin=2)
+    velas = np.empty(len(bruto), dtype=DTYPE_KLINE)
+    for i, campo in enumerate(CAMPOS):
+        velas[campo] = bruto[:, i]
+    # Dumps spot a partir de 2025 vêm em microssegundos
+    for campo in ("t_open", "t_close"):
+        micro = velas[campo] > 10**14
+        velas[campo][micro] //= 1000
+    velas.sort(order="t_open")
+    return velas
+
+
+def ler_zip(conteudo: bytes) -> np.ndarray:
+    """Velas de um dump mensal (``.zip`` com um ou mais CSVs), em memória."""
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as z:
+        partes = [ler_csv(z.read(nome)) for nome in sorted(z.namelist()) if nome.endswith(".csv")]
+    if not partes:
+        return np.empty(0, dtype=DTYPE_KLINE)
+    velas = np.concatenate(partes)
+    velas.sort(order="t_open")
+    return velas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa dumps mensais de klines da Binance no arquivo local")
+    parser.add_argument("arquivos", nargs="+", help="arquivos .zip ou .csv (aceita glob)")
+    parser.add_argument("--simbolo", required=True)
+    parser.add_argument("--intervalo", required=True)
+    parser.add_argument("--mercado", default="futures")
+    parser.add_argument("--raiz", default=Config.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    configurar_logs("arquivo_velas")
+    arquivo = ArquivoVelas(args.raiz, args.simbolo, args.intervalo, args.mercado)
+    caminhos = sorted(c for padrao in args.arquivos for c in glob.glob(padrao))
+    for caminho in caminhos:
+        if caminho.endswith(".zip"):
+            n = arquivo.importar_zip(caminho)
+        else:
+            with open(caminho, "rb") as f:
+                n = arquivo.importar_csv(f.read())
+        logger.info(f"[Arquivo] {os.path.basename(caminho)}: +{n} velas")
+    logger.info(f"[Arquivo] {args.simbolo} {args.intervalo}: {len(arquivo)} velas em {arquivo.diretorio}")
+
+
+if __name__ == "__main__":
+    main()
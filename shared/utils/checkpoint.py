@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Checkpoint do estado de um robô em JSON, gravado de forma atômica.
+
+O robô grava ao fim de cada ciclo o que não dá para obter da exchange em
+uma ida só: estado das médias, última vela processada, posição vista e
+client order ids ainda sem confirmação final. Na partida o checkpoint é
+lido e conferido com a exchange (``futures_bot.restaurar_estado``), em vez
+de reaquecer tudo a partir do histórico.
+
+A gravação usa arquivo temporário + ``fsync`` + ``os.replace``: uma queda no
+meio da escrita (ou do sistema logo depois) deixa o checkpoint anterior intacto. Um arquivo ilegível, de outra
+versão ou de outra configuração é ignorado (partida a frio).
+"""
+import os
+import json
+import time
+import logging
+
+logger = logging.getLogger("checkpoint")
+
+VERSAO = 1
+
+
+class Checkpoint:
+    def __init__(self, caminho: str, chave: dict = None):
+        """``chave``: configuração que precisa bater para o estado valer (par, período, médias...)."""
+        self.caminho = caminho
+        self.chave = chave or {}
+
+    def salvar(self, estado: dict):
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"versao": VERSAO, "chave": self.chave, "salvo_em": time.time(), "estado": estado}, f)
+            f.flush()
+            os.fsync(f.fileno())        # conteúdo no disco antes do rename: queda de energia não deixa arquivo vazio
+        os.replace(temporario, self.caminho)
+
+    def carregar(self):
+        """Estado salvo, ou None (sem arquivo, corrompido ou de outra versão/configuração)."""
+        try:
+            with open(self.caminho, encoding="utf-8") as f:
+                dados = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"[Checkpoint] {self.caminho} ilegível ({e}); partida a frio")
+            return None
+        if dados.get("versao") != VERSAO or dados.get("chave") != self.chave:
+            logger.warning(f"[Checkpoint] {self.caminho} é de outra versão/configuração; partida a frio")
+            return None
+        idade_s = time.time() - dados.get("salvo_em", 0)
+        logger.info(f"[Checkpoint] Estado de {idade_s / 60:.0f} min atrás carregado de {self.caminho}")
+        return dados["estado"]
+
+    def apagar(self):
+        try:
+            os.remove(self.caminho)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""Cache incremental de klines (velas) por símbolo/intervalo.
+
+Na primeira chamada baixa o histórico completo (``limite`` velas); nas
+seguintes pede à API apenas as velas posteriores à última vela fechada
+armazenada, detecta lacunas e faz backfill paginado após períodos offline.
+Com ``diretorio`` as velas fechadas também são anexadas ao arquivo colunar
+(``shared/utils/candle_archive.py``), de onde o cache é recarregado ao reiniciar.
+
+``BaixadorHistorico`` preenche o mesmo arquivo com anos de histórico
+(backtests, otimizador), retomando de onde parou::
+
+    python -m shared.utils.data_fetcher SOLUSDT BTCUSDT --periodos 1m 1h --inicio 2021-01-01
+"""
+import os
+import time
+import logging
+import argparse
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config.constants import INTERVALO_MS
+from shared.utils.logger import configurar_logs
+
+logger = logging.getLogger("data_fetcher")
+
+# Colunas retornadas por futures_klines / get_klines (a última, "ignore", é descartada)
+COLUNAS_KLINE = [
+    "t_open", "open", "high", "low", "close", "volume", "t_close", "quote_vol",
+    "trades", "taker_base", "taker_quote", "ignore"
+]
+
+DTYPE_KLINE = np.dtype([
+    ("t_open",      "i8"),
+    ("open",        "f8"),
+    ("high",        "f8"),
+    ("low",         "f8"),
+    ("close",       "f8"),
+    ("volume",      "f8"),
+    ("t_close",     "i8"),
+    ("quote_vol",   "f8"),
+    ("trades",      "i8"),
+    ("taker_base",  "f8"),
+    ("taker_quote", "f8"),
+])
+
+
+def klines_para_array(kl: list) -> np.ndarray:
+    """Converte a lista crua da API (campos numéricos em string) em array estruturado."""
+    arr = np.empty(len(kl), dtype=DTYPE_KLINE)
+    if not kl:
+        return arr
+    for i, nome in enumerate(DTYPE_KLINE.names):
+        arr[nome] = np.array([k[i] for k in kl], dtype=DTYPE_KLINE[nome])
+    return arr
+
+
+class CacheKlines:
+    """Armazena as velas fechadas de um par/intervalo e as atualiza incrementalmente.
+
+    ``funcao_klines`` é o método do cliente que busca as velas
+    (``cliente.futures_klines`` ou ``cliente.get_klines``). A última vela
+    retornada pela API é sempre a vela em formação; ela fica em ``aberta`` e
+    é substituída a cada atualização.
+    """
+
+    def __init__(self, funcao_klines, par: str, periodo: str, limite: int = 1000,
+                 max_velas: int = 5000, diretorio: str = None, mercado: str = "futures"):
+        self.funcao_klines = funcao_klines
+        self.par = par
+        self.periodo = periodo
+        self.limite = limite
+        self.max_velas = max(max_velas, limite)
+        self.passo_ms = INTERVALO_MS[periodo]
+        self.fechadas = np.empty(0, dtype=DTYPE_KLINE)
+        self.aberta = None
+        self.lacunas = 0
+        self._lock = threading.Lock()
+        self.arquivo = None
+        if diretorio:
+            from shared.utils.candle_archive import ArquivoVelas
+            self.arquivo = ArquivoVelas(diretorio, par, periodo, mercado)
+            self._carregar()
+
+    # ---------- Persistência ----------
+    def _carregar(self):
+        try:
+            self.fechadas = self.arquivo.ultimas(self.max_velas)
+            if len(self.fechadas):
+                logger.info(f"[Cache] {self.par} {self.periodo}: {len(self.fechadas)} velas carregadas do disco")
+        except Exception as e:
+            logger.warning(f"[Cache] Falha ao ler {self.arquivo.diretorio}: {e}")
+
+    def _salvar(self, novas: np.ndarray):
+        if self.arquivo is not None:
+            self.arquivo.anexar(novas)
+
+    # ---------- Atualização ----------
+    def _buscar(self, inicio_ms: int = None, limite: int = None) -> np.ndarray:
+        params = dict(symbol=self.par, interval=self.periodo, limit=limite or self.limite)
+        if inicio_ms is not None:
+            params["startTime"] = int(inicio_ms)
+        return klines_para_array(self.funcao_klines(**params))
+
+    def _baixar_desde(self, inicio_ms: int, agora_ms: int = None) -> np.ndarray:
+        """Pagina a partir de ``inicio_ms`` até alcançar a vela em formação.
+
+        Com ``agora_ms`` cada página pede só as velas que faltam (+1 de folga para
+        relógio adiantado no servidor): na atualização de rotina o ``limit`` fica
+        abaixo de 100 e a chamada pesa 1 em vez de 5.
+        """
+        paginas = []
+        while True:
+            limite = self.limite
+            if agora_ms is not None:
+                limite = int(min(max((agora_ms - inicio_ms) // self.passo_ms + 2, 1), self.limite))
+            pagina = self._buscar(inicio_ms, limite)
+            if len(pagina):
+                paginas.append(pagina)
+            if len(pagina) < limite:
+                break
+            inicio_ms = int(pagina["t_open"][-1]) + self.passo_ms
+        return np.concatenate(paginas) if paginas else np.empty(0, dtype=DTYPE_KLINE)
+
+    def atualizar(self, agora_ms: int = None) -> np.ndarray:
+        """Sincroniza o cache com a exchange e retorna apenas as velas recém-fechadas."""
+        with self._lock:
+            if agora_ms is None:
+                agora_ms = int(time.time() * 1000)
+            ultimo = int(self.fechadas["t_open"][-1]) if len(self.fechadas) else None
+            faltando = (agora_ms - ultimo) // self.passo_ms if ultimo is not None else None
+
+            if ultimo is None or faltando > self.max_velas:
+                # Bootstrap (ou parada longa demais para backfill): janela completa
+                if ultimo is not None:
+                    logger.warning(f"[Cache] {self.par} {self.periodo}: {faltando} velas sem dados, recarregando janela")
+                velas = self._buscar()
+                self.fechadas = np.empty(0, dtype=DTYPE_KLINE)
+                ultimo = None
+            else:
+                velas = self._baixar_desde(ultimo + self.passo_ms, agora_ms)
+
+            if not len(velas):
+                return np.empty(0, dtype=DTYPE_KLINE)
+
+            novas, self.aberta = velas[:-1], velas[-1:]
+            if ultimo is not None:
+                novas = novas[novas["t_open"] > ultimo]
+            self._verificar_continuidade(novas)
+
+            if len(novas):
+                self.fechadas = np.concatenate([self.fechadas, novas])[-self.max_velas:]
+                self._salvar(novas)
+            return novas
+
+    def inserir_fechada(self, vela: np.ndarray) -> bool:
+        """Anexa uma vela fechada recebida por stream (array de 1 linha).
+
+        Retorna False quando a vela não é a sucessora da última armazenada
+        (cache vazio ou lacuna): nesse caso o chamador deve usar ``atualizar()``.
+        """
+        with self._lock:
+            if not len(self.fechadas):
+                return False
+            ultimo = int(self.fechadas["t_open"][-1])
+            t_open = int(vela["t_open"][0])
+            if t_open <= ultimo:
+                return True
+            if t_open != ultimo + self.passo_ms:
+                return False
+            self.fechadas = np.concatenate([self.fechadas, vela])[-self.max_velas:]
+            if self.aberta is not None and int(self.aberta["t_open"][0]) <= t_open:
+                self.aberta = None
+            self._salvar(vela)
+            return True
+
+    def atualizar_aberta(self, vela: np.ndarray):
+        """Substitui a vela em formação (array de 1 linha) com o último valor do stream."""
+        with self._lock:
+            self.aberta = vela
+
+    def _verificar_continuidade(self, novas: np.ndarray):
+        if not len(novas):
+            return
+        tempos = novas["t_open"]
+        if len(self.fechadas):
+            tempos = np.concatenate([self.fechadas["t_open"][-1:], tempos])
+        saltos = np.flatnonzero(np.diff(tempos) != self.passo_ms)
+        if len(saltos):
+            self.lacunas += len(saltos)
+            logger.warning(f"[Cache] {self.par} {self.periodo}: {len(saltos)} lacuna(s) na sequência de velas")
+
+    # ---------- Leitura ----------
+    def janela(self, n: int) -> np.ndarray:
+        """Últimas ``n`` velas no mesmo formato de ``futures_klines(limit=n)``: n-1 fechadas + a em formação."""
+        with self._lock:
+            if self.aberta is None:
+                return self.fechadas[-n:].copy()
+            fechadas = self.fechadas[-(n - 1):] if n > 1 else self.fechadas[:0]
+            return np.concatenate([fechadas, self.aberta])
+
+    def dataframe(self, n: int, fuso: str = "America/Sao_Paulo"):
+        """DataFrame ``[t_close, close]`` das últimas ``n`` velas (conversão de fuso só nessas linhas)."""
+        import pandas as pd
+        velas = self.janela(n)
+        return pd.DataFrame({
+            "t_close": pd.to_datetime(velas["t_close"], unit="ms", utc=True).tz_convert(fuso),
+            "close": velas["close"],
+        })
+
+
+# Um cache por (mercado, par, intervalo) compartilhado dentro do processo
+_caches = {}
+
+
+def obter_cache(funcao_klines, par: str, periodo: str, mercado: str = "futures", **kwargs) -> CacheKlines:
+    """Retorna (criando na primeira chamada) o cache do par/intervalo."""
+    chave = (mercado, par, periodo)
+    cache = _caches.get(chave)
+    if cache is None:
+        cache = _caches[chave] = CacheKlines(funcao_klines, par, periodo, mercado=mercado, **kwargs)
+    return cache
+
+
+# =========================
+# Download histórico
+# =========================
+URL_DUMPS = "https://data.binance.vision/data"
+CAMINHO_DUMPS = {"futures": "futures/um", "spot": "spot"}
+# 1000 velas pesam 5 em /fapi/v1/klines; 1500 custariam 10 pelo mesmo ganho de 50%
+TAMANHO_PAGINA = 1000
+PARALELO_DOWNLOAD = 8
+TENTATIVAS_PAGINA = 5
+LOG_PROGRESSO_S = 10.0
+# Intervalos cujas velas começam na virada do mês (têm dump mensal alinhado)
+INTERVALOS_MENSAIS = {"1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "8h", "12h", "1d"}
+
+
+def _meses(t_ms: int) -> tuple:
+    """(início do mês de ``t_ms``, início do mês seguinte, 'AAAA-MM'), em ms UTC."""
+    d = datetime.fromtimestamp(t_ms / 1000, tz=timezone.utc)
+    inicio = datetime(d.year, d.month, 1, tzinfo=timezone.utc)
+    seguinte = datetime(d.year + d.month // 12, d.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(inicio.timestamp() * 1000), int(seguinte.timestamp() * 1000), inicio.strftime("%Y-%m")
+
+
+def paginas_download(inicio_ms: int, fim_ms: int, passo_ms: int, tamanho: int = TAMANHO_PAGINA,
+                     meses: bool = True) -> list:
+    """Divide ``[inicio_ms, fim_ms)`` (``t_open``) em páginas ``(ini, fim inclusivo, 'AAAA-MM' ou None)``.
+
+    Com ``meses``, cada mês inteiro dentro do intervalo vira uma página de dump
+    mensal; as pontas (e tudo, sem ``meses``) viram páginas REST de ``tamanho``
+    velas. Cada página REST cobre exatamente ``tamanho * passo_ms`` ms, então
+    contém no máximo ``tamanho`` aberturas mesmo fora do alinhamento.
+    """
+    paginas = []
+    t = inicio_ms
+    while t < fim_ms:
+        limite = fim_ms
+        if meses:
+            mes_ini, mes_fim, mes = _meses(t)
+            if t == mes_ini and mes_fim <= fim_ms:
+                paginas.append((t, mes_fim - 1, mes))
+                t = mes_fim
+                continue
+            limite = min(limite, mes_fim)
+        fim = min(t + tamanho * passo_ms, limite)
+        paginas.append((t, fim - 1, None))
+        t = fim
+    return paginas
+
+
+class BaixadorHistorico:
+    """Backfill paralelo e retomável de klines direto no arquivo colunar.
+
+    Meses fechados vêm dos dumps mensais da Binance (``data.binance.vision``,
+    sem consumir peso da API); o resto, e os meses sem dump, em páginas REST
+    de ``tamanho_pagina`` velas por ``funcao_klines``. Até ``paralelo``
+    páginas são baixadas ao mesmo tempo (com ``ClienteBinance`` o orçamento de
+    peso segura as threads), mas gravadas em ordem: o arquivo só cresce por
+    prefixos contínuos, então o fim do arquivo é o próprio checkpoint e uma
+    execução interrompida retoma da última vela gravada. A continuidade dos
+    ``t_open`` é conferida a cada página e as lacunas (manutenção da
+    exchange) são contadas no resumo.
+    """
+
+    def __init__(self, funcao_klines, diretorio: str = None, mercado: str = "futures",
+                 paralelo: int = PARALELO_DOWNLOAD, tamanho_pagina: int = TAMANHO_PAGINA,
+                 url_dumps: str = URL_DUMPS):
+        """``url_dumps=None`` desliga os dumps mensais (só REST)."""
+        if diretorio is None:
+            from config.settings import Config
+            diretorio = Config.DATA_DIR
+        self.funcao_klines = funcao_klines
+        self.diretorio = diretorio
+        self.mercado = mercado
+        self.paralelo = paralelo
+        self.tamanho_pagina = tamanho_pagina
+        self.url_dumps = url_dumps
+        self._sessao = None
+        self._lock = threading.Lock()
+
+    # ---------- Páginas ----------
+    def _http(self):
+        with self._lock:
+            if self._sessao is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                self._sessao = requests.Session()
+                self._sessao.mount("https://", HTTPAdapter(pool_maxsize=self.paralelo))
+            return self._sessao
+
+    def _dump(self, par: str, periodo: str, mes: str):
+        """Velas do dump mensal, ou None se o dump não existe (mês sem negociação ou ainda não publicado)."""
+        from shared.utils.candle_archive import ler_zip
+
+        url = f"{self.url_dumps}/{CAMINHO_DUMPS[self.mercado]}/monthly/klines/{par}/{periodo}/{par}-{periodo}-{mes}.zip"
+        resposta = self._http().get(url, timeout=120)
+        if resposta.status_code == 404:
+            return None
+        resposta.raise_for_status()
+        return ler_zip(resposta.content)
+
+    def _rest(self, par: str, periodo: str, inicio_ms: int, fim_ms: int) -> np.ndarray:
+        passo_ms = INTERVALO_MS[periodo]
+        partes = []
+        for ini, fim, _ in paginas_download(inicio_ms, fim_ms + 1, passo_ms, self.tamanho_pagina, meses=False):
+            partes.append(klines_para_array(self.funcao_klines(symbol=par, interval=periodo, startTime=ini,
+                                                               endTime=fim, limit=self.tamanho_pagina)))
+        return np.concatenate(partes) if partes else np.empty(0, dtype=DTYPE_KLINE)
+
+    def _baixar_pagina(self, par: str, periodo: str, pagina: tuple) -> np.ndarray:
+        from shared.utils.scheduler import Backoff
+
+        inicio_ms, fim_ms, mes = pagina
+        backoff = Backoff(base_s=1.0, maximo_s=60.0)
+        for tentativa in range(1, TENTATIVAS_PAGINA + 1):
+            try:
+                velas = self._dump(par, periodo, mes) if mes is not None and self.url_dumps else None
+                if velas is None:
+                    velas = self._rest(par, periodo, inicio_ms, fim_ms)
+                return velas[(velas["t_open"] >= inicio_ms) & (velas["t_open"] <= fim_ms)]
+            except Exception as e:
+                if tentativa == TENTATIVAS_PAGINA:
+                    raise
+                espera = backoff.proxima()
+                logger.warning(f"[Download] {par} {periodo} página {mes or inicio_ms}: {e}; "
+                               f"tentativa {tentativa + 1} em {espera:.1f}s")
+                time.sleep(espera)
+
+    # ---------- Download ----------
+    def baixar(self, par: str, periodo: str, inicio_ms: int, fim_ms: int = None) -> dict:
+        """Completa o arquivo de ``par``/``periodo`` de ``inicio_ms`` até ``fim_ms`` (padrão: última vela fechada).
+
+        O arquivo só cresce para a frente: se ele já existe e começa depois de
+        ``inicio_ms``, o trecho anterior não é baixado.
+        """
+        from shared.utils.candle_archive import ArquivoVelas
+        from shared.utils.scheduler import proximo_fechamento
+
+        passo_ms = INTERVALO_MS[periodo]
+        if fim_ms is None:
+            fim_ms = int(proximo_fechamento(periodo, time.time()) * 1000) - passo_ms
+        arquivo = ArquivoVelas(self.diretorio, par, periodo, self.mercado)
+        if len(arquivo):
+            primeiro = int(arquivo.coluna("t_open")[0])
+            if inicio_ms < primeiro:
+                logger.warning(f"[Download] {par} {periodo}: o arquivo começa em {_data(primeiro)}; "
+                               f"o trecho desde {_data(inicio_ms)} não é acrescentado (arquivo só cresce para a frente)")
+            inicio_ms = max(inicio_ms, arquivo.ultimo_t_open + passo_ms)
+
+        paginas = paginas_download(inicio_ms, fim_ms, passo_ms, self.tamanho_pagina,
+                                   meses=bool(self.url_dumps) and periodo in INTERVALOS_MENSAIS)
+        resumo = {"par": par, "periodo": periodo, "paginas": len(paginas), "velas": 0, "lacunas": 0,
+                  "segundos": 0.0}
+        if not paginas:
+            return resumo
+        logger.info(f"[Download] {par} {periodo}: {_data(inicio_ms)} -> {_data(fim_ms)}, {len(paginas)} página(s)")
+
+        t0 = ultimo_log = time.monotonic()
+        pendentes = iter(paginas)
+        janela = deque()
+        pool = ThreadPoolExecutor(max_workers=self.paralelo, thread_name_prefix=f"download-{par}")
+
+        def submeter():
+            pagina = next(pendentes, None)
+            if pagina is not None:
+                janela.append(pool.submit(self._baixar_pagina, par, periodo, pagina))
+
+        try:
+            for _ in range(2 * self.paralelo):
+                submeter()
+            feitas = 0
+            while janela:
+                velas = janela.popleft().result()       # em ordem; as seguintes continuam baixando
+                submeter()
+                resumo["lacunas"] += self._gravar(arquivo, velas, passo_ms)
+                resumo["velas"] += len(velas)
+                feitas += 1
+                if time.monotonic() - ultimo_log >= LOG_PROGRESSO_S:
+                    ultimo_log = time.monotonic()
+                    logger.info(f"[Download] {par} {periodo}: {feitas}/{len(paginas)} páginas, "
+                                f"{resumo['velas']:,} velas ({resumo['velas'] / (ultimo_log - t0):,.0f}/s)")
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        resumo["segundos"] = time.monotonic() - t0
+        logger.info(f"[Download] {par} {periodo}: {resumo['velas']:,} velas em {resumo['segundos']:.1f}s, "
+                    f"{resumo['lacunas']} lacuna(s); arquivo com {len(arquivo):,} velas")
+        return resumo
+
+    def _gravar(self, arquivo, velas: np.ndarray, passo_ms: int) -> int:
+        """Anexa a página e devolve quantas lacunas de ``t_open`` ela abriu ou contém."""
+        if not len(velas):
+            return 0
+        tempos = velas["t_open"]
+        if arquivo.ultimo_t_open is not None:
+            tempos = np.concatenate([[arquivo.ultimo_t_open], tempos])
+        saltos = np.flatnonzero(np.diff(tempos) != passo_ms)
+        for i in saltos[:3]:
+            logger.warning(f"[Download] {arquivo.simbolo} {arquivo.intervalo}: lacuna de "
+                           f"{(tempos[i + 1] - tempos[i]) // passo_ms - 1} vela(s) após {_data(int(tempos[i]))}")
+        arquivo.anexar(velas)
+        return len(saltos)
+
+    def _progresso(self):
+        from shared.utils.checkpoint import Checkpoint
+
+        return Checkpoint(os.path.join(self.diretorio, "download_historico.json"), {"mercado": self.mercado})
+
+    def _executar(self, tarefas: list) -> list:
+        progresso = self._progresso()
+        resumos = []
+        while tarefas:
+            progresso.salvar({"tarefas": tarefas})
+            resumos.append(self.baixar(*tarefas[0]))
+            tarefas = tarefas[1:]
+        progresso.apagar()
+        return resumos
+
+    def baixar_varios(self, pares, periodos, inicio_ms: int, fim_ms: int = None) -> list:
+        """Um ``baixar`` por par/intervalo; a lista do que falta fica em disco para ``retomar``."""
+        return self._executar([[par, periodo, inicio_ms, fim_ms] for par in pares for periodo in periodos])
+
+    def retomar(self) -> list:
+        """Refaz as tarefas de um ``baixar_varios`` interrompido (cada uma continua do fim do arquivo)."""
+        estado = self._progresso().carregar()
+        if not estado:
+            logger.info("[Download] Nada a retomar")
+            return []
+        return self._executar(estado["tarefas"])
+
+
+def _data(t_ms: int) -> str:
+    return datetime.fromtimestamp(t_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+def _ms(texto: str) -> int:
+    return int(datetime.fromisoformat(texto).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill paralelo e retomável de klines no arquivo local")
+    parser.add_argument("pares", nargs="*")
+    parser.add_argument("--periodos", nargs="+", default=["1h"])
+    parser.add_argument("--inicio", help="AAAA-MM-DD (UTC)")
+    parser.add_argument("--fim", help="AAAA-MM-DD (UTC, exclusivo); padrão: última vela fechada")
+    parser.add_argument("--mercado", default="futures", choices=["futures", "spot"])
+    parser.add_argument("--paralelo", type=int, default=PARALELO_DOWNLOAD)
+    parser.add_argument("--sem-dumps", action="store_true", help="só REST (não usa data.binance.vision)")
+    parser.add_argument("--retomar", action="store_true", help="continua o último download interrompido")
+    parser.add_argument("--raiz", help="diretório do arquivo de velas (padrão: Config.DATA_DIR)")
+    args = parser.parse_args(argv)
+
+    configurar_logs("download_velas")
+    from crypto.src.binance_client import obter_cliente
+
+    cliente = obter_cliente(pool=max(16, args.paralelo))
+    funcao = cliente.futures_klines if args.mercado == "futures" else cliente.get_klines
+    baixador = BaixadorHistorico(funcao, args.raiz, args.mercado, args.paralelo,
+                                 url_dumps=None if args.sem_dumps else URL_DUMPS)
+    if args.retomar:
+        baixador.retomar()
+    elif args.pares and args.inicio:
+        baixador.baixar_varios(args.pares, args.periodos, _ms(args.inicio), _ms(args.fim) if args.fim else None)
+    else:
+        parser.error("informe os pares e --inicio, ou --retomar")
+
+
+if __name__ == "__main__":
+    main()
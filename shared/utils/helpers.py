@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+from decimal import Decimal, ROUND_DOWN
+
+
+def arredondar_passo(qtd: float, passo: float) -> float:
+    """Arredonda ``qtd`` para baixo no múltiplo de ``passo`` (stepSize do MARKET_LOT_SIZE)."""
+    d = (Decimal(str(qtd)) / Decimal(str(passo))).to_integral_value(rounding=ROUND_DOWN) * Decimal(str(passo))
+    return float(d)
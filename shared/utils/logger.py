@@ -0,0 +1,445 @@
+# -*- coding: utf-8 -*-
+"""Telemetria dos robôs: spans de tempo por fase, histogramas, contadores e exportação Prometheus.
+
+Um ciclo de decisão é medido por fase::
+
+    with Ciclo(par="SOLUSDT") as ciclo:
+        with ciclo.fase("velas"):
+            cache.atualizar()
+        with ciclo.fase("sinal"):
+            ...
+
+Cada fase vira uma observação em ``robo_fase_segundos{fase,par}``; o ciclo
+inteiro, as chamadas REST e o peso consumido dentro dele vão para
+``robo_ciclo_*``. O ``ClienteBinance`` (e a ``CorretoraSimulada``) contam as
+chamadas REST em ``robo_rest_chamadas_total{endpoint}``.
+
+Exportação no formato texto do Prometheus: ``obter_metricas().servir(9108)``
+(``GET /metrics``) ou ``gravar(arquivo)`` (coletor textfile do node_exporter).
+``resumo()`` dá p50/p90/p99 de cada histograma para o log.
+
+Logs: ``configurar_logs("runtime")`` troca o ``basicConfig`` dos robôs por
+uma fila. Quem loga só enfileira o registro (sem formatar nem escrever);
+uma thread monta a mensagem e grava linhas JSON em arquivos rotativos em
+``Config.LOGS_DIR`` (e o texto de sempre no stderr), então um disco ou
+terminal lento nunca atrasa o envio de uma ordem. Níveis por subsistema vêm
+de ``LOG_NIVEIS`` (``binance_client=WARNING,estrategia=DEBUG``).
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+logger = logging.getLogger("metricas")
+
+LIMITES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LIMITES_CONTAGEM = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+AMOSTRAS_PERCENTIL = 1024
+
+
+def _rotulos(rotulos: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in rotulos.items() if v is not None))
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatar_rotulos(rotulos: tuple, extra: tuple = ()) -> str:
+    itens = rotulos + extra
+    if not itens:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in itens) + "}"
+
+
+class Histograma:
+    """Buckets cumulativos (exportação) + últimas ``AMOSTRAS_PERCENTIL`` observações (percentis exatos)."""
+
+    __slots__ = ("limites", "contagens", "soma", "total", "amostras")
+
+    def __init__(self, limites=LIMITES_SEGUNDOS):
+        self.limites = tuple(limites)
+        self.contagens = [0] * (len(self.limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+        self.amostras = deque(maxlen=AMOSTRAS_PERCENTIL)
+
+    def observar(self, valor: float):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+        self.amostras.append(valor)
+
+    def percentil(self, p: float) -> float:
+        """Percentil ``p`` (0-100) das observações recentes, por posto mais próximo."""
+        if not self.amostras:
+            return float("nan")
+        ordenadas = sorted(self.amostras)
+        return ordenadas[min(int(len(ordenadas) * p / 100), len(ordenadas) - 1)]
+
+
+class Metricas:
+    """Registro de contadores, medidores e histogramas com rótulos, seguro entre threads."""
+
+    def __init__(self):
+        self._contadores = {}       # nome -> {rótulos: valor}
+        self._medidores = {}
+        self._histogramas = {}      # nome -> {rótulos: Histograma}
+        self._limites = {}
+        self._lock = threading.Lock()
+        self._servidor = None
+        self.arquivo = None             # se definido, ``exportar()`` grava aqui ao fim de cada ciclo
+
+    # ---------- Registro ----------
+    def incrementar(self, nome: str, valor: float = 1, **rotulos):
+        chave = _rotulos(rotulos)
+        with self._lock:
+            serie = self._contadores.setdefault(nome, {})
+            serie[chave] = serie.get(chave, 0) + valor
+
+    def definir(self, nome: str, valor: float, **rotulos):
+        with self._lock:
+            self._medidores.setdefault(nome, {})[_rotulos(rotulos)] = valor
+
+    def observar(self, nome: str, valor: float, limites=None, **rotulos):
+        chave = _rotulos(rotulos)
+        with self._lock:
+            serie = self._histogramas.setdefault(nome, {})
+            hist = serie.get(chave)
+            if hist is None:
+                limites = self._limites.setdefault(nome, limites or LIMITES_SEGUNDOS)
+                hist = serie[chave] = Histograma(limites)
+            hist.observar(valor)
+
+    @contextmanager
+    def medir(self, nome: str, **rotulos):
+        """Observa em ``nome`` a duração (s) do bloco, mesmo se ele levantar exceção."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - t0, **rotulos)
+
+    def span(self, fase: str, **rotulos):
+        return self.medir("robo_fase_segundos", fase=fase, **rotulos)
+
+    # ---------- Leitura ----------
+    def contador(self, nome: str, **rotulos) -> float:
+        return self._contadores.get(nome, {}).get(_rotulos(rotulos), 0)
+
+    def total(self, nome: str) -> float:
+        """Soma de um contador em todos os rótulos."""
+        with self._lock:
+            return sum(self._contadores.get(nome, {}).values())
+
+    def histograma(self, nome: str, **rotulos):
+        return self._histogramas.get(nome, {}).get(_rotulos(rotulos))
+
+    def zerar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._medidores.clear()
+            self._histogramas.clear()
+            self._limites.clear()
+
+    def resumo(self) -> str:
+        """Uma linha por histograma: contagem, média e p50/p90/p99."""
+        linhas = []
+        with self._lock:
+            itens = [(n, r, h) for n, serie in sorted(self._histogramas.items()) for r, h in sorted(serie.items())]
+            for nome, rotulos, h in itens:
+                if not h.total:
+                    continue
+                linhas.append(f"{nome}{_formatar_rotulos(rotulos)}: n={h.total} média={h.soma / h.total:.4g} "
+                              f"p50={h.percentil(50):.4g} p90={h.percentil(90):.4g} p99={h.percentil(99):.4g}")
+        return "\n".join(linhas)
+
+    # ---------- Exportação ----------
+    def texto(self) -> str:
+        """Formato de exposição texto do Prometheus (0.0.4)."""
+        linhas = []
+        with self._lock:
+            for nome, serie in sorted(self._contadores.items()):
+                linhas.append(f"# TYPE {nome} counter")
+                linhas.extend(f"{nome}{_formatar_rotulos(r)} {v:.10g}" for r, v in sorted(serie.items()))
+            for nome, serie in sorted(self._medidores.items()):
+                linhas.append(f"# TYPE {nome} gauge")
+                linhas.extend(f"{nome}{_formatar_rotulos(r)} {v:.10g}" for r, v in sorted(serie.items()))
+            for nome, serie in sorted(self._histogramas.items()):
+                linhas.append(f"# TYPE {nome} histogram")
+                for r, h in sorted(serie.items()):
+                    acumulado = 0
+                    for limite, qtd in zip(h.limites + (float("inf"),), h.contagens):
+                        acumulado += qtd
+                        le = "+Inf" if limite == float("inf") else f"{limite:g}"
+                        linhas.append(f"{nome}_bucket{_formatar_rotulos(r, (('le', le),))} {acumulado}")
+                    linhas.append(f"{nome}_sum{_formatar_rotulos(r)} {h.soma:.10g}")
+                    linhas.append(f"{nome}_count{_formatar_rotulos(r)} {h.total}")
+        return "\n".join(linhas) + "\n"
+
+    def gravar(self, arquivo: str):
+        """Grava ``texto()`` de forma atômica (o coletor nunca lê um arquivo pela metade)."""
+        os.makedirs(os.path.dirname(os.path.abspath(arquivo)), exist_ok=True)
+        temporario = arquivo + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(self.texto())
+        os.replace(temporario, arquivo)
+
+    def exportar(self):
+        if self.arquivo:
+            try:
+                self.gravar(self.arquivo)
+            except OSError as e:
+                logger.warning(f"[Métricas] Não foi possível gravar {self.arquivo}: {e}")
+
+    def servir(self, porta: int, host: str = "127.0.0.1"):
+        """Expõe ``GET /metrics`` em uma thread daemon; retorna o servidor HTTP."""
+        if self._servidor is not None:
+            return self._servidor
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metricas = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                corpo = metricas.texto().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer((host, porta), _Handler)
+        threading.Thread(target=self._servidor.serve_forever, name="metricas-http", daemon=True).start()
+        logger.info(f"[Métricas] http://{host}:{self._servidor.server_address[1]}/metrics")
+        return self._servidor
+
+
+_metricas = Metricas()
+
+
+def obter_metricas() -> Metricas:
+    """Registro único do processo (cliente, executor e robôs escrevem no mesmo)."""
+    return _metricas
+
+
+def iniciar_exportacao(porta: int = None, arquivo: str = None) -> Metricas:
+    """Liga a exportação pedida (padrão: ``METRICAS_PORTA``/``METRICAS_ARQUIVO`` do ``Config``)."""
+    from config.settings import Config
+
+    porta = porta or Config.METRICAS_PORTA
+    _metricas.arquivo = arquivo or Config.METRICAS_ARQUIVO
+    if porta:
+        _metricas.servir(porta)
+    if _metricas.arquivo:
+        logger.info(f"[Métricas] Gravando em {_metricas.arquivo} a cada ciclo")
+    return _metricas
+
+
+class Ciclo:
+    """Um ciclo de decisão: spans por fase, duração total, chamadas REST e peso consumidos nele.
+
+    As chamadas/peso são a diferença dos contadores globais do início ao fim
+    do ciclo; com vários robôs no mesmo processo isso inclui as chamadas
+    concorrentes dos outros.
+    """
+
+    def __init__(self, metricas: Metricas = None, **rotulos):
+        self.metricas = metricas or _metricas
+        self.rotulos = rotulos
+        self.fases = {}             # fase -> segundos
+
+    def __enter__(self):
+        self._chamadas = self.metricas.total("robo_rest_chamadas_total")
+        self._peso = self.metricas.total("robo_rest_peso_total")
+        self._t0 = time.perf_counter()
+        return self
+
+    @contextmanager
+    def fase(self, nome: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - t0
+            self.fases[nome] = self.fases.get(nome, 0.0) + duracao
+            self.metricas.observar("robo_fase_segundos", duracao, fase=nome, **self.rotulos)
+
+    def __exit__(self, *exc):
+        m = self.metricas
+        self.duracao_s = time.perf_counter() - self._t0
+        self.chamadas_rest = m.total("robo_rest_chamadas_total") - self._chamadas
+        self.peso = m.total("robo_rest_peso_total") - self._peso
+        m.observar("robo_ciclo_segundos", self.duracao_s, **self.rotulos)
+        m.observar("robo_ciclo_chamadas_rest", self.chamadas_rest, LIMITES_CONTAGEM, **self.rotulos)
+        m.observar("robo_ciclo_peso", self.peso, LIMITES_CONTAGEM, **self.rotulos)
+        m.incrementar("robo_ciclos_total", **self.rotulos)
+        m.exportar()
+        return False
+
+    def linha(self) -> str:
+        """Resumo do ciclo para o log: duração, REST, peso e as fases mais lentas."""
+        fases = " | ".join(f"{n}={1000 * s:.0f}ms" for n, s in sorted(self.fases.items(), key=lambda x: -x[1]))
+        return f"{1000 * self.duracao_s:.0f} ms | REST={self.chamadas_rest:.0f} | peso={self.peso:.0f} | {fases}"
+
+
+# ---------- Logs estruturados ----------
+# Atributos de todo LogRecord; o que sobrar veio de ``extra=`` e vai para o JSON
+_ATRIBUTOS_RECORD = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+FORMATO_TEXTO = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+CAPACIDADE_FILA_LOG = 100_000
+ESPERA_FILA_LOG_S = 0.05           # espera por vaga na fila para WARNING ou acima
+TAMANHO_ARQUIVO_LOG = 50 * 1024 * 1024
+BACKUPS_LOG = 5
+
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por registro: ``t`` (UTC), ``nivel``, ``logger``, ``msg``, ``thread``, extras e ``exc``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            "t": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "nivel": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_RECORD and not chave.startswith("_"):
+                dados[chave] = valor
+        if record.exc_info:
+            dados["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            dados["exc"] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class FilaLogs(QueueHandler):
+    """``QueueHandler`` que não formata nada na thread de quem loga.
+
+    O registro vai para a fila com ``msg`` e ``args`` intactos: a mensagem só é
+    montada na thread de escrita (passe os valores como argumentos, no estilo
+    ``logger.info("[MM] %.6f", valor)``, e não como f-string). Com a fila cheia
+    (disco travado), DEBUG e INFO são descartados e contados em
+    ``descartados``; WARNING ou acima nunca se perdem: esperam até
+    ``ESPERA_FILA_LOG_S`` por uma vaga e, se ela não vier, são gravados direto
+    pelos destinos da escuta, na thread de quem loga (contados em ``diretos``).
+    """
+
+    def __init__(self, fila: queue.Queue):
+        super().__init__(fila)
+        self.descartados = 0
+        self.diretos = 0
+        self.escuta = None              # EscutaLogs que consome a fila (destino reserva)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if record.levelno < logging.WARNING:
+            self.descartados += 1
+            _metricas.incrementar("robo_logs_descartados_total")
+            return
+        try:
+            self.queue.put(record, timeout=ESPERA_FILA_LOG_S)
+        except queue.Full:
+            self.diretos += 1
+            _metricas.incrementar("robo_logs_diretos_total")
+            (self.escuta or logging.lastResort).handle(record)
+
+
+class EscutaLogs(QueueListener):
+    """Thread de escrita; ``fila`` é o ``FilaLogs`` da raiz (com a contagem de descartados)."""
+
+    def __init__(self, fila: FilaLogs, *destinos):
+        super().__init__(fila.queue, *destinos, respect_handler_level=True)
+        self.fila = fila
+        fila.escuta = self
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)          # na parada, espera vaga em vez de perder o sentinela
+
+
+def niveis_subsistema(texto: str) -> dict:
+    """``"binance_client=WARNING,estrategia=DEBUG"`` -> ``{"binance_client": 30, "estrategia": 10}``."""
+    niveis = {}
+    for item in filter(None, (p.strip() for p in (texto or "").split(","))):
+        nome, _, nivel = item.partition("=")
+        niveis[nome.strip()] = logging.getLevelName(nivel.strip().upper())
+    return {n: v for n, v in niveis.items() if isinstance(v, int)}
+
+
+_escuta = None
+
+
+def configurar_logs(nome: str = "robo", diretorio: str = None, nivel=None, niveis: dict = None,
+                    console: bool = True, capacidade: int = CAPACIDADE_FILA_LOG,
+                    tamanho_max: int = TAMANHO_ARQUIVO_LOG, backups: int = BACKUPS_LOG) -> EscutaLogs:
+    """Troca os handlers da raiz por uma fila; uma thread grava JSON em ``<diretorio>/<nome>.jsonl`` (rotativo).
+
+    ``nivel``: nível da raiz (padrão ``LOG_LEVEL``); ``niveis``: nível por
+    subsistema (nome do logger; padrão ``LOG_NIVEIS``). O filtro de nível roda
+    antes da fila, então um ``debug`` desligado não custa nada. Com
+    ``console``, o texto de sempre também vai para o stderr, pela mesma thread.
+    Chamar de novo reconfigura; ``parar_logs`` esvazia a fila (roda no ``atexit``).
+    """
+    from config.settings import Config
+
+    global _escuta
+    parar_logs()
+    diretorio = diretorio or Config.LOGS_DIR
+    os.makedirs(diretorio, exist_ok=True)
+    arquivo = RotatingFileHandler(os.path.join(diretorio, f"{nome}.jsonl"), maxBytes=tamanho_max,
+                                  backupCount=backups, encoding="utf-8")
+    arquivo.setFormatter(FormatadorJSON())
+    destinos = [arquivo]
+    if console:
+        terminal = logging.StreamHandler()
+        terminal.setFormatter(logging.Formatter(FORMATO_TEXTO))
+        destinos.append(terminal)
+
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    fila = FilaLogs(queue.Queue(capacidade))
+    raiz.addHandler(fila)
+    raiz.setLevel(nivel if nivel is not None else Config.LOG_LEVEL.upper())
+    niveis = niveis if niveis is not None else niveis_subsistema(Config.LOG_NIVEIS)
+    for subsistema, nivel_sub in niveis.items():
+        logging.getLogger(subsistema).setLevel(nivel_sub)
+
+    _escuta = EscutaLogs(fila, *destinos)
+    _escuta.start()
+    return _escuta
+
+
+def parar_logs():
+    """Grava o que estiver na fila e para a thread de escrita (os handlers da raiz ficam)."""
+    global _escuta
+    if _escuta is None:
+        return
+    escuta, _escuta = _escuta, None
+    escuta.stop()
+    for handler in escuta.handlers:
+        handler.close()
+
+
+atexit.register(parar_logs)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""Agendamento alinhado ao fechamento das velas, para qualquer mistura de intervalos.
+
+``Agendador`` mantém um heap de tarefas ordenado pelo próximo disparo, no
+relógio do servidor (``ClienteBinance.relogio_servidor``: relógio local +
+deslocamento medido contra ``futures_time``). Um único laço dorme até o
+disparo mais próximo, sem polling, e acorda antes se uma tarefa for
+agendada ou cancelada::
+
+    agendador = Agendador(cliente.relogio_servidor)
+    agendador.a_cada_vela("1h", avaliar_h1, margem_s=0.25)
+    agendador.a_cada_vela("15m", avaliar_15m, margem_s=0.25)
+    agendador.a_cada_vela("15m", antecipar, margem_s=-3)     # 3 s antes do fechamento
+    await agendador.executar_async()                          # ou executar() em uma thread
+
+Uma tarefa que levanta exceção é repetida com backoff exponencial com
+jitter (``Backoff``) até dar certo ou até a próxima vela, que tem
+precedência. ``proximo_fechamento`` e ``Backoff`` também servem a laços
+simples de um intervalo só (``futures_bot.aguardar_fechamento``).
+"""
+import time
+import heapq
+import random
+import asyncio
+import logging
+import threading
+import itertools
+import inspect
+
+from config.constants import INTERVALO_MS
+
+logger = logging.getLogger("scheduler")
+
+
+def proximo_fechamento(periodo: str, agora_s: float) -> float:
+    """Instante (s, relógio do servidor) da próxima virada de vela do ``periodo`` após ``agora_s``.
+
+    Velas da Binance são alinhadas à época Unix em UTC (o ``1w`` começa na segunda-feira).
+    """
+    passo = INTERVALO_MS[periodo] / 1000
+    deslocamento = 4 * 86400 if periodo == "1w" else 0       # 01/01/1970 foi uma quinta-feira
+    return ((agora_s - deslocamento) // passo + 1) * passo + deslocamento
+
+
+class Backoff:
+    """Espera exponencial com jitter: ``base * 2^n``, limitada a ``maximo``, sorteada em ±``jitter``."""
+
+    def __init__(self, base_s: float = 1.0, maximo_s: float = 300.0, jitter: float = 0.5):
+        self.base_s = base_s
+        self.maximo_s = maximo_s
+        self.jitter = jitter
+        self.falhas = 0
+
+    def proxima(self) -> float:
+        espera = min(self.base_s * 2 ** self.falhas, self.maximo_s)
+        self.falhas += 1
+        return espera * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def zerar(self):
+        self.falhas = 0
+
+
+class Tarefa:
+    __slots__ = ("nome", "funcao", "args", "periodo", "margem_s", "quando", "backoff", "cancelada", "execucoes")
+
+    def __init__(self, nome: str, funcao, args: tuple, periodo: str, margem_s: float, backoff: Backoff):
+        self.nome = nome
+        self.funcao = funcao
+        self.args = args
+        self.periodo = periodo          # None: disparo único
+        self.margem_s = margem_s
+        self.quando = None
+        self.backoff = backoff
+        self.cancelada = False
+        self.execucoes = 0
+
+    def cancelar(self):
+        self.cancelada = True
+
+
+class Agendador:
+    def __init__(self, relogio=None, backoff_base_s: float = 1.0, backoff_max_s: float = 300.0,
+                 jitter: float = 0.5):
+        """``relogio``: segundos no relógio do servidor (padrão: relógio local)."""
+        self.relogio = relogio or time.time
+        self.backoff = (backoff_base_s, backoff_max_s, jitter)
+        self._heap = []                 # (quando, sequência, tarefa)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._acordar_async = None      # (loop, asyncio.Event) durante executar_async
+        self._parado = False
+
+    # ---------- Agenda ----------
+    def _empilhar(self, tarefa: Tarefa, quando: float):
+        tarefa.quando = quando
+        with self._lock:
+            heapq.heappush(self._heap, (quando, next(self._seq), tarefa))
+        self._sinalizar()
+
+    def _sinalizar(self):
+        self._acordar.set()
+        if self._acordar_async is not None:
+            loop, evento = self._acordar_async
+            loop.call_soon_threadsafe(evento.set)
+
+    def _proxima_vela(self, tarefa: Tarefa, depois_de: float) -> float:
+        # margem negativa (antecipação) mira a vela cujo disparo ainda não passou; o 1 µs evita
+        # que o arredondamento de ``quando - margem`` devolva a mesma virada já disparada
+        return proximo_fechamento(tarefa.periodo, depois_de - tarefa.margem_s + 1e-6) + tarefa.margem_s
+
+    def a_cada_vela(self, periodo: str, funcao, *args, margem_s: float = 0.0, nome: str = None) -> Tarefa:
+        """Chama ``funcao(*args)`` a cada fechamento de vela do ``periodo``, ``margem_s`` depois (ou antes)."""
+        if periodo not in INTERVALO_MS:
+            raise ValueError(f"Intervalo desconhecido: {periodo}")
+        tarefa = Tarefa(nome or f"{getattr(funcao, '__name__', 'tarefa')}[{periodo}]", funcao, args, periodo,
+                        margem_s, Backoff(*self.backoff))
+        self._empilhar(tarefa, self._proxima_vela(tarefa, self.relogio()))
+        return tarefa
+
+    def em(self, segundos: float, funcao, *args, nome: str = None) -> Tarefa:
+        """Disparo único daqui a ``segundos``."""
+        tarefa = Tarefa(nome or getattr(funcao, "__name__", "tarefa"), funcao, args, None, 0.0,
+                        Backoff(*self.backoff))
+        self._empilhar(tarefa, self.relogio() + segundos)
+        return tarefa
+
+    def cancelar(self, tarefa: Tarefa):
+        tarefa.cancelar()
+        self._sinalizar()
+
+    def parar(self):
+        self._parado = True
+        self._sinalizar()
+
+    @property
+    def tarefas(self) -> list:
+        with self._lock:
+            return sorted((t for _, _, t in self._heap if not t.cancelada), key=lambda t: t.quando)
+
+    # ---------- Disparo ----------
+    def _vencida(self):
+        """(tarefa vencida ou None, segundos até a próxima)."""
+        with self._lock:
+            while self._heap and self._heap[0][2].cancelada:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None, None
+            quando, _, tarefa = self._heap[0]
+            espera = quando - self.relogio()
+            if espera > 0:
+                return None, espera
+            heapq.heappop(self._heap)
+            return tarefa, 0.0
+
+    def _concluir(self, tarefa: Tarefa, erro: Exception = None):
+        """Reagenda: próxima vela após sucesso; após falha, backoff (se vier antes da próxima vela)."""
+        tarefa.execucoes += 1
+        agora = self.relogio()
+        if erro is None:
+            tarefa.backoff.zerar()
+            repetir = None
+        else:
+            repetir = agora + tarefa.backoff.proxima()
+            logger.warning(f"[Agenda] {tarefa.nome}: {erro}; nova tentativa em {repetir - agora:.1f}s")
+        if tarefa.cancelada:
+            return
+        if tarefa.periodo is None:
+            if repetir is not None:
+                self._empilhar(tarefa, repetir)
+            return
+        proxima = self._proxima_vela(tarefa, max(agora, tarefa.quando))
+        if repetir is not None and repetir < proxima:
+            self._empilhar(tarefa, repetir)
+        else:
+            tarefa.backoff.zerar()
+            self._empilhar(tarefa, proxima)
+
+    def executar(self):
+        """Laço bloqueante (uma thread): dispara as tarefas vencidas em sequência até ``parar()``."""
+        self._parado = False
+        while not self._parado:
+            tarefa, espera = self._vencida()
+            if tarefa is None:
+                self._acordar.wait(espera)
+                self._acordar.clear()
+                continue
+            try:
+                tarefa.funcao(*tarefa.args)
+            except Exception as e:
+                self._concluir(tarefa, e)
+            else:
+                self._concluir(tarefa)
+
+    async def _disparar_async(self, tarefa: Tarefa):
+        try:
+            if inspect.iscoroutinefunction(tarefa.funcao):
+                await tarefa.funcao(*tarefa.args)
+            else:
+                await asyncio.to_thread(tarefa.funcao, *tarefa.args)
+        except Exception as e:
+            self._concluir(tarefa, e)
+        else:
+            self._concluir(tarefa)
+
+    async def executar_async(self):
+        """Laço no event loop: cada disparo vira uma task (corrotina ou função em thread)."""
+        evento = asyncio.Event()
+        self._acordar_async = (asyncio.get_running_loop(), evento)
+        self._parado = False
+        pendentes = set()
+        try:
+            while not self._parado:
+                tarefa, espera = self._vencida()
+                if tarefa is None:
+                    try:
+                        await asyncio.wait_for(evento.wait(), espera)
+                    except asyncio.TimeoutError:
+                        pass
+                    evento.clear()
+                    continue
+                disparo = asyncio.create_task(self._disparar_async(tarefa))
+                pendentes.add(disparo)
+                disparo.add_done_callback(pendentes.discard)
+        finally:
+            self._acordar_async = None
+            for disparo in pendentes:
+                disparo.cancel()
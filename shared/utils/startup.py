@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Medição da partida dos robôs: fases da inicialização e custo de importação dos módulos.
+
+Na partida::
+
+    partida = MedidorPartida("futuros-SOLUSDT", orcamento_ms=3000)
+    with partida.fase("cliente"):
+        ...
+    partida.registrar(logger)      # tabela por fase + aviso se passar do orçamento
+
+Custo de importação (cada módulo em um interpretador novo, sem credenciais
+nem rede), para acompanhar regressões::
+
+    python -m shared.utils.startup                      # módulos padrão
+    python -m shared.utils.startup --orcamento-ms 300 crypto.strategies.sma_crossover
+
+Cada medição é anexada a ``logs/startup.jsonl``; o código de saída é 1 se
+algum módulo passar do orçamento.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import subprocess
+from contextlib import contextmanager
+
+from config.settings import Config
+
+logger = logging.getLogger("startup")
+
+# Código que testes, backtester e Telegram importam: precisa carregar sem rede e rápido
+MODULOS_PADRAO = (
+    "shared.indicators",
+    "shared.utils.data_fetcher",
+    "crypto.strategies.sma_crossover",
+    "crypto.strategies.backtest",
+    "crypto.sol_futures.futures_bot",
+    "crypto.src.main",
+    "telegram.src.bot",
+)
+ORCAMENTO_IMPORTACAO_MS = 300
+ARQUIVO_HISTORICO = os.path.join(Config.LOGS_DIR, "startup.jsonl")
+
+
+class MedidorPartida:
+    def __init__(self, nome: str, orcamento_ms: float = None):
+        self.nome = nome
+        self.orcamento_ms = orcamento_ms
+        self.fases = []                 # [(nome, ms)]
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def fase(self, nome: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases.append((nome, (time.perf_counter() - t0) * 1000))
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._inicio) * 1000
+
+    def relatorio(self) -> str:
+        total = self.total_ms
+        linhas = [f"Partida {self.nome}: {total:.0f} ms"]
+        for nome, ms in self.fases:
+            linhas.append(f"  {nome:<24} {ms:8.1f} ms  {100 * ms / total:5.1f}%")
+        return "\n".join(linhas)
+
+    def registrar(self, log: logging.Logger = logger, arquivo: str = ARQUIVO_HISTORICO):
+        log.info(f"[Partida]\n{self.relatorio()}")
+        if self.orcamento_ms is not None and self.total_ms > self.orcamento_ms:
+            log.warning(f"[Partida] {self.total_ms:.0f} ms acima do orçamento de {self.orcamento_ms:.0f} ms")
+        if arquivo:
+            _anexar(arquivo, {"tipo": "partida", "nome": self.nome, "total_ms": round(self.total_ms, 1),
+                              "fases": {n: round(ms, 1) for n, ms in self.fases}})
+
+
+def _anexar(arquivo: str, registro: dict):
+    try:
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+        registro["quando"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with open(arquivo, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro) + "\n")
+    except OSError as e:
+        logger.warning(f"[Partida] Não foi possível gravar {arquivo}: {e}")
+
+
+def medir_importacao(modulo: str, repeticoes: int = 3) -> float:
+    """Menor tempo (ms) de ``import modulo`` em um interpretador novo, sem variáveis de credencial."""
+    codigo = f"import time; t = time.perf_counter(); import {modulo}; print((time.perf_counter() - t) * 1000)"
+    ambiente = {k: v for k, v in os.environ.items() if "KEY" not in k and "SECRET" not in k and "TOKEN" not in k}
+    ambiente["PYTHONPATH"] = Config.BASE_DIR + os.pathsep + ambiente.get("PYTHONPATH", "")
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True,
+                               cwd=Config.BASE_DIR, env=ambiente, check=True)
+        melhor = min(melhor, float(saida.stdout.strip().splitlines()[-1]))
+    return melhor
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tempo de importação dos módulos dos robôs")
+    parser.add_argument("modulos", nargs="*", default=list(MODULOS_PADRAO))
+    parser.add_argument("--orcamento-ms", type=float, default=ORCAMENTO_IMPORTACAO_MS)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    estourados = 0
+    tempos = {}
+    for modulo in args.modulos:
+        try:
+            ms = medir_importacao(modulo, args.repeticoes)
+        except subprocess.CalledProcessError as e:
+            print(f"{modulo:<40} ERRO\n{e.stderr.strip()}")
+            estourados += 1
+            continue
+        tempos[modulo] = round(ms, 1)
+        marca = "" if ms <= args.orcamento_ms else f"  > {args.orcamento_ms:.0f} ms"
+        estourados += bool(marca)
+        print(f"{modulo:<40} {ms:8.1f} ms{marca}")
+    _anexar(ARQUIVO_HISTORICO, {"tipo": "importacao", "orcamento_ms": args.orcamento_ms, "modulos": tempos})
+    return 1 if estourados else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
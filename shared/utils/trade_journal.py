@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""Diário de operações e execuções: SQLite em WAL, somente-anexação, gravado fora da thread do robô.
+
+``DiarioOperacoes`` guarda duas coisas:
+
+- ``execucoes``: cada ordem executada (par, lado, quantidade, preço médio,
+  taxa). O diário mantém a posição por par (quantidade e preço médio de
+  entrada, como a Binance) e calcula o P&L realizado de cada execução e o
+  resultado de cada operação completa (de zerado a zerado, líquido de taxas).
+- ``operacoes``: a telemetria das decisões do robô (ação, preço visto,
+  força do sinal, saldo antes da ordem).
+
+A chamada de registro só calcula o P&L em memória e põe a linha em uma
+fila; uma thread grava em lote (uma transação por lote), então nada disso
+entra no tempo de envio da ordem. As consultas quentes
+(``estatisticas``, ``perdas_seguidas``) vêm de agregados em memória,
+reconstruídos do arquivo na abertura: sobrevivem a uma queda do processo.
+As últimas ``capacidade`` linhas de cada tipo ficam em anéis
+(``execucoes_recentes``/``operacoes_recentes``).
+
+Sem ``arquivo`` o diário fica só em memória (agregados e anéis).
+
+``ao_execucao`` registra ouvintes chamados com cada execução nova, já com o
+P&L calculado (ex.: notificações do Telegram, ``telegram/src/bot.py``).
+"""
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger("trade_journal")
+
+CAPACIDADE_PADRAO = 256
+JANELA_IDS = 1024                  # client order ids recentes lembrados além dos da operação aberta
+LOTE_MAX = 500
+EPSILON_QTD = 1e-12
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes (
+    id          INTEGER PRIMARY KEY,
+    t_ms        INTEGER NOT NULL,
+    par         TEXT    NOT NULL,
+    lado        TEXT    NOT NULL,
+    quantidade  REAL    NOT NULL,
+    preco       REAL    NOT NULL,
+    taxa        REAL    NOT NULL,
+    realizado   REAL    NOT NULL,   -- P&L bruto da parte que reduziu a posição
+    posicao     REAL    NOT NULL,   -- posição depois da execução
+    entrada     REAL    NOT NULL,   -- preço médio de entrada depois da execução
+    acumulado   REAL    NOT NULL,   -- resultado parcial da operação aberta
+    resultado   REAL,               -- resultado líquido se a execução zerou/inverteu a posição
+    id_cliente  TEXT    UNIQUE
+);
+CREATE INDEX IF NOT EXISTS execucoes_par_t ON execucoes (par, t_ms);
+CREATE TABLE IF NOT EXISTS operacoes (
+    id          INTEGER PRIMARY KEY,
+    t_ms        INTEGER NOT NULL,
+    par         TEXT    NOT NULL,
+    acao        TEXT    NOT NULL,
+    quantidade  REAL    NOT NULL,
+    preco       REAL    NOT NULL,
+    forca_sinal REAL,
+    saldo_usdt  REAL
+);
+"""
+
+CAMPOS_EXECUCAO = ("t_ms", "par", "lado", "quantidade", "preco", "taxa", "realizado", "posicao", "entrada",
+                   "acumulado", "resultado", "id_cliente")
+CAMPOS_OPERACAO = ("t_ms", "par", "acao", "quantidade", "preco", "forca_sinal", "saldo_usdt")
+
+
+class Estatisticas:
+    """Agregados de um par (ou de todos): P&L realizado, operações fechadas e sequência de perdas."""
+
+    __slots__ = ("pnl_realizado", "taxas", "execucoes", "operacoes", "ganhos", "perdas",
+                 "perdas_seguidas", "maior_sequencia_perdas", "ultimo_resultado_ms")
+
+    def __init__(self):
+        self.pnl_realizado = 0.0        # líquido de taxas, todas as execuções
+        self.taxas = 0.0
+        self.execucoes = 0
+        self.operacoes = 0              # operações fechadas (posição voltou a zero ou inverteu)
+        self.ganhos = 0
+        self.perdas = 0
+        self.perdas_seguidas = 0
+        self.maior_sequencia_perdas = 0
+        self.ultimo_resultado_ms = None
+
+    def _execucao(self, realizado: float, taxa: float):
+        self.pnl_realizado += realizado - taxa
+        self.taxas += taxa
+        self.execucoes += 1
+
+    def _resultado(self, resultado: float, t_ms: int):
+        self.operacoes += 1
+        self.ultimo_resultado_ms = t_ms
+        if resultado < 0:
+            self.perdas += 1
+            self.perdas_seguidas += 1
+            self.maior_sequencia_perdas = max(self.maior_sequencia_perdas, self.perdas_seguidas)
+        else:
+            self.ganhos += 1
+            self.perdas_seguidas = 0
+
+    def como_dict(self) -> dict:
+        return {c: getattr(self, c) for c in self.__slots__}
+
+
+class DiarioOperacoes:
+    def __init__(self, arquivo: str = None, capacidade: int = CAPACIDADE_PADRAO):
+        self.arquivo = arquivo
+        self.execucoes_recentes = deque(maxlen=capacidade)
+        self.operacoes_recentes = deque(maxlen=capacidade)
+        self._posicoes = {}             # par -> [posição, entrada, acumulado]
+        self._por_par = {}              # par -> Estatisticas
+        self._total = Estatisticas()
+        # Client order ids já registrados (evita dupla contagem REST/stream): os da operação
+        # aberta de cada par e os ``JANELA_IDS`` mais recentes
+        self._ids_abertos = {}          # par -> ids da operação aberta
+        self._ids_recentes = {}         # dict como conjunto ordenado (o mais antigo sai primeiro)
+        self._ouvintes = []
+        self._lock = threading.Lock()
+        self._fila = None
+        self._escritor = None
+        if arquivo:
+            os.makedirs(os.path.dirname(os.path.abspath(arquivo)), exist_ok=True)
+            self._reconstruir()
+            self._fila = queue.Queue()
+            self._escritor = threading.Thread(target=self._gravar, name="diario-sqlite", daemon=True)
+            self._escritor.start()
+            atexit.register(self.fechar)
+
+    # ---------- SQLite ----------
+    def _conectar(self) -> sqlite3.Connection:
+        conexao = sqlite3.connect(self.arquivo, timeout=30)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        return conexao
+
+    def _reconstruir(self):
+        """Refaz posições, agregados e anéis a partir do arquivo (partida após queda/reinício)."""
+        conexao = self._conectar()
+        try:
+            conexao.executescript(ESQUEMA)
+            cursor = conexao.execute(f"SELECT {', '.join(CAMPOS_EXECUCAO)} FROM execucoes ORDER BY id")
+            for linha in cursor:
+                e = dict(zip(CAMPOS_EXECUCAO, linha))
+                self._aplicar(e)
+                self._posicoes[e["par"]] = [e["posicao"], e["entrada"], e["acumulado"]]
+                self._lembrar(e)
+                self.execucoes_recentes.append(e)
+            cursor = conexao.execute(f"SELECT {', '.join(CAMPOS_OPERACAO)} FROM operacoes "
+                                     f"ORDER BY id DESC LIMIT ?", (self.operacoes_recentes.maxlen,))
+            self.operacoes_recentes.extend(dict(zip(CAMPOS_OPERACAO, l)) for l in reversed(cursor.fetchall()))
+        finally:
+            conexao.close()
+        if self._total.execucoes:
+            logger.info(f"[Diário] {self.arquivo}: {self._total.execucoes} execuções, "
+                        f"P&L realizado={self._total.pnl_realizado:.2f}")
+
+    def _gravar(self):
+        """Thread escritora: junta o que estiver na fila e grava em uma transação por lote."""
+        conexao = self._conectar()
+        ativo = True
+        while ativo:
+            lote = [self._fila.get()]
+            try:
+                while len(lote) < LOTE_MAX:     # o que chegou durante o último commit vai junto
+                    lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                pass
+            ativo = None not in lote
+            execucoes = [l[1] for l in lote if l is not None and l[0] == "execucao"]
+            operacoes = [l[1] for l in lote if l is not None and l[0] == "operacao"]
+            try:
+                with conexao:
+                    if execucoes:
+                        conexao.executemany(
+                            f"INSERT OR IGNORE INTO execucoes ({', '.join(CAMPOS_EXECUCAO)}) "
+                            f"VALUES ({', '.join('?' * len(CAMPOS_EXECUCAO))})", execucoes)
+                    if operacoes:
+                        conexao.executemany(
+                            f"INSERT INTO operacoes ({', '.join(CAMPOS_OPERACAO)}) "
+                            f"VALUES ({', '.join('?' * len(CAMPOS_OPERACAO))})", operacoes)
+            except sqlite3.Error as e:
+                logger.error(f"[Diário] Falha ao gravar {len(lote)} linha(s) em {self.arquivo}: {e}")
+            finally:
+                for _ in lote:
+                    self._fila.task_done()
+        conexao.close()
+
+    def descarregar(self):
+        """Bloqueia até tudo o que foi registrado estar no arquivo."""
+        if self._fila is not None and self._escritor.is_alive():
+            self._fila.join()
+
+    def fechar(self):
+        if self._escritor is not None and self._escritor.is_alive():
+            self._fila.put(None)
+            self._escritor.join()
+
+    # ---------- Registro ----------
+    def _registrado(self, id_cliente: str) -> bool:
+        return id_cliente in self._ids_recentes or any(id_cliente in ids for ids in self._ids_abertos.values())
+
+    def _lembrar(self, e: dict):
+        """Guarda o id da execução; ao fechar a operação, os ids dela ficam só na janela recente."""
+        ident, par = e["id_cliente"], e["par"]
+        if e["resultado"] is not None:
+            self._ids_abertos[par] = set()
+        if not ident:
+            return
+        if abs(e["posicao"]) >= EPSILON_QTD:        # abriu, aumentou ou inverteu: faz parte da operação aberta
+            self._ids_abertos.setdefault(par, set()).add(ident)
+        self._ids_recentes[ident] = None
+        if len(self._ids_recentes) > JANELA_IDS:
+            del self._ids_recentes[next(iter(self._ids_recentes))]
+
+    def _aplicar(self, e: dict):
+        por_par = self._por_par.get(e["par"])
+        if por_par is None:
+            por_par = self._por_par[e["par"]] = Estatisticas()
+        for est in (por_par, self._total):
+            est._execucao(e["realizado"], e["taxa"])
+            if e["resultado"] is not None:
+                est._resultado(e["resultado"], e["t_ms"])
+
+    def execucao(self, par: str, lado: str, quantidade: float, preco: float, taxa: float = 0.0,
+                 t_ms: int = None, id_cliente: str = None) -> dict:
+        """Registra uma ordem executada e devolve a linha (com P&L realizado e resultado, se fechou)."""
+        t_ms = int(time.time() * 1000) if t_ms is None else int(t_ms)
+        delta = quantidade if lado == "BUY" else -quantidade
+        with self._lock:
+            if id_cliente is not None and self._registrado(id_cliente):
+                return None
+            posicao, entrada, acumulado = self._posicoes.get(par, (0.0, 0.0, 0.0))
+            fecha = min(abs(delta), abs(posicao)) if posicao and (posicao > 0) != (delta > 0) else 0.0
+            abre = abs(delta) - fecha
+            realizado = fecha * (preco - entrada) * (1 if posicao > 0 else -1) if fecha else 0.0
+            taxa_fecha = taxa * fecha / abs(delta) if delta else 0.0
+            acumulado += realizado - taxa_fecha
+            nova = posicao + delta
+            resultado = None
+            if abs(nova) < EPSILON_QTD or (posicao and (nova > 0) != (posicao > 0)):
+                resultado, acumulado = acumulado, 0.0
+            if abs(nova) < EPSILON_QTD:
+                nova, entrada = 0.0, 0.0
+            elif abre:
+                base = abs(posicao) - fecha
+                entrada = (base * entrada + abre * preco) / (base + abre)
+            acumulado -= taxa - taxa_fecha
+            self._posicoes[par] = [nova, entrada, acumulado]
+            e = {"t_ms": t_ms, "par": par, "lado": lado, "quantidade": quantidade, "preco": preco,
+                 "taxa": taxa, "realizado": realizado, "posicao": nova, "entrada": entrada,
+                 "acumulado": acumulado, "resultado": resultado, "id_cliente": id_cliente}
+            self._aplicar(e)
+            self._lembrar(e)
+            self.execucoes_recentes.append(e)
+        if self._fila is not None:
+            self._fila.put(("execucao", tuple(e[c] for c in CAMPOS_EXECUCAO)))
+        for callback in self._ouvintes:
+            try:
+                callback(dict(e))
+            except Exception as erro:
+                logger.warning(f"[Diário] Ouvinte de execução falhou: {erro}")
+        return e
+
+    def ao_execucao(self, callback):
+        """Registra ``callback(execucao)``, chamado na thread que registrou cada execução nova."""
+        self._ouvintes.append(callback)
+
+    def operacao(self, par: str, acao: str, quantidade: float, preco: float, forca_sinal: float = None,
+                 saldo_usdt: float = None, t_ms: int = None):
+        t_ms = int(time.time() * 1000) if t_ms is None else int(t_ms)
+        o = {"t_ms": t_ms, "par": par, "acao": acao, "quantidade": quantidade, "preco": preco,
+             "forca_sinal": forca_sinal, "saldo_usdt": saldo_usdt}
+        self.operacoes_recentes.append(o)
+        if self._fila is not None:
+            self._fila.put(("operacao", tuple(o[c] for c in CAMPOS_OPERACAO)))
+
+    # ---------- Consultas ----------
+    def estatisticas(self, par: str = None) -> Estatisticas:
+        """Agregados do par (ou de todos os pares, com ``par`` None). O(1), sem acesso ao disco."""
+        if par is None:
+            return self._total
+        return self._por_par.get(par) or Estatisticas()
+
+    def perdas_seguidas(self, par: str = None) -> int:
+        return self.estatisticas(par).perdas_seguidas
+
+    def pnl_realizado(self, par: str = None) -> float:
+        return self.estatisticas(par).pnl_realizado
+
+    def pares(self) -> list:
+        """Pares com execuções registradas."""
+        return sorted(self._por_par)
+
+    def posicao(self, par: str) -> tuple:
+        """(quantidade, preço médio de entrada) segundo as execuções registradas."""
+        posicao, entrada, _ = self._posicoes.get(par, (0.0, 0.0, 0.0))
+        return posicao, entrada
+
+    def _consultar(self, tabela: str, campos: tuple, par: str, desde_ms: int) -> list:
+        if not self.arquivo:
+            recentes = self.execucoes_recentes if tabela == "execucoes" else self.operacoes_recentes
+            return [dict(l) for l in recentes
+                    if (par is None or l["par"] == par) and (desde_ms is None or l["t_ms"] >= desde_ms)]
+        self.descarregar()
+        condicoes, args = [], []
+        if par is not None:
+            condicoes.append("par = ?")
+            args.append(par)
+        if desde_ms is not None:
+            condicoes.append("t_ms >= ?")
+            args.append(int(desde_ms))
+        onde = f" WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        conexao = self._conectar()          # leitor próprio: o WAL não bloqueia a escrita
+        try:
+            cursor = conexao.execute(f"SELECT {', '.join(campos)} FROM {tabela}{onde} ORDER BY id", args)
+            return [dict(zip(campos, l)) for l in cursor]
+        finally:
+            conexao.close()
+
+    def execucoes(self, par: str = None, desde_ms: int = None) -> list:
+        """Histórico de execuções do arquivo (só o anel recente se o diário estiver em memória)."""
+        return self._consultar("execucoes", CAMPOS_EXECUCAO, par, desde_ms)
+
+    def operacoes(self, par: str = None, desde_ms: int = None) -> list:
+        return self._consultar("operacoes", CAMPOS_OPERACAO, par, desde_ms)
+
+
+_diarios = {}
+
+
+def obter_diario(arquivo: str = "") -> DiarioOperacoes:
+    """Diário único por arquivo; padrão ``DATA_DIR/diario_operacoes.sqlite`` (só memória sem ``DATA_DIR``)."""
+    if arquivo == "":
+        from config.settings import Config
+        arquivo = os.path.join(Config.DATA_DIR, "diario_operacoes.sqlite") if Config.DATA_DIR else None
+    diario = _diarios.get(arquivo)
+    if diario is None:
+        diario = _diarios[arquivo] = DiarioOperacoes(arquivo)
+    return diario
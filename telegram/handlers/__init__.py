@@ -0,0 +1 @@
+from .comandos import COMANDOS, ajuda, pnl, posicoes, status
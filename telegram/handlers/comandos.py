@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Comandos do bot do Telegram, respondidos só com o estado em memória (nenhuma chamada à exchange).
+
+Cada comando recebe o ``ServicoTelegram`` e devolve o texto da resposta. O
+estado vem de ``servico.contexto`` (no runtime, o próprio ``Runtime``):
+``instancias`` (sinal e médias de cada estratégia), ``conta`` (último
+instantâneo do ``EstadoConta`` e preços já em cache), ``diario`` (agregados
+do ``DiarioOperacoes``) e ``erros`` (erros seguidos por instância). O que
+faltar no contexto aparece como indisponível.
+"""
+import time
+
+
+def _do_contexto(servico, nome: str):
+    return getattr(servico.contexto, nome, None)
+
+
+def _duracao(segundos: float) -> str:
+    minutos = int(segundos // 60)
+    if minutos < 60:
+        return f"{minutos}min"
+    horas, minutos = divmod(minutos, 60)
+    if horas < 24:
+        return f"{horas}h{minutos:02d}"
+    dias, horas = divmod(horas, 24)
+    return f"{dias}d{horas:02d}h"
+
+
+def _hora(t_ms: int) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.gmtime(t_ms / 1000))
+
+
+def status(servico) -> str:
+    linhas = [f"Ativo há {_duracao(time.time() - servico.iniciado_em)}"]
+    conta = _do_contexto(servico, "conta")
+    if conta is not None and conta.atual is not None:
+        linhas.append(f"Conta: instantâneo de {conta.atual.idade_s:.0f}s atrás ({conta.atual.origem}), "
+                      f"stream de usuário {'ligado' if conta.stream_ativo else 'desligado'}")
+    erros = _do_contexto(servico, "erros") or {}
+    instancias = _do_contexto(servico, "instancias") or []
+    for inst in instancias:
+        texto = inst.nome
+        cruzamento = getattr(inst, "cruzamento", None)
+        if cruzamento is not None:
+            rapida, lenta = cruzamento.valores()
+            texto += f": {cruzamento.sinal()} (rápida={rapida:.6g}, lenta={lenta:.6g}"
+            if cruzamento.ultimo_t_open is not None:
+                texto += f", vela {_hora(cruzamento.ultimo_t_open)} UTC"
+            texto += ")"
+        if erros.get(inst.nome):
+            texto += f" | {erros[inst.nome]} erro(s) seguidos"
+        linhas.append(texto)
+    if not instancias:
+        linhas.append("Nenhuma instância neste processo")
+    if servico.descartados:
+        linhas.append(f"{servico.descartados} notificação(ões) descartada(s) aguardando envio")
+    return "\n".join(linhas)
+
+
+def _linha_pnl(nome: str, est) -> str:
+    return (f"{nome}: {est.pnl_realizado:+.2f} USDT | {est.operacoes} operação(ões), "
+            f"{est.ganhos} ganho(s) / {est.perdas} perda(s), taxas {est.taxas:.2f}"
+            + (f", {est.perdas_seguidas} perda(s) seguidas" if est.perdas_seguidas else ""))
+
+
+def pnl(servico) -> str:
+    diario = _do_contexto(servico, "diario")
+    if diario is None:
+        return "Diário de operações indisponível"
+    linhas = [_linha_pnl("Total", diario.estatisticas())]
+    linhas += [_linha_pnl(par, diario.estatisticas(par)) for par in diario.pares()]
+    return "\n".join(linhas)
+
+
+def posicoes(servico) -> str:
+    """Posições do último instantâneo da conta (ou, sem ele, as do diário), com P&L aberto pelo preço em cache."""
+    conta = _do_contexto(servico, "conta")
+    diario = _do_contexto(servico, "diario")
+    if conta is not None and conta.atual is not None:
+        abertas = dict(conta.atual.posicoes)
+        origem = f"conta, {conta.atual.idade_s:.0f}s atrás"
+    elif diario is not None:
+        abertas = {par: diario.posicao(par)[0] for par in diario.pares() if diario.posicao(par)[0]}
+        origem = "diário de operações"
+    else:
+        return "Estado da conta indisponível"
+    if not abertas:
+        return f"Nenhuma posição aberta ({origem})"
+    linhas = [f"Posições ({origem}):"]
+    for par, qtd in sorted(abertas.items()):
+        texto = f"{par}: {'LONG' if qtd > 0 else 'SHORT'} {abs(qtd):g}"
+        qtd_diario, entrada = diario.posicao(par) if diario is not None else (0.0, 0.0)
+        preco = conta.preco_em_cache(par) if conta is not None else None
+        if entrada and abs(qtd_diario - qtd) < 1e-9:
+            texto += f" @ {entrada:g}"
+            if preco is not None:
+                texto += f" | preço {preco:g} | aberto {qtd * (preco - entrada):+.2f} USDT"
+        elif preco is not None:
+            texto += f" | preço {preco:g}"
+        linhas.append(texto)
+    return "\n".join(linhas)
+
+
+def ajuda(servico) -> str:
+    return ("/status - instâncias, sinais e estado da conta\n"
+            "/pnl - P&L realizado (total e por par)\n"
+            "/positions - posições abertas e P&L aberto")
+
+
+COMANDOS = {
+    "/status": status,
+    "/pnl": pnl,
+    "/positions": posicoes,
+    "/posicoes": posicoes,
+    "/help": ajuda,
+    "/start": ajuda,
+}
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""Serviço do Telegram: notificações em lote e comandos respondidos com o estado em memória.
+
+Os robôs nunca esperam o Telegram. Execuções (``DiarioOperacoes.ao_execucao``)
+e erros (registros ``ERROR`` de qualquer logger, via ``ManipuladorAlertas``)
+entram numa fila em memória com um ``append`` na thread de quem publicou,
+sem rede. Uma tarefa do event loop junta o que chegou em ``agrupar_s``
+segundos em mensagens de até 4096 caracteres e respeita o intervalo mínimo
+entre mensagens do mesmo chat e o ``retry_after`` das respostas 429. A fila
+é limitada: com o Telegram fora do ar, os eventos mais antigos são
+descartados e a contagem aparece na mensagem seguinte.
+
+``/status``, ``/pnl`` e ``/positions`` (``telegram/handlers/comandos.py``) são
+respondidos com o que o processo já tem em memória (instâncias do runtime,
+instantâneo do ``EstadoConta``, agregados do diário), sem chamada à exchange.
+Só os chats configurados recebem notificações e respostas.
+
+O serviço fala direto com a Bot API HTTP por ``aiohttp`` (dependência do
+``ccxt``): o pacote ``telegram/`` deste repositório encobre o
+``python-telegram-bot``. No runtime ele é ligado pela chave ``telegram`` da
+configuração (``crypto/src/main.py``).
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+
+from shared.utils.scheduler import Backoff
+
+logger = logging.getLogger("telegram")
+
+URL_API = "https://api.telegram.org"
+LIMITE_TEXTO = 4096
+AGRUPAR_S = 2.0
+INTERVALO_CHAT_S = 1.0          # o Telegram aceita ~1 mensagem/s por chat
+CAPACIDADE_FILA = 1000
+TENTATIVAS_ENVIO = 5
+POLL_TIMEOUT_S = 25             # long polling do getUpdates
+
+
+class ErroTelegram(Exception):
+    def __init__(self, descricao: str, codigo: int = None, retry_after: float = None):
+        super().__init__(descricao)
+        self.codigo = codigo
+        self.retry_after = retry_after
+
+
+class ClienteBotAPI:
+    """Chamadas da Bot API (``POST /bot<token>/<método>``) numa sessão ``aiohttp`` reaproveitada."""
+
+    def __init__(self, token: str, url_base: str = URL_API, timeout_s: float = 10.0):
+        self.url = f"{url_base.rstrip('/')}/bot{token}"
+        self.timeout_s = timeout_s
+        self._sessao = None
+
+    async def chamar(self, metodo: str, timeout_s: float = None, **params):
+        import aiohttp
+
+        if self._sessao is None or self._sessao.closed:
+            self._sessao = aiohttp.ClientSession()
+        corpo = {k: v for k, v in params.items() if v is not None}
+        limite = aiohttp.ClientTimeout(total=timeout_s or self.timeout_s)
+        async with self._sessao.post(f"{self.url}/{metodo}", json=corpo, timeout=limite) as resposta:
+            dados = await resposta.json(content_type=None)
+        if not dados.get("ok"):
+            raise ErroTelegram(dados.get("description", f"HTTP {resposta.status}"),
+                               dados.get("error_code", resposta.status),
+                               (dados.get("parameters") or {}).get("retry_after"))
+        return dados["result"]
+
+    async def enviar_mensagem(self, chat_id, texto: str):
+        return await self.chamar("sendMessage", chat_id=chat_id, text=texto, disable_web_page_preview=True)
+
+    async def atualizacoes(self, offset: int = None, timeout_s: int = POLL_TIMEOUT_S) -> list:
+        return await self.chamar("getUpdates", timeout_s=timeout_s + 10, offset=offset, timeout=timeout_s,
+                                 allowed_updates=["message"])
+
+    async def fechar(self):
+        if self._sessao is not None:
+            await self._sessao.close()
+            self._sessao = None
+
+
+class ManipuladorAlertas(logging.Handler):
+    """Publica no serviço os registros ``ERROR`` (ou acima), exceto os do próprio serviço."""
+
+    def __init__(self, servico, nivel: int = logging.ERROR):
+        super().__init__(nivel)
+        self.servico = servico
+
+    def emit(self, registro: logging.LogRecord):
+        if registro.name == logger.name or registro.name.startswith(logger.name + "."):
+            return
+        try:
+            self.servico.publicar("erro", origem=registro.name, texto=registro.getMessage())
+        except Exception:
+            self.handleError(registro)
+
+
+def _linha(t: float, tipo: str, dados: dict) -> str:
+    hora = time.strftime("%H:%M:%S", time.gmtime(t))
+    if tipo == "execucao":
+        texto = f"{dados['lado']} {dados['quantidade']:g} {dados['par']} @ {dados['preco']:g}"
+        if dados.get("resultado") is not None:
+            texto += f" | resultado {dados['resultado']:+.2f} USDT"
+        elif dados.get("posicao"):
+            texto += f" | posição {dados['posicao']:g} (entrada {dados['entrada']:g})"
+        return f"{hora} {texto}"
+    if tipo == "erro":
+        return f"{hora} ERRO [{dados.get('origem', '?')}] {dados.get('texto', '')}"
+    return f"{hora} {dados.get('texto') or tipo}"
+
+
+def dividir(linhas, limite: int = LIMITE_TEXTO) -> list:
+    """Junta as linhas em mensagens de até ``limite`` caracteres (linhas maiores são cortadas)."""
+    mensagens, atual = [], ""
+    for linha in linhas:
+        linha = linha[:limite]
+        if atual and len(atual) + 1 + len(linha) > limite:
+            mensagens.append(atual)
+            atual = ""
+        atual = f"{atual}\n{linha}" if atual else linha
+    if atual:
+        mensagens.append(atual)
+    return mensagens
+
+
+class ServicoTelegram:
+    def __init__(self, token: str = None, chats=(), contexto=None, cliente: ClienteBotAPI = None,
+                 agrupar_s: float = AGRUPAR_S, intervalo_chat_s: float = INTERVALO_CHAT_S,
+                 capacidade: int = CAPACIDADE_FILA, alertar_erros: bool = True, comandos: dict = None,
+                 poll_timeout_s: int = POLL_TIMEOUT_S):
+        """``chats``: ids que recebem as notificações e podem usar os comandos.
+
+        ``contexto``: de onde os comandos leem o estado (o ``Runtime``:
+        ``instancias``, ``conta``, ``diario``, ``erros``). Sem ``token`` nem
+        ``cliente`` usa ``Config.TELEGRAM_BOT_TOKEN``.
+        """
+        if cliente is None:
+            if token is None:
+                from config.settings import Config
+                token = Config.TELEGRAM_BOT_TOKEN
+            if not token:
+                raise RuntimeError("Token do bot não encontrado (TELEGRAM_BOT_TOKEN)")
+            cliente = ClienteBotAPI(token)
+        if comandos is None:
+            from telegram.handlers import COMANDOS
+            comandos = COMANDOS
+        self.cliente = cliente
+        # ids numéricos podem vir como texto da configuração; "@canal" só recebe notificações
+        self.chats = [int(c) if str(c).lstrip("-").isdigit() else c for c in chats]
+        self.contexto = contexto
+        self.agrupar_s = agrupar_s
+        self.intervalo_chat_s = intervalo_chat_s
+        self.alertar_erros = alertar_erros
+        self.comandos = comandos
+        self.poll_timeout_s = poll_timeout_s
+        self.fila = deque(maxlen=capacidade)
+        self.descartados = 0
+        self.enviadas = 0
+        self.iniciado_em = time.time()
+        self._acordar = None            # (loop, asyncio.Event) enquanto ``executar`` roda
+        self._proximo_envio = {}        # chat -> monotonic a partir do qual pode enviar
+        self._offset = None
+
+    # ---------- Eventos ----------
+    def publicar(self, tipo: str, **dados):
+        """Enfileira um evento ('execucao', 'erro' ou texto livre em ``texto``); de qualquer thread, sem rede."""
+        if len(self.fila) == self.fila.maxlen:
+            self.descartados += 1
+        self.fila.append((time.time(), tipo, dados))
+        acordar = self._acordar
+        if acordar is not None:
+            loop, evento = acordar
+            try:
+                loop.call_soon_threadsafe(evento.set)
+            except RuntimeError:
+                pass                    # loop já encerrado
+
+    def acompanhar(self, diario):
+        """Notifica cada execução registrada no ``DiarioOperacoes``."""
+        diario.ao_execucao(lambda e: self.publicar("execucao", **e))
+
+    # ---------- Envio ----------
+    async def enviar(self, chat, texto: str, tentativas: int = TENTATIVAS_ENVIO) -> bool:
+        """Envia respeitando ``intervalo_chat_s`` por chat; repete em 429 (``retry_after``) e falha de rede."""
+        backoff = Backoff(base_s=1.0, maximo_s=60.0)
+        for tentativa in range(1, tentativas + 1):
+            agora = time.monotonic()
+            vez = max(agora, self._proximo_envio.get(chat, 0.0))
+            self._proximo_envio[chat] = vez + self.intervalo_chat_s      # reserva antes de dormir
+            if vez > agora:
+                await asyncio.sleep(vez - agora)
+            try:
+                await self.cliente.enviar_mensagem(chat, texto)
+                self.enviadas += 1
+                return True
+            except ErroTelegram as e:
+                if e.retry_after is not None:
+                    self._proximo_envio[chat] = time.monotonic() + float(e.retry_after)
+                    logger.warning(f"[Telegram] Limite de envio no chat {chat}; nova tentativa em {e.retry_after}s")
+                    continue
+                if e.codigo in (400, 403):
+                    logger.warning(f"[Telegram] Chat {chat} recusou a mensagem: {e}")
+                    return False
+                erro = e
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                erro = e
+            espera = backoff.proxima()
+            logger.warning(f"[Telegram] Falha ao enviar ({erro}); tentativa {tentativa + 1} em {espera:.1f}s")
+            await asyncio.sleep(espera)
+        logger.warning(f"[Telegram] Mensagem ao chat {chat} descartada após {tentativas} tentativas")
+        return False
+
+    async def descarregar(self):
+        """Envia tudo o que está na fila, agrupado em mensagens de até 4096 caracteres."""
+        linhas = []
+        while self.fila:
+            linhas.append(_linha(*self.fila.popleft()))
+        if self.descartados:
+            linhas.insert(0, f"({self.descartados} evento(s) descartado(s) com a fila cheia)")
+            self.descartados = 0
+        for texto in dividir(linhas):
+            for chat in self.chats:
+                await self.enviar(chat, texto)
+
+    async def _notificar(self):
+        _, evento = self._acordar
+        while True:
+            await evento.wait()
+            await asyncio.sleep(self.agrupar_s)         # junta o que chegar nesse meio-tempo
+            evento.clear()
+            await self.descarregar()
+
+    # ---------- Comandos ----------
+    async def responder(self, mensagem: dict):
+        texto = (mensagem.get("text") or "").strip()
+        chat = (mensagem.get("chat") or {}).get("id")
+        if not texto.startswith("/") or chat is None:
+            return
+        if chat not in self.chats:
+            logger.warning(f"[Telegram] Comando de chat não autorizado ({chat}) ignorado")
+            return
+        nome = texto.split()[0].split("@")[0].lower()
+        funcao = self.comandos.get(nome) or self.comandos["/help"]
+        try:
+            resposta = funcao(self)
+        except Exception as e:
+            logger.warning(f"[Telegram] {nome} falhou: {e}")
+            resposta = f"{nome} falhou: {e}"
+        for parte in dividir(resposta.split("\n")):
+            await self.enviar(chat, parte)
+
+    async def _comandos(self):
+        backoff = Backoff(base_s=1.0, maximo_s=60.0)
+        while True:
+            try:
+                atualizacoes = await self.cliente.atualizacoes(self._offset, self.poll_timeout_s)
+                backoff.zerar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                espera = backoff.proxima()
+                logger.warning(f"[Telegram] getUpdates falhou ({e}); nova tentativa em {espera:.1f}s")
+                await asyncio.sleep(espera)
+                continue
+            for a in atualizacoes:
+                self._offset = a["update_id"] + 1
+                if "message" in a:
+                    await self.responder(a["message"])
+
+    # ---------- Laço ----------
+    async def executar(self):
+        """Notificações e comandos até ser cancelado."""
+        self._acordar = (asyncio.get_running_loop(), asyncio.Event())
+        if self.fila:
+            self._acordar[1].set()
+        manipulador = None
+        if self.alertar_erros:
+            manipulador = ManipuladorAlertas(self)
+            logging.getLogger().addHandler(manipulador)
+        logger.info(f"[Telegram] Serviço iniciado para {len(self.chats)} chat(s)")
+        try:
+            await asyncio.gather(self._notificar(), self._comandos())
+        finally:
+            if manipulador is not None:
+                logging.getLogger().removeHandler(manipulador)
+            self._acordar = None
+            await self.cliente.fechar()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Utilitários do bot do Telegram pela linha de comando.
+
+Uso::
+
+    python -m telegram.src.main --chats                 # chats que mandaram mensagem ao bot (ids para a config)
+    python -m telegram.src.main --enviar 123456789 "teste"
+
+O serviço em si (notificações e comandos) roda dentro do runtime dos robôs,
+ligado pela chave ``telegram`` da configuração (``crypto/src/main.py``).
+"""
+import asyncio
+import logging
+import argparse
+
+from shared.utils.logger import configurar_logs
+from telegram.src.bot import ClienteBotAPI
+
+logger = logging.getLogger("telegram")
+
+
+async def listar_chats(cliente: ClienteBotAPI) -> dict:
+    """chat id -> nome, das mensagens pendentes no ``getUpdates``."""
+    chats = {}
+    try:
+        for a in await cliente.atualizacoes(timeout_s=0):
+            chat = (a.get("message") or {}).get("chat") or {}
+            if "id" in chat:
+                chats[chat["id"]] = chat.get("title") or chat.get("username") or chat.get("first_name", "")
+    finally:
+        await cliente.fechar()
+    return chats
+
+
+async def enviar(cliente: ClienteBotAPI, chat, texto: str):
+    try:
+        await cliente.enviar_mensagem(chat, texto)
+    finally:
+        await cliente.fechar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Utilitários do bot do Telegram")
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--chats", action="store_true", help="lista os chats que falaram com o bot")
+    grupo.add_argument("--enviar", nargs=2, metavar=("CHAT", "TEXTO"))
+    args = parser.parse_args(argv)
+
+    configurar_logs("telegram")
+    from config.settings import Config
+
+    if not Config.TELEGRAM_BOT_TOKEN:
+        parser.error("TELEGRAM_BOT_TOKEN não configurado")
+    cliente = ClienteBotAPI(Config.TELEGRAM_BOT_TOKEN)
+    if args.chats:
+        chats = asyncio.run(listar_chats(cliente))
+        for chat, nome in chats.items():
+            logger.info(f"{chat}\t{nome}")
+        if not chats:
+            logger.info("Nenhuma mensagem pendente: mande uma mensagem ao bot e repita")
+    else:
+        asyncio.run(enviar(cliente, args.enviar[0], args.enviar[1]))
+
+
+if __name__ == "__main__":
+    main()
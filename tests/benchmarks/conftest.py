@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Bancada de desempenho: fixture ``bancada`` com tempo, vazão por par e memória por vela.
+
+Desligada por padrão (os números dependem da máquina). Para rodar::
+
+    BANCADA=1 python -m pytest tests/benchmarks -q          # compara com baseline.json
+    BANCADA=salvar python -m pytest tests/benchmarks -q     # regrava a baseline
+
+Um teste falha quando a mediana por vela ou a memória por vela passa de
+``BANCADA_TOLERANCIA`` (padrão 1.5) vezes o valor da baseline.
+"""
+import os
+import gc
+import json
+import time
+import logging
+import statistics
+import tracemalloc
+
+import pytest
+
+ARQUIVO_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+MODO = os.getenv("BANCADA", "").lower()
+TOLERANCIA = float(os.getenv("BANCADA_TOLERANCIA", "1.5"))
+RODADAS = int(os.getenv("BANCADA_RODADAS", "7"))
+TEMPO_MIN_RODADA_S = 0.02
+
+_resultados = {}
+
+
+def _carregar_baseline() -> dict:
+    try:
+        with open(ARQUIVO_BASELINE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class Bancada:
+    def __init__(self, baseline: dict):
+        self.baseline = baseline
+
+    @staticmethod
+    def _iteracoes(funcao) -> int:
+        """Repetições por rodada para que cada rodada dure pelo menos ``TEMPO_MIN_RODADA_S``."""
+        n = 1
+        while True:
+            t0 = time.perf_counter()
+            for _ in range(n):
+                funcao()
+            if time.perf_counter() - t0 >= TEMPO_MIN_RODADA_S or n >= 1 << 16:
+                return n
+            n *= 2
+
+    @staticmethod
+    def _memoria(funcao) -> int:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            funcao()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def medir(self, nome: str, funcao, velas: int, par: str = "-") -> dict:
+        """Executa ``funcao`` em ``RODADAS`` rodadas; ``velas`` é quantas velas uma chamada processa."""
+        funcao()                                    # aquecimento (imports, caches)
+        n = self._iteracoes(funcao)
+        tempos = []
+        for _ in range(RODADAS):
+            t0 = time.perf_counter()
+            for _ in range(n):
+                funcao()
+            tempos.append((time.perf_counter() - t0) / n)
+        mediana = statistics.median(tempos)
+        r = {
+            "mediana_ms": mediana * 1000,
+            "min_ms": min(tempos) * 1000,
+            "velas_por_s": velas / mediana,
+            "bytes_por_vela": self._memoria(funcao) / velas,
+        }
+        chave = f"{nome}[{par}]"
+        _resultados[chave] = r
+        self._comparar(chave, r)
+        return r
+
+    def _comparar(self, chave: str, r: dict):
+        base = self.baseline.get(chave)
+        if MODO == "salvar" or base is None:
+            return
+        if r["mediana_ms"] > base["mediana_ms"] * TOLERANCIA:
+            pytest.fail(f"{chave}: {r['mediana_ms']:.3f} ms > {TOLERANCIA}x baseline ({base['mediana_ms']:.3f} ms)")
+        # Folga de 1 byte/vela para variações do alocador em medições minúsculas
+        if r["bytes_por_vela"] > base["bytes_por_vela"] * TOLERANCIA + 1:
+            pytest.fail(f"{chave}: {r['bytes_por_vela']:.1f} B/vela > {TOLERANCIA}x baseline "
+                        f"({base['bytes_por_vela']:.1f} B/vela)")
+
+
+@pytest.fixture(scope="session")
+def bancada():
+    if not MODO:
+        pytest.skip("bancada desligada (defina BANCADA=1 ou BANCADA=salvar)")
+    return Bancada(_carregar_baseline())
+
+
+@pytest.fixture(autouse=True)
+def _silenciar_logs():
+    """Logs INFO por chamada distorcem a medição."""
+    anterior = logging.root.manager.disable
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(anterior)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _resultados:
+        return
+    baseline = _carregar_baseline()
+    terminalreporter.section("bancada")
+    terminalreporter.write_line(f"{'medição':<42} {'mediana ms':>11} {'velas/s':>13} {'B/vela':>9} {'vs base':>8}")
+    for chave, r in sorted(_resultados.items()):
+        base = baseline.get(chave)
+        rel = f"{r['mediana_ms'] / base['mediana_ms']:.2f}x" if base else "novo"
+        terminalreporter.write_line(f"{chave:<42} {r['mediana_ms']:>11.3f} {r['velas_por_s']:>13,.0f} "
+                                    f"{r['bytes_por_vela']:>9.1f} {rel:>8}")
+
+
+def pytest_sessionfinish(session):
+    if MODO != "salvar" or not _resultados:
+        return
+    baseline = _carregar_baseline()
+    baseline.update({k: {c: round(v, 4) for c, v in r.items()} for k, r in _resultados.items()})
+    with open(ARQUIVO_BASELINE, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
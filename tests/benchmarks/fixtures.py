@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Velas para a bancada: gravadas da API (``dados/``) ou geradas de forma determinística.
+
+Os benchmarks rodam sem rede. Se existir ``dados/klines_<PAR>_<periodo>.json.gz``
+(lista crua de ``futures_klines``, campos numéricos em string), ela é usada;
+senão as velas são geradas com semente fixa no mesmo formato, com a escala
+de preço do par. Para gravar velas reais (uma vez, com rede)::
+
+    python -m tests.benchmarks.fixtures SOLUSDT BTCUSDT ETHUSDT --periodo 1h --velas 5000
+"""
+import os
+import sys
+import gzip
+import json
+import zlib
+import argparse
+
+import numpy as np
+
+from config.constants import INTERVALO_MS
+
+DIRETORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados")
+PARES = ("SOLUSDT", "BTCUSDT", "ETHUSDT")
+PERIODO = "1h"
+VELAS = 5000
+T_INICIAL_MS = 1_600_000_000_000 // 3_600_000 * 3_600_000
+PRECO_INICIAL = {"SOLUSDT": 25.0, "BTCUSDT": 30000.0, "ETHUSDT": 1800.0}
+
+
+def caminho(par: str, periodo: str = PERIODO) -> str:
+    return os.path.join(DIRETORIO, f"klines_{par}_{periodo}.json.gz")
+
+
+def gerar_klines(par: str, periodo: str = PERIODO, n: int = VELAS) -> list:
+    """Passeio aleatório com tendência alternada (gera cruzamentos), no formato cru da API."""
+    passo = INTERVALO_MS[periodo]
+    rng = np.random.default_rng(zlib.crc32(f"{par}:{periodo}".encode()))
+    tendencia = np.repeat(rng.normal(0, 0.002, n // 100 + 1), 100)[:n]
+    retornos = tendencia + rng.normal(0, 0.01, n)
+    fech = PRECO_INICIAL.get(par, 100.0) * np.exp(np.cumsum(retornos))
+    abert = np.concatenate([[fech[0]], fech[:-1]])
+    amplitude = np.abs(rng.normal(0, 0.004, n)) * fech
+    maxima = np.maximum(abert, fech) + amplitude
+    minima = np.minimum(abert, fech) - amplitude
+    volume = rng.gamma(2.0, 500.0, n)
+    negocios = rng.integers(500, 5000, n)
+    klines = []
+    for i in range(n):
+        t = T_INICIAL_MS + i * passo
+        klines.append([
+            t, f"{abert[i]:.4f}", f"{maxima[i]:.4f}", f"{minima[i]:.4f}", f"{fech[i]:.4f}",
+            f"{volume[i]:.3f}", t + passo - 1, f"{volume[i] * fech[i]:.4f}", int(negocios[i]),
+            f"{volume[i] / 2:.3f}", f"{volume[i] * fech[i] / 2:.4f}", "0",
+        ])
+    return klines
+
+
+def carregar_klines(par: str, periodo: str = PERIODO, n: int = VELAS) -> list:
+    arquivo = caminho(par, periodo)
+    if os.path.exists(arquivo):
+        with gzip.open(arquivo, "rt", encoding="utf-8") as f:
+            return json.load(f)[-n:]
+    return gerar_klines(par, periodo, n)
+
+
+def gravar(cliente, par: str, periodo: str = PERIODO, n: int = VELAS) -> int:
+    """Baixa as últimas ``n`` velas fechadas de Futuros e grava em ``dados/``."""
+    passo = INTERVALO_MS[periodo]
+    fim = cliente.futures_time()["serverTime"] // passo * passo
+    inicio = fim - n * passo
+    klines = []
+    while inicio < fim:
+        pagina = cliente.futures_klines(symbol=par, interval=periodo, startTime=inicio, limit=1500)
+        pagina = [k for k in pagina if k[0] < fim]
+        if not pagina:
+            break
+        klines.extend(pagina)
+        inicio = pagina[-1][0] + passo
+    os.makedirs(DIRETORIO, exist_ok=True)
+    with gzip.open(caminho(par, periodo), "wt", encoding="utf-8") as f:
+        json.dump(klines, f)
+    return len(klines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Grava velas reais para a bancada")
+    parser.add_argument("pares", nargs="*", default=list(PARES))
+    parser.add_argument("--periodo", default=PERIODO)
+    parser.add_argument("--velas", type=int, default=VELAS)
+    args = parser.parse_args(argv)
+
+    from crypto.src.binance_client import obter_cliente
+    cliente = obter_cliente()
+    for par in args.pares:
+        print(f"{par} {args.periodo}: {gravar(cliente, par, args.periodo, args.velas)} velas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
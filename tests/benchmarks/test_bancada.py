@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Caminhos quentes do robô: leitura de velas, sinal, tamanho da ordem e backtest."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import crypto.sol_futures.futures_bot as robo
+from config.settings import Config
+from crypto.src.order_executor import ExecutorOrdens
+from crypto.strategies.backtest import backtestar, varrer_grade
+from shared.indicators import ATR, RSI, VWAP, Bollinger, DesvioRetornos, Media, Painel
+from shared.utils import data_fetcher
+from shared.utils.data_fetcher import klines_para_array, CacheKlines
+from shared.utils.helpers import arredondar_passo
+from tests.benchmarks.fixtures import PARES, PERIODO, carregar_klines
+
+FILTROS = {
+    "MARKET_LOT_SIZE": {"stepSize": "0.001"},
+    "MIN_NOTIONAL": {"notional": "5"},
+}
+
+
+class ClienteGravado:
+    """Responde ``futures_klines`` a partir das velas da fixture, sem rede."""
+
+    def __init__(self, klines: list):
+        self.klines = klines
+
+    def futures_klines(self, symbol, interval, limit=500, startTime=None):
+        if startTime is None:
+            return self.klines[-limit:]
+        return [k for k in self.klines if k[0] >= startTime][:limit]
+
+
+class ContaFixa:
+    def __init__(self, saldo: float, preco: float):
+        self._saldo = saldo
+        self._preco = preco
+
+    def ao_evento(self, callback):
+        pass
+
+    def saldo(self, ativo="USDT"):
+        return self._saldo
+
+    def preco(self, par):
+        return self._preco
+
+
+@pytest.fixture(scope="module", params=PARES)
+def par(request):
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def klines(par):
+    return carregar_klines(par)
+
+
+@pytest.fixture(scope="module")
+def velas(klines):
+    return klines_para_array(klines)
+
+
+def test_klines_para_array(bancada, par, klines):
+    bancada.medir("klines_para_array", lambda: klines_para_array(klines), len(klines), par)
+
+
+def test_buscar_klines_fechados(bancada, par, klines, monkeypatch):
+    """Partida a frio: busca, conversão e DataFrame das últimas ``LIMITE_CANDLES`` velas."""
+    monkeypatch.setattr(robo, "cliente", ClienteGravado(klines))
+    monkeypatch.setattr(Config, "DATA_DIR", None)
+
+    def buscar():
+        data_fetcher._caches.clear()
+        return robo.buscar_klines_fechados(par, PERIODO)
+
+    assert len(buscar()) == robo.LIMITE_CANDLES
+    bancada.medir("buscar_klines_fechados", buscar, robo.LIMITE_CANDLES, par)
+    data_fetcher._caches.clear()
+
+
+def test_sinal_media_movel(bancada, par, klines):
+    cache = CacheKlines(ClienteGravado(klines).futures_klines, par, PERIODO, limite=robo.LIMITE_CANDLES)
+    cache.atualizar(agora_ms=klines[-1][0])
+    df = cache.dataframe(robo.LIMITE_CANDLES)
+    bancada.medir("sinal_media_movel", lambda: robo.sinal_media_movel(df), len(df), par)
+
+
+def test_sinal_incremental(bancada, par, velas, monkeypatch):
+    """Uma vela nova por chamada sobre o estado incremental das médias."""
+    cruzamento = robo.CruzamentoMedias(robo.MEDIA_RAPIDA, robo.MEDIA_LENTA, robo.TIPO_MEDIA)
+    monkeypatch.setattr(robo, "cruzamento", cruzamento)
+    base = len(velas) // 2
+    robo.sinal_incremental(velas[:base])
+    fim = [base]
+
+    def proxima():
+        fim[0] = fim[0] + 1 if fim[0] < len(velas) else base + 1
+        if fim[0] == base + 1:
+            cruzamento.reiniciar()
+            cruzamento.sincronizar(velas[:base])
+        return robo.sinal_incremental(velas[:fim[0]])
+
+    bancada.medir("sinal_incremental", proxima, 1, par)
+
+
+def test_arredondar_passo(bancada):
+    quantidades = np.random.default_rng(0).uniform(0.01, 500, 1000).tolist()
+    bancada.medir("arredondar_passo", lambda: [arredondar_passo(q, 0.001) for q in quantidades],
+                  len(quantidades))
+
+
+def test_calcular_quantidade(bancada, par, velas, monkeypatch):
+    preco = float(velas["close"][-1])
+    executor = ExecutorOrdens(None, ContaFixa(1000.0, preco), filtros={par: FILTROS})
+    monkeypatch.setattr(robo, "executor", executor)
+    assert robo.calcular_quantidade(par, robo.PCT_SALDO, robo.ALAVANCAGEM) > 0
+    bancada.medir("calcular_quantidade",
+                  lambda: robo.calcular_quantidade(par, robo.PCT_SALDO, robo.ALAVANCAGEM), 1, par)
+
+
+def test_backtestar(bancada, par, velas):
+    bancada.medir("backtestar", lambda: backtestar(velas, passo_qtd=0.001, notional_min=5.0), len(velas), par)
+
+
+def test_varrer_grade(bancada, par, velas):
+    """Grade 5..20 x 20..100 (passo 5): cada par da grade conta como uma passada pelas velas."""
+    rapidas, lentas = range(5, 21, 5), range(20, 101, 5)
+    n_pares = sum(1 for r in rapidas for l in lentas if r < l)
+    bancada.medir("varrer_grade", lambda: varrer_grade(velas, rapidas, lentas), len(velas) * n_pares, par)
+
+
+def test_painel_indicadores(bancada, par, velas):
+    """Sete indicadores sobre as mesmas velas em uma passada, em vetores float64."""
+    painel = Painel(sma7=Media(7), ema40=Media(40, "EMA"), atr14=ATR(14), vol20=DesvioRetornos(20),
+                    rsi14=RSI(14), bb20=Bollinger(20), vwap20=VWAP(20))
+    bancada.medir("painel_indicadores", lambda: painel.calcular(velas), len(velas), par)
+
+
+def test_indicadores_pandas(bancada, par, velas):
+    """Os mesmos indicadores pela via pandas (DataFrame, rolling, ewm), como referência."""
+    def calcular():
+        df = pd.DataFrame({c: velas[c] for c in ("high", "low", "close", "volume", "quote_vol")})
+        c = df["close"]
+        tr = pd.concat([df["high"] - df["low"], (df["high"] - c.shift()).abs(), (df["low"] - c.shift()).abs()],
+                       axis=1).max(axis=1)
+        variacao = c.diff()
+        ganhos = variacao.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+        perdas = (-variacao).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+        meio, desvio = c.rolling(20).mean(), c.rolling(20).std(ddof=0)
+        return {
+            "sma7": c.rolling(7).mean(),
+            "ema40": c.ewm(span=40, adjust=False).mean(),
+            "atr14": tr.ewm(alpha=1 / 14, adjust=False).mean(),
+            "vol20": c.pct_change().rolling(20).std(),
+            "rsi14": 100 - 100 / (1 + ganhos / perdas),
+            "bb20": (meio - 2 * desvio, meio, meio + 2 * desvio),
+            "vwap20": df["quote_vol"].rolling(20).sum() / df["volume"].rolling(20).sum(),
+        }
+
+    bancada.medir("indicadores_pandas", calcular, len(velas), par)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Backfill histórico sobre a corretora simulada (sem rede)."""
+import logging
+
+import numpy as np
+import pytest
+
+from config.constants import INTERVALO_MS
+from crypto.src.simulator import CorretoraSimulada, RelogioVirtual
+from shared.utils.candle_archive import ArquivoVelas
+from shared.utils import data_fetcher
+from shared.utils.data_fetcher import BaixadorHistorico, klines_para_array, paginas_download
+from tests.benchmarks.fixtures import gerar_klines
+
+PAR = "SOLUSDT"
+PASSO = INTERVALO_MS["1h"]
+
+
+@pytest.fixture(autouse=True)
+def _silencioso():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def relogio(velas):
+    relogio = RelogioVirtual(int(velas["t_close"][-1]) + 5_000)
+    with relogio.instalado(data_fetcher):
+        yield relogio
+
+
+@pytest.fixture
+def corretora(velas, relogio):
+    return CorretoraSimulada({PAR: velas}, "1h", relogio)
+
+
+@pytest.fixture
+def velas():
+    return klines_para_array(gerar_klines(PAR, "1h", 4000))
+
+
+def _baixador(corretora, tmp_path, **kwargs) -> BaixadorHistorico:
+    kwargs.setdefault("url_dumps", None)
+    return BaixadorHistorico(corretora.futures_klines, str(tmp_path), paralelo=4, **kwargs)
+
+
+def _confere_arquivo(tmp_path, esperadas: np.ndarray):
+    gravadas = ArquivoVelas(str(tmp_path), PAR, "1h").ultimas()
+    np.testing.assert_array_equal(gravadas["t_open"], esperadas["t_open"])
+    np.testing.assert_allclose(gravadas["close"], esperadas["close"], rtol=1e-7)   # a API devolve 8 dígitos
+
+
+def test_paginas_cobrem_o_intervalo_sem_sobreposicao():
+    inicio = int(np.datetime64("2024-01-15", "ms").astype(np.int64))
+    for meses in (False, True):
+        paginas = paginas_download(inicio, inicio + 5000 * PASSO, PASSO, 1000, meses=meses)
+        assert paginas[0][0] == inicio and paginas[-1][1] == inicio + 5000 * PASSO - 1
+        assert all(a[1] + 1 == b[0] for a, b in zip(paginas, paginas[1:]))
+        assert all(fim - ini < 1000 * PASSO for ini, fim, mes in paginas if mes is None)
+    assert [mes for *_, mes in paginas if mes] == [f"2024-{m:02d}" for m in range(2, 8)]   # até 10/08
+
+
+def test_download_completo_e_retomada_sem_duplicatas(corretora, velas, tmp_path):
+    inicio = int(velas["t_open"][0])
+    fim = int(velas["t_open"][2500])
+    primeiro = _baixador(corretora, tmp_path).baixar(PAR, "1h", inicio, fim)    # "interrompido" no meio
+    assert primeiro["velas"] == 2500 and primeiro["lacunas"] == 0
+
+    chamadas = corretora.chamadas["futures_klines"]
+    resumo = _baixador(corretora, tmp_path).baixar(PAR, "1h", inicio)           # até a última vela fechada
+    assert resumo["velas"] == len(velas) - 2500
+    assert corretora.chamadas["futures_klines"] - chamadas == 2                  # só as páginas que faltavam
+    _confere_arquivo(tmp_path, velas)
+    assert _baixador(corretora, tmp_path).baixar(PAR, "1h", inicio)["velas"] == 0
+
+
+def test_meses_do_dump_e_rest_quando_falta_dump(corretora, velas, tmp_path, monkeypatch):
+    pedidos = []
+
+    def dump(self, par, periodo, mes):
+        pedidos.append(mes)
+        if len(pedidos) == 2:
+            return None                                   # dump ainda não publicado: cai no REST
+        ini, fim = (np.datetime64(mes, "M") + np.array([0, 1])).astype("datetime64[ms]").astype(np.int64)
+        return velas[(velas["t_open"] >= ini) & (velas["t_open"] < fim)]
+
+    monkeypatch.setattr(BaixadorHistorico, "_dump", dump)
+    resumo = _baixador(corretora, tmp_path, url_dumps="http://dumps").baixar(PAR, "1h", int(velas["t_open"][0]))
+    assert len(pedidos) == 4 and resumo["lacunas"] == 0
+    assert corretora.chamadas["futures_klines"] == 3     # pontas + o mês sem dump; os demais meses sem REST
+    _confere_arquivo(tmp_path, velas)
+
+
+def test_lacunas_da_exchange_sao_contadas(velas, relogio, tmp_path):
+    com_lacunas = np.delete(velas, np.r_[1200:1210, 3100:3101])                     # manutenções
+    corretora = CorretoraSimulada({PAR: com_lacunas}, "1h", relogio)
+    resumo = _baixador(corretora, tmp_path).baixar(PAR, "1h", int(velas["t_open"][0]))
+    assert resumo["lacunas"] == 2 and resumo["velas"] == len(com_lacunas)
+    _confere_arquivo(tmp_path, com_lacunas)
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""Interface única de corretoras: python-binance (corretora simulada) e ccxt (exchange falsa), sem rede."""
+import time
+import asyncio
+import logging
+
+import numpy as np
+import pytest
+
+from crypto.src.exchange_info import InfoSimbolos
+from crypto.src.exchanges import CorretoraBinance, CorretoraCcxt, Corretoras, par_unificado
+from crypto.src.simulator import CorretoraSimulada
+from shared.utils.data_fetcher import klines_para_array
+from tests.benchmarks.fixtures import gerar_klines
+
+
+@pytest.fixture(autouse=True)
+def _silencioso():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+class ExchangeCcxtFalsa:
+    """Subconjunto do ``ccxt.async_support`` com números como o ccxt devolve (float, às vezes string/None)."""
+
+    precisionMode = 4                           # TICK_SIZE
+
+    def __init__(self, velas: np.ndarray, ask: float, latencia_s: float = 0.0, falhar: bool = False):
+        self.velas = velas
+        self.ask = ask
+        self.latencia_s = latencia_s
+        self.falhar = falhar
+        self.markets = {}
+        self.cargas = 0
+        self.ordens = []
+        self.fechada = False
+
+    async def _esperar(self):
+        await asyncio.sleep(self.latencia_s)
+        if self.falhar:
+            raise ConnectionError("exchange fora do ar")
+
+    async def load_markets(self):
+        self.cargas += 1
+        await self._esperar()
+        self.markets = {
+            "SOL/USDT:USDT": {"id": "SOL-USDT-SWAP", "symbol": "SOL/USDT:USDT", "base": "SOL", "quote": "USDT",
+                              "type": "swap", "linear": True, "precision": {"amount": 0.1, "price": "0.001"},
+                              "limits": {"amount": {"min": 0.1}, "cost": {"min": "5"}}},
+            "SOL/USD:SOL": {"id": "SOL-USD-SWAP", "symbol": "SOL/USD:SOL", "base": "SOL", "quote": "USD",
+                            "type": "swap", "linear": False},
+            "SOL/USDT": {"id": "SOL-USDT", "symbol": "SOL/USDT", "base": "SOL", "quote": "USDT", "type": "spot"},
+        }
+        return self.markets
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        await self._esperar()
+        v = self.velas if since is None else self.velas[self.velas["t_open"] >= since]
+        return [[int(x["t_open"]), float(x["open"]), str(x["high"]), x["low"], x["close"], x["volume"]]
+                for x in v[-limit:]]
+
+    async def fetch_ticker(self, symbol):
+        await self._esperar()
+        return {"symbol": symbol, "last": self.ask - 0.01, "bid": self.ask - 0.02, "ask": self.ask}
+
+    async def fetch_tickers(self, symbols=None):
+        await self._esperar()
+        return {s: {"symbol": s, "last": None, "close": "25.5", "bid": None, "ask": None} for s in symbols}
+
+    async def fetch_balance(self):
+        await self._esperar()
+        return {"total": {"USDT": "1000.5", "BNB": 0.0, "SOL": None}}
+
+    async def fetch_positions(self, symbols=None):
+        await self._esperar()
+        return [{"symbol": "SOL/USDT:USDT", "side": "short", "contracts": "3", "contractSize": 1.0},
+                {"symbol": "SOL/USDT:USDT", "side": "long", "contracts": 0, "contractSize": 1.0}]
+
+    async def create_order(self, symbol, type, side, amount, price=None, params=None):
+        await self._esperar()
+        self.ordens.append((symbol, type, side, amount, params))
+        return {"id": 77, "clientOrderId": params.get("clientOrderId"), "symbol": symbol, "status": "closed",
+                "amount": amount, "filled": str(amount), "average": "25.51"}
+
+    async def close(self):
+        self.fechada = True
+
+
+@pytest.fixture
+def velas():
+    return klines_para_array(gerar_klines("SOLUSDT", "1h", 200))
+
+
+def test_binance_normalizado_sobre_a_corretora_simulada(velas, tmp_path):
+    sim = CorretoraSimulada({"SOLUSDT": velas}, "1h", saldo=1000.0)
+    sim.relogio.agora_ms = int(velas["t_open"][150]) + 60_000
+    corretora = CorretoraBinance(sim, simbolos=InfoSimbolos(sim, diretorio=str(tmp_path)))
+
+    async def principal():
+        klines = await corretora.klines("SOL/USDT", "1h", limite=50)
+        ticker = await corretora.ticker("SOLUSDT")
+        filtros = await corretora.filtros("SOLUSDT")
+        ordem = await corretora.criar_ordem("SOL/USDT:USDT", "buy", 1.23456, id_cliente="t-1")
+        return klines, ticker, filtros, ordem, await corretora.saldos(), await corretora.posicoes()
+
+    klines, ticker, filtros, ordem, saldos, posicoes = asyncio.run(principal())
+    np.testing.assert_array_equal(klines["t_open"], velas["t_open"][101:151])
+    assert ticker["preco"] == pytest.approx(float(velas["close"][149]), rel=1e-6)
+    assert ticker["bid"] < ticker["preco"] < ticker["ask"]
+    assert filtros == {"passo_qtd": 0.001, "qtd_min": 0.001, "passo_preco": 0.0001, "nocional_min": 5.0}
+    assert ordem["estado"] == "FILLED" and ordem["id_cliente"] == "t-1" and ordem["par"] == "SOLUSDT"
+    assert ordem["executada"] == 1.234 and ordem["preco_medio"] == pytest.approx(ticker["preco"], rel=1e-6)
+    assert posicoes == {"SOLUSDT": 1.234} and 999.0 < saldos["USDT"] < 1000.0
+
+
+def test_ccxt_normaliza_simbolos_numeros_e_ordens(velas):
+    exchange = ExchangeCcxtFalsa(velas, ask=25.6)
+    corretora = CorretoraCcxt("okx", exchange=exchange)
+
+    async def principal():
+        simbolos = await asyncio.gather(*(corretora.simbolo(p) for p in ("SOLUSDT", "SOL/USDT", "SOL-USDT-SWAP")))
+        klines = await corretora.klines("SOLUSDT", "1h", limite=10)
+        resultado = (simbolos, klines, await corretora.ticker("SOLUSDT"), await corretora.tickers(["SOLUSDT"]),
+                     await corretora.saldos(), await corretora.posicoes(), await corretora.filtros("SOLUSDT"),
+                     await corretora.criar_ordem("SOLUSDT", "SELL", 0.5, reduzir=True, id_cliente="t-2"))
+        await corretora.fechar()
+        return resultado
+
+    simbolos, klines, ticker, tickers, saldos, posicoes, filtros, ordem = asyncio.run(principal())
+    assert exchange.cargas == 1 and set(simbolos) == {"SOL/USDT:USDT"}     # contrato linear, mercados carregados uma vez
+    np.testing.assert_array_equal(klines["t_open"], velas["t_open"][-10:])
+    np.testing.assert_allclose(klines["high"], velas["high"][-10:])
+    assert klines["t_close"][0] == velas["t_close"][-10]
+    assert ticker == {"par": "SOLUSDT", "preco": pytest.approx(25.59), "bid": pytest.approx(25.58), "ask": 25.6}
+    assert tickers == {"SOLUSDT": 25.5}
+    assert saldos == {"USDT": 1000.5} and posicoes == {"SOLUSDT": -3.0}
+    assert filtros == {"passo_qtd": 0.1, "qtd_min": 0.1, "passo_preco": 0.001, "nocional_min": 5.0}
+    assert exchange.ordens == [("SOL/USDT:USDT", "market", "sell", 0.5, {"clientOrderId": "t-2", "reduceOnly": True})]
+    assert ordem == {"id": "77", "id_cliente": "t-2", "par": "SOLUSDT", "lado": "SELL", "estado": "FILLED",
+                     "quantidade": 0.5, "executada": 0.5, "preco_medio": 25.51, "corretora": "okx"}
+    assert exchange.fechada
+    assert par_unificado("BTC/USDT") == "BTCUSDT"
+
+
+def test_varias_corretoras_em_paralelo_com_falha_isolada(velas):
+    grupo = Corretoras([
+        CorretoraCcxt("okx", exchange=ExchangeCcxtFalsa(velas, ask=25.6, latencia_s=0.1)),
+        CorretoraCcxt("bybit", exchange=ExchangeCcxtFalsa(velas, ask=25.4, latencia_s=0.1)),
+        CorretoraCcxt("kraken", exchange=ExchangeCcxtFalsa(velas, ask=25.0, latencia_s=0.1, falhar=True)),
+    ])
+
+    async def principal():
+        await grupo.em_todas("abrir")
+        t0 = time.perf_counter()
+        tickers = await grupo.em_todas("ticker", "SOLUSDT")
+        duracao = time.perf_counter() - t0
+        melhor = await grupo.melhor_preco("SOLUSDT", "BUY")
+        await grupo.fechar()
+        return tickers, duracao, melhor
+
+    tickers, duracao, melhor = asyncio.run(principal())
+    assert duracao < 0.18                                           # as três ao mesmo tempo, não em sequência
+    assert isinstance(tickers["kraken"], ConnectionError)
+    assert tickers["okx"]["ask"] == 25.6 and tickers["bybit"]["ask"] == 25.4
+    assert melhor == ("bybit", 25.4)
+
+
+def test_ccxt_sessao_propria_com_pool():
+    pytest.importorskip("ccxt")
+    corretora = CorretoraCcxt("binance", pool=4)
+
+    async def principal():
+        exchange = corretora._criar_exchange()
+        assert exchange.session is corretora.sessao and corretora.sessao.connector.limit == 4
+        corretora.exchange = exchange
+        await corretora.fechar()
+        return exchange
+
+    asyncio.run(principal())
+    assert corretora.sessao is None
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Runtime de forex contra uma conexão falsa do SDK do MetaApi (sem rede, sem o SDK instalado)."""
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from config.constants import INTERVALO_MS
+from crypto.src.simulator import RelogioVirtual
+from forex.src import metaapi_client
+from forex.src.main import RuntimeForex
+from forex.strategies.sma_crossover import arredondar_volume, id_cliente
+from shared.indicators import CruzamentoMedias
+from shared.utils import data_fetcher
+from shared.utils.data_fetcher import klines_para_array
+from shared.utils.scheduler import Agendador
+from tests.benchmarks.fixtures import gerar_klines
+
+PAR = "EURUSD"
+PASSO = INTERVALO_MS["1h"]
+ESPEC = {"symbol": PAR, "contractSize": 100_000, "minVolume": 0.01, "maxVolume": 100.0, "volumeStep": 0.01}
+CONFIG = {"instancias": [{"par": PAR, "periodo": "1h", "rapida": 7, "lenta": 40}]}
+
+
+@pytest.fixture(autouse=True)
+def _isolado(monkeypatch):
+    monkeypatch.setattr(data_fetcher, "_caches", {})
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _sem_fim_de_semana(velas: np.ndarray) -> np.ndarray:
+    """Remove de sexta 21h a domingo 21h UTC, como o pregão de FX."""
+    horas = velas["t_open"] // 3_600_000
+    dia = (horas // 24 + 3) % 7                 # 0 = segunda
+    hora = horas % 24
+    fechado = (dia == 5) | ((dia == 4) & (hora >= 21)) | ((dia == 6) & (hora < 21))
+    return velas[~fechado]
+
+
+def _dict(vela) -> dict:
+    return {"symbol": PAR, "timeframe": "1h", "time": datetime.fromtimestamp(vela["t_open"] / 1000, tz=timezone.utc),
+            "open": float(vela["open"]), "high": float(vela["high"]), "low": float(vela["low"]),
+            "close": float(vela["close"]), "tickVolume": int(vela["trades"])}
+
+
+class TerminalFalso:
+    def __init__(self):
+        self.positions = []
+        self.account_information = {"balance": 10_000.0, "currency": "USD"}
+        self.cotacoes = {}
+
+    def price(self, symbol):
+        return self.cotacoes.get(symbol)
+
+    def specification(self, symbol):
+        return ESPEC if symbol == PAR else None
+
+
+class ConexaoFalsa:
+    """``StreamingConnection``: sem métodos de consulta; as ordens atualizam o ``terminal_state`` na hora."""
+
+    def __init__(self):
+        self.terminal_state = TerminalFalso()
+        self.ouvintes = []
+        self.assinaturas = {}
+        self.ordens = []            # (perf_counter, tipo, alvo, volume, clientId)
+
+    def add_synchronization_listener(self, ouvinte):
+        self.ouvintes.append(ouvinte)
+
+    async def connect(self):
+        pass
+
+    async def wait_synchronized(self, opcoes=None):
+        pass
+
+    async def close(self):
+        pass
+
+    async def subscribe_to_market_data(self, symbol, subscriptions=None):
+        self.assinaturas[symbol] = subscriptions
+
+    async def create_market_buy_order(self, symbol, volume, stop_loss=None, take_profit=None, options=None):
+        ident = (options or {}).get("clientId")
+        self.ordens.append((time.perf_counter(), "BUY", symbol, volume, ident))
+        posicao = {"id": str(len(self.ordens)), "symbol": symbol, "type": "POSITION_TYPE_BUY", "volume": volume,
+                   "clientId": ident}
+        self.terminal_state.positions.append(posicao)
+        return {"numericCode": 10009, "stringCode": "TRADE_RETCODE_DONE", "positionId": posicao["id"]}
+
+    async def close_position(self, position_id, options=None):
+        posicao = next(p for p in self.terminal_state.positions if p["id"] == position_id)
+        self.ordens.append((time.perf_counter(), "CLOSE", position_id, posicao["volume"],
+                            (options or {}).get("clientId")))
+        self.terminal_state.positions.remove(posicao)
+        return {"numericCode": 10009, "stringCode": "TRADE_RETCODE_DONE", "positionId": position_id}
+
+    async def empurrar(self, vela):
+        """Uma atualização do stream: cotação e vela em formação."""
+        preco = {"symbol": PAR, "bid": float(vela["close"]), "ask": float(vela["close"]) + 0.0001}
+        self.terminal_state.cotacoes[PAR] = preco
+        for ouvinte in self.ouvintes:
+            await ouvinte.on_symbol_price_updated(0, preco)
+            await ouvinte.on_candles_updated(0, [_dict(vela)])
+
+
+class ContaFalsa:
+    """``MetatraderAccount``: histórico de trás para frente a partir de ``start_time`` (ou de agora)."""
+
+    def __init__(self, velas: np.ndarray, agora_ms):
+        self.velas = velas
+        self.agora_ms = agora_ms
+        self.conexao = ConexaoFalsa()
+        self.historicos = 0
+
+    def get_streaming_connection(self):
+        return self.conexao
+
+    async def get_historical_candles(self, symbol, timeframe, start_time=None, limit=None):
+        self.historicos += 1
+        fim = self.agora_ms() if start_time is None else min(self.agora_ms(), start_time.timestamp() * 1000)
+        visiveis = self.velas[self.velas["t_open"] <= fim][-(limit or 1000):]
+        return [_dict(v) for v in visiveis]
+
+
+def _velas(n: int, escala: float = 1.1) -> np.ndarray:
+    velas = klines_para_array(gerar_klines(PAR, "1h", n))
+    fator = escala / velas["close"][0]
+    for campo in ("open", "high", "low", "close"):
+        velas[campo] *= fator
+    return velas
+
+
+def _esperadas(velas: np.ndarray, inicio: int, fim: int) -> list:
+    """Ordens do 7 x 40 avaliado no fechamento de cada vela de ``inicio`` a ``fim - 1``."""
+    referencia, comprado, ordens = CruzamentoMedias(7, 40), False, []
+    for k in range(inicio, fim):
+        sinal = referencia.sincronizar(velas[:k + 1])
+        if sinal == "COMPRA" and not comprado:
+            ordens.append(("BUY", int(velas["t_open"][k])))
+            comprado = True
+        elif sinal == "VENDA" and comprado:
+            ordens.append(("CLOSE", int(velas["t_open"][k])))
+            comprado = False
+    return ordens
+
+
+def test_stream_fecha_velas_e_opera_como_o_cruzamento(tmp_path):
+    velas = _sem_fim_de_semana(_velas(1200))
+    inicio = 600
+    relogio = RelogioVirtual(int(velas["t_open"][inicio]) + PASSO // 2)
+    conta = ContaFalsa(velas, lambda: relogio.agora_ms)
+
+    async def principal():
+        runtime = RuntimeForex(CONFIG, conta=conta, agendador=Agendador(lambda: relogio.agora_ms / 1000),
+                               diretorio=str(tmp_path))
+        await runtime.iniciar()
+        cliente, cache = runtime.cliente, runtime.caches[(PAR, "1h")]
+        assert conta.conexao.assinaturas[PAR][1] == {"type": "candles", "timeframe": "1h"}
+        assert len(cache.fechadas) == inicio and int(cache.aberta["t_open"][0]) == int(velas["t_open"][inicio])
+        historicos = conta.historicos
+        for k in range(inicio, len(velas)):
+            relogio.agora_ms = int(velas["t_open"][k]) + 1_000
+            parcial = velas[k].copy()
+            parcial["high"] = parcial["low"] = parcial["close"] = parcial["open"]
+            await conta.conexao.empurrar(parcial)
+            await conta.conexao.empurrar(velas[k])
+            while cliente._tarefas:
+                await asyncio.sleep(0)
+        return runtime, cache, conta.historicos - historicos
+
+    with relogio.instalado(data_fetcher, metaapi_client):
+        runtime, cache, historicos = asyncio.run(principal())
+
+    np.testing.assert_array_equal(cache.fechadas["t_open"], velas["t_open"][:-1])
+    np.testing.assert_allclose(cache.fechadas["close"], velas["close"][:-1])
+    fins_de_semana = int((np.diff(velas["t_open"][inicio - 1:]) > PASSO).sum())
+    assert fins_de_semana >= 1 and historicos == fins_de_semana     # só as lacunas vão ao histórico
+    assert runtime.cliente.fechamentos == len(velas) - 1 - inicio
+
+    ordens = conta.conexao.ordens
+    esperadas = _esperadas(velas, inicio, len(velas) - 1)
+    assert len(esperadas) >= 2
+    assert [(tipo, ident) for _, tipo, _, _, ident in ordens] == [
+        (tipo, id_cliente(PAR, t, "BUY" if tipo == "BUY" else "SELL")) for tipo, t in esperadas]
+    # 10% do saldo x 10 em lotes de 100k pelo ask sincronizado (última cotação antes da avaliação)
+    for _, tipo, _, volume, ident in ordens:
+        if tipo == "BUY":
+            k = int(np.searchsorted(velas["t_open"], int(ident[len(PAR):-1]) * 1000)) + 1
+            assert volume == arredondar_volume(10_000 / ((velas["close"][k] + 0.0001) * 100_000), ESPEC) > 0
+    assert runtime.erros[runtime.instancias[0].nome] == 0
+
+
+def test_agendador_fecha_a_vela_no_fim_do_intervalo_e_envia_a_ordem(tmp_path):
+    # Queda longa e alta no fim: a última vela fechada dá COMPRA sem posição
+    fech = np.concatenate([np.linspace(1.20, 1.00, 50), np.linspace(1.00, 1.30, 12)])
+    velas = np.zeros(len(fech), dtype=data_fetcher.DTYPE_KLINE)
+    fim_ms = int(time.time() * 1000) + 300                    # a vela em formação fecha daqui a 0,3 s
+    t_fim = time.perf_counter() + (fim_ms / 1000 - time.time())
+    velas["t_open"] = fim_ms - PASSO * np.arange(len(fech), 0, -1)
+    velas["t_close"] = velas["t_open"] + PASSO - 1
+    for campo in ("open", "high", "low", "close"):
+        velas[campo] = fech
+    conta = ContaFalsa(velas, lambda: time.time() * 1000)
+
+    async def principal():
+        runtime = RuntimeForex(CONFIG, conta=conta, diretorio=str(tmp_path))
+        execucao = asyncio.create_task(runtime.executar())
+        while not runtime.cliente or not runtime.cliente._callbacks:
+            await asyncio.sleep(0.01)
+        assert len(conta.conexao.ordens) == 0
+        await conta.conexao.empurrar(velas[-1])             # a assinatura entrega a vela em formação
+        limite = time.monotonic() + 5
+        while not conta.conexao.ordens and time.monotonic() < limite:
+            await asyncio.sleep(0.005)
+        runtime.agendador.parar()
+        await execucao
+        return runtime
+
+    runtime = asyncio.run(principal())
+    assert [o[1] for o in conta.conexao.ordens] == ["BUY"]
+    t_ordem = conta.conexao.ordens[0][0]
+    atraso = t_ordem - t_fim
+    # fecha na virada + margem e a ordem sai em seguida, sem consulta no caminho
+    assert metaapi_client.MARGEM_FECHAMENTO_S - 0.05 < atraso < metaapi_client.MARGEM_FECHAMENTO_S + 0.1
+    assert runtime.cliente.fechamentos == 1 and conta.historicos == 1
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""Runtime multi-instância: envio em lote por executor, erros atribuídos a quem decidiu a ordem e trava da estratégia."""
+import asyncio
+import logging
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from crypto.src.main import Runtime
+from crypto.src.order_executor import ExecutorOrdens
+from crypto.strategies.sma_crossover import EstrategiaCruzamento
+from shared.utils.data_fetcher import klines_para_array
+from tests.benchmarks.fixtures import gerar_klines
+
+FILTROS = {"MARKET_LOT_SIZE": {"stepSize": "0.001", "minQty": "0.001"}, "MIN_NOTIONAL": {"notional": "5"}}
+T_VELA = 1_700_000_000_000
+
+
+@pytest.fixture(autouse=True)
+def _silencioso():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+class ClienteLote:
+    """Executa tudo, menos as ordens de ``recusar`` (margem insuficiente)."""
+
+    def __init__(self, recusar=()):
+        self.recusar = set(recusar)
+        self.lotes = []
+        self.individuais = []
+
+    def _resposta(self, o: dict) -> dict:
+        if o["symbol"] in self.recusar:
+            return {"code": -2019, "msg": "Margin is insufficient."}
+        return {"orderId": len(self.lotes) + len(self.individuais), "symbol": o["symbol"], "status": "FILLED",
+                "clientOrderId": o["newClientOrderId"], "side": o["side"], "origQty": o["quantity"],
+                "executedQty": o["quantity"], "avgPrice": "10.0", "updateTime": T_VELA}
+
+    def futures_place_batch_order(self, batchOrders, **params):
+        self.lotes.append([o["newClientOrderId"] for o in batchOrders])
+        return [self._resposta(o) for o in batchOrders]
+
+    def futures_create_order(self, **params):
+        self.individuais.append(params["newClientOrderId"])
+        return self._resposta(params)
+
+
+class InstanciaFalsa:
+    def __init__(self, par: str, executor: ExecutorOrdens, prefixo: str, falhar: bool = False):
+        self.par = par
+        self.executor = executor
+        self.prefixo = prefixo
+        self.falhar = falhar
+        self.nome = f"{par}:1h:{prefixo}"
+        executor.definir_filtros(par, FILTROS)
+
+    def decidir(self, cache):
+        if self.falhar:
+            raise RuntimeError("sem velas")
+        return "COMPRA", self.executor.preparar(self.par, "BUY", 1.0, T_VELA, prefixo=self.prefixo)
+
+
+def test_um_lote_por_executor_e_erro_na_instancia_certa():
+    compartilhado = ClienteLote(recusar={"XRPUSDT"})
+    executor = ExecutorOrdens(compartilhado, espera_s=0.0)
+    proprio = ClienteLote()
+    instancias = [
+        InstanciaFalsa("SOLUSDT", executor, "czS7x40"),
+        InstanciaFalsa("XRPUSDT", executor, "czS7x40"),
+        InstanciaFalsa("SOLUSDT", executor, "czE9x21"),
+        InstanciaFalsa("BTCUSDT", ExecutorOrdens(proprio, espera_s=0.0), "cz1h"),
+        InstanciaFalsa("ETHUSDT", executor, "czS7x40", falhar=True),
+    ]
+    caches = [object(), object()]
+    runtime = Runtime({})
+    runtime.por_cache = {id(caches[0]): instancias[:3], id(caches[1]): instancias[3:]}
+
+    asyncio.run(runtime.avaliar_lote(caches))
+
+    assert compartilhado.lotes == [["czS7x40-SOLUSDT-1700000000-B", "czS7x40-XRPUSDT-1700000000-B",
+                                    "czE9x21-SOLUSDT-1700000000-B"]]
+    assert proprio.individuais == ["cz1h-BTCUSDT-1700000000-B"] and not proprio.lotes
+    assert runtime.erros == {"SOLUSDT:1h:czS7x40": 0, "XRPUSDT:1h:czS7x40": 1, "SOLUSDT:1h:czE9x21": 0,
+                             "BTCUSDT:1h:cz1h": 0, "ETHUSDT:1h:czS7x40": 1}
+
+
+def test_prefixo_distingue_estrategias_no_mesmo_par():
+    executor = ExecutorOrdens(ClienteLote(), filtros={"SOLUSDT": FILTROS})
+    sma = EstrategiaCruzamento(None, "SOLUSDT", "1h", 7, 40, "SMA", conta=object(), executor=executor)
+    ema = EstrategiaCruzamento(None, "SOLUSDT", "1h", 9, 21, "ema", conta=object(), executor=executor)
+    assert (sma.prefixo, ema.prefixo) == ("cz1hS7x40", "cz1hE9x21")
+    ordens = [e.executor.preparar("SOLUSDT", "BUY", 1.0, T_VELA, prefixo=e.prefixo) for e in (sma, ema)]
+    assert ordens[0] is not ordens[1] and len(executor.ordens) == 2
+    assert all(len(o.id_cliente) <= 36 and o.id_cliente.endswith("-B") for o in ordens)
+
+
+def test_antecipacao_espera_o_ciclo_do_fechamento():
+    estrategia = EstrategiaCruzamento(None, "SOLUSDT", "1h", filtros=FILTROS, conta=object(),
+                                      executor=ExecutorOrdens(ClienteLote(), espera_s=0.0))
+    velas = klines_para_array(gerar_klines("SOLUSDT", "1h", 60))
+    cache = SimpleNamespace(fechadas=velas[:-1], aberta=velas[-1:])
+    sincronizadas = []
+    sincronizar = estrategia.cruzamento.sincronizar
+    estrategia.cruzamento.sincronizar = lambda fechadas: sincronizadas.append(threading.current_thread()) \
+        or sincronizar(fechadas)
+    estrategia.posicao_aberta = lambda: 0.0
+    estrategia.calcular_quantidade = lambda: 0.0
+
+    with estrategia.trava:                                  # ciclo do fechamento em andamento
+        antecipacao = threading.Thread(target=estrategia.antecipar, args=(cache,))
+        antecipacao.start()
+        antecipacao.join(0.1)
+        assert antecipacao.is_alive() and sincronizadas == []
+    antecipacao.join(1.0)
+    assert not antecipacao.is_alive() and sincronizadas == [antecipacao]
+
+
+def test_config_com_par_repetido_e_recusada():
+    runtime = Runtime({"instancias": [
+        {"par": "SOLUSDT", "periodo": "1h", "alavancagem": 2},
+        {"par": "BTCUSDT", "periodo": "1h", "alavancagem": 2},
+        {"par": "SOLUSDT", "periodo": "4h", "alavancagem": 5},
+    ]}, cliente=ClienteLote())
+    with pytest.raises(ValueError, match="Mais de uma instância para SOLUSDT"):
+        asyncio.run(runtime.iniciar())
+    assert runtime.instancias == []
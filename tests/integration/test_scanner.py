@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Varredura multi-símbolo sobre a corretora simulada (sem rede)."""
+import logging
+
+import numpy as np
+import pytest
+
+from crypto.src.exchange_info import InfoSimbolos
+from crypto.src.simulator import CorretoraSimulada, RelogioVirtual
+from crypto.strategies.scanner import Varredura, ranking
+from shared.indicators import CruzamentoMedias, desvio_retornos
+from shared.utils import data_fetcher
+from shared.utils.data_fetcher import klines_para_array
+from tests.benchmarks.fixtures import gerar_klines
+
+PARES = [f"T{i:02d}USDT" for i in range(12)]
+VELAS = 500
+
+
+@pytest.fixture(autouse=True)
+def _isolado():
+    logging.disable(logging.INFO)
+    data_fetcher._caches.clear()
+    yield
+    data_fetcher._caches.clear()
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def corretora():
+    velas = {par: klines_para_array(gerar_klines(par, "1h", 2000)) for par in PARES}
+    velas["NOVOUSDT"] = klines_para_array(gerar_klines("NOVOUSDT", "1h", 2000))[1300:]     # listado há pouco
+    relogio = RelogioVirtual(int(velas[PARES[0]]["t_close"][1500]) + 5_000)
+    corretora = CorretoraSimulada(velas, "1h", relogio)
+    with relogio.instalado(data_fetcher):
+        yield corretora
+
+
+def _varredura(corretora, tmp_path, volume_min: float = 0, **kwargs) -> Varredura:
+    simbolos = InfoSimbolos(corretora, diretorio=str(tmp_path))
+    simbolos.atualizar()
+    return Varredura(corretora, "1h", velas=VELAS, volume_min=volume_min, simbolos=simbolos,
+                     diretorio=str(tmp_path), **kwargs)
+
+
+def test_mesmo_sinal_e_desvio_que_o_robo(corretora, tmp_path):
+    resultado = _varredura(corretora, tmp_path).executar()
+    assert sorted(resultado["par"]) == PARES                        # NOVOUSDT sem histórico suficiente
+    fim = int(np.searchsorted(corretora.velas[PARES[0]]["t_close"], corretora.agora_ms))
+    for r in resultado:
+        fechamentos = corretora.velas[str(r["par"])]["close"][fim - (VELAS - 1):fim]
+        cruzamento = CruzamentoMedias(7, 40)
+        assert r["sinal"] == cruzamento.aquecer(fechamentos)
+        assert r["rapida"] == pytest.approx(cruzamento.valores()[0], rel=1e-9)
+        assert r["desvio"] == pytest.approx(desvio_retornos(fechamentos[-21:], 20)[-1], rel=1e-9)
+        velas_15m = corretora.futures_klines(symbol=str(r["par"]), interval="15m", limit=21)
+        fechamentos_15m = np.array([float(k[4]) for k in velas_15m[:-1]])   # como ``mercado_volatil``
+        assert r["desvio_15m"] == pytest.approx(desvio_retornos(fechamentos_15m, 19)[-1], rel=1e-9)
+        assert r["volatil"] == (r["desvio_15m"] > 0.05)
+    elegiveis = resultado[resultado["elegivel"]]
+    assert (elegiveis["sinal"] == "COMPRA").all() and not elegiveis["volatil"].any()
+    assert list(elegiveis["forca"]) == sorted(elegiveis["forca"], reverse=True)
+    assert ranking(resultado, 3) == [str(p) for p in elegiveis["par"][:3]]
+    assert corretora.chamadas["futures_ticker"] == corretora.chamadas["futures_orderbook_ticker"] == 1
+
+
+def test_segunda_varredura_busca_so_as_velas_novas(corretora, tmp_path, monkeypatch):
+    varredura = _varredura(corretora, tmp_path)
+    varredura.executar()
+    limites, volatilidade = [], []
+    original = corretora.futures_klines
+
+    def espiar(**params):
+        (limites if params["interval"] == "1h" else volatilidade).append(params["limit"])
+        return original(**params)
+
+    monkeypatch.setattr(corretora, "futures_klines", espiar)
+    corretora.relogio.avancar_ms(3 * 3600_000)
+    data_fetcher._caches.clear()                                    # reinício: recarrega do arquivo local
+    resultado = varredura.executar()
+    assert len(resultado) == len(PARES)
+    assert len(limites) == len(PARES) + 1 and max(limites) < 100    # uma chamada leve por par
+    assert volatilidade == [21] * len(PARES)                         # + 20 velas de 15m fechadas por par
+
+
+def test_filtros_de_liquidez_e_volatilidade(corretora, tmp_path):
+    tudo = _varredura(corretora, tmp_path).executar()
+    volume_corte = float(np.median(tudo["volume_24h"]))
+    data_fetcher._caches.clear()
+    liquidos = _varredura(corretora, tmp_path, volume_min=volume_corte).executar()
+    assert set(liquidos["par"]) == set(tudo["par"][tudo["volume_24h"] >= volume_corte])
+    data_fetcher._caches.clear()
+    calmos = _varredura(corretora, tmp_path, desvio_limite=0.0).executar()
+    assert calmos["volatil"].all() and not calmos["elegivel"].any()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Replay do ``loop_principal`` do robô de Futuros na corretora simulada (sem rede)."""
+import logging
+
+import numpy as np
+import pytest
+
+import crypto.sol_futures.futures_bot as robo
+from crypto.src.simulator import CorretoraSimulada, RelogioVirtual, reproduzir
+from crypto.strategies.backtest import backtestar
+from shared.utils.data_fetcher import klines_para_array
+from tests.benchmarks.fixtures import gerar_klines
+
+AQUECIMENTO = 1000
+HORAS_ANO = 365 * 24
+
+
+@pytest.fixture(scope="module")
+def velas():
+    return klines_para_array(gerar_klines("SOLUSDT", "1h", AQUECIMENTO + HORAS_ANO))
+
+
+@pytest.fixture(autouse=True)
+def _sem_logs_info():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def test_klines_visiveis_ate_o_relogio(velas):
+    relogio = RelogioVirtual(int(velas["t_close"][9]) + 1)
+    corretora = CorretoraSimulada({"SOLUSDT": velas[:50]}, "1h", relogio)
+    kl = corretora.futures_klines(symbol="SOLUSDT", interval="1h", limit=5)
+    assert [k[0] for k in kl] == velas["t_open"][6:11].tolist()
+    assert kl[-1][1] == kl[-1][4]                       # em formação: só a abertura
+    assert corretora.preco("SOLUSDT") == pytest.approx(velas["close"][9])
+    relogio.avancar_ms(3600_000)
+    assert corretora.futures_klines(symbol="SOLUSDT", interval="1h", limit=1)[0][0] == int(velas["t_open"][11])
+    assert len(corretora.futures_klines(symbol="SOLUSDT", interval="4h", limit=10)) == 3
+
+
+def test_resposta_ack_ou_result_como_a_binance(velas):
+    relogio = RelogioVirtual(int(velas["t_close"][99]) + 1)
+    corretora = CorretoraSimulada({"SOLUSDT": velas[:200]}, "1h", relogio, saldo=1000.0)
+    ack = corretora.futures_create_order(symbol="SOLUSDT", side="BUY", type="MARKET", quantity="1.000",
+                                         newClientOrderId="a-1")
+    assert ack["status"] == "NEW" and ack["executedQty"] == "0" and ack["clientOrderId"] == "a-1"
+    consulta = corretora.futures_get_order(symbol="SOLUSDT", origClientOrderId="a-1")
+    assert consulta["status"] == "FILLED" and consulta["executedQty"] == "1.000"
+
+    result = corretora.futures_create_order(symbol="SOLUSDT", side="SELL", type="MARKET", quantity="1.000",
+                                            newClientOrderId="a-2", newOrderRespType="RESULT")
+    assert result["status"] == "FILLED" and result["executedQty"] == "1.000"
+    assert float(result["avgPrice"]) == pytest.approx(velas["close"][99])
+    lote = corretora.futures_place_batch_order(batchOrders=[
+        {"symbol": "SOLUSDT", "side": "BUY", "type": "MARKET", "quantity": "1.000", "newClientOrderId": "a-3"},
+        {"symbol": "SOLUSDT", "side": "SELL", "type": "MARKET", "quantity": "1.000", "newClientOrderId": "a-4",
+         "newOrderRespType": "RESULT"},
+    ])
+    assert [r["status"] for r in lote] == ["NEW", "FILLED"]
+
+
+def test_ano_de_h1_igual_ao_backtest(velas, monkeypatch):
+    monkeypatch.setattr(robo, "MAX_PERDAS_SEGUIDAS", None)     # o backtest não tem circuit breaker
+    r = reproduzir(velas, aquecimento=AQUECIMENTO)
+    b = backtestar(velas, passo_qtd=0.001, notional_min=5.0, inicio=AQUECIMENTO)
+
+    assert r["velas"] == HORAS_ANO
+    # Um instantâneo da conta por ciclo: o da partida + um por vela seguinte (a última não tem sucessora)
+    assert r["chamadas"]["futures_account"] == HORAS_ANO
+    compras = [e for e in r["execucoes"] if e["lado"] == "BUY"]
+    vendas = [e for e in r["execucoes"] if e["lado"] == "SELL"]
+    assert len(compras) == len(b["trades"])
+    assert [e["preco"] for e in compras] == pytest.approx([t["preco_entrada"] for t in b["trades"]])
+    assert [e["quantidade"] for e in compras] == pytest.approx([t["quantidade"] for t in b["trades"]])
+    assert len(vendas) == sum(t["preco_saida"] is not None for t in b["trades"])
+    capital_final = b["curva"][-1] if r["posicoes"] else b["trades"][-1]["capital_depois"]
+    assert r["saldo"] + r["pnl_aberto"] == pytest.approx(capital_final, rel=1e-9)
+
+    # Diário: uma operação fechada por venda, P&L e taxas iguais aos da corretora (taxa pelos trades)
+    assert r["diario"]["operacoes"] == len(vendas)
+    assert r["diario"]["taxas"] == pytest.approx(r["taxas"])
+    assert r["diario"]["pnl_realizado"] == pytest.approx(sum(e["realizado"] - e["taxa"] for e in r["execucoes"]))
+    assert [o["acao"] for o in r["operacoes"]] == ["COMPRA" if e["lado"] == "BUY" else "VENDA"
+                                                   for e in r["execucoes"]]
+
+
+def test_circuit_breaker_suspende_entradas(velas):
+    r = reproduzir(velas[:AQUECIMENTO + 3000], aquecimento=AQUECIMENTO)
+    assert r["chamadas"]["futures_account_trades"] == len(r["execucoes"])     # taxa de cada ordem pelo REST
+    pausa_ms = robo.PAUSA_PERDAS_VELAS * 3600_000
+    # Resultado líquido de cada operação (entrada + saída, com as duas taxas), como o diário conta
+    perdas, maior, acumulado, suspensoes = 0, 0, 0.0, 0
+    for e, seguinte in zip(r["execucoes"], r["execucoes"][1:] + [None]):
+        acumulado += e["realizado"] - e["taxa"]
+        if e["lado"] != "SELL":
+            continue
+        perdas = perdas + 1 if acumulado < 0 else 0
+        maior, acumulado = max(maior, perdas), 0.0
+        if perdas >= robo.MAX_PERDAS_SEGUIDAS and seguinte is not None:
+            suspensoes += 1
+            assert seguinte["t"] >= e["t"] + pausa_ms
+    assert r["diario"]["maior_sequencia_perdas"] == maior >= robo.MAX_PERDAS_SEGUIDAS
+    assert suspensoes >= 1
+
+
+def test_latencia_atrasa_ordem_sem_mudar_decisoes(velas):
+    trecho = velas[:AQUECIMENTO + 1500]
+    sem = reproduzir(trecho, aquecimento=AQUECIMENTO)
+    com = reproduzir(trecho, aquecimento=AQUECIMENTO, latencia_ms=80)
+    assert [e["lado"] for e in com["execucoes"]] == [e["lado"] for e in sem["execucoes"]]
+    margem_ms = robo.MARGEM_FECHAMENTO_SEG * 1000               # o robô acorda logo depois da virada
+    assert sem["atraso_max_ms"] == margem_ms
+    # klines + conta + preço antes de toda ordem, cada uma custando 80 ms de relógio
+    assert np.min([e["atraso_ms"] for e in com["execucoes"]]) >= margem_ms + 3 * 80
+
+
+def test_reinicio_retoma_sem_perder_nem_duplicar_sinais(velas):
+    trecho = velas[:AQUECIMENTO + 600]
+    continuo = reproduzir(trecho, aquecimento=AQUECIMENTO)
+    reiniciado = reproduzir(trecho, aquecimento=AQUECIMENTO, reinicios=[50, 200, 201, 400])
+    chave = [(e["t"], e["lado"], e["quantidade"]) for e in continuo["execucoes"]]
+    assert [(e["t"], e["lado"], e["quantidade"]) for e in reiniciado["execucoes"]] == chave
+    assert reiniciado["diario"] == continuo["diario"]                      # diário reaberto do disco
+    # Na volta, só as velas novas: uma chamada de klines por vela, como sem reinício
+    assert reiniciado["chamadas"]["futures_klines"] == continuo["chamadas"]["futures_klines"]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""``StreamMercado`` contra o servidor WebSocket falso: reconexão, reassinatura e backfill REST das lacunas."""
+import asyncio
+import logging
+
+import numpy as np
+import pytest
+
+from crypto.src.fake_stream import ServidorStreamFalso
+from crypto.src.market_stream import StreamMercado
+from crypto.src.simulator import CorretoraSimulada, RelogioVirtual
+from shared.utils import data_fetcher
+from shared.utils.data_fetcher import CacheKlines, klines_para_array
+from tests.benchmarks.fixtures import gerar_klines
+
+pytest.importorskip("websockets")
+
+PAR = "SOLUSDT"
+NOME = "solusdt@kline_1h"
+PASSO = 3600_000
+
+
+@pytest.fixture(autouse=True)
+def _silencioso():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+async def _ate(condicao, timeout: float = 5.0):
+    async def _esperar():
+        while not condicao():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(_esperar(), timeout)
+
+
+def test_reconexao_reassina_e_completa_lacunas_pelo_rest():
+    velas = klines_para_array(gerar_klines(PAR, "1h", 300))
+    relogio = RelogioVirtual(int(velas["t_close"][199]) + 1)
+    corretora = CorretoraSimulada({PAR: velas}, "1h", relogio)
+
+    def fechar_ate(k: int):
+        relogio.agora_ms = int(velas["t_close"][k]) + 1
+
+    async def principal():
+        servidor = await ServidorStreamFalso().iniciar()
+        cache = CacheKlines(corretora.futures_klines, PAR, "1h", limite=200)
+        await asyncio.to_thread(cache.atualizar)
+        stream = StreamMercado(servidor.url, backoff_inicial=0.05)
+        emitidas = []
+        stream.ao_fechar_vela(lambda c, novas: emitidas.append(novas["t_open"].tolist()))
+        stream.assinar_klines(cache)
+        execucao = asyncio.create_task(stream.executar())
+        await servidor.aguardar_assinatura(NOME)
+
+        # Atualizações da vela em formação não emitem; só o kline com x=true
+        parcial = velas[200:201].copy()
+        parcial["close"] = parcial["open"]
+        await servidor.enviar_kline(PAR, "1h", parcial, fechada=False)
+        await _ate(lambda: cache.aberta is not None and cache.aberta["close"][0] == parcial["close"][0])
+        assert emitidas == []
+        fechar_ate(200)
+        await servidor.enviar_kline(PAR, "1h", velas[200:201], fechada=True)
+        await _ate(lambda: len(emitidas) == 1)
+
+        # Queda: três velas fecham sem a conexão; a reconexão reassina e completa pelo REST
+        await servidor.derrubar_conexoes()
+        fechar_ate(203)
+        await _ate(lambda: len(emitidas) == 2)
+        assert servidor.conexoes == 2 and stream.reconexoes == 1
+        assert any(NOME in assinados for assinados in servidor.clientes.values())
+
+        # Lacuna dentro da conexão: a 205 chega sem a 204 e o REST traz as duas
+        fechar_ate(205)
+        await servidor.enviar_kline(PAR, "1h", velas[205:206], fechada=True)
+        await _ate(lambda: len(emitidas) == 3)
+        # Repetida: já está no cache, não emite de novo
+        await servidor.enviar_kline(PAR, "1h", velas[205:206], fechada=True)
+        await servidor.enviar_kline(PAR, "1h", velas[206:207], fechada=False)
+        await _ate(lambda: int(cache.aberta["t_open"][0]) == int(velas["t_open"][206]))
+
+        await stream.parar()
+        await execucao
+        await servidor.parar()
+        return cache, emitidas
+
+    with relogio.instalado(data_fetcher):
+        cache, emitidas = asyncio.run(principal())
+
+    t = velas["t_open"].tolist()
+    assert emitidas == [t[200:201], t[201:204], t[204:206]]
+    np.testing.assert_array_equal(cache.fechadas["t_open"], velas["t_open"][1:206])      # janela de 200 da partida + 6
+    np.testing.assert_allclose(cache.fechadas["close"], velas["close"][1:206])
+    assert cache.lacunas == 0
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Serviço do Telegram contra um stub local da Bot API (aiohttp, sem rede externa)."""
+import time
+import socket
+import asyncio
+import logging
+
+import numpy as np
+import pytest
+
+web = pytest.importorskip("aiohttp.web")
+
+from crypto.src.account_state import EstadoConta, Instantaneo
+from crypto.strategies.sma_crossover import EstrategiaCruzamento
+from shared.utils.trade_journal import DiarioOperacoes
+from telegram.src.bot import ClienteBotAPI, ServicoTelegram
+
+TOKEN = "123:teste"
+CHAT = 42
+
+
+class BotAPIFalsa:
+    """getUpdates devolve os comandos enfileirados; sendMessage grava (e responde 429 ``limitar`` vezes)."""
+
+    def __init__(self):
+        self.enviadas = []          # (monotonic, chat, texto)
+        self.atualizacoes = []
+        self.limitar = 0
+        self.recusadas = 0
+
+    def comando(self, texto: str, chat: int = CHAT):
+        n = len(self.atualizacoes) + 1
+        self.atualizacoes.append({"update_id": n, "message": {"message_id": n, "chat": {"id": chat}, "text": texto}})
+
+    async def tratar(self, pedido):
+        dados = await pedido.json()
+        metodo = pedido.match_info["metodo"]
+        if metodo == "sendMessage":
+            if self.limitar:
+                self.limitar -= 1
+                self.recusadas += 1
+                return web.json_response({"ok": False, "error_code": 429, "description": "Too Many Requests",
+                                          "parameters": {"retry_after": 0.2}}, status=429)
+            self.enviadas.append((time.monotonic(), dados["chat_id"], dados["text"]))
+            return web.json_response({"ok": True, "result": {"message_id": len(self.enviadas)}})
+        if metodo == "getUpdates":
+            offset = dados.get("offset") or 0
+            novas = [a for a in self.atualizacoes if a["update_id"] >= offset]
+            if not novas:
+                await asyncio.sleep(0.02)
+            return web.json_response({"ok": True, "result": novas})
+        return web.json_response({"ok": False, "error_code": 404, "description": "Not Found"}, status=404)
+
+
+class ClienteProibido:
+    """Cliente da exchange que falha em qualquer chamada: os comandos não podem consultar a API."""
+
+    def __getattr__(self, nome):
+        raise AssertionError(f"chamada à exchange durante um comando: {nome}")
+
+
+def _rodar(cenario, **kwargs):
+    async def principal():
+        api = BotAPIFalsa()
+        app = web.Application()
+        app.router.add_post(f"/bot{TOKEN}/{{metodo}}", api.tratar)
+        executor = web.AppRunner(app)
+        await executor.setup()
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        await web.SockSite(executor, sock).start()
+        cliente = ClienteBotAPI(TOKEN, f"http://127.0.0.1:{sock.getsockname()[1]}")
+        kwargs.setdefault("agrupar_s", 0.05)
+        kwargs.setdefault("intervalo_chat_s", 0.1)
+        servico = ServicoTelegram(cliente=cliente, chats=[str(CHAT)], poll_timeout_s=0, **kwargs)
+        tarefa = asyncio.create_task(servico.executar())
+        try:
+            await cenario(servico, api)
+        finally:
+            tarefa.cancel()
+            await asyncio.gather(tarefa, return_exceptions=True)
+            await executor.cleanup()
+
+    asyncio.run(principal())
+
+
+async def _ate(condicao, timeout_s: float = 5.0):
+    limite = time.monotonic() + timeout_s
+    while not condicao():
+        assert time.monotonic() < limite, "tempo esgotado"
+        await asyncio.sleep(0.01)
+
+
+def test_eventos_das_threads_viram_mensagens_em_lote_com_limite_de_envio():
+    async def cenario(servico, api):
+        diario = DiarioOperacoes()
+        servico.acompanhar(diario)
+        api.limitar = 1
+        duracoes = []
+
+        def robo():
+            for i in range(60):
+                t0 = time.perf_counter()
+                diario.execucao("SOLUSDT", "BUY" if i % 2 == 0 else "SELL", 1.5, 20.0 + i, id_cliente=f"o{i}")
+                duracoes.append(time.perf_counter() - t0)
+            logging.getLogger("runtime").error("[Runtime] SOLUSDT:1h: falha simulada")
+
+        await asyncio.sleep(0.05)                                       # serviço no ar
+        await asyncio.to_thread(robo)
+        await _ate(lambda: "falha simulada" in "".join(t for *_, t in api.enviadas))
+        assert max(duracoes) < 0.01                                     # nada de rede na thread do robô
+        textos = [t for _, chat, t in api.enviadas]
+        assert {chat for _, chat, _ in api.enviadas} == {CHAT}
+        assert len(textos) <= 3 and api.recusadas == 1                  # lote, e o 429 foi repetido
+        linhas = "\n".join(textos).split("\n")
+        assert sum("SOLUSDT @" in l for l in linhas) == 60
+        assert sum("resultado" in l for l in linhas) == 30              # cada venda fecha uma operação
+        intervalos = np.diff([t for t, *_ in api.enviadas])
+        assert (intervalos >= 0.1 - 1e-3).all()
+
+    _rodar(cenario)
+
+
+def test_fila_cheia_descarta_os_mais_antigos():
+    async def cenario(servico, api):
+        for i in range(8):
+            servico.publicar("aviso", texto=f"evento {i}")
+        await _ate(lambda: api.enviadas)
+        texto = api.enviadas[0][2]
+        assert "3 evento(s) descartado(s)" in texto
+        assert "evento 2" not in texto and "evento 3" in texto and "evento 7" in texto
+
+    _rodar(cenario, capacidade=5, agrupar_s=0.2)
+
+
+def test_comandos_respondidos_do_estado_em_cache():
+    conta = EstadoConta(ClienteProibido())
+    conta.atual = Instantaneo({"USDT": 1000.0}, {"SOLUSDT": 2.0}, origem="stream")
+    conta._precos["SOLUSDT"] = (25.0, time.monotonic())
+    diario = DiarioOperacoes()
+    diario.execucao("SOLUSDT", "BUY", 1.0, 18.0, id_cliente="a")
+    diario.execucao("SOLUSDT", "SELL", 1.0, 19.0, id_cliente="b")
+    diario.execucao("SOLUSDT", "BUY", 2.0, 20.0, id_cliente="c")
+    instancia = EstrategiaCruzamento(ClienteProibido(), "SOLUSDT", "1h", conta=conta, diario=diario)
+    instancia.cruzamento.aquecer(np.linspace(10.0, 20.0, 60), 1_700_000_000_000)
+
+    class Runtime:
+        instancias = [instancia]
+        erros = {instancia.nome: 2}
+
+    Runtime.conta, Runtime.diario = conta, diario
+
+    async def cenario(servico, api):
+        for comando in ("/status", "/pnl", "/positions@MeuBot", "/xyz"):
+            api.comando(comando)
+        api.comando("/pnl", chat=999)                                   # chat não autorizado
+        await _ate(lambda: len(api.enviadas) >= 4)
+        await asyncio.sleep(0.2)
+        respostas = [t for _, chat, t in api.enviadas]
+        assert len(respostas) == 4 and all(chat == CHAT for _, chat, _ in api.enviadas)
+        status, pnl, posicoes, ajuda = respostas
+        assert "SOLUSDT:1h:SMA7x40: COMPRA" in status and "2 erro(s) seguidos" in status
+        assert "Total: +1.00 USDT" in pnl and "1 ganho(s)" in pnl
+        assert "SOLUSDT: LONG 2 @ 20 | preço 25 | aberto +10.00 USDT" in posicoes
+        assert "/positions" in ajuda
+
+    _rodar(cenario, contexto=Runtime())
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Agendador com relógio falso: alinhamento às velas, antecipação, backoff e cancelamento."""
+import logging
+from datetime import datetime, timezone
+
+import pytest
+
+from shared.utils.scheduler import Agendador, proximo_fechamento
+
+VIRADA = 1_700_006_400.0            # 15/11/2023 00:00 UTC: virada de todos os intervalos até 1d
+
+
+@pytest.fixture(autouse=True)
+def _silencioso():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+class Relogio:
+    def __init__(self, agora: float):
+        self.agora = agora
+
+    def __call__(self) -> float:
+        return self.agora
+
+
+def _rodar_ate(agendador: Agendador, relogio: Relogio, fim: float):
+    """Mesmo laço de ``executar``, mas o relógio salta direto para cada disparo."""
+    while True:
+        tarefa, espera = agendador._vencida()
+        if tarefa is None:
+            if espera is None or relogio.agora + espera > fim:
+                relogio.agora = fim
+                return
+            relogio.agora += espera
+            continue
+        try:
+            tarefa.funcao(*tarefa.args)
+        except Exception as e:
+            agendador._concluir(tarefa, e)
+        else:
+            agendador._concluir(tarefa)
+
+
+def _utc(segundos: float) -> datetime:
+    return datetime.fromtimestamp(segundos, timezone.utc)
+
+
+@pytest.mark.parametrize("periodo, passo", [("1m", 60), ("15m", 900), ("1h", 3600), ("4h", 14400), ("1d", 86400)])
+def test_proximo_fechamento_alinhado_a_epoca(periodo, passo):
+    assert proximo_fechamento(periodo, VIRADA - 0.5) == VIRADA
+    assert proximo_fechamento(periodo, VIRADA) == VIRADA + passo          # exatamente na virada: a seguinte
+    assert proximo_fechamento(periodo, VIRADA + 1) % passo == 0
+
+
+def test_semana_vira_na_segunda_feira():
+    quinta = datetime(2024, 3, 7, 15, 30, tzinfo=timezone.utc).timestamp()
+    virada = _utc(proximo_fechamento("1w", quinta))
+    assert virada == datetime(2024, 3, 11, tzinfo=timezone.utc) and virada.weekday() == 0
+    assert proximo_fechamento("1w", virada.timestamp()) - virada.timestamp() == 7 * 86400
+
+
+def test_margem_positiva_e_negativa():
+    relogio = Relogio(VIRADA - 10)
+    agendador = Agendador(relogio)
+    disparos = []
+    agendador.a_cada_vela("15m", lambda: disparos.append(("fechou", relogio.agora)), margem_s=0.25)
+    agendador.a_cada_vela("15m", lambda: disparos.append(("antes", relogio.agora)), margem_s=-3)
+    _rodar_ate(agendador, relogio, VIRADA + 900 + 1)
+    assert disparos == [("antes", VIRADA - 3), ("fechou", VIRADA + 0.25),
+                        ("antes", VIRADA + 897), ("fechou", VIRADA + 900.25)]
+
+
+def test_antecipacao_ja_passada_mira_a_vela_seguinte():
+    relogio = Relogio(VIRADA - 1)                                       # dentro da janela de 3 s
+    tarefa = Agendador(relogio).a_cada_vela("15m", lambda: None, margem_s=-3)
+    assert tarefa.quando == VIRADA + 897
+
+
+def test_falha_repete_com_backoff_antes_da_proxima_vela():
+    relogio = Relogio(VIRADA - 10)
+    agendador = Agendador(relogio, backoff_base_s=1.0, jitter=0.0)
+    chamadas = []
+
+    def instavel():
+        chamadas.append(relogio.agora)
+        if len(chamadas) <= 3:
+            raise RuntimeError("REST indisponível")
+
+    tarefa = agendador.a_cada_vela("1h", instavel)
+    _rodar_ate(agendador, relogio, VIRADA + 3600)
+    assert chamadas == [VIRADA, VIRADA + 1, VIRADA + 3, VIRADA + 7, VIRADA + 3600]
+    assert tarefa.execucoes == 5 and tarefa.backoff.falhas == 0
+
+
+def test_backoff_alem_da_proxima_vela_cede_a_vela():
+    relogio = Relogio(VIRADA - 10)
+    agendador = Agendador(relogio, backoff_base_s=5000.0, backoff_max_s=5000.0, jitter=0.0)
+    chamadas = []
+
+    def sempre_falha():
+        chamadas.append(relogio.agora)
+        raise RuntimeError("fora do ar")
+
+    tarefa = agendador.a_cada_vela("1h", sempre_falha)
+    _rodar_ate(agendador, relogio, VIRADA + 7200)
+    assert chamadas == [VIRADA, VIRADA + 3600, VIRADA + 7200]
+    assert tarefa.backoff.falhas == 0 and tarefa.quando == VIRADA + 10800
+
+
+def test_cancelamento_e_disparo_unico():
+    relogio = Relogio(VIRADA - 10)
+    agendador = Agendador(relogio)
+    disparos = []
+    horaria = agendador.a_cada_vela("1h", lambda: disparos.append("1h"))
+    agendador.a_cada_vela("15m", lambda: disparos.append("15m"))
+    agendador.em(5, lambda: disparos.append("unico"))
+    _rodar_ate(agendador, relogio, VIRADA + 1)
+    assert sorted(disparos) == ["15m", "1h", "unico"]
+
+    agendador.cancelar(horaria)
+    assert [t.periodo for t in agendador.tarefas] == ["15m"]
+    disparos.clear()
+    _rodar_ate(agendador, relogio, VIRADA + 3600)
+    assert disparos == ["15m"] * 4 and horaria.execucoes == 1
+    with pytest.raises(ValueError):
+        agendador.a_cada_vela("7m", lambda: None)
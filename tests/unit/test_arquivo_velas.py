@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Arquivo colunar de velas: reparo de anexação interrompida e importação de CSVs da Binance."""
+import io
+import logging
+import zipfile
+
+import numpy as np
+import pytest
+
+from shared.utils.candle_archive import CAMPOS, ArquivoVelas, ler_csv, ler_zip
+from shared.utils.data_fetcher import DTYPE_KLINE, klines_para_array
+from tests.benchmarks.fixtures import gerar_klines
+
+PAR = "SOLUSDT"
+CABECALHO = b"open_time,open,high,low,close,volume,close_time,quote_volume,count,taker_buy_volume,taker_buy_quote_volume,ignore"
+
+
+@pytest.fixture(autouse=True)
+def _silencioso():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(scope="module")
+def velas():
+    return klines_para_array(gerar_klines(PAR, "1h", 50))
+
+
+def _csv(velas: np.ndarray, micro: bool = False, cabecalho: bool = True) -> bytes:
+    escala = 1000 if micro else 1
+    linhas = [CABECALHO] if cabecalho else []
+    for v in velas:
+        campos = [int(v["t_open"]) * escala] + [repr(float(v[c])) for c in CAMPOS[1:6]] + [int(v["t_close"]) * escala]
+        campos += [repr(float(v[c])) if DTYPE_KLINE[c].kind == "f" else int(v[c]) for c in CAMPOS[7:]]
+        linhas.append(",".join(map(str, campos)).encode())
+    return b"\n".join(linhas) + b"\n"
+
+
+def test_anexacao_interrompida_e_reparada_na_abertura(tmp_path, velas):
+    arquivo = ArquivoVelas(str(tmp_path), PAR, "1h")
+    assert arquivo.anexar(velas[:30]) == 30
+    # Queda no meio da anexação seguinte: parte das colunas com 2 velas a mais, uma com meio valor
+    for campo in CAMPOS[:4]:
+        with open(arquivo._caminho(campo), "ab") as f:
+            f.write(np.ascontiguousarray(velas[campo][30:32]).tobytes())
+    with open(arquivo._caminho("close"), "ab") as f:
+        f.write(b"\x00\x01\x02")
+
+    reaberto = ArquivoVelas(str(tmp_path), PAR, "1h")
+    assert len(reaberto) == 30 and reaberto.ultimo_t_open == int(velas["t_open"][29])
+    for campo in CAMPOS:
+        assert (tmp_path / "futures" / PAR / "1h" / f"{campo}.bin").stat().st_size == 30 * DTYPE_KLINE[campo].itemsize
+    # Só meio valor no fim de uma coluna, as demais inteiras: também cortado antes de anexar
+    with open(reaberto._caminho("volume"), "ab") as f:
+        f.write(b"\xff" * 5)
+    reaberto = ArquivoVelas(str(tmp_path), PAR, "1h")
+    assert len(reaberto) == 30
+    assert reaberto.anexar(velas) == 20                                   # só as mais novas que a última
+    np.testing.assert_array_equal(reaberto.ultimas(), velas)
+    np.testing.assert_array_equal(ArquivoVelas(str(tmp_path), PAR, "1h").coluna("close"), velas["close"])
+
+
+def test_csv_em_microssegundos_com_e_sem_cabecalho(tmp_path, velas):
+    mili = ler_csv(_csv(velas[:10]))
+    micro = ler_csv(_csv(velas[:10], micro=True, cabecalho=False))
+    np.testing.assert_array_equal(mili, velas[:10])
+    np.testing.assert_array_equal(micro, velas[:10])                     # dumps spot de 2025 em µs
+    assert ler_csv(CABECALHO + b"\n").dtype == DTYPE_KLINE and len(ler_csv(b"")) == 0
+
+    # Zip mensal com dois CSVs fora de ordem; a importação ignora o que já está no arquivo
+    conteudo = io.BytesIO()
+    with zipfile.ZipFile(conteudo, "w") as z:
+        z.writestr(f"{PAR}-1h-2024-02.csv", _csv(velas[25:], micro=True))
+        z.writestr(f"{PAR}-1h-2024-01.csv", _csv(velas[:25]))
+        z.writestr("LEIAME.txt", b"ignorado")
+    np.testing.assert_array_equal(ler_zip(conteudo.getvalue()), velas)
+    caminho = tmp_path / f"{PAR}-1h.zip"
+    caminho.write_bytes(conteudo.getvalue())
+    arquivo = ArquivoVelas(str(tmp_path), PAR, "1h")
+    assert arquivo.importar_csv(_csv(velas[:5])) == 5
+    assert arquivo.importar_zip(str(caminho)) == 45
+    np.testing.assert_array_equal(arquivo.ultimas(10), velas[-10:])
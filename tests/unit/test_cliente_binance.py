@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""``OrcamentoPeso`` e ``ClienteBinance`` com a sessão HTTP trocada por um adaptador falso (sem rede)."""
+import json
+import time
+import logging
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+from binance.exceptions import BinanceAPIException
+from requests.adapters import BaseAdapter
+
+from crypto.src.binance_client import ClienteBinance, OrcamentoPeso
+
+KLINE = [1_700_000_000_000, "25.0", "25.5", "24.9", "25.2", "100", 1_700_003_599_999, "2520", 10, "50", "1260", "0"]
+
+
+@pytest.fixture(autouse=True)
+def _silencioso():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+class AdaptadorFalso(BaseAdapter):
+    """Responde por caminho com ``rotas[caminho](params) -> (status, corpo, cabeçalhos)``."""
+
+    def __init__(self, rotas: dict, latencia_s: float = 0.0):
+        super().__init__()
+        self.rotas = rotas
+        self.latencia_s = latencia_s
+        self.pedidos = []           # (caminho, params, instante)
+
+    def send(self, request, **kwargs):
+        url = urlparse(request.url)
+        corpo = request.body.decode() if isinstance(request.body, bytes) else (request.body or "")
+        params = {k: v[-1] for k, v in parse_qs(url.query or corpo).items()}
+        self.pedidos.append((url.path, params, time.monotonic()))
+        time.sleep(self.latencia_s)
+        status, dados, cabecalhos = self.rotas[url.path](params)
+        resposta = requests.Response()
+        resposta.status_code = status
+        resposta._content = json.dumps(dados).encode()
+        resposta.headers.update(cabecalhos)
+        resposta.url = request.url
+        resposta.request = request
+        return resposta
+
+    def close(self):
+        pass
+
+    def caminhos(self) -> list:
+        return [p for p, _, _ in self.pedidos]
+
+
+def _cliente(rotas: dict, latencia_s: float = 0.0):
+    cliente = ClienteBinance("chave", "segredo")
+    adaptador = AdaptadorFalso(rotas, latencia_s)
+    cliente.session.mount("https://", adaptador)
+    return cliente, adaptador
+
+
+def _perto_da_virada(segundos_antes: float) -> float:
+    """Deslocamento (ms) que põe o relógio do servidor ``segundos_antes`` da virada do minuto."""
+    return ((60 - time.time() % 60) - segundos_antes) * 1000
+
+
+def test_orcamento_espera_a_virada_do_minuto():
+    base = time.time()
+    orcamento = OrcamentoPeso(100, margem=1.0, relogio=lambda: time.time() - base + 59.7)
+    orcamento.reservar(60)
+    orcamento.reservar(40)
+    assert orcamento.esperas == 0
+    t0 = time.monotonic()
+    orcamento.reservar(10)                                  # 110 > 100: só no minuto seguinte
+    assert 0.2 < time.monotonic() - t0 < 1.0
+    assert orcamento.esperas == 1 and orcamento.usado == 10
+    orcamento.registrar(95)                                 # o servidor viu mais peso (outro processo no IP)
+    assert orcamento.usado == 95
+    orcamento.registrar(20)
+    assert orcamento.usado == 95                            # o cabeçalho nunca reduz o que já foi reservado
+
+
+def test_cabecalho_de_peso_reconcilia_e_segura_a_proxima_requisicao():
+    usado = {"valor": 2160}
+    cliente, adaptador = _cliente({
+        "/fapi/v1/klines": lambda p: (200, [KLINE], {"X-MBX-USED-WEIGHT-1M": str(usado["valor"])}),
+    })
+    cliente.timestamp_offset = _perto_da_virada(0.3)
+    cliente.futures_klines(symbol="SOLUSDT", interval="1h", limit=1)
+    orcamento = cliente.orcamento("https://fapi.binance.com/fapi/v1/klines")
+    assert orcamento.usado == 2160 and orcamento.limite == 2160
+    usado["valor"] = 3
+    cliente.futures_klines(symbol="SOLUSDT", interval="1h", limit=2)    # peso 1 estouraria: espera a virada
+    assert orcamento.esperas == 1
+    (_, _, t1), (_, _, t2) = adaptador.pedidos
+    assert t2 - t1 >= 0.2
+    assert orcamento.usado == 3
+
+
+@pytest.mark.parametrize("status", [418, 429])
+def test_retry_after_bloqueia_o_host(status):
+    respostas = iter([
+        (status, {"code": -1003, "msg": "Too many requests"}, {"Retry-After": "0.4"}),
+        (200, {"symbol": "SOLUSDT", "price": "25.2"}, {}),
+    ])
+    cliente, adaptador = _cliente({"/fapi/v2/ticker/price": lambda p: next(respostas)})
+    with pytest.raises(BinanceAPIException) as erro:
+        cliente.futures_symbol_ticker(symbol="SOLUSDT")
+    assert erro.value.status_code == status
+    t0 = time.monotonic()
+    assert cliente.futures_symbol_ticker(symbol="SOLUSDT")["price"] == "25.2"
+    assert time.monotonic() - t0 >= 0.35
+    assert cliente.orcamento("https://fapi.binance.com/fapi/v2/ticker/price").esperas >= 1
+
+
+def test_gets_identicos_simultaneos_viram_uma_requisicao():
+    cliente, adaptador = _cliente({"/fapi/v1/klines": lambda p: (200, [KLINE], {})}, latencia_s=0.2)
+    resultados = []
+    barreira = threading.Barrier(5)
+
+    def buscar():
+        barreira.wait()
+        resultados.append(cliente.futures_klines(symbol="SOLUSDT", interval="1h", limit=1))
+
+    threads = [threading.Thread(target=buscar) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert adaptador.caminhos() == ["/fapi/v1/klines"] and cliente.coalescidas == 4
+    assert all(r is resultados[0] for r in resultados)
+    # Parâmetros diferentes não coalescem
+    cliente.futures_klines(symbol="SOLUSDT", interval="1h", limit=2)
+    assert len(adaptador.pedidos) == 2
+
+
+def test_timestamp_fora_da_janela_ressincroniza_e_repete():
+    deslocamentos = iter([0, 5000])
+    contas = iter([(400, {"code": -1021, "msg": "Timestamp for this request is outside of the recvWindow."}, {}),
+                   (200, {"assets": [], "positions": []}, {})])
+    cliente, adaptador = _cliente({
+        "/fapi/v1/time": lambda p: (200, {"serverTime": int(time.time() * 1000) + next(deslocamentos)}, {}),
+        "/fapi/v2/account": lambda p: next(contas),
+    })
+    assert cliente.futures_account() == {"assets": [], "positions": []}
+    assert adaptador.caminhos() == ["/fapi/v1/time", "/fapi/v2/account", "/fapi/v1/time", "/fapi/v2/account"]
+    assert 4000 < cliente.timestamp_offset < 6000
+    primeira, repetida = adaptador.pedidos[1][1], adaptador.pedidos[3][1]
+    assert int(repetida["timestamp"]) - int(primeira["timestamp"]) > 4000     # assinada de novo com o novo relógio
+    assert repetida["signature"] != primeira["signature"]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""``EstadoConta`` contra um cliente falso: TTL, invalidação por ordem e ``ACCOUNT_UPDATE`` do stream."""
+import logging
+
+import pytest
+
+from crypto.src.account_state import EstadoConta
+
+PAR = "SOLUSDT"
+
+
+@pytest.fixture(autouse=True)
+def _silencioso():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+class ClienteConta:
+    def __init__(self, saldo: float = 1000.0, posicao: float = 0.0):
+        self.saldo = saldo
+        self.posicao = posicao
+        self.contas = 0
+        self.tickers = 0
+
+    def futures_account(self, **params):
+        self.contas += 1
+        return {"assets": [{"asset": "USDT", "walletBalance": str(self.saldo)}],
+                "positions": [{"symbol": PAR, "positionAmt": str(self.posicao)},
+                              {"symbol": "BTCUSDT", "positionAmt": "0"}]}
+
+    def futures_symbol_ticker(self, symbol):
+        self.tickers += 1
+        return {"symbol": symbol, "price": "25.5"}
+
+
+def test_instantaneo_vence_pelo_ttl_e_por_ordem():
+    cliente = ClienteConta(posicao=1.5)
+    conta = EstadoConta(cliente, ttl_s=60.0)
+    assert conta.saldo() == 1000.0 and conta.posicao(PAR) == 1.5 and conta.posicao("BTCUSDT") == 0.0
+    assert cliente.contas == 1                                      # um instantâneo serve todas as leituras
+    assert conta.atual.origem == "rest"
+
+    conta.atual.obtido_em -= 61                                     # passou do TTL
+    cliente.saldo = 990.0
+    assert conta.saldo() == 990.0 and cliente.contas == 2
+
+    conta.invalidar()                                               # ordem enviada: próxima leitura consulta
+    cliente.posicao = 0.0
+    assert conta.posicao(PAR) == 0.0 and cliente.contas == 3
+    conta.instantaneo(forcar=True)
+    assert cliente.contas == 4
+
+
+def test_preco_do_ticker_em_cache_e_da_fonte_do_stream():
+    cliente = ClienteConta()
+    conta = EstadoConta(cliente, ttl_preco_s=60.0)
+    assert conta.preco_em_cache(PAR) is None
+    assert conta.preco(PAR) == conta.preco(PAR) == 25.5 and cliente.tickers == 1
+    conta.fonte_preco = lambda par: 26.0 if par == PAR else None
+    assert conta.preco(PAR) == 26.0 and conta.preco_em_cache(PAR) == 26.0 and cliente.tickers == 1
+
+
+def test_account_update_com_stream_ativo_dispensa_rest():
+    cliente = ClienteConta(posicao=1.5)
+    conta = EstadoConta(cliente, ttl_s=0.0)
+    eventos = []
+    conta.ao_evento(eventos.append)
+    conta.instantaneo(forcar=True)
+    conta.stream_ativo = True
+    conta.invalidar()                                               # com o stream, a ordem não invalida
+
+    conta.atual.obtido_em -= 3600                                   # nem o TTL vence
+    assert conta.posicao(PAR) == 1.5 and cliente.contas == 1
+    evento = {"e": "ACCOUNT_UPDATE", "a": {"B": [{"a": "USDT", "wb": "1012.5"}],
+                                           "P": [{"s": PAR, "pa": "0"}, {"s": "ETHUSDT", "pa": "-0.3"}]}}
+    conta.aplicar_evento(evento)
+    assert eventos == [evento]
+    assert conta.saldo() == 1012.5 and conta.posicao(PAR) == 0.0 and conta.posicao("ETHUSDT") == -0.3
+    assert conta.atual.origem == "stream" and cliente.contas == 1
+
+    conta.aplicar_evento({"e": "listenKeyExpired"})                 # stream perdido: volta ao REST
+    assert not conta.stream_ativo
+    assert conta.posicao(PAR) == 1.5 and cliente.contas == 2
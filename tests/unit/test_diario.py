@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Diário de operações: P&L por preço médio, operações fechadas, SQLite em WAL e reabertura do arquivo."""
+import sqlite3
+
+import pytest
+
+from shared.utils import trade_journal
+from shared.utils.trade_journal import DiarioOperacoes
+
+PAR = "SOLUSDT"
+
+
+def _operar(diario: DiarioOperacoes):
+    """Uma operação comprada com saída em duas partes e uma vendida aberta por inversão."""
+    diario.execucao(PAR, "BUY", 2.0, 10.0, 0.02, 1_000, "c-1")
+    diario.execucao(PAR, "BUY", 2.0, 12.0, 0.02, 2_000, "c-2")              # preço médio 11
+    diario.execucao(PAR, "SELL", 3.0, 13.0, 0.03, 3_000, "c-3")             # realiza +6
+    diario.execucao(PAR, "SELL", 2.0, 9.0, 0.02, 4_000, "c-4")              # fecha 1 com -2 e abre 1 vendido
+
+
+def test_pnl_por_preco_medio_e_resultado_liquido():
+    diario = DiarioOperacoes()
+    _operar(diario)
+    fechou = diario.execucoes_recentes[-1]
+    assert fechou["realizado"] == pytest.approx(-2.0)
+    # +6 - 2 bruto, menos as taxas de entrada (0,04), da saída parcial (0,03) e da metade que fechou (0,01)
+    assert fechou["resultado"] == pytest.approx(4.0 - 0.08)
+    assert diario.posicao(PAR) == (-1.0, 9.0)
+    est = diario.estatisticas(PAR)
+    assert est.operacoes == 1 and est.ganhos == 1 and est.perdas_seguidas == 0
+    assert est.taxas == pytest.approx(0.09) and est.pnl_realizado == pytest.approx(4.0 - 0.09)
+
+    assert diario.execucao(PAR, "BUY", 1.0, 11.0, 0.01, 5_000, "c-5")["resultado"] == pytest.approx(-2.0 - 0.02)
+    assert diario.perdas_seguidas(PAR) == 1 and diario.posicao(PAR) == (0.0, 0.0)
+    assert diario.execucao(PAR, "BUY", 1.0, 11.0, 0.01, 5_000, "c-5") is None         # mesmo id: ignorado
+    assert diario.estatisticas().execucoes == 5
+
+
+def test_wal_e_reabertura_reconstroi_agregados(tmp_path):
+    arquivo = str(tmp_path / "diario.sqlite")
+    diario = DiarioOperacoes(arquivo)
+    _operar(diario)
+    diario.operacao(PAR, "COMPRA", 2.0, 10.0, forca_sinal=1.0, saldo_usdt=1000.0, t_ms=1_000)
+    diario.descarregar()
+    conexao = sqlite3.connect(arquivo)
+    assert conexao.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conexao.execute("SELECT COUNT(*) FROM execucoes").fetchone()[0] == 4
+    conexao.close()
+    antes = diario.estatisticas(PAR).como_dict()
+    diario.fechar()
+
+    reaberto = DiarioOperacoes(arquivo)
+    assert reaberto.estatisticas(PAR).como_dict() == antes
+    assert reaberto.posicao(PAR) == (-1.0, 9.0)
+    assert [e["id_cliente"] for e in reaberto.execucoes_recentes] == ["c-1", "c-2", "c-3", "c-4"]
+    assert reaberto.operacoes(PAR)[0]["acao"] == "COMPRA"
+    assert reaberto.execucao(PAR, "SELL", 2.0, 9.0, 0.02, 4_000, "c-4") is None      # id da operação aberta
+    reaberto.fechar()
+
+
+def test_ids_limitados_a_operacao_aberta_e_janela_recente(monkeypatch):
+    monkeypatch.setattr(trade_journal, "JANELA_IDS", 4)
+    diario = DiarioOperacoes()
+    diario.execucao(PAR, "BUY", 1.0, 10.0, 0.0, 0, "aberta")
+    for i in range(10):
+        diario.execucao("BTCUSDT", "BUY", 1.0, 10.0, 0.0, i, f"e-{i}")
+        diario.execucao("BTCUSDT", "SELL", 1.0, 11.0, 0.0, i, f"s-{i}")
+    assert len(diario._ids_recentes) == 4
+    assert diario._ids_abertos == {PAR: {"aberta"}, "BTCUSDT": set()}
+    assert diario.execucao(PAR, "BUY", 1.0, 10.0, 0.0, 0, "aberta") is None
+    assert diario.execucao("BTCUSDT", "SELL", 1.0, 11.0, 0.0, 9, "s-9") is None
+    assert diario.execucao("BTCUSDT", "BUY", 1.0, 10.0, 0.0, 0, "e-0") is not None   # saiu da janela
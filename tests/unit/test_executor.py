@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""Executor de ordens contra clientes falsos: confirmação, repetição idempotente, filtros, lote e poda."""
+import re
+import logging
+
+import pytest
+import requests
+from binance.exceptions import BinanceAPIException
+
+from crypto.src.exchange_info import InfoSimbolos
+from crypto.src.order_executor import ExecutorOrdens, id_cliente
+from crypto.src.simulator import CorretoraSimulada, RelogioVirtual
+from shared.utils.data_fetcher import klines_para_array
+from shared.utils.trade_journal import DiarioOperacoes
+from tests.benchmarks.fixtures import gerar_klines
+
+PAR = "SOLUSDT"
+FILTROS = {"MARKET_LOT_SIZE": {"stepSize": "0.01", "minQty": "0.01"}, "MIN_NOTIONAL": {"notional": "5"}}
+T_VELA = 1_700_000_000_000
+PASSO = 3600_000
+
+
+@pytest.fixture(autouse=True)
+def _silencioso():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+class ClienteAck:
+    """Aceita a ordem só com o ACK ``NEW``; a execução aparece nas consultas seguintes."""
+
+    def __init__(self, consultas_ate_executar: int = 1, preco: float = 25.0):
+        self.consultas_ate_executar = consultas_ate_executar
+        self.preco = preco
+        self.criadas = []
+        self.consultas = 0
+
+    def futures_create_order(self, **params):
+        self.criadas.append(params)
+        return {"orderId": 1, "symbol": params["symbol"], "status": "NEW", "clientOrderId": params["newClientOrderId"],
+                "side": params["side"], "origQty": params["quantity"], "executedQty": "0", "avgPrice": "0.00",
+                "updateTime": T_VELA}
+
+    def futures_get_order(self, symbol, origClientOrderId=None, **params):
+        self.consultas += 1
+        ordem = self.criadas[-1]
+        executada = self.consultas >= self.consultas_ate_executar
+        return {"orderId": 1, "symbol": symbol, "status": "FILLED" if executada else "NEW",
+                "clientOrderId": origClientOrderId, "side": ordem["side"], "origQty": ordem["quantity"],
+                "executedQty": ordem["quantity"] if executada else "0",
+                "avgPrice": f"{self.preco}" if executada else "0.00", "updateTime": T_VELA + 50}
+
+    def futures_account_trades(self, symbol, orderId=None, **params):
+        ordem = self.criadas[-1]
+        metade = float(ordem["quantity"]) / 2
+        return [{"symbol": symbol, "orderId": orderId, "qty": str(metade), "commission": "0.0061",
+                 "commissionAsset": "USDT"}] * 2
+
+
+def test_ack_new_e_consultado_ate_a_execucao():
+    cliente, diario = ClienteAck(consultas_ate_executar=2), DiarioOperacoes()
+    executor = ExecutorOrdens(cliente, filtros={PAR: FILTROS}, espera_s=0.0, diario=diario)
+    ordem = executor.preparar(PAR, "BUY", 1.234, T_VELA)
+    resposta = executor.enviar(ordem)
+
+    assert cliente.criadas[0]["newOrderRespType"] == "RESULT"
+    assert resposta["status"] == "NEW"                                  # volta sem esperar a execução
+    assert ordem.concluida.wait(2.0)
+    assert cliente.consultas == 2
+    assert ordem.resposta["status"] == "FILLED" and ordem.estado == "FILLED"
+    assert diario.posicao(PAR) == (1.23, 25.0)                         # execução registrada pelo REST
+    assert diario.estatisticas(PAR).taxas == pytest.approx(0.0122)     # taxa somada dos trades da ordem
+
+
+class ContaComStream:
+    stream_ativo = True
+
+    def __init__(self):
+        self.ouvintes = []
+
+    def ao_evento(self, callback):
+        self.ouvintes.append(callback)
+
+    def invalidar(self):
+        pass
+
+
+def test_ack_new_com_stream_ativo_e_confirmado_pelo_evento():
+    cliente, conta = ClienteAck(), ContaComStream()
+    executor = ExecutorOrdens(cliente, conta, filtros={PAR: FILTROS}, espera_s=0.0)
+    ordem = executor.preparar(PAR, "SELL", 2.0, T_VELA)
+    assert executor.enviar(ordem)["status"] == "NEW"
+    assert not ordem.concluida.wait(0.05) and cliente.consultas == 0      # nenhuma consulta REST
+    for ouvinte in conta.ouvintes:
+        ouvinte({"e": "ORDER_TRADE_UPDATE", "o": {"c": ordem.id_cliente, "X": "FILLED", "z": "2.00", "ap": "25.1",
+                                                  "n": "0.01", "T": T_VELA + 40}})
+    assert ordem.concluida.is_set() and ordem.estado == "FILLED"
+
+
+class CorretoraInstavel(CorretoraSimulada):
+    """Simulador que perde a conexão conforme o roteiro: ``"antes"`` (a ordem não chega) ou ``"depois"``
+    (a ordem executa e a resposta se perde)."""
+
+    def __init__(self, *args, falhas=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.falhas = list(falhas)
+
+    def _falhar(self, quando: str, chamada: str) -> bool:
+        if self.falhas and self.falhas[0] == quando:
+            self.falhas.pop(0)
+            if quando == "antes":
+                self.chamadas[chamada] += 1     # a tentativa conta, mesmo sem chegar
+            return True
+        return False
+
+    def futures_create_order(self, **params):
+        if self._falhar("antes", "futures_create_order"):
+            raise requests.ConnectionError("Connection reset by peer")
+        resposta = super().futures_create_order(**params)
+        if self._falhar("depois", "futures_create_order"):
+            raise requests.ReadTimeout("Read timed out")
+        return resposta
+
+    def futures_place_batch_order(self, batchOrders, **params):
+        if self._falhar("antes", "futures_place_batch_order"):
+            raise requests.ConnectionError("Connection reset by peer")
+        return super().futures_place_batch_order(batchOrders, **params)
+
+
+def _corretora(falhas=()):
+    velas = klines_para_array(gerar_klines(PAR, "1h", 50))
+    return CorretoraInstavel({PAR: velas}, "1h", RelogioVirtual(int(velas["t_close"][40]) + 1), falhas=falhas)
+
+
+def _executor(corretora, **kwargs):
+    return ExecutorOrdens(corretora, filtros={PAR: FILTROS}, espera_s=0.0, **kwargs)
+
+
+def test_falha_de_rede_repete_com_o_mesmo_id():
+    corretora = _corretora(falhas=["antes"])
+    executor = _executor(corretora)
+    ordem = executor.preparar(PAR, "BUY", 1.0, T_VELA)
+    assert executor.enviar(ordem)["status"] == "FILLED"
+    # Antes de repetir, consulta pelo id (-2013: não chegou) e reenvia o mesmo payload
+    assert corretora.chamadas["futures_create_order"] == 2 and corretora.chamadas["futures_get_order"] == 1
+    assert [e["id_ordem"] for e in corretora.execucoes] == [ordem.resposta["orderId"]]
+    assert ordem.resposta["clientOrderId"] == ordem.id_cliente
+
+
+def test_resposta_perdida_e_recuperada_pela_consulta_sem_reenviar():
+    corretora = _corretora(falhas=["depois"])
+    executor = _executor(corretora)
+    ordem = executor.preparar(PAR, "SELL", 1.0, T_VELA)
+    assert executor.enviar(ordem)["status"] == "FILLED" and ordem.estado == "FILLED"
+    assert corretora.chamadas["futures_create_order"] == 1 and len(corretora.execucoes) == 1
+
+
+def test_duplicada_consulta_a_ordem_existente():
+    corretora = _corretora()
+    executor = _executor(corretora)
+    ordem = executor.preparar(PAR, "BUY", 1.0, T_VELA)
+    corretora.futures_create_order(**ordem.payload)             # enviada por uma execução anterior do robô
+    assert executor.enviar(ordem)["status"] == "FILLED"
+    assert corretora.chamadas["futures_create_order"] == 2 and corretora.chamadas["futures_get_order"] == 1
+    assert len(corretora.execucoes) == 1
+
+
+def test_recusa_por_filtro_atualiza_o_exchange_info_e_reenvia(tmp_path):
+    corretora = _corretora()
+    simbolos = InfoSimbolos(corretora, diretorio=str(tmp_path))
+    obsoletos = {"MARKET_LOT_SIZE": {"stepSize": "0.0001", "minQty": "0.0001"}, "MIN_NOTIONAL": {"notional": "5"}}
+    executor = ExecutorOrdens(corretora, filtros={PAR: obsoletos}, espera_s=0.0, simbolos=simbolos)
+    ordem = executor.preparar(PAR, "BUY", 1.2345, T_VELA)
+    assert ordem.payload["quantity"] == "1.2345"                # o simulador exige passo 0.001: -1111
+    assert executor.enviar(ordem)["status"] == "FILLED"
+    assert ordem.payload["quantity"] == "1.234" and executor.regras[PAR][0] == 0.001
+    assert corretora.chamadas["futures_create_order"] == 2 and corretora.chamadas["futures_exchange_info"] == 1
+
+
+def test_lote_confirma_cada_item_duplicada_e_rejeitada():
+    corretora = _corretora()
+    executor = _executor(corretora)
+    nova = executor.preparar(PAR, "BUY", 1.0, T_VELA)
+    duplicada = executor.preparar(PAR, "BUY", 1.0, T_VELA + PASSO)
+    pequena = executor.preparar(PAR, "SELL", 0.01, T_VELA + 2 * PASSO)   # abaixo do notional mínimo
+    corretora.futures_create_order(**duplicada.payload)
+    respostas = executor.enviar_lote([nova, duplicada, pequena])
+    assert [r.get("status") for r in respostas] == ["FILLED", "FILLED", None]
+    assert (nova.estado, duplicada.estado, pequena.estado) == ("FILLED", "FILLED", "REJEITADA")
+    assert pequena.resposta["code"] == -4164
+    # A duplicada cai para ``enviar``: uma recusa -4116 e uma consulta, sem segunda execução
+    assert corretora.chamadas["futures_get_order"] == 1 and len(corretora.execucoes) == 2
+
+
+def test_lote_sem_resposta_confirma_individualmente():
+    corretora = _corretora(falhas=["antes"])
+    executor = _executor(corretora)
+    ordens = [executor.preparar(PAR, "BUY", 1.0, T_VELA + i * PASSO) for i in range(3)]
+    respostas = executor.enviar_lote(ordens)
+    assert [r["status"] for r in respostas] == ["FILLED"] * 3
+    assert corretora.chamadas["futures_place_batch_order"] == 1
+    assert corretora.chamadas["futures_create_order"] == 3 and corretora.chamadas["futures_get_order"] == 0
+    assert len(corretora.execucoes) == 3
+
+
+def test_ordens_finais_antigas_sao_descartadas():
+    corretora = _corretora()
+    executor = _executor(corretora, retencao_s=60.0)
+    antiga = executor.preparar(PAR, "BUY", 1.0, T_VELA)
+    executor.enviar(antiga)
+    pendente = executor.preparar(PAR, "SELL", 1.0, T_VELA + PASSO)
+    pendente.estado = "ENVIANDO"
+    antiga.preparada_em -= 120
+    pendente.preparada_em -= 120
+    executor.preparar(PAR, "BUY", 1.0, T_VELA + 2 * PASSO)
+    assert antiga.id_cliente not in executor.ordens                 # executada há mais de ``retencao_s``
+    assert executor.preparada(PAR, "SELL", T_VELA + PASSO) is pendente     # sem estado final: continua
+    assert executor.pendentes() == [[PAR, pendente.id_cliente]]
+
+
+def test_id_cliente_com_par_longo_preserva_vela_e_lado():
+    prefixo, par = "cz15mE100x200", "1000000MOGUSDT"
+    entrada = id_cliente(prefixo, par, 1_700_002_000_000, "BUY")
+    saida = id_cliente(prefixo, par, 1_700_002_900_000, "SELL")
+    assert entrada != saida
+    assert entrada.endswith("-1700002000-B") and saida.endswith("-1700002900-S")
+    assert len(entrada) == len(saida) == 36 and re.fullmatch(r"[.A-Z:/a-z0-9_-]{1,36}", entrada)
+    assert entrada == id_cliente(prefixo, par, 1_700_002_000_000, "BUY")           # determinístico
+    assert entrada[:-13] != id_cliente("cz15mE100x201", par, 1_700_002_000_000, "BUY")[:-13]
+    assert id_cliente("sma", PAR, T_VELA, "BUY") == "sma-SOLUSDT-1700000000-B"      # curto: sem resumo
+
+
+def test_recusa_por_notional_nao_e_repetida(tmp_path):
+    corretora = _corretora()
+    simbolos = InfoSimbolos(corretora, diretorio=str(tmp_path))
+    executor = ExecutorOrdens(corretora, filtros={PAR: FILTROS}, espera_s=0.0, simbolos=simbolos)
+    ordem = executor.preparar(PAR, "BUY", 0.01, T_VELA)
+    with pytest.raises(BinanceAPIException) as erro:
+        executor.enviar(ordem)
+    assert erro.value.code == -4164 and ordem.estado == "REJEITADA"
+    assert corretora.chamadas["futures_create_order"] == 1 and corretora.chamadas["futures_exchange_info"] == 0
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Indicadores técnicos: lote x incremental x equivalentes em pandas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared.indicators import (
+    ATR, RSI, VWAP, Bollinger, CruzamentoMedias, DesvioRetornos, Media, Painel, desvio_retornos, rsi,
+)
+from shared.utils.data_fetcher import klines_para_array
+from tests.benchmarks.fixtures import gerar_klines
+
+AQUECIMENTO = 100
+
+
+@pytest.fixture(scope="module")
+def velas():
+    return klines_para_array(gerar_klines("SOLUSDT", "1h", 2000))
+
+
+def painel() -> Painel:
+    return Painel(sma7=Media(7), ema40=Media(40, "EMA"), atr14=ATR(14), vol20=DesvioRetornos(20),
+                  rsi14=RSI(14), bb20=Bollinger(20), vwap20=VWAP(20))
+
+
+def _semeada(serie: pd.Series, periodo: int, alfa: float) -> np.ndarray:
+    """``ewm(adjust=False)`` semeado pela média dos primeiros ``periodo`` valores."""
+    base = pd.concat([pd.Series([serie.iloc[:periodo].mean()]), serie.iloc[periodo:]], ignore_index=True)
+    saida = np.full(len(serie), np.nan)
+    saida[periodo - 1:] = base.ewm(alpha=alfa, adjust=False).mean().to_numpy()
+    return saida
+
+
+def test_lote_igual_a_pandas(velas):
+    series = painel().calcular(velas)
+    df = pd.DataFrame({c: velas[c] for c in ("high", "low", "close", "volume", "quote_vol")})
+    c = df["close"]
+    tr = pd.concat([df["high"] - df["low"], (df["high"] - c.shift()).abs(), (df["low"] - c.shift()).abs()],
+                   axis=1).max(axis=1)
+    variacao = c.diff().iloc[1:]
+    ganhos = _semeada(variacao.clip(lower=0), 14, 1 / 14)
+    perdas = _semeada((-variacao).clip(lower=0), 14, 1 / 14)
+    esperado = {
+        "sma7": c.rolling(7).mean().to_numpy(),
+        "ema40": _semeada(c, 40, 2 / 41),
+        "atr14": _semeada(tr, 14, 1 / 14),
+        "vol20": c.pct_change().rolling(20).std().to_numpy(),
+        "rsi14": np.concatenate([[np.nan], 100 - 100 / (1 + ganhos / perdas)]),
+        "vwap20": (df["quote_vol"].rolling(20).sum() / df["volume"].rolling(20).sum()).to_numpy(),
+    }
+    for nome, serie in esperado.items():
+        np.testing.assert_allclose(series[nome], serie, rtol=1e-9, err_msg=nome)
+    meio, desvio = c.rolling(20).mean(), c.rolling(20).std(ddof=0)
+    for obtida, serie in zip(series["bb20"], (meio - 2 * desvio, meio, meio + 2 * desvio)):
+        np.testing.assert_allclose(obtida, serie.to_numpy(), rtol=1e-9)
+
+
+def test_incremental_igual_ao_lote(velas):
+    lote = painel().calcular(velas)
+    ao_vivo = painel()
+    ao_vivo.aquecer(velas[:AQUECIMENTO])
+    passos = [ao_vivo.atualizar(vela) for vela in velas[AQUECIMENTO:]]
+    for nome, serie in lote.items():
+        obtida = np.array([p[nome] for p in passos])
+        esperada = np.array(serie)[..., AQUECIMENTO:]
+        np.testing.assert_allclose(obtida, esperada.T, rtol=1e-9, err_msg=nome)
+
+
+def test_aquecimento_curto_completa_com_atualizacoes(velas):
+    """Aquecer com menos velas que a janela e completar vela a vela dá o mesmo que o lote."""
+    lote = painel().calcular(velas[:60])
+    ao_vivo = painel()
+    valores = ao_vivo.aquecer(velas[:3])
+    assert np.isnan(valores["atr14"]) and np.isnan(valores["rsi14"])
+    for vela in velas[3:60]:
+        valores = ao_vivo.atualizar(vela)
+    for nome, serie in lote.items():
+        np.testing.assert_allclose(valores[nome], np.array(serie)[..., -1], rtol=1e-9, err_msg=nome)
+
+
+def test_mercado_volatil_mesmo_desvio_que_antes(velas):
+    fechamentos = velas["close"][-20:]
+    antes = np.std(np.diff(fechamentos) / fechamentos[:-1], ddof=1)
+    assert desvio_retornos(fechamentos, 19)[-1] == pytest.approx(antes, rel=1e-12)
+
+
+def test_rsi_sem_perdas_vale_100():
+    assert rsi(np.arange(1.0, 30.0), 14)[-1] == 100.0
+    assert rsi(np.full(30, 5.0), 14)[-1] == 50.0
+
+
+@pytest.mark.parametrize("tipo", ["SMA", "EMA"])
+def test_cruzamento_reiniciado_igual_a_um_novo(velas, tipo):
+    usado = CruzamentoMedias(7, 40, tipo)
+    usado.sincronizar(velas[:500])
+    rapida = usado.rapida
+    usado.reiniciar()
+    assert usado.ultimo_t_open is None and usado.sinal() == "MANTER" and usado.rapida is not rapida
+    novo = CruzamentoMedias(7, 40, tipo)
+    assert usado.sincronizar(velas[:900]) == novo.sincronizar(velas[:900])
+    assert usado.estado() == novo.estado()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Índice de exchange info: ida e volta pelo disco, atualização por validade e símbolos ausentes."""
+import logging
+
+import pytest
+
+from crypto.src.exchange_info import InfoSimbolos
+
+FILTROS = [{"filterType": "MARKET_LOT_SIZE", "stepSize": "0.01", "minQty": "0.01"},
+           {"filterType": "MIN_NOTIONAL", "notional": "5"}]
+
+
+@pytest.fixture(autouse=True)
+def _silencioso():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+class ClienteInfo:
+    """``futures_exchange_info`` com a lista de pares de ``pares``, contando os downloads."""
+
+    def __init__(self, *pares):
+        self.pares = list(pares)
+        self.downloads = 0
+
+    def futures_exchange_info(self):
+        self.downloads += 1
+        return {"symbols": [{"symbol": p, "status": "TRADING", "baseAsset": p[:-4], "quoteAsset": "USDT",
+                             "contractType": "PERPETUAL", "filters": FILTROS} for p in self.pares]}
+
+
+def test_simbolo_ausente_rebaixa_no_maximo_uma_vez_por_intervalo(tmp_path):
+    cliente = ClienteInfo("SOLUSDT")
+    info = InfoSimbolos(cliente, diretorio=str(tmp_path), intervalo_falta_s=60.0)
+    assert info.filtro("SOLUSDT", "MIN_NOTIONAL")["notional"] == "5"        # índice vazio: baixa
+    assert cliente.downloads == 1
+    for _ in range(20):
+        with pytest.raises(KeyError, match="SOLUSDTT não existe em futures"):
+            info.simbolo("SOLUSDTT")
+    assert cliente.downloads == 1                                           # índice recente: sem download
+
+    cliente.pares.append("NOVOUSDT")                                        # listado depois do download
+    info.obtido_em -= 61
+    assert info.simbolo("NOVOUSDT")["base"] == "NOVO"
+    assert cliente.downloads == 2
+
+
+def test_disco_ida_e_volta_sem_rede_e_atualizacao_quando_vence(tmp_path):
+    cliente = ClienteInfo("SOLUSDT", "BTCUSDT")
+    info = InfoSimbolos(cliente, diretorio=str(tmp_path), validade_s=3600)
+    avisos = []
+    info.ao_atualizar(lambda i: avisos.append(len(i.simbolos)))
+    assert info.vencido
+    info.garantir()
+    assert cliente.downloads == 1 and avisos == [2]
+    assert (tmp_path / "exchange_info_futures.json").exists()
+
+    # Nova instância: índice lido do disco, sem cliente e sem rede
+    do_disco = InfoSimbolos(None, diretorio=str(tmp_path), validade_s=3600)
+    assert not do_disco.vencido and do_disco.obtido_em == info.obtido_em
+    assert do_disco.simbolos == info.simbolos
+    assert do_disco.filtro("BTCUSDT", "MARKET_LOT_SIZE")["stepSize"] == "0.01"
+    assert do_disco.negociaveis() == ["BTCUSDT", "SOLUSDT"]
+
+    # Vencido: ``garantir`` baixa de novo e avisa os ouvintes
+    cliente.pares.remove("BTCUSDT")
+    info.obtido_em -= 3601
+    info.garantir()
+    assert cliente.downloads == 2 and avisos == [2, 1]
+    info.garantir()
+    assert cliente.downloads == 2
+    assert "BTCUSDT" not in InfoSimbolos(None, diretorio=str(tmp_path)).simbolos
+
+
+def test_disco_corrompido_comeca_vazio(tmp_path):
+    (tmp_path / "exchange_info_futures.json").write_text("{truncado", encoding="utf-8")
+    info = InfoSimbolos(ClienteInfo("SOLUSDT"), diretorio=str(tmp_path))
+    assert info.simbolos == {} and info.vencido
+    assert info.simbolo("SOLUSDT")["cotacao"] == "USDT"
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Logs em fila: JSON rotativo gravado por uma thread, formatação preguiçosa e níveis por subsistema."""
+import json
+import time
+import logging
+import threading
+from logging.handlers import RotatingFileHandler
+
+import pytest
+
+from shared.utils import logger as modulo
+from shared.utils.logger import configurar_logs, niveis_subsistema, parar_logs
+
+
+@pytest.fixture(autouse=True)
+def _raiz_restaurada():
+    raiz = logging.getLogger()
+    handlers, nivel = list(raiz.handlers), raiz.level
+    yield
+    parar_logs()
+    for h in list(raiz.handlers):
+        raiz.removeHandler(h)
+    for h in handlers:
+        raiz.addHandler(h)
+    raiz.setLevel(nivel)
+    for nome in ("teste.rest", "teste.estrategia"):
+        logging.getLogger(nome).setLevel(logging.NOTSET)
+
+
+class Sonda:
+    """Argumento de log que registra em qual thread foi formatado."""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return "sonda"
+
+
+def _linhas(caminho) -> list:
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(l) for l in f]
+
+
+def test_json_rotativo_com_extras_excecao_e_niveis_por_subsistema(tmp_path):
+    configurar_logs("robo", str(tmp_path), nivel="INFO", console=False,
+                    niveis=niveis_subsistema("teste.rest=WARNING, teste.estrategia=debug, x=NADA"))
+    sonda = Sonda()
+    logging.getLogger("teste.estrategia").debug("[MM] Rápida=%.6f | Lenta=%.6f %s", 1.5, 2.25, sonda,
+                                                extra={"par": "SOLUSDT"})
+    logging.getLogger("teste.rest").info("descartado pelo nível")
+    logging.getLogger("teste.rest").warning("[Peso] %d/%d", 2000, 2160)
+    logging.getLogger("teste.outro").debug("abaixo do nível da raiz")
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logging.getLogger("teste.outro").exception("[Erro] falhou")
+    parar_logs()
+
+    mm, peso, erro = _linhas(tmp_path / "robo.jsonl")
+    assert mm["msg"] == "[MM] Rápida=1.500000 | Lenta=2.250000 sonda" and mm["nivel"] == "DEBUG"
+    assert mm["logger"] == "teste.estrategia" and mm["par"] == "SOLUSDT" and mm["t"].endswith("Z")
+    assert mm["thread"] == threading.current_thread().name
+    assert sonda.threads and threading.current_thread().name not in sonda.threads     # formatado na thread de escrita
+    assert peso["msg"] == "[Peso] 2000/2160" and peso["nivel"] == "WARNING"
+    assert erro["msg"] == "[Erro] falhou" and "ZeroDivisionError" in erro["exc"]
+
+
+def test_disco_travado_nao_atrasa_quem_loga(tmp_path, monkeypatch):
+    emitir = RotatingFileHandler.emit
+
+    def disco_lento(self, record):
+        time.sleep(0.02)
+        emitir(self, record)
+
+    monkeypatch.setattr(RotatingFileHandler, "emit", disco_lento)
+    escuta = configurar_logs("lento", str(tmp_path), nivel="INFO", console=False, capacidade=50)
+    log = logging.getLogger("teste.estrategia")
+    duracoes = []
+    for i in range(300):
+        t0 = time.perf_counter()
+        log.info("[Ordem] %d enviada", i)
+        duracoes.append(time.perf_counter() - t0)
+    assert max(duracoes) < 0.01 and sum(duracoes) < 0.1
+    assert escuta.fila.descartados >= 200                               # fila cheia descarta, não bloqueia
+    assert modulo.obter_metricas().contador("robo_logs_descartados_total") >= escuta.fila.descartados
+    parar_logs()
+    gravadas = _linhas(tmp_path / "lento.jsonl")
+    assert len(gravadas) == 300 - escuta.fila.descartados
+    assert gravadas[0]["msg"] == "[Ordem] 0 enviada"
+
+
+def test_fila_cheia_nunca_perde_warning_ou_acima(tmp_path, monkeypatch):
+    emitir = RotatingFileHandler.emit
+
+    def disco_lento(self, record):
+        time.sleep(0.01)
+        emitir(self, record)
+
+    monkeypatch.setattr(RotatingFileHandler, "emit", disco_lento)
+    monkeypatch.setattr(modulo, "ESPERA_FILA_LOG_S", 0.001)
+    escuta = configurar_logs("alertas", str(tmp_path), nivel="INFO", console=False, capacidade=5)
+    log = logging.getLogger("teste.executor")
+    for i in range(40):
+        log.info("[Ordem] %d enviada", i)
+        log.error("[Ordem] %d rejeitada", i)
+    log.critical("[Runtime] parada")
+    parar_logs()
+    gravadas = [l["msg"] for l in _linhas(tmp_path / "alertas.jsonl")]
+    # Gravados direto passam à frente dos que estão na fila: a ordem muda, nada se perde
+    assert sorted(m for m in gravadas if "rejeitada" in m) == sorted(f"[Ordem] {i} rejeitada" for i in range(40))
+    assert "[Runtime] parada" in gravadas
+    assert escuta.fila.descartados > 0 and escuta.fila.diretos > 0            # só INFO é descartado
+    assert len(gravadas) == 81 - escuta.fila.descartados
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Registro de métricas: texto de exposição do Prometheus, percentis, arquivo e ``/metrics``."""
+import logging
+import urllib.error
+import urllib.request
+
+import pytest
+
+from shared.utils.logger import Metricas
+
+
+@pytest.fixture(autouse=True)
+def _silencioso():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _registro() -> Metricas:
+    m = Metricas()
+    m.incrementar("robo_ordens_estado_total", par="SOLUSDT", estado="FILLED")
+    m.incrementar("robo_ordens_estado_total", 2, par="SOLUSDT", estado="FILLED")
+    m.incrementar("robo_ordens_estado_total", par="BTCUSDT", estado="REJEITADA", lado=None)   # None: sem rótulo
+    m.definir("robo_saldo_usdt", 1012.5)
+    for valor in (0.05, 0.1, 0.3, 2.0):
+        m.observar("robo_ciclo_segundos", valor, limites=(0.1, 0.5, 1.0), par="SOLUSDT")
+    return m
+
+
+def test_texto_prometheus_de_contadores_medidores_e_histogramas():
+    assert _registro().texto() == "\n".join([
+        "# TYPE robo_ordens_estado_total counter",
+        'robo_ordens_estado_total{estado="FILLED",par="SOLUSDT"} 3',
+        'robo_ordens_estado_total{estado="REJEITADA",par="BTCUSDT"} 1',
+        "# TYPE robo_saldo_usdt gauge",
+        "robo_saldo_usdt 1012.5",
+        "# TYPE robo_ciclo_segundos histogram",
+        'robo_ciclo_segundos_bucket{par="SOLUSDT",le="0.1"} 2',        # o limite é inclusivo
+        'robo_ciclo_segundos_bucket{par="SOLUSDT",le="0.5"} 3',
+        'robo_ciclo_segundos_bucket{par="SOLUSDT",le="1"} 3',
+        'robo_ciclo_segundos_bucket{par="SOLUSDT",le="+Inf"} 4',
+        'robo_ciclo_segundos_sum{par="SOLUSDT"} 2.45',
+        'robo_ciclo_segundos_count{par="SOLUSDT"} 4',
+    ]) + "\n"
+
+
+def test_rotulos_escapados_percentis_e_limites_fixos_por_nome():
+    m = Metricas()
+    m.incrementar("robo_erros_total", msg='falha "dupla"\\n\nfim')
+    assert 'robo_erros_total{msg="falha \\"dupla\\"\\\\n\\nfim"} 1' in m.texto()
+
+    for i in range(1, 101):
+        m.observar("robo_latencia", i / 100, limites=(0.5,), par="A")
+    m.observar("robo_latencia", 0.7, limites=(0.1, 0.2), par="B")          # limites do primeiro registro valem
+    h = m.histograma("robo_latencia", par="A")
+    assert (h.percentil(50), h.percentil(99), h.total) == (0.51, 1.0, 100)
+    assert m.histograma("robo_latencia", par="B").limites == (0.5,)
+    assert "p50=0.51" in m.resumo() and m.total("robo_erros_total") == 1
+
+
+def test_arquivo_atomico_e_endpoint_metrics(tmp_path):
+    m = _registro()
+    m.arquivo = str(tmp_path / "metricas" / "robo.prom")
+    m.exportar()
+    assert (tmp_path / "metricas" / "robo.prom").read_text(encoding="utf-8") == m.texto()
+    assert not (tmp_path / "metricas" / "robo.prom.tmp").exists()
+
+    servidor = m.servir(0)
+    try:
+        porta = servidor.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{porta}/metrics?x=1", timeout=5) as r:
+            assert r.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert r.read().decode() == m.texto()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{porta}/outro", timeout=5)
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Divisão walk-forward do otimizador e uma otimização completa em dois processos."""
+import csv
+import logging
+import math
+
+import pytest
+
+from crypto.strategies.optimizer import COLUNAS_SAIDA, dividir_dobras, otimizar, salvar_tabela
+from shared.utils.candle_archive import ArquivoVelas
+from shared.utils.data_fetcher import klines_para_array
+from tests.benchmarks.fixtures import gerar_klines
+
+
+def test_dobras_contiguas_sem_sobreposicao():
+    assert dividir_dobras(100, 0, 3) == [(0, 100, 100)]
+    fatias = dividir_dobras(100, 3, 2)                      # segmentos de 20 velas
+    assert fatias == [(0, 40, 60), (20, 60, 80), (40, 80, 100)]
+    assert all(a[2] == b[1] for a, b in zip(fatias, fatias[1:]))
+
+
+def test_amostra_curta_demais_para_as_dobras():
+    assert dividir_dobras(5, 3, 2) == [(0, 2, 3), (1, 3, 4), (2, 4, 5)]
+    with pytest.raises(ValueError, match="4 velas não bastam para 3 dobra"):
+        dividir_dobras(4, 3, 2)
+
+
+def test_otimizacao_em_dois_processos_sobre_o_arquivo(tmp_path):
+    ArquivoVelas(str(tmp_path), "SOLUSDT", "1h").anexar(klines_para_array(gerar_klines("SOLUSDT", "1h", 800)))
+    logging.disable(logging.WARNING)
+    try:
+        linhas = otimizar(["SOLUSDT", "XRPUSDT"], ["1h"], range(3, 9), range(20, 41, 5), dobras=2, treino=2,
+                          top=3, processos=2, diretorio=str(tmp_path))
+    finally:
+        logging.disable(logging.NOTSET)
+
+    assert len(linhas) == 2 * 3                             # XRPUSDT sem velas no arquivo: ignorado
+    assert {(l["simbolo"], l["dobra"]) for l in linhas} == {("SOLUSDT", 0), ("SOLUSDT", 1)}
+    retornos = [l["retorno_teste"] for l in linhas]
+    assert not any(math.isnan(r) for r in retornos) and retornos == sorted(retornos, reverse=True)
+    assert all(3 <= l["rapida"] <= 8 and l["lenta"] in range(20, 41, 5) for l in linhas)
+
+    saida = tmp_path / "otimizacao.csv"
+    salvar_tabela(linhas, str(saida))
+    with open(saida, newline="") as f:
+        leitor = csv.reader(f)
+        assert next(leitor) == COLUNAS_SAIDA
+        assert sum(1 for _ in leitor) == len(linhas)